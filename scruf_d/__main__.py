@@ -4,17 +4,33 @@ import os
 import toml
 from scruf.util.errors import ConfigFileError
 from scruf import Scruf
+# The runners are imported on first use (see scruf.runner), so a plain run does not load them
+from scruf import runner
 
 
 def read_args():
     parser = argparse.ArgumentParser(
         description='SCRUF-D tool for dynamic fairness-aware recommender systems experiments')
 
-    parser.add_argument('config_file', help='Path to the configuration file.')
+    parser.add_argument('config_file', nargs='?', help='Path to the configuration file.')
     parser.add_argument('-p', '--post', action='store_true',
                         help='Post-processing only. If set, no simulation will be run.')
     parser.add_argument('-g', '--progress', action='store_true',
                         help='Shows progress bar if set.')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Run the simulation even if a cached result exists.')
+    parser.add_argument('-r', '--resume', action='store_true',
+                        help='Continue an interrupted simulation from its last checkpoint.')
+    parser.add_argument('-s', '--serve', action='store_true',
+                        help='Run as an online re-ranking service (see [service] in the configuration).')
+    parser.add_argument('-n', '--replicates', action='store_true',
+                        help='Run the experiment over several random seeds (see [replicates] in the configuration).')
+    parser.add_argument('-k', '--sharded', action='store_true',
+                        help='Split the simulation over several processes (see [sharding] in the configuration).')
+    parser.add_argument('-q', '--queue', metavar='QUEUE_DIR',
+                        help='Publish the configuration as a job to the work queue in QUEUE_DIR instead of running it.')
+    parser.add_argument('-w', '--worker', metavar='QUEUE_DIR',
+                        help='Run jobs from the work queue in QUEUE_DIR until it is finished (no configuration file).')
 
     input_args = parser.parse_args()
     arg_check(vars(input_args))
@@ -22,7 +38,12 @@ def read_args():
 
 
 def arg_check(input_args):
+    if input_args['worker'] is not None:
+        return
     config_file = input_args['config_file']
+    if config_file is None:
+        print('A configuration file is needed unless --worker is given. Exiting.')
+        exit(-1)
     if not os.path.exists(config_file):
         print(f'Configuration file {config_file} not found. Working directory: {os.getcwd()} Exiting.')
         exit(-1)
@@ -39,18 +60,45 @@ def load_config(config_file):
 if __name__ == '__main__':
 
     args = read_args()
+
+    if args['worker'] is not None:
+        runner.QueueWorker(runner.WorkQueue(args['worker']), force=args['force']).run()
+        exit(0)
+
     config = load_config(args['config_file'])
     post_only = args['post']
     progress = args['progress']
+    force = args['force']
+    resume = args['resume']
+    serve = args['serve']
+    replicates = args['replicates']
+    sharded = args['sharded']
+    queue_dir = args['queue']
 
     if config == None:
         raise ConfigFileError(args['config_file'])
 
+    if queue_dir is not None:
+        print(f'Published job {runner.WorkQueue(queue_dir).publish_configs([config])[0]}')
+        exit(0)
+
+    if serve:
+        runner.RerankService.from_config(config).run()
+        exit(0)
+
+    if replicates:
+        runner.ReplicateRunner.from_config(config).run_and_write(progress=progress)
+        exit(0)
+
+    if sharded:
+        runner.ShardedRun.from_config(config).run_and_write()
+        exit(0)
+
     scruf = Scruf(config, post_only=post_only)
 
     if post_only:
         scruf.post_process()
 
-    scruf.run_experiment(progress = progress)
+    scruf.run_experiment(progress = progress, force = force, resume = resume)
 
     exit(0)
\ No newline at end of file
@@ -1,17 +1,21 @@
 import argparse
-import logging
 import os
-import toml
-from scruf.util.errors import ConfigFileError
-from scruf import Scruf
-from _toml_gen import path_list
-import pathlib
+from scruf.runner import run_grid
+from _toml_gen import load_params, build_grid
+
+# Runs the experiment grid described by params.yaml in the current directory. The configurations are
+# generated in memory; nothing is written to disk except the simulation output.
 
 def read_args():
     parser = argparse.ArgumentParser(
         description='SCRUF-D tool for dynamic fairness-aware recommender systems experiments')
 
-    parser.add_argument('config_file', help='Path to the configuration file.')
+    parser.add_argument('params_file', nargs='?', default='params.yaml',
+                        help='Path to the grid parameters file. Default: params.yaml')
+    parser.add_argument('-w', '--workers', type=int, default=1,
+                        help='Number of worker processes.')
+    parser.add_argument('-f', '--force', action='store_true',
+                        help='Run the simulation even if a cached result exists.')
 
     input_args = parser.parse_args()
     arg_check(vars(input_args))
@@ -19,32 +23,25 @@ def read_args():
 
 
 def arg_check(input_args):
-    config_file = input_args['config_file']
-    if not os.path.exists(config_file):
-        print(f'Configuration file {config_file} not found. Working directory: {os.getcwd()} Exiting.')
+    params_file = input_args['params_file']
+    if not os.path.exists(params_file):
+        print(f'Parameters file {params_file} not found. Working directory: {os.getcwd()} Exiting.')
         exit(-1)
     else:
         return
 
 
-def load_config(config_file):
-    with open(config_file, 'r') as f:
-        config = toml.load(f)
-    return config
+if __name__ == '__main__':
+    args = read_args()
+    params = load_params(args['params_file'])
+    grid = build_grid(params)
+    total = len(grid)
+    finished = []
 
+    def report(history_file):
+        finished.append(history_file)
+        print("Finished: " + str(len(finished)) + "/" + str(total))
 
-config_paths = path_list
-counter = 0
-total = len(path_list)
-for config_path in config_paths:
-    counter += 1
-    config = load_config(config_path[1])
-    if config == None:
-        raise ConfigFileError("No file found")
-    scruf = Scruf(config)
-    scruf.run_experiment()
-    print("Finished: "+str(counter)+"/"+str(total))
+    run_grid(grid, workers=args['workers'], force=args['force'], callback=report)
 
-#os.remove("fair1.toml")
-#os.remove("fair2.toml")
-exit(0)
\ No newline at end of file
+    exit(0)
@@ -2,21 +2,18 @@ import toml
 import pandas as pd
 from ruamel.yaml import YAML
 import itertools
+from scruf.runner import ConfigGrid
 
-yaml = YAML(typ="safe")
+# Builds the experiment grid described by params.yaml: choice × allocation × rec_weight × agent deltas
+# applied to the base TOML file. The grid yields config dicts directly (see __main__recsys_25.py).
+# Running this file as a script still writes one TOML per configuration plus path_list.csv.
 
-# Load parameters from YAML
-params = yaml.load(open("params.yaml", encoding="utf-8"))
-folder_path = params["config"]["folder_path"]
-base_toml_file = params["config"]["base_toml"]
+yaml = YAML(typ="safe")
 
-# Extract choices, allocations, and recommender weights
-choices = params["config"]["choice"]
-allocations = params["config"]["allocation"]
-rec_weights = params["config"]["rec_weight"]
 
-# Extract agent delta values
-agent_deltas = params["config"].get("agent", {})
+def load_params(params_file="params.yaml"):
+    with open(params_file, encoding="utf-8") as f:
+        return yaml.load(f)
 
 
 def remove_suffix(input_string, suffix):
@@ -25,7 +22,7 @@ def remove_suffix(input_string, suffix):
         return input_string[:-len(suffix)]
     return input_string
 
-def generate_agent_combinations():
+def generate_agent_combinations(agent_deltas):
     """Generate all possible agent delta combinations."""
     agent_keys = list(agent_deltas.keys())  # ['one', 'two']
     agent_value_combinations = list(itertools.product(*agent_deltas.values()))
@@ -52,34 +49,22 @@ def format_agent_deltas(agent_delta_config):
     """Format agent deltas into a filename-friendly string."""
     return "_".join([f"agent{key}-{delta}" for key, delta in agent_delta_config.items()])
 
-def generate_config(base, config_number, rec_weight, choice, allocation, agent_delta_config):
-    """Generate and save a modified TOML configuration file."""
-    base_toml = toml.load(base)
-
-    # Update agent deltas
-    base_toml = update_agent_deltas(base_toml, agent_delta_config)
-
-    # Format deltas into filename
-    delta_str = format_agent_deltas(agent_delta_config)
-    
-    choice2 = choice
+def choice_label(choice):
     if choice == "weighted_scoring":
-        choice2 = "Rescore"
+        return "Rescore"
+    return choice
 
-    allocation2 = allocation
+def allocation_label(allocation):
     if allocation == "weighted_product_allocation":
-        allocation2 = "Product"
+        return "Product"
     if allocation == "product_lottery":
-        allocation2 = "lottery"
+        return "lottery"
     if allocation == "least_fair":
-        allocation2 = "leastFair"
+        return "leastFair"
+    return allocation
 
-    # Modify output filenames with deltas
-    base_filename = remove_suffix(base_toml["output"]["filename"], ".json")
-    new_filename = f"{base_filename}_{choice2}_{allocation2}_{rec_weight}_{delta_str}.json"
-    base_toml["output"]["filename"] = new_filename
-
-    # Set choice properties
+def apply_choice(base_toml, choice):
+    """Set choice properties"""
     if choice == "weighted_scoring":
         base_toml["choice"]["choice_class"] = choice
     else:
@@ -87,48 +72,53 @@ def generate_config(base, config_number, rec_weight, choice, allocation, agent_d
         base_toml["choice"]["properties"]["tie_breaker"] = "Random"
         base_toml["choice"]["properties"]["ignore_weights"] = "false"
         base_toml["choice"]['choice_class'] = "whalrus_scoring"
-    
-    # Set allocation properties
+
+def apply_allocation(base_toml, allocation):
+    """Set allocation properties"""
     base_toml["allocation"]["allocation_class"] = allocation
     if allocation == "weighted_product_allocation":
         base_toml["allocation"]["properties"]["compatibility_exponent"] = 2
         base_toml["allocation"]["properties"]["fairness_exponent"] = 1
-    
-    base_toml["choice"]["properties"]["recommender_weight"] = rec_weight
-
-    # Generate config filename with deltas
-    config_name = f"{folder_path}/{remove_suffix(base.split('/')[-1], '.toml')}_{choice2}_{allocation2}_{rec_weight}_{delta_str}.toml"
-    
-    # Save the modified TOML file
-    with open(config_name, 'w') as f:
-        toml.dump(base_toml, f)
-
-    return config_name, new_filename
-
-# Generate configurations
-config_number_counter = 0
-path_list = []
-agent_combinations = generate_agent_combinations()
-
-
-for choice in choices:
-    for allocation in allocations:
-        for rec_weight in rec_weights:
-            for agent_delta_config in agent_combinations:
-                config_number_counter += 1
-                toml_name, history_name = generate_config(
-                    base_toml_file, 
-                    config_number_counter, 
-                    float(rec_weight),
-                    choice, 
-                    allocation, 
-                    agent_delta_config
-                )
-                path_list.append((config_number_counter, toml_name, history_name, float(rec_weight), agent_delta_config))
-
-# Save the generated configuration paths
-config_df = pd.DataFrame(path_list, columns=['Config Number', 'Config Path', 'Output Path', 'Recommender Weight', 'Agent Deltas'])
-config_df.to_csv(f"{folder_path}/path_list.csv", index=False)
-
 
+def apply_rec_weight(base_toml, rec_weight):
+    base_toml["choice"]["properties"]["recommender_weight"] = rec_weight
 
+def history_name(filename, labels):
+    """Modify output filenames with the grid labels"""
+    return f"{remove_suffix(filename, '.json')}_{'_'.join(labels)}.json"
+
+def build_grid(params):
+    """Create the in-memory grid for the parameters in params.yaml"""
+    config_params = params["config"]
+    base_toml = toml.load(config_params["base_toml"])
+    grid = ConfigGrid(base_toml, name_fn=history_name)
+    grid.add_axis("choice", config_params["choice"], apply=apply_choice, label=choice_label)
+    grid.add_axis("allocation", config_params["allocation"], apply=apply_allocation, label=allocation_label)
+    grid.add_axis("rec_weight", [float(rec_weight) for rec_weight in config_params["rec_weight"]],
+                  apply=apply_rec_weight)
+    grid.add_axis("agent", generate_agent_combinations(config_params.get("agent", {})),
+                  apply=update_agent_deltas, label=format_agent_deltas)
+    return grid
+
+def write_grid(grid, params):
+    """Save one TOML file per configuration and the list of generated paths"""
+    folder_path = params["config"]["folder_path"]
+    base_name = remove_suffix(params["config"]["base_toml"].split('/')[-1], '.toml')
+    path_list = []
+    for config_number, point in enumerate(grid.points(), start=1):
+        config = grid.make_config(point)
+        history_file = config["output"]["filename"]
+        config_name = f"{folder_path}/{base_name}_{'_'.join(grid.labels(point))}.toml"
+        with open(config_name, 'w') as f:
+            toml.dump(config, f)
+        path_list.append((config_number, config_name, history_file, point["rec_weight"], point["agent"]))
+
+    config_df = pd.DataFrame(path_list, columns=['Config Number', 'Config Path', 'Output Path',
+                                                 'Recommender Weight', 'Agent Deltas'])
+    config_df.to_csv(f"{folder_path}/path_list.csv", index=False)
+    return path_list
+
+
+if __name__ == '__main__':
+    params = load_params()
+    write_grid(build_grid(params), params)
@@ -0,0 +1,85 @@
+# Start-up cost of the data sources. Writes a synthetic data set (users, candidate lists, item features,
+# compatibilities and popularity) to a temporary directory and sets up the data for a few configurations
+# that need different sources. For each, reports the time and peak memory of each source that was loaded
+# (from the DataLoader report, with memory tracing, which slows the loading down) and the total time,
+# without tracing, against loading every source, as was done before the components declared their data.
+# The times are the best of --repeats runs.
+#
+# Usage (from scruf_d): python -m benchmarks.data_loading [--users 5000] [--items 100000] [--repeats 3]
+import argparse
+import copy
+import gc
+import random
+import tempfile
+import time
+import scruf
+from scruf.data import DataLoader
+from benchmarks.rerank_service import CONFIG, write_data
+
+
+# Stands for the setup before the components declared their data, which loaded every source
+class EverySource:
+    DATA_SOURCES = DataLoader.SOURCES
+
+
+def configurations():
+    features = copy.deepcopy(CONFIG)
+    # No item features: fairness from the Gini sketch, preferences from the popularity counts
+    popularity = copy.deepcopy(CONFIG)
+    for agent in popularity['agent'].values():
+        agent['metric_class'] = 'gini_sketch'
+        agent['metric'] = {'num_items': 1000, 'target': 0.5, 'sample_rate': 0.1, 'relative_accuracy': 0.01}
+        agent['preference_function_class'] = 'ind_norm'
+        agent['preference'] = {'delta': 0.5}
+    # Neither
+    minimal = copy.deepcopy(popularity)
+    for agent in minimal['agent'].values():
+        agent['preference_function_class'] = 'zero_preference'
+        agent.pop('preference')
+    return [('item features', features), ('popularity', popularity), ('minimal', minimal)]
+
+
+def time_setup(config, all_sources, trace_memory):
+    scruf.Scruf.state = None
+    gc.collect()
+    scruf.Scruf(config)
+    state = scruf.Scruf.state
+    state.data_loader = DataLoader(trace_memory=trace_memory)
+    start = time.perf_counter()
+    if all_sources:
+        scruf.Scruf.load_data([('every source', EverySource)])
+    else:
+        scruf.Scruf.setup_data()
+    return time.perf_counter() - start, state.data_loader.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time and memory of loading the data sources.')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        write_data(path, random.Random(0), args.users, args.items, args.candidates)
+        print(f'users={args.users} items={args.items} candidates={args.candidates}')
+        for name, config in configurations():
+            config['location']['path'] = path
+            _, report = time_setup(config, all_sources=False, trace_memory=True)
+            needed, every = float('inf'), float('inf')
+            for _ in range(args.repeats):
+                needed = min(needed, time_setup(config, False, False)[0])
+                every = min(every, time_setup(config, True, False)[0])
+            print(f'\n{name}: {needed:.2f} s for the sources needed, {every:.2f} s for all of them')
+            print(f'{"source":>14} {"loaded":>7} {"seconds":>8} {"peak MB":>8} {"kept MB":>8}  needed by')
+            for source, entry in report.items():
+                if entry['loaded']:
+                    print(f'{source:>14} {"yes":>7} {entry["seconds"]:8.2f} {entry["peak_mb"]:8.1f} '
+                          f'{entry["retained_mb"]:8.1f}  {", ".join(entry["needed_by"])}')
+                else:
+                    print(f'{source:>14} {"no":>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Compares the fixed history window with the exponentially decayed window (parameters.window = "decay")
+# on fairness convergence and throughput.
+#
+# A stream of output lists is generated in which the share of protected items jumps from --before to
+# --after half way through. Each step adds one list and computes the fairness of three agents
+# (proportional_item, mrr and disparate_exposure). The fixed window keeps --window lists; the decayed
+# window uses a half life that gives lists the same mean age (window / 2 * ln 2), and a history of one list.
+# Reports the time per step, the memory held by the window statistics and the number of steps after the
+# jump until the estimated protected share (protected_count / item_count) stays within --tolerance of
+# the new share.
+#
+# Usage (from scruf_d): python -m benchmarks.decay_window [--window 1000] [--steps 4000]
+import argparse
+import math
+import random
+import time
+import scruf
+from scruf.util import ResultList, HistoryCollection
+from scruf.history import ScrufHistory
+from benchmarks.fused_fairness import make_item_features, make_agents
+
+
+def make_stream(rand, steps, list_size, item_features, before, after):
+    protected = [item for item in item_features.item_ids if item_features.is_protected('f1', item)]
+    unprotected = [item for item in item_features.item_ids if not item_features.is_protected('f1', item)]
+    stream = []
+    for step in range(steps):
+        share = before if step < steps // 2 else after
+        items = [rand.choice(protected) if rand.random() < share else rand.choice(unprotected)
+                 for _ in range(list_size)]
+        rlist = ResultList()
+        rlist.setup([('u1', item, list_size - rank) for rank, item in enumerate(dict.fromkeys(items))],
+                    presorted=True)
+        stream.append(rlist)
+    return stream
+
+
+def run(mode, stream, window, half_life, agents):
+    history = ScrufHistory()
+    history.window_mode = mode
+    history.half_life = half_life
+    history.choice_output_history = HistoryCollection(window if mode == 'fixed' else 1)
+
+    shares = []
+    elapsed = 0.0
+    for rlist in stream:
+        history.choice_output_history.add_item(rlist)
+        start = time.perf_counter()
+        agents.compute_fairnesses(history)
+        elapsed += time.perf_counter() - start
+        stats = history.get_output_window().compute_stats({'f1': ['item_count', 'protected_count']})['f1']
+        shares.append(stats['protected_count'] / stats['item_count'])
+    window_bytes = sum(value.nbytes for value in vars(history.get_output_window()).values()
+                       if hasattr(value, 'nbytes'))
+    return elapsed / len(stream), window_bytes, shares
+
+
+def settle_steps(shares, start, target, tolerance):
+    for step in range(len(shares) - 1, start - 1, -1):
+        if abs(shares[step] - target) > tolerance:
+            return step + 1 - start
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fixed vs decayed history windows.')
+    parser.add_argument('--window', type=int, default=1000)
+    parser.add_argument('--steps', type=int, default=4000)
+    parser.add_argument('--list-size', type=int, default=10)
+    parser.add_argument('--before', type=float, default=0.2)
+    parser.add_argument('--after', type=float, default=0.5)
+    parser.add_argument('--tolerance', type=float, default=0.02)
+    parser.add_argument('--num-items', type=int, default=2000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+    item_features = make_item_features(args.num_items, rand)
+    scruf.Scruf.state.item_features = item_features
+    stream = make_stream(rand, args.steps, args.list_size, item_features, args.before, args.after)
+    agents = make_agents(3)
+    half_life = args.window / 2 * math.log(2)
+
+    print(f'window={args.window} half_life={half_life:.0f} steps={args.steps} '
+          f'protected share {args.before} -> {args.after}')
+    print(f'{"mode":>6} {"ms/step":>8} {"window bytes":>13} {"settle steps":>13} {"final share":>12}')
+    for mode in ['fixed', 'decay']:
+        step_time, window_bytes, shares = run(mode, stream, args.window, half_life, agents)
+        settle = settle_steps(shares, args.steps // 2, args.after, args.tolerance)
+        print(f'{mode:>6} {step_time * 1000:8.3f} {window_bytes:13d} {settle:>13} {shares[-1]:12.3f}')
+
+
+if __name__ == '__main__':
+    main()
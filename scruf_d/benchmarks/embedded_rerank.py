@@ -0,0 +1,66 @@
+# Latency of the in-process Reranker: one rerank() call per user, with the candidate list passed as
+# arrays of items and scores, compatibilities with the call and the history kept in memory only (no
+# files are read or written after construction).
+#
+# Reports the p50/p99 time per call for each candidate list length, with a few proportional fairness
+# agents over binary item features.
+#
+# Usage (from scruf_d): python -m benchmarks.embedded_rerank [--calls 5000] [--candidates 20,100,500]
+import argparse
+import random
+import time
+import numpy as np
+from scruf.runner import Reranker
+
+
+def make_config(num_agents, list_size, choice_class):
+    agents = {}
+    for agent in range(num_agents):
+        agents[f'a{agent}'] = {'name': f'A{agent}', 'metric_class': 'proportional_item',
+                               'compatibility_class': 'context_compatibility',
+                               'preference_function_class': 'binary_preference',
+                               'metric': {'feature': f'F{agent}', 'proportion': 0.5},
+                               'preference': {'feature': f'F{agent}', 'delta': 0.5}}
+    return {'parameters': {'list_size': list_size, 'history_window_size': 50, 'random_seed': 11},
+            'feature': {f'f{agent}': {'name': f'F{agent}', 'protected_feature': f'f{agent}', 'protected_values': 1}
+                        for agent in range(num_agents)},
+            'agent': agents,
+            'allocation': {'allocation_class': 'product_lottery'},
+            'choice': {'choice_class': choice_class, 'properties': {'recommender_weight': 0.8}}}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latency of embedded re-ranking.')
+    parser.add_argument('--calls', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=10000)
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--list-size', type=int, default=10)
+    parser.add_argument('--candidates', default='20,100,500')
+    parser.add_argument('--choice', default='weighted_scoring')
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    items = np.array([f'i{item}' for item in range(args.items)], dtype=object)
+    features = [(items[item], f'f{agent}', rand.randint(0, 1))
+                for item in range(args.items) for agent in range(args.agents)]
+    names = [f'A{agent}' for agent in range(args.agents)]
+
+    print(f'agents={args.agents} list_size={args.list_size} choice={args.choice} calls={args.calls}')
+    print(f'{"candidates":>10} {"p50 us":>9} {"p99 us":>9}')
+    for num_candidates in [int(size) for size in args.candidates.split(',')]:
+        reranker = Reranker(make_config(args.agents, args.list_size, args.choice), item_features=features)
+        np_rand = np.random.default_rng(0)
+        times = []
+        for call in range(args.calls):
+            candidates = items[np_rand.choice(args.items, num_candidates, replace=False)]
+            scores = np_rand.random(num_candidates)
+            compatibility = {name: rand.random() for name in names}
+            start = time.perf_counter()
+            reranker.rerank(f'u{call}', candidates, scores=scores, compatibility=compatibility)
+            times.append(time.perf_counter() - start)
+        times = 1e6 * np.array(times)
+        print(f'{num_candidates:>10} {np.percentile(times, 50):9.1f} {np.percentile(times, 99):9.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Accuracy and memory of the approximate exposure statistics (scruf.util.ExposureSketch) against exact
+# per-item counts, on a skewed stream of output lists over a large catalog.
+#
+# Usage (from scruf_d): python -m benchmarks.exposure_sketch [--num-items 1000000] [--lists 20000]
+import argparse
+import random
+import sys
+import time
+import numpy as np
+from scruf.util import ExposureSketch
+
+
+def exact_summary(counts, num_items):
+    values = np.sort(np.concatenate([np.fromiter(counts.values(), dtype=np.float64),
+                                     np.zeros(num_items - len(counts))]))
+    index = np.arange(1, num_items + 1)
+    gini = ((2 * index - num_items - 1) * values).sum() / (num_items * values.sum())
+    return {'distinct_items': len(counts), 'coverage': len(counts) / num_items,
+            'min': values[0], 'median': float(np.median(values)), 'max': values[-1], 'gini': float(gini)}
+
+
+def dict_bytes(counts):
+    # The dict itself plus the keys; small int values are shared
+    return sys.getsizeof(counts) + sum(sys.getsizeof(key) for key in counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Exposure sketch accuracy and memory.')
+    parser.add_argument('--num-items', type=int, default=1000000)
+    parser.add_argument('--lists', type=int, default=20000)
+    parser.add_argument('--list-size', type=int, default=10)
+    # Item positions are num_items * u ** skew for uniform u, so larger values concentrate the exposure
+    parser.add_argument('--skew', type=float, default=4.0)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    stream = [[f'i{int(args.num_items * rand.random() ** args.skew)}' for _ in range(args.list_size)]
+              for _ in range(args.lists)]
+
+    start = time.perf_counter()
+    counts = {}
+    for items in stream:
+        for item in items:
+            counts[item] = counts.get(item, 0) + 1
+    exact_time = time.perf_counter() - start
+    exact = exact_summary(counts, args.num_items)
+
+    print(f'catalog={args.num_items} lists={args.lists} list_size={args.list_size} '
+          f'distinct={len(counts)}')
+    print(f'exact: {dict_bytes(counts) / 2**20:.2f} MB, {exact_time:.2f} s')
+    print(f'{"epsilon":>8} {"hll":>6} {"alpha":>6} {"sample":>7} {"MB":>7} {"s":>6} '
+          f'{"coverage err":>13} {"gini err":>9} {"max err":>8} {"median":>7}')
+    for epsilon, hll_error, alpha, sample_rate in [(0.001, 0.02, 0.02, 0.005), (0.0002, 0.01, 0.01, 0.02),
+                                                   (0.00005, 0.005, 0.005, 0.05)]:
+        sketch = ExposureSketch(args.num_items, epsilon=epsilon, delta=0.01, hll_error=hll_error, alpha=alpha,
+                                sample_rate=sample_rate)
+        start = time.perf_counter()
+        for items in stream:
+            sketch.add_items(items)
+        sketch_time = time.perf_counter() - start
+        summary = sketch.summary()
+        print(f'{epsilon:8.5f} {hll_error:6.3f} {alpha:6.3f} {sample_rate:7.3f} {summary["memory_bytes"] / 2**20:7.2f} '
+              f'{sketch_time:6.2f} '
+              f'{abs(summary["coverage"] - exact["coverage"]) / exact["coverage"]:13.4f} '
+              f'{abs(summary["gini"] - exact["gini"]):9.4f} '
+              f'{abs(summary["max"] - exact["max"]) / exact["max"]:8.4f} '
+              f'{summary["median"]:7.1f}')
+    print(f'exact gini {exact["gini"]:.4f}, max {exact["max"]:.0f}, median {exact["median"]:.1f}')
+
+
+if __name__ == '__main__':
+    main()
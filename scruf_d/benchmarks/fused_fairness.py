@@ -0,0 +1,94 @@
+# Timing benchmark for the fairness computation of an agent collection: each agent's metric walking the
+# output window (the old behavior) versus the fused window statistics computed once for all agents.
+#
+# Three agents use proportional_item, mrr and disparate_exposure on the same protected feature. The
+# window is filled, then each simulated step adds one list and computes all of the agents' fairness.
+#
+# Usage (from scruf_d): python -m benchmarks.fused_fairness [--window 8000] [--list-size 10] [--steps 20]
+import argparse
+import random
+import time
+import scruf
+from scruf.util import ResultList, HistoryCollection
+from scruf.history import ScrufHistory
+from scruf.data import ItemFeatureData
+from scruf.agent import AgentCollection, FairnessAgent, ProportionalItemFM, MeanReciprocalRankFM, \
+    DisparateExposureFM
+
+METRICS = [(ProportionalItemFM, {'feature': 'f1', 'proportion': 0.5}),
+           (MeanReciprocalRankFM, {'feature': 'f1', 'target': 0.5}),
+           (DisparateExposureFM, {'feature': 'f1', 'target': 0.5, 'n_protected': 0.3})]
+
+
+def make_item_features(num_items, rand):
+    item_data = ItemFeatureData()
+    item_data.item_feature_index = {f'i{item}': {'f1': int(rand.random() < 0.3)} for item in range(num_items)}
+    item_data.known_features = {'f1': ('f1', 1)}
+    item_data.setup_indices()
+    return item_data
+
+
+def make_agents(count):
+    agents = AgentCollection()
+    for i in range(count):
+        metric_class, props = METRICS[i % len(METRICS)]
+        agent = FairnessAgent(f'agent{i}')
+        agent.fairness_metric = metric_class()
+        agent.fairness_metric.setup(props)
+        agents.agents.append(agent)
+    return agents
+
+
+def make_list(rand, list_size, num_items):
+    rlist = ResultList()
+    rlist.setup([('u1', f'i{item}', rand.random()) for item in rand.sample(range(num_items), list_size)])
+    return rlist
+
+
+def run(mode, agents, window, list_size, steps, num_items, seed=0):
+    rand = random.Random(seed)
+    history = ScrufHistory()
+    history.choice_output_history = HistoryCollection(window)
+    history.choice_output_history.add_items([make_list(rand, list_size, num_items) for _ in range(window)])
+    new_lists = [make_list(rand, list_size, num_items) for _ in range(steps)]
+    if mode == 'fused':
+        # The window arrays are built once, before the timed steps
+        history.get_output_window()
+
+    start = time.perf_counter()
+    for rlist in new_lists:
+        history.choice_output_history.add_item(rlist)
+        if mode == 'fused':
+            fairness = agents.compute_fairnesses(history)
+        else:
+            fairness = {agent.name: agent.fairness_metric.compute_fairness(history) for agent in agents.agents}
+    return (time.perf_counter() - start) / steps, fairness
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fused fairness computation over the output window.')
+    parser.add_argument('--window', type=int, default=8000)
+    parser.add_argument('--list-size', type=int, default=10)
+    parser.add_argument('--steps', type=int, default=20)
+    parser.add_argument('--num-items', type=int, default=2000)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+    scruf.Scruf.state.item_features = make_item_features(args.num_items, rand)
+
+    print(f'window={args.window} list_size={args.list_size} steps={args.steps}')
+    print(f'{"agents":>6} {"per-metric ms/step":>19} {"fused ms/step":>14} {"speedup":>8}')
+    for count in [1, 3, 6]:
+        agents = make_agents(count)
+        metric_time, metric_fairness = run('per-metric', agents, args.window, args.list_size, args.steps,
+                                           args.num_items)
+        fused_time, fused_fairness = run('fused', agents, args.window, args.list_size, args.steps,
+                                         args.num_items)
+        for name, value in metric_fairness.items():
+            assert abs(value - fused_fairness[name]) < 1e-9
+        print(f'{count:>6} {metric_time * 1000:19.2f} {fused_time * 1000:14.2f} {metric_time / fused_time:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
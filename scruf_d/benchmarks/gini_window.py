@@ -0,0 +1,77 @@
+# Compares the Gini index of item exposure over a sliding history window computed from scratch at every
+# step (count the window, sort the counts, as post_processing/metrics.c does) with the incremental
+# ExposureDistribution, which is updated as lists enter and leave the window.
+#
+# Each step adds one output list (items drawn with a skewed popularity), drops the oldest list once the
+# window is full and computes the Gini index over the whole catalog. Reports the time per step for each
+# and the largest difference between the two values.
+#
+# Usage (from scruf_d): python -m benchmarks.gini_window [--num-items 20000] [--window 500] [--steps 2000]
+import argparse
+import random
+import time
+from collections import Counter, deque
+import numpy as np
+from scruf.util import ExposureDistribution
+
+
+def make_lists(rand, steps, list_size, num_items, skew):
+    return [rand.sample([f'i{int(num_items * rand.random() ** skew)}' for _ in range(2 * list_size)], list_size)
+            for _ in range(steps)]
+
+
+def gini_sorted(window, num_items):
+    counts = Counter(item for items in window for item in items)
+    values = np.sort(np.array(list(counts.values()), dtype=np.float64))
+    ranks = np.arange(num_items - len(values) + 1, num_items + 1)
+    return float(((2 * ranks - num_items - 1) * values).sum() / (num_items * values.sum()))
+
+
+def run_sorted(lists, window_size, num_items):
+    window = deque(maxlen=window_size)
+    values = []
+    start = time.perf_counter()
+    for items in lists:
+        window.append(items)
+        values.append(gini_sorted(window, num_items))
+    return values, time.perf_counter() - start
+
+
+def run_incremental(lists, window_size, num_items):
+    window = deque()
+    distribution = ExposureDistribution(num_items)
+    values = []
+    start = time.perf_counter()
+    for items in lists:
+        distribution.add_items(items)
+        window.append(items)
+        if len(window) > window_size:
+            distribution.remove_items(window.popleft())
+        values.append(distribution.gini())
+    return values, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incremental vs recomputed Gini over a history window.')
+    parser.add_argument('--num-items', type=int, default=20000)
+    parser.add_argument('--window', type=int, default=500)
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--list-size', type=int, default=10)
+    parser.add_argument('--skew', type=float, default=3.0)
+    args = parser.parse_args()
+
+    rand = random.Random(0)
+    lists = make_lists(rand, args.steps, args.list_size, args.num_items, args.skew)
+    sorted_values, sorted_time = run_sorted(lists, args.window, args.num_items)
+    incremental_values, incremental_time = run_incremental(lists, args.window, args.num_items)
+    error = max(abs(a - b) for a, b in zip(sorted_values, incremental_values))
+
+    print(f'catalog={args.num_items} window={args.window} steps={args.steps} list_size={args.list_size}')
+    print(f'{"method":>12} {"ms/step":>9}')
+    print(f'{"sorted":>12} {1000 * sorted_time / args.steps:9.3f}')
+    print(f'{"incremental":>12} {1000 * incremental_time / args.steps:9.3f}')
+    print(f'max difference {error:.2e}, final gini {incremental_values[-1]:.4f}')
+
+
+if __name__ == '__main__':
+    main()
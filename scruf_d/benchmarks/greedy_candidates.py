@@ -0,0 +1,72 @@
+# Timing benchmark for the candidate bookkeeping in the greedy re-rankers: runs FAR on synthetic ballots
+# with the item index in ResultList and with the old list scans (contains_item building a list of all
+# items, remove_top slicing the list), which are patched back in for comparison.
+#
+# Usage (from scruf_d): python -m benchmarks.greedy_candidates [--candidates 100 500] [--list-size 10]
+import argparse
+import random
+import time
+from scruf.util import ResultList, BallotCollection
+from scruf.choice import FARChoiceMechanism
+
+
+def scan_contains_item(self, item):
+    return item in [entry.item for entry in self.results]
+
+
+def slice_remove_top(self):
+    self.results = self.results[1:]
+
+
+def make_ballots(rand, candidates, agents):
+    items = [f'i{item}' for item in range(candidates)]
+    recommendations = ResultList()
+    recommendations.setup([('u1', item, rand.random()) for item in items])
+    bcoll = BallotCollection()
+    for agent in range(agents):
+        prefs = ResultList()
+        prefs.setup([('u1', item, 1.0 if rand.random() < 0.2 else 0.0) for item in items])
+        bcoll.set_ballot(f'agent{agent}', prefs, rand.random())
+    return recommendations, bcoll
+
+
+def run(mode, candidates, list_size, agents, users, seed=0):
+    rand = random.Random(seed)
+    mechanism = FARChoiceMechanism()
+    mechanism.setup({'recommender_weight': 0.5, 'binary': 'True', 'use_allocation_weight': 'True'})
+    inputs = [make_ballots(rand, candidates, agents) for _ in range(users)]
+
+    saved = (ResultList.contains_item, ResultList.remove_top)
+    if mode == 'scan':
+        ResultList.contains_item = scan_contains_item
+        ResultList.remove_top = slice_remove_top
+    try:
+        start = time.perf_counter()
+        outputs = [mechanism.compute_choice(None, bcoll, recommendations, list_size)[1]
+                   for recommendations, bcoll in inputs]
+        elapsed = time.perf_counter() - start
+    finally:
+        ResultList.contains_item, ResultList.remove_top = saved
+    return elapsed / users, [[entry.item for entry in output.get_results()] for output in outputs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Greedy re-ranker candidate bookkeeping.')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--list-size', type=int, default=10)
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f'list_size={args.list_size} agents={args.agents} users={args.users}')
+    print(f'{"candidates":>10} {"scan ms/user":>13} {"index ms/user":>14} {"speedup":>8}')
+    for candidates in args.candidates:
+        scan_time, scan_lists = run('scan', candidates, args.list_size, args.agents, args.users)
+        index_time, index_lists = run('index', candidates, args.list_size, args.agents, args.users)
+        assert scan_lists == index_lists
+        print(f'{candidates:>10} {scan_time * 1000:13.2f} {index_time * 1000:14.2f} '
+              f'{scan_time / index_time:8.1f}')
+
+
+if __name__ == '__main__':
+    main()
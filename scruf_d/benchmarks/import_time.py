@@ -0,0 +1,57 @@
+# Start-up cost of SCRUF-D: the time to import scruf in a fresh interpreter, against a budget. The
+# interpreter alone and numpy (which scruf always needs) are timed too, for comparison. Also reports which
+# of the optional heavy modules were loaded by the import; none of them should be, since they are only
+# imported by the components that use them (whalrus by the whalrus choice mechanisms, pandas by the
+# default post-processors, asyncio and multiprocessing by the runners, etc.).
+#
+# Exits with status 1 if the median import time is over the budget.
+#
+# Usage (from scruf_d): python -m benchmarks.import_time [--repeats 10] [--budget-ms 300]
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ['pandas', 'whalrus', 'pyarrow', 'jsonlines', 'jsons', 'tqdm', 'icecream', 'asyncio',
+                 'multiprocessing']
+
+
+def time_command(code, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000.0
+
+
+def loaded_modules(statement):
+    code = f'{statement}; import sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time to import scruf.')
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--budget-ms', type=float, default=300.0)
+    args = parser.parse_args()
+
+    interpreter = time_command('pass', args.repeats)
+    numpy = time_command('import numpy', args.repeats)
+    package = time_command('import scruf', args.repeats)
+    print(f'{"interpreter":>12} {interpreter:8.1f} ms')
+    print(f'{"numpy":>12} {numpy:8.1f} ms')
+    print(f'{"scruf":>12} {package:8.1f} ms  (budget {args.budget_ms:.0f} ms)')
+    print(f'heavy modules after import scruf: {loaded_modules("import scruf") or "none"}')
+    print(f'heavy modules after from scruf.runner import Reranker: '
+          f'{loaded_modules("from scruf.runner import Reranker") or "none"}')
+    if package > args.budget_ms:
+        print('Over budget')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+# Time per user of the lottery draw: the dict-based draw (normalize the score dict, build the key and
+# value lists, random.Random.choices) against the array draw of LotteryAllocationMechanism, and the
+# static lottery drawn one user at a time against the block draw of StaticAllocationLottery.
+#
+# Usage (from scruf_d): python -m benchmarks.lottery_allocation [--agents 8] [--users 100000]
+import argparse
+import random
+import time
+import numpy as np
+import scruf
+from scruf.agent import AgentCollection
+from scruf.allocation import StaticAllocationLottery, ProductAllocationLottery
+from scruf.util import normalize_score_dict
+
+
+def dict_draw(rand, score_dict):
+    lottery = normalize_score_dict(score_dict)
+    return rand.choices(list(lottery.keys()), list(lottery.values()))[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lottery allocation draw time.')
+    parser.add_argument('--agents', type=int, default=8)
+    parser.add_argument('--users', type=int, default=100000)
+    args = parser.parse_args()
+
+    names = [f'agent{i}' for i in range(args.agents)]
+    scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+    scruf.Scruf.state.rand = random.Random(0)
+    scruf.Scruf.state.agents = AgentCollection()
+    scruf.Scruf.state.agents.agents = []
+    rand = random.Random(0)
+    fairness = np.array([rand.random() for _ in names])
+    compatibility = np.array([rand.random() for _ in names])
+    scores = dict(zip(names, (1.0 - fairness) * compatibility))
+
+    print(f'agents={args.agents} users={args.users}')
+    print(f'{"draw":>22} {"us/user":>9}')
+
+    start = time.perf_counter()
+    for _ in range(args.users):
+        dict_draw(rand, scores)
+    print(f'{"dynamic, dict":>22} {1e6 * (time.perf_counter() - start) / args.users:9.2f}')
+
+    alloc = ProductAllocationLottery()
+    alloc.setup({})
+    start = time.perf_counter()
+    for _ in range(args.users):
+        alloc.draw_winner(alloc.score_vector(names, fairness, compatibility))
+    print(f'{"dynamic, array":>22} {1e6 * (time.perf_counter() - start) / args.users:9.2f}')
+
+    weights = [[name, str(1.0 / (args.agents + 1))] for name in names]
+    static_scores = normalize_score_dict({name: float(wt) for name, wt in weights})
+    start = time.perf_counter()
+    for _ in range(args.users):
+        dict_draw(rand, static_scores)
+    print(f'{"static, dict":>22} {1e6 * (time.perf_counter() - start) / args.users:9.2f}')
+
+    static = StaticAllocationLottery()
+    static.setup({'weights': weights})
+    start = time.perf_counter()
+    for _ in range(args.users):
+        static.score_dict_lottery(None, scruf.Scruf.state.agents)
+    print(f'{"static, blocks":>22} {1e6 * (time.perf_counter() - start) / args.users:9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# Cost of reading configuration properties on the per-user path. For each typed property of a few
+# components, times the per-call lookup and conversion that the components did before (get_property and,
+# for numbers, float or int) against reading the attribute that setup converted once. Also times a call
+# that reads several properties per user: DisparateExposureFM.compute_fairness_from_stats, which reads
+# n_protected and target.
+#
+# Usage (from scruf_d): python -m benchmarks.property_access [--calls 1000000]
+import argparse
+import timeit
+from scruf.agent import FairnessMetricFactory, PreferenceFunctionFactory
+from scruf.choice import ChoiceMechanismFactory
+
+COMPONENTS = [
+    ('disparate_exposure', FairnessMetricFactory.create_fairness_metric,
+     {'feature': 'FA', 'n_protected': 0.2, 'target': 0.8}),
+    ('binary_preference', PreferenceFunctionFactory.create_preference_function, {'feature': 'FA', 'delta': 0.5}),
+    ('FAR', ChoiceMechanismFactory.create_choice_mechanism,
+     {'recommender_weight': 0.8, 'use_allocation_weight': 'false', 'binary': 'true'}),
+]
+
+
+def per_call(component, name, property_type):
+    if property_type is bool:
+        return lambda: component.get_property(name) in {'True', 'true'}
+    if property_type is str:
+        return lambda: component.get_property(name)
+    return lambda: property_type(component.get_property(name))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-call property lookups against compiled attributes.')
+    parser.add_argument('--calls', type=int, default=1000000)
+    args = parser.parse_args()
+
+    print(f'{"component":>20} {"property":>20} {"lookup ns":>10} {"attribute ns":>13}')
+    for class_name, create, properties in COMPONENTS:
+        component = create(class_name)
+        component.setup(properties)
+        for name, property_type in component.property_types().items():
+            lookup = timeit.timeit(per_call(component, name, property_type), number=args.calls)
+            attribute = timeit.timeit(lambda: getattr(component, name), number=args.calls)
+            print(f'{class_name:>20} {name:>20} {lookup / args.calls * 1e9:10.0f} '
+                  f'{attribute / args.calls * 1e9:13.0f}')
+
+    metric = FairnessMetricFactory.create_fairness_metric('disparate_exposure')
+    metric.setup(COMPONENTS[0][2])
+    stats = {'list_count': 10, 'protected_exposure': 3.0, 'unprotected_exposure': 9.0}
+    call = timeit.timeit(lambda: metric.compute_fairness_from_stats(stats), number=args.calls)
+    print(f'\ncompute_fairness_from_stats: {call / args.calls * 1e9:.0f} ns per call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# Wall-clock time of replicate runs over several seeds, with different numbers of worker processes.
+# Writes a synthetic data set (users, candidate lists, item features, compatibilities and popularity) to a
+# temporary directory and runs the same replicate set with each worker count. The summaries should be
+# identical; only the time changes.
+#
+# Usage (from scruf_d): python -m benchmarks.replicates [--users 2000] [--seeds 8] [--workers 1,2,4]
+import argparse
+import copy
+import random
+import tempfile
+import time
+from scruf.runner import ReplicateRunner
+from benchmarks.rerank_service import CONFIG, write_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replicate runs with different numbers of workers.')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--seeds', type=int, default=8)
+    parser.add_argument('--workers', default='1,2,4')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        write_data(path, random.Random(0), args.users, args.items, args.candidates)
+        config = copy.deepcopy(CONFIG)
+        config['location']['path'] = path
+        print(f'users={args.users} candidates={args.candidates} seeds={args.seeds}')
+        print(f'{"workers":>8} {"seconds":>8} {"s/seed":>8} {"mean fairness A":>16}')
+        for workers in [int(count) for count in args.workers.split(',')]:
+            runner = ReplicateRunner(config, max_seeds=args.seeds, workers=workers)
+            start = time.perf_counter()
+            summary = runner.run()
+            elapsed = time.perf_counter() - start
+            stats = summary.final['fairness_A']
+            print(f'{workers:>8} {elapsed:8.2f} {elapsed / args.seeds:8.2f} '
+                  f'{stats["mean"]:7.4f}+-{(stats["ci_high"] - stats["ci_low"]) / 2:.4f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+# Local load generator for the re-ranking service. Writes a synthetic data set (users, candidate lists,
+# item features, compatibilities and popularity) to a temporary directory, starts the service on a free
+# port and sends requests from a number of concurrent keep-alive clients, each with the candidate list
+# of a random user.
+#
+# Runs once per max_batch_size setting and reports the latency seen by the clients (p50/p99), the
+# throughput, and the mean batch size that the service formed. With a batch size of 1 every request is
+# a hand-off to the worker thread and a flush of the history file; larger batches amortize both.
+#
+# Usage (from scruf_d): python -m benchmarks.rerank_service [--requests 5000] [--concurrency 64]
+#                       [--batch-sizes 1,8,32] [--max-wait-ms 2]
+import argparse
+import asyncio
+import copy
+import random
+import tempfile
+import time
+import numpy as np
+from scruf.runner import RerankService, RerankClient
+
+CONFIG = {
+    'location': {'path': '.', 'overwrite': 'true'},
+    'data': {'rec_filename': 'recs.csv', 'feature_filename': 'features.csv'},
+    'output': {'filename': 'history.csv'},
+    'parameters': {'list_size': 10, 'iterations': -1, 'initialize': 'skip', 'history_window_size': 50,
+                   'random_seed': 11},
+    'context': {'context_class': 'csv_context',
+                'properties': {'compatibility_file': 'compat.csv', 'popularity_data': 'pop.csv'}},
+    'feature': {'fa': {'name': 'FA', 'protected_feature': 'fa', 'protected_values': [1]},
+                'fb': {'name': 'FB', 'protected_feature': 'fb', 'protected_values': ['x']}},
+    'agent': {'a': {'name': 'A', 'metric_class': 'proportional_item',
+                    'compatibility_class': 'context_compatibility', 'preference_function_class': 'binary_preference',
+                    'metric': {'feature': 'FA', 'proportion': 0.6}, 'preference': {'feature': 'FA', 'delta': 0.5}},
+              'b': {'name': 'B', 'metric_class': 'proportional_item',
+                    'compatibility_class': 'context_compatibility', 'preference_function_class': 'binary_preference',
+                    'metric': {'feature': 'FB', 'proportion': 0.5}, 'preference': {'feature': 'FB', 'delta': 1.0}}},
+    'allocation': {'allocation_class': 'product_lottery', 'properties': {}},
+    'choice': {'choice_class': 'weighted_scoring', 'properties': {'recommender_weight': 0.8}},
+    'post': {'postprocess_class': 'null'},
+}
+
+
+def write_data(path, rand, num_users, num_items, num_candidates):
+    candidates = {}
+    with open(f'{path}/recs.csv', 'w') as f:
+        for user in range(num_users):
+            pairs = [(f'i{item}', round(rand.random() * 5, 4)) for item in rand.sample(range(num_items), num_candidates)]
+            candidates[f'u{user}'] = pairs
+            for item, score in pairs:
+                f.write(f'u{user}, {item}, {score}\n')
+    with open(f'{path}/features.csv', 'w') as f:
+        for item in range(num_items):
+            f.write(f'i{item}, fa, {rand.randint(0, 1)}\ni{item}, fb, {rand.choice("xyz")}\n')
+    with open(f'{path}/compat.csv', 'w') as f:
+        for user in range(num_users):
+            f.write(f'u{user},A,{rand.random():.3f}\nu{user},B,{rand.random():.3f}\n')
+    with open(f'{path}/pop.csv', 'w') as f:
+        for item in range(num_items):
+            f.write(f'i{item},{rand.randint(1, 500)}\n')
+    return candidates
+
+
+async def load(service, candidates, num_requests, concurrency, seed):
+    users = list(candidates)
+    latencies = []
+    remaining = [num_requests]
+
+    async def client_loop(client_id):
+        rand = random.Random(seed + client_id)
+        client = RerankClient(service.host, service.port)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            user = rand.choice(users)
+            start = time.perf_counter()
+            status, _ = await client.rerank(user, candidates[user])
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f'Request for {user} failed with status {status}')
+        await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client_loop(client_id) for client_id in range(concurrency)])
+    return np.array(latencies), time.perf_counter() - start
+
+
+async def run_service(config, candidates, args, batch_size):
+    service = RerankService.from_config(config)
+    service.max_batch_size = batch_size
+    service.max_wait = args.max_wait_ms / 1000.0
+    await service.start(port=0)
+    try:
+        latencies, elapsed = await load(service, candidates, args.requests, args.concurrency, args.seed)
+        return latencies, elapsed, service.stats.summary()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load generator for the re-ranking service.')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--batch-sizes', default='1,8,32')
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        candidates = write_data(path, random.Random(args.seed), args.users, args.items, args.candidates)
+        print(f'requests={args.requests} concurrency={args.concurrency} candidates={args.candidates} '
+              f'max_wait_ms={args.max_wait_ms}')
+        print(f'{"batch":>6} {"p50 ms":>8} {"p99 ms":>8} {"req/s":>8} {"mean batch":>11}')
+        for batch_size in [int(size) for size in args.batch_sizes.split(',')]:
+            config = copy.deepcopy(CONFIG)
+            config['location']['path'] = path
+            config['output']['filename'] = f'history_{batch_size}.csv'
+            latencies, elapsed, stats = asyncio.run(run_service(config, candidates, args, batch_size))
+            print(f'{batch_size:>6} {1000 * np.percentile(latencies, 50):8.2f} '
+                  f'{1000 * np.percentile(latencies, 99):8.2f} {len(latencies) / elapsed:8.0f} '
+                  f'{stats["mean_batch_size"]:11.1f}')
+
+
+if __name__ == '__main__':
+    main()
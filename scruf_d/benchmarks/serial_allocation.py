@@ -0,0 +1,80 @@
+# Compares the probabilistic serial allocation with the lottery mechanisms on a batch of users with
+# random compatibilities and fixed agent fairness values.
+#
+# Reports the time per user (probabilistic serial one user at a time, as in the simulation, and in
+# batches) and how the allocation is spread over the agents: the L1 distance between each agent's
+# share of the allocation and its share of the need (1 - fairness), and the mean compatibility of the
+# allocated agent. For the lotteries the shares are those of the drawn winners; for probabilistic
+# serial they are the expected shares.
+#
+# Usage (from scruf_d): python -m benchmarks.serial_allocation [--agents 8] [--users 20000] [--batch 1000]
+import argparse
+import random
+import time
+import numpy as np
+import scruf
+from scruf.allocation import ProbabilisticSerialAllocation, ProductAllocationLottery, \
+    WeightedProductAllocationLottery
+
+
+def lottery_allocation(alloc, names, fairness, compatibility):
+    allocation = np.zeros_like(compatibility)
+    start = time.perf_counter()
+    for user in range(len(compatibility)):
+        winner = alloc.draw_winner(alloc.score_vector(names, fairness, compatibility[user]))
+        if winner is not None:
+            allocation[user, winner] = 1.0
+    return allocation, time.perf_counter() - start
+
+
+def serial_allocation(fairness, compatibility, batch):
+    allocation = np.zeros_like(compatibility)
+    start = time.perf_counter()
+    for first in range(0, len(compatibility), batch):
+        allocation[first:first + batch] = \
+            ProbabilisticSerialAllocation.allocate_batch(fairness, compatibility[first:first + batch])
+    return allocation, time.perf_counter() - start
+
+
+def report(label, allocation, elapsed, need_share, compatibility):
+    allocated = allocation.sum()
+    share = allocation.sum(axis=0) / allocated
+    mean_compat = (allocation * compatibility).sum() / allocated
+    print(f'{label:>28} {1e6 * elapsed / len(allocation):9.2f} {np.abs(share - need_share).sum():9.4f} '
+          f'{allocated / len(allocation):9.3f} {mean_compat:9.3f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Probabilistic serial vs lottery allocation.')
+    parser.add_argument('--agents', type=int, default=8)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+
+    rand = np.random.default_rng(0)
+    names = [f'agent{i}' for i in range(args.agents)]
+    fairness = rand.random(args.agents)
+    compatibility = rand.random((args.users, args.agents))
+    need = 1.0 - fairness
+    need_share = need / need.sum()
+
+    scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+    scruf.Scruf.state.rand = random.Random(0)
+
+    print(f'agents={args.agents} users={args.users}')
+    print(f'{"mechanism":>28} {"us/user":>9} {"share L1":>9} {"allocated":>9} {"compat":>9}')
+    product = ProductAllocationLottery()
+    product.setup({})
+    report('product_lottery', *lottery_allocation(product, names, fairness, compatibility), need_share,
+           compatibility)
+    weighted = WeightedProductAllocationLottery()
+    weighted.setup({'fairness_exponent': 1.0, 'compatibility_exponent': 0.5})
+    report('weighted_product_lottery', *lottery_allocation(weighted, names, fairness, compatibility),
+           need_share, compatibility)
+    report('probabilistic_serial, 1', *serial_allocation(fairness, compatibility, 1), need_share, compatibility)
+    report(f'probabilistic_serial, {args.batch}', *serial_allocation(fairness, compatibility, args.batch),
+           need_share, compatibility)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+# Speed and accuracy of sharded simulation. Writes a synthetic data set (users, candidate lists, item
+# features, compatibilities and popularity) to a temporary directory and runs it with each number of
+# shards and each exchange interval. Reports the wall-clock time, the speedup over the single-process run
+# and the mean and maximum absolute deviation of the agents' fairness trajectories from it.
+#
+# The speedup needs a core per shard; on fewer cores the shards only add the cost of the exchanges.
+#
+# Usage (from scruf_d): python -m benchmarks.sharding [--users 5000] [--shards 2,4] [--intervals 50,500]
+import argparse
+import copy
+import random
+import tempfile
+from scruf.runner import ShardedRun
+from benchmarks.rerank_service import CONFIG, write_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sharded simulation: speed and deviation.')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--shards', default='2,4')
+    parser.add_argument('--intervals', default='50,500')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        write_data(path, random.Random(0), args.users, args.items, args.candidates)
+        print(f'users={args.users} candidates={args.candidates}')
+        print(f'{"shards":>7} {"interval":>9} {"seconds":>8} {"speedup":>8} {"mean dev":>9} {"max dev":>8}')
+        for shards in [int(count) for count in args.shards.split(',')]:
+            for interval in [int(count) for count in args.intervals.split(',')]:
+                config = copy.deepcopy(CONFIG)
+                config['location']['path'] = path
+                config['output']['filename'] = f'history_{shards}_{interval}.csv'
+                report = ShardedRun(config, shards=shards, sync_interval=interval).run()
+                deviation = report.deviation()
+                mean_deviation = max(stats['mean_abs'] for stats in deviation.values())
+                max_deviation = max(stats['max_abs'] for stats in deviation.values())
+                print(f'{shards:>7} {interval:>9} {report.elapsed:8.2f} {report.exact_elapsed / report.elapsed:8.2f} '
+                      f'{mean_deviation:9.4f} {max_deviation:8.4f}')
+
+
+if __name__ == '__main__':
+    main()
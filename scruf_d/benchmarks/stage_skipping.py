@@ -0,0 +1,75 @@
+# Cost of the pipeline stages that a mechanism does not use. Writes a synthetic data set to a temporary
+# directory and runs the simulation loop for mechanisms that ignore some of their inputs: the static
+# lottery (neither fairness nor compatibility) with the null choice mechanism (no agent ballots), and
+# most_compatible (no fairness). Each runs with skipped_values = "lazy" and a history file (the unused
+# scores are still computed, to be written; only the ballots are skipped), with skipped_values = "nan"
+# and with no history file (nothing reads the unused scores). Speedups are relative to the first. The
+# times are the best of --repeats runs of the loop, without the setup.
+#
+# Usage (from scruf_d): python -m benchmarks.stage_skipping [--users 5000] [--items 2000] [--repeats 3]
+import argparse
+import copy
+import gc
+import random
+import tempfile
+import time
+import scruf
+from benchmarks.rerank_service import CONFIG, write_data
+
+
+def configurations():
+    static = copy.deepcopy(CONFIG)
+    static['allocation'] = {'allocation_class': 'static_lottery',
+                            'properties': {'weights': [['A', '0.5'], ['B', '0.3']]}}
+    static['choice'] = {'choice_class': 'null_choice', 'properties': {}}
+    most_compatible = copy.deepcopy(CONFIG)
+    most_compatible['allocation'] = {'allocation_class': 'most_compatible', 'properties': {}}
+    return [('static_lottery + null_choice', static), ('most_compatible', most_compatible)]
+
+
+def settings(config):
+    computed = copy.deepcopy(config)
+    computed['parameters']['skipped_values'] = 'lazy'
+    nan = copy.deepcopy(config)
+    nan['parameters']['skipped_values'] = 'nan'
+    in_memory = copy.deepcopy(config)
+    in_memory.pop('output')
+    return [('lazy', computed), ('nan', nan), ('no history file', in_memory)]
+
+
+def time_loop(config):
+    scruf.Scruf.state = None
+    gc.collect()
+    experiment = scruf.Scruf(config)
+    scruf.Scruf.setup_experiment()
+    state = scruf.Scruf.state
+    start = time.perf_counter()
+    experiment.run_loop(iterations=state.iterations)
+    elapsed = time.perf_counter() - start
+    scruf.Scruf.cleanup_experiment()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time of the simulation loop with and without unused stages.')
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=2000)
+    parser.add_argument('--candidates', type=int, default=50)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as path:
+        write_data(path, random.Random(0), args.users, args.items, args.candidates)
+        print(f'users={args.users} items={args.items} candidates={args.candidates}')
+        for name, config in configurations():
+            config['location']['path'] = path
+            print(f'\n{name}')
+            baseline = None
+            for setting, setting_config in settings(config):
+                elapsed = min(time_loop(setting_config) for _ in range(args.repeats))
+                baseline = baseline or elapsed
+                print(f'{setting:>16} {elapsed:8.2f} s  {baseline / elapsed:5.2f}x')
+
+
+if __name__ == '__main__':
+    main()
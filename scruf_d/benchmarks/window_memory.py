@@ -0,0 +1,83 @@
+# Memory benchmark for a full history window: compares the allocations made by the choice path when
+# result lists are deep-copied (the old behavior) with copy-on-write views.
+#
+# For each simulated user, the agents compute preference lists from the recommendations, the greedy
+# choice mechanisms copy the recommender ballot and the ballot collection, and the ballots and output
+# are kept in the history window. Reports the memory retained by a full window, the peak and the time.
+#
+# Usage (from scruf_d): python -m benchmarks.window_memory [--window 200] [--list-size 100] [--agents 3]
+import argparse
+import copy
+import random
+import time
+import tracemalloc
+from scruf.util import ResultList, BallotCollection, HistoryCollection
+
+
+def make_recommendations(rand, user, list_size, num_items):
+    items = rand.sample(range(num_items), list_size)
+    rec_list = ResultList()
+    rec_list.setup([(f'u{user}', f'i{item}', rand.random()) for item in items])
+    return rec_list
+
+
+def compute_preferences(recommendations, agent, mode):
+    if mode == 'deepcopy':
+        prefs = copy.deepcopy(recommendations)
+    else:
+        prefs = recommendations.view()
+    prefs.rescore(lambda entry: entry.score * (agent + 1) % 1.0)
+    return prefs
+
+
+def run_window(mode, users, window, list_size, agents, num_items, seed=0):
+    rand = random.Random(seed)
+    choice_input_history = HistoryCollection(window)
+    choice_output_history = HistoryCollection(window)
+    # The recommendations are loaded before the simulation, so they are not counted
+    all_recs = [make_recommendations(rand, user, list_size, num_items) for user in range(users)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for recommendations in all_recs:
+        bcoll = BallotCollection()
+        for agent in range(agents):
+            bcoll.set_ballot(f'agent{agent}', compute_preferences(recommendations, agent, mode), 1.0)
+        # What GreedySublistChoiceMechanism.compute_choice copies
+        if mode == 'deepcopy':
+            bcoll.set_ballot(BallotCollection.REC_NAME, copy.deepcopy(recommendations), 0.5)
+            ballots = copy.deepcopy(bcoll)
+            output = copy.deepcopy(recommendations)
+        else:
+            bcoll.set_ballot(BallotCollection.REC_NAME, recommendations.view(), 0.5)
+            ballots = bcoll.view()
+            output = recommendations.view()
+        output.trim(10)
+        del ballots
+        choice_input_history.add_item(bcoll)
+        choice_output_history.add_item(output)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory use of a full history window.')
+    parser.add_argument('--window', type=int, default=200)
+    parser.add_argument('--list-size', type=int, default=100)
+    parser.add_argument('--agents', type=int, default=3)
+    parser.add_argument('--num-items', type=int, default=2000)
+    args = parser.parse_args()
+
+    users = args.window
+    print(f'window={args.window} list_size={args.list_size} agents={args.agents}')
+    print(f'{"mode":>10} {"retained MB":>12} {"peak MB":>10} {"time s":>8}')
+    for mode in ['deepcopy', 'view']:
+        current, peak, elapsed = run_window(mode, users, args.window, args.list_size, args.agents,
+                                            args.num_items)
+        print(f'{mode:>10} {current / 2**20:12.2f} {peak / 2**20:10.2f} {elapsed:8.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -8,5 +8,5 @@ from .preference_function import PreferenceFunction, PreferenceFunctionFactory
 from .binary_preference import BinaryPreferenceFunction, PerturbedBinaryPreferenceFunction
 from .cascade_preference import CascadePreferenceFunction
 from .item_ranking_fairness import DisparateExposureFM, MeanReciprocalRankFM
-from .individual_fairness import IndividualFairnessMetric, GiniIndexFM
+from .individual_fairness import IndividualFairnessMetric, GiniIndexFM, GiniSketchFM
 from .individual_preference import IndividualPreferenceFunction, Individual_Norm, Individual_Binary, Individual_Exponential
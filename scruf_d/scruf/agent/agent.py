@@ -4,8 +4,9 @@ from .preference_function import PreferenceFunctionFactory
 from scruf.util import get_value_from_keys
 from scruf.util.errors import ConfigKeyMissingError, ConfigNoAgentsError
 from scruf.util import ResultList
+from collections import defaultdict
+import numpy as np
 import scruf
-from icecream import ic
 
 
 class FairnessAgent:
@@ -49,8 +50,13 @@ class FairnessAgent:
         else:
             self.preference_function.setup(dict())
 
-    def compute_fairness(self, history):
-        self.recent_fairness = self.fairness_metric.compute_fairness(history)
+    # window_stats: feature -> statistics from the output window, if the collection computed them
+    def compute_fairness(self, history, window_stats=None):
+        metric = self.fairness_metric
+        if window_stats is not None and len(metric.WINDOW_STATS) > 0:
+            self.recent_fairness = metric.compute_fairness_from_stats(window_stats[metric.get_stats_feature()])
+        else:
+            self.recent_fairness = metric.compute_fairness(history)
         return self.recent_fairness
 
     def compute_compatibility(self, context):
@@ -75,22 +81,63 @@ class AgentCollection:
         if len(agents) == 0:
             raise ConfigNoAgentsError()
 
+    # The fairness metric, compatibility metric and preference function of each configured agent, as
+    # (description, component) pairs. They are created but not set up, e.g. to find the data they read.
+    @classmethod
+    def configured_components(cls, config):
+        cls.check_config(config)
+        for agent_config in config['agent'].values():
+            name = agent_config['name']
+            yield (f'agent {name} metric',
+                   FairnessMetricFactory.create_fairness_metric(agent_config['metric_class']))
+            yield (f'agent {name} compatibility',
+                   CompatibilityMetricFactory.create_compatibility_metric(agent_config['compatibility_class']))
+            yield (f'agent {name} preference',
+                   PreferenceFunctionFactory.create_preference_function(agent_config['preference_function_class']))
+
+    # The agents are kept in a fixed order, with a map from name to position. Fairness, compatibility and
+    # allocation values can be computed as arrays in that order (fairness_vector etc.); the dict versions
+    # (compute_fairnesses etc.) are for the history and other code that works with agent names.
+    # Replace the agent list by assigning to agents, so that the index is rebuilt.
     def __init__(self):
-        self.agents = []
+        self._agents = []
+        self._names = []
+        self._index = {}
         self.history = None
 
+    @property
+    def agents(self):
+        return self._agents
+
+    @agents.setter
+    def agents(self, agent_list):
+        self._agents = list(agent_list)
+        self._names = [agent.name for agent in self._agents]
+        self._index = {name: position for position, name in enumerate(self._names)}
+
+    # The list is shared, so it should not be changed
     def agent_names(self):
-        return [agent.name for agent in self.agents]
+        return self._names
+
+    # Position of the agent in the agent order, None if there is no such agent
+    def agent_index(self, name):
+        return self._index.get(name)
 
     def get_agent(self, name):
-        agent = None
-        for ag in self.agents:
-            if ag.name == name:
-                agent = ag
-        return agent
+        position = self._index.get(name)
+        return None if position is None else self._agents[position]
 
     def agent_value_pairs(self, default=0.0):
-        return {name: default for name in self.agent_names()}
+        return dict.fromkeys(self._names, default)
+
+    # Agent name -> value, from an array in agent order
+    def to_dict(self, vector):
+        return dict(zip(self._names, vector.tolist()))
+
+    # Array in agent order from agent name -> value. Agents that are not in the dict get the default.
+    def from_dict(self, values, default=0.0):
+        return np.fromiter((values.get(name, default) for name in self._names), dtype=np.float64,
+                           count=len(self._names))
 
     # Note: Overwrites the agent list
     def setup(self, config=None):
@@ -109,14 +156,45 @@ class AgentCollection:
 
         self.agents = agent_list
 
+    def fairness_vector(self, history):
+        window_stats = self.compute_window_stats(history)
+        return np.fromiter((agent.compute_fairness(history, window_stats) for agent in self._agents),
+                           dtype=np.float64, count=len(self._agents))
+
     def compute_fairnesses(self, history):
-        return {agent.name: agent.compute_fairness(history) for agent in self.agents}
+        return self.to_dict(self.fairness_vector(history))
+
+    # Whether a metric or preference function walks the output window, other than through the window
+    # statistics
+    def reads_output_window(self):
+        return any((agent.fairness_metric.READS_WINDOW and len(agent.fairness_metric.WINDOW_STATS) == 0)
+                   or agent.preference_function.READS_WINDOW for agent in self.agents)
+
+    def uses_window_stats(self):
+        return any(len(agent.fairness_metric.WINDOW_STATS) > 0 for agent in self.agents)
+
+    # Collects the window statistics that the agents' metrics need, by feature, and computes all of
+    # them in one pass over the output window. None if no metric uses them or there is no window.
+    def compute_window_stats(self, history):
+        requests = defaultdict(set)
+        for agent in self.agents:
+            metric = agent.fairness_metric
+            if len(metric.WINDOW_STATS) > 0:
+                requests[metric.get_stats_feature()].update(metric.WINDOW_STATS)
+        if len(requests) == 0 or not hasattr(history, 'get_output_window') \
+                or scruf.Scruf.state.item_features is None:
+            return None
+        return history.get_output_window().compute_stats(requests)
 
     def compute_test_fairnesses(self, history):
         return {agent.name: agent.compute_test_fairness(history) for agent in self.agents}
 
+    def compatibility_vector(self, context):
+        return np.fromiter((agent.compute_compatibility(context) for agent in self._agents),
+                           dtype=np.float64, count=len(self._agents))
+
     def compute_compatibilities(self, context):
-        return {agent.name: agent.compute_compatibility(context) for agent in self.agents}
+        return self.to_dict(self.compatibility_vector(context))
 
     def compute_preference_lists(self, recommendations):
         return {agent.name: agent.compute_preferences(recommendations) for agent in self.agents}
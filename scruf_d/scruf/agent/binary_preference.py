@@ -1,6 +1,5 @@
 from .preference_function import PreferenceFunctionFactory, PreferenceFunction
 import scruf
-import copy
 import random
 from scruf.util import ResultList
 
@@ -11,6 +10,8 @@ class BinaryPreferenceFunction(PreferenceFunction):
     # Need to get the value as a property
     # Need to get protected feature as a property
     _PROPERTY_NAMES = ['feature', 'delta']
+    _PROPERTY_TYPES = {'feature': str, 'delta': float}
+    DATA_SOURCES = ['item_features']
 
     def __init__(self):
         super().__init__()
@@ -30,12 +31,11 @@ class BinaryPreferenceFunction(PreferenceFunction):
     #  return the list.
     # List size is ignored.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
 
         if_data = scruf.Scruf.state.item_features
-        feature = self.get_property('feature')
-        delta = self.get_property('delta')
-        rec_list.rescore(lambda entry: delta if if_data.is_protected(feature, entry.item) else 0.0)
+        protected = if_data.is_protected_many(self.feature, list(rec_list.result_item_iter()))
+        rec_list.set_scores([self.delta if is_protected else 0.0 for is_protected in protected])
         return rec_list
 
 
@@ -51,7 +51,7 @@ class PerturbedBinaryPreferenceFunction(BinaryPreferenceFunction):
 
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
         rand: random.Random = scruf.Scruf.state.rand
-        delta = float(self.get_property('delta'))
+        delta = self.delta
         rec_list = super().compute_preferences(recommendations)
         rec_list.rescore(lambda entry: entry.score + delta * rand.gauss(0, 0.1))
         return rec_list
@@ -1,7 +1,6 @@
 from .preference_function import PreferenceFunctionFactory, PreferenceFunction
 from .binary_preference import BinaryPreferenceFunction
 import scruf
-import copy
 import random
 from scruf.util import ResultList
 
@@ -27,23 +26,24 @@ class CascadePreferenceFunction(BinaryPreferenceFunction):
     # The new range of the data will be delta * 1.5 to zero and all the scores >= delta will be protected
     # All the scores < delta will be unprotected.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
         max_score, min_score = recommendations.score_range()
 
         if_data = scruf.Scruf.state.item_features
-        feature = self.get_property('feature')
-        delta = self.get_property('delta')
+        delta = self.delta
 
         # Didn't want to cram this whole thing into the rescore call.
-        def cascade_score(entry):
+        def cascade_score(entry, is_protected):
             normalized = (entry.score - min_score) / (max_score - min_score)
             scaled = normalized * CascadePreferenceFunction.CASCADE_FACTOR * delta
-            if if_data.is_protected(feature, entry.item):
+            if is_protected:
                 return scaled + delta
             else:
                 return scaled
 
-        rec_list.rescore(cascade_score)
+        protected = if_data.is_protected_many(self.feature, list(rec_list.result_item_iter()))
+        rec_list.set_scores([cascade_score(entry, is_protected)
+                             for entry, is_protected in zip(rec_list.get_results(), protected)])
         return rec_list
 
 
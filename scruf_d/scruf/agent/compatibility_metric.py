@@ -6,8 +6,11 @@ class CompatibilityMetric (PropertyMixin,ABC):
     A CompatibilityMetric uses a system History & * to computes a score in the range [0..1] reflecting the
     compatibility of the users over the Recommended Items with some particular concern. All metrics are
     initialized with a dictionary of property name, value pairs. Each subclass has to specify the
-    property names that it expects.
+    property names that it expects. A metric that reads the context lists it in DATA_SOURCES.
     """
+
+    DATA_SOURCES = []
+
     def set_agent(self, agent):
         self.agent = agent
 
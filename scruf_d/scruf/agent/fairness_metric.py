@@ -8,7 +8,23 @@ class FairnessMetric (PropertyMixin,ABC):
     fairness relative to some particular concern of the outcomes over that history. All metrics are
     initialized with a dictionary of property name, value pairs. Each subclass has to specify the
     property names that it expects.
+
+    A metric that can be computed from per-list statistics over the output window lists them in
+    WINDOW_STATS (see ItemWindow.STAT_NAMES) and implements compute_fairness_from_stats. The agent
+    collection then computes the statistics for all agents in one pass over the window.
+
+    A metric that reads input data (e.g. the item features) lists the data sources in DATA_SOURCES (see
+    DataLoader.SOURCES), so that they are loaded only if some component needs them.
+
+    A metric whose compute_fairness does not walk the output window (choice_output_history) sets
+    READS_WINDOW to False. In decay mode, the output window is only kept at its full size if some metric
+    walks it other than through WINDOW_STATS (see ScrufHistory.setup).
     """
+
+    WINDOW_STATS = []
+    DATA_SOURCES = []
+    READS_WINDOW = True
+
     def setup(self, input_props, names=None):
         super().setup(input_props, names=names)
 
@@ -19,14 +35,26 @@ class FairnessMetric (PropertyMixin,ABC):
     def compute_fairness(self, history):
         pass
 
+    # The protected feature that the window statistics are computed for
+    def get_stats_feature(self):
+        return None
+
+    # stats: statistic name -> value for the feature, as computed by ItemWindow.compute_stats
+    def compute_fairness_from_stats(self, stats):
+        raise NotImplementedError()
+
 class AlwaysOneFairnessMetric(FairnessMetric):
 
+    READS_WINDOW = False
+
     def compute_fairness(self, history):
         return 1.0
 
 
 class AlwaysZeroFairnessMetric(FairnessMetric):
 
+    READS_WINDOW = False
+
     def compute_fairness(self, history):
         return 0.0
 
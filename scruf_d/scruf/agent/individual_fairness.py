@@ -1,8 +1,9 @@
 from . import FairnessMetric, FairnessMetricFactory, ItemFeatureFairnessMetric
 from abc import abstractmethod, ABC
 import numpy as np
-from statistics import mean
+from collections import deque
 import scruf
+from scruf.util import QuantileSketch, ExposureDistribution, in_hash_sample
 
 
 class IndividualFairnessMetric(FairnessMetric):
@@ -25,85 +26,162 @@ class IndividualFairnessMetric(FairnessMetric):
 
 class GiniIndexFM(IndividualFairnessMetric):
     """
-    The gini index computes the fairness in terms of .
+    Fairness as one minus the Gini index of the per-item exposure counts over the history window,
+    relative to a target. Items that were not recommended count as zeros, so the catalog size is taken
+    from the item feature data; the num_items property is only used if there is none. The distribution
+    follows choice_output_history by its time stamps and is updated as lists enter and leave the window
+    (see ExposureDistribution), so it needs to see every list.
     """
     _PROPERTY_NAMES = ['num_items', 'target']
+    _PROPERTY_TYPES = {'num_items': int, 'target': float}
+    DATA_SOURCES = ['item_features']
 
     def __init__(self):
         super().__init__()
+        self.distribution: ExposureDistribution = None
+        self.source = None
+        self.synced_time = 0
+        # The item lists in the window, most recent last, so that the ones leaving it can be removed
+        self.window_items = deque()
 
     def setup(self, input_props, names=None):
         super().setup(input_props,
                       names=self.configure_names(GiniIndexFM._PROPERTY_NAMES, names))
+        self.distribution = None
+        self.source = None
+
+    def get_num_items(self):
+        item_features = scruf.Scruf.state.item_features if scruf.Scruf.state is not None else None
+        if item_features is not None and item_features.get_num_items() > 0:
+            return item_features.get_num_items()
+        return int(self.get_property('num_items'))
+
+    def sync(self, output_history):
+        if self.source is not output_history:
+            self.distribution = ExposureDistribution(self.get_num_items())
+            self.source = output_history
+            self.synced_time = 0
+            self.window_items = deque()
+        new_entries = output_history.time - self.synced_time
+        if new_entries > 0:
+            recent = output_history.get_recent(min(new_entries, len(output_history.collection)))
+            for result in reversed(recent):
+                items = list(result.result_item_iter())
+                self.distribution.add_items(items)
+                self.window_items.append(items)
+                if output_history.window_size is not None and len(self.window_items) > output_history.window_size:
+                    self.distribution.remove_items(self.window_items.popleft())
+        self.synced_time = output_history.time
+
+    def fairness_from_gini(self, gini):
+        return (1.0 - gini) / self.target
 
     def compute_fairness(self, history):
-        """
-        Computes the
-        """
-
-        n = self.get_property('num_items')
-        target = float(self.get_property('target'))
-
         if history.choice_output_history.is_empty():
             return 1.0
+        self.sync(history.choice_output_history)
+        return self.fairness_from_gini(self.distribution.gini())
 
-        counts_dict = {}
-        for result in history.choice_output_history.get_recent(-1):
-            for recommendation in result.get_results():
-                if recommendation.item in counts_dict:
-                    counts_dict[recommendation.item] += 1
-                else:
-                    counts_dict[recommendation.item] = 1
-        non_zero_counts = np.array(list(counts_dict.values()))
-        coverage = len(non_zero_counts)/2000
-        # zero_count = n - len(non_zero_counts)
-        #
-        # total_sum = non_zero_counts.sum()
-        # mean_n = total_sum / n
-        #
-        # diff_sum = 0
-        #
-        # for i, xi in enumerate(non_zero_counts[:-1]):
-        #     diff_sum += np.sum(np.abs(xi - non_zero_counts[i + 1:]))
-        #
-        # diff_sum += zero_count * np.sum(non_zero_counts)
-        # diff_sum += zero_count * (zero_count - 1) // 2 * 0
-
-        #gini = diff_sum / (n ** 2 * mean_n)
-        fairness_score = coverage/target
-        #fairness_score = (1 - gini) / target
-        # for i, value in enumerate(item_recs, 1):
-        #     position_sum += i * value
-        # value_sum = sum(item_recs)
-        # half_relative_mean = (2*position_sum) / (n*value_sum)
-        # fairness_score = half_relative_mean - ((n + 1) / n)
-
-        return fairness_score
-
+    # Post-processing: history is the whole list of output item lists
     def compute_test_fairness(self, history):
-        fairness_score = 1.0
-        return fairness_score
-        """  protected_feature = self.get_property('feature')
-        item_data = scruf.Scruf.state.item_features
-        target_mrr = float(self.get_property('target'))
-        mrr = []
+        distribution = ExposureDistribution(self.get_num_items())
+        for items in history:
+            distribution.add_items(items)
+        return self.fairness_from_gini(distribution.gini())
+
+
+class GiniSketchFM(IndividualFairnessMetric):
+    """
+    Approximate version of GiniIndexFM for very large catalogs: the same fairness, (1 - Gini) / target,
+    with the Gini index of the exposure counts over the history window estimated from a hash sample of
+    the catalog (as in ExposureSketch). Only the items whose hash falls in the first sample_rate of the
+    hash range are counted, in a quantile sketch with relative accuracy relative_accuracy, and the sampled
+    items that were not recommended count as zeros (sample_rate * num_items in all). The memory is
+    proportional to the sampled items, not to the catalog. Like GiniIndexFM, the sketch follows
+    choice_output_history by its time stamps and needs to see every list.
+    """
+    _PROPERTY_NAMES = ['num_items', 'target', 'sample_rate', 'relative_accuracy']
+    _PROPERTY_TYPES = {'num_items': int, 'target': float, 'sample_rate': float, 'relative_accuracy': float}
+
+    def __init__(self):
+        super().__init__()
+        self.distribution: QuantileSketch = None
+        self.sample_threshold = 0
+        self.sample_counts = {}
+        self.source = None
+        self.synced_time = 0
+        # The sampled items of each list in the window, most recent last
+        self.window_items = deque()
 
-        for result in history:
-            mrr_for_query = 0.0
-            for idx, recommendation in enumerate(result, start=1):
-                if item_data.is_protected(protected_feature, recommendation):
-                    mrr_for_query = max(mrr_for_query, 1.0 / idx)
-                    mrr.append(mrr_for_query)
-                    break
-                if idx == 10:
-                    mrr.append(0)
-        avg_mrr = mean(mrr)
-        fair_mrr = avg_mrr / target_mrr"""
+    def setup(self, input_props, names=None):
+        super().setup(input_props,
+                      names=self.configure_names(GiniSketchFM._PROPERTY_NAMES, names))
+        self.sample_threshold = int(self.sample_rate * 2 ** 64)
+        self.distribution = None
+        self.source = None
+
+    def reset(self):
+        self.distribution = QuantileSketch(self.relative_accuracy)
+        self.sample_counts = {}
+        self.window_items = deque()
+
+    def add_item(self, item):
+        before = self.sample_counts.get(item, 0)
+        if before > 0:
+            self.distribution.remove(before)
+        self.distribution.add(before + 1)
+        self.sample_counts[item] = before + 1
+
+    def remove_item(self, item):
+        before = self.sample_counts[item]
+        self.distribution.remove(before)
+        if before > 1:
+            self.distribution.add(before - 1)
+            self.sample_counts[item] = before - 1
+        else:
+            del self.sample_counts[item]
+
+    def add_list(self, items, window_size=None):
+        sampled = [item for item in items if in_hash_sample(item, self.sample_threshold)]
+        for item in sampled:
+            self.add_item(item)
+        self.window_items.append(sampled)
+        if window_size is not None and len(self.window_items) > window_size:
+            for item in self.window_items.popleft():
+                self.remove_item(item)
+
+    def sync(self, output_history):
+        if self.source is not output_history:
+            self.reset()
+            self.source = output_history
+            self.synced_time = 0
+        new_entries = output_history.time - self.synced_time
+        if new_entries > 0:
+            recent = output_history.get_recent(min(new_entries, len(output_history.collection)))
+            for result in reversed(recent):
+                self.add_list(list(result.result_item_iter()), output_history.window_size)
+        self.synced_time = output_history.time
+
+    def gini(self):
+        zeros = max(int(round(self.sample_rate * self.num_items)) - len(self.sample_counts), 0)
+        return self.distribution.gini(zeros)
 
+    def compute_fairness(self, history):
+        if history.choice_output_history.is_empty():
+            return 1.0
+        self.sync(history.choice_output_history)
+        return (1.0 - self.gini()) / self.target
 
+    # Post-processing: history is the whole list of output item lists
+    def compute_test_fairness(self, history):
+        self.reset()
+        self.source = None
+        for items in history:
+            self.add_list(items)
+        return (1.0 - self.gini()) / self.target
 
 
 # Register the metrics created above
-metric_specs = [("gini", GiniIndexFM)]
+metric_specs = [("gini", GiniIndexFM), ("gini_sketch", GiniSketchFM)]
 
 FairnessMetricFactory.register_fairness_metrics(metric_specs)
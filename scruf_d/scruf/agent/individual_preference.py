@@ -1,6 +1,5 @@
 from .preference_function import PreferenceFunctionFactory, PreferenceFunction
 import scruf
-import copy
 import random
 from scruf.util import ResultList
 from abc import ABC, abstractmethod
@@ -10,6 +9,9 @@ from abc import ABC, abstractmethod
 class IndividualPreferenceFunction(PreferenceFunction):
 
     _PROPERTY_NAMES = ['delta']
+    _PROPERTY_TYPES = {'delta': float}
+    DATA_SOURCES = ['popularity']
+    READS_WINDOW = True
 
     def __init__(self):
         super().__init__()
@@ -33,9 +35,9 @@ class Individual_Norm(IndividualPreferenceFunction):
     #   check how often item is recommended
     #   order list with the least recommended items recommended highest.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
         counts_dict = scruf.Scruf.state.popularity.popularity_dict
-        delta = self.get_property('delta')
+        delta = self.delta
         history = scruf.Scruf.state.history
         for result in history.choice_output_history.get_recent(-1):
             for recommendation in result.get_results():
@@ -65,9 +67,9 @@ class Individual_Exponential(IndividualPreferenceFunction):
     #   check how often item is recommended
     #   order list with the least recommended items recommended highest.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
         counts_dict = scruf.Scruf.state.popularity.popularity_dict
-        delta = self.get_property('delta')
+        delta = self.delta
         history = scruf.Scruf.state.history
         for result in history.choice_output_history.get_recent(-1):
             for recommendation in result.get_results():
@@ -97,9 +99,9 @@ class Individual_Binary(IndividualPreferenceFunction):
     #   check how often item is recommended
     #   order list with the least recommended items recommended highest.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
         counts_dict = scruf.Scruf.state.popularity.popularity_dict
-        delta = self.get_property('delta')
+        delta = self.delta
         history = scruf.Scruf.state.history
         for result in history.choice_output_history.get_recent(-1):
             for recommendation in result.get_results():
@@ -1,7 +1,6 @@
 from . import FairnessMetric, FairnessMetricFactory
 from abc import abstractmethod
 import scruf
-from icecream import ic
 import numpy as np
 
 class ItemFeatureFairnessMetric(FairnessMetric):
@@ -10,6 +9,8 @@ class ItemFeatureFairnessMetric(FairnessMetric):
     feature defined in the feature section.
     """
     _PROPERTY_NAMES = ['feature']
+    _PROPERTY_TYPES = {'feature': str}
+    DATA_SOURCES = ['item_features']
 
     def __init__(self):
         super().__init__()
@@ -20,6 +21,9 @@ class ItemFeatureFairnessMetric(FairnessMetric):
     def __str__(self):
         return f"ItemFeatureFairnessMetric: feature = {self.get_property('feature')}"
 
+    def get_stats_feature(self):
+        return self.feature
+
     @abstractmethod
     def compute_fairness(self, history):
         pass
@@ -37,6 +41,8 @@ class ProportionalItemFM(ItemFeatureFairnessMetric):
     """
 
     _PROPERTY_NAMES = ['proportion']
+    _PROPERTY_TYPES = {'proportion': float}
+    WINDOW_STATS = ['item_count', 'protected_count']
 
     def __init__(self):
         super().__init__()
@@ -55,7 +61,7 @@ class ProportionalItemFM(ItemFeatureFairnessMetric):
             return 1.0
         else:
             prior_results = history.choice_output_history.get_recent(-1)
-            target_proportion = float(self.get_property('proportion'))
+            target_proportion = self.proportion
             protected, total_items = self.count_protected(prior_results)
             protected_ratio = float(protected) / total_items
             # If protected ratio is at or above
@@ -65,9 +71,18 @@ class ProportionalItemFM(ItemFeatureFairnessMetric):
             fairness_value = protected_ratio / target_proportion
             return fairness_value
 
+    def compute_fairness_from_stats(self, stats):
+        if stats['list_count'] == 0:
+            return 1.0
+        target_proportion = self.proportion
+        protected_ratio = float(stats['protected_count']) / stats['item_count']
+        if protected_ratio > target_proportion:
+            protected_ratio = target_proportion
+        return protected_ratio / target_proportion
+
     def compute_test_fairness(self, history):
 
-        target_proportion = float(self.get_property('proportion'))
+        target_proportion = self.proportion
         protected, total_items = self.count_test_protected(history)
         protected_ratio = float(protected) / total_items
         # If protected ratio is at or above
@@ -79,26 +94,22 @@ class ProportionalItemFM(ItemFeatureFairnessMetric):
 
 
     def count_protected(self, history_entries):
-        feature = self.get_property('feature')
+        feature = self.feature
         item_data = scruf.Scruf.state.item_features
         protected_count = 0
         total_count = 0
         for result in history_entries:
-            protected_vector = [1 if item_data.is_protected(feature, result_entry.item) else 0 \
-                                    for result_entry in result.get_results()]
-            protected_count += sum(protected_vector)
+            protected_vector = item_data.is_protected_many(feature, list(result.result_item_iter()))
+            protected_count += int(protected_vector.sum())
             total_count += len(result.get_results())
 
         return protected_count, total_count
 
     def count_test_protected(self, history_entries):
-        feature = self.get_property('feature')
+        feature = self.feature
         item_data = scruf.Scruf.state.item_features
-        protected_count = 0
         results = [item for sublist in history_entries for item in sublist]
-        for result in results:
-            protected_vector = [1 if item_data.is_protected(feature, result) else 0]
-            protected_count += sum(protected_vector)
+        protected_count = int(item_data.is_protected_many(feature, results).sum())
         total_count = len(results)
 
         return protected_count, total_count
@@ -12,6 +12,8 @@ class MeanReciprocalRankFM(ItemFeatureFairnessMetric):
     ordered by probability of correctness.
     """
     _PROPERTY_NAMES = ['target']
+    _PROPERTY_TYPES = {'target': float}
+    WINDOW_STATS = ['non_empty_count', 'reciprocal_rank_sum']
 
     def __init__(self):
         super().__init__()
@@ -33,43 +35,49 @@ class MeanReciprocalRankFM(ItemFeatureFairnessMetric):
             return 1.0
 
         max_mrr = 0  # To track the maximum MRR across all queries
-        protected_feature = self.get_property('feature')
+        protected_feature = self.feature
         item_data = scruf.Scruf.state.item_features
-        target_mrr = float(self.get_property('target'))
+        target_mrr = self.target
         mrr = []
 
         for result in history.choice_output_history.get_recent(-1):
-            mrr_for_query = 0.0  # MRR for the current query
-            results = result.get_results()
-            for idx, recommendation in enumerate(results, start=1):
-                if item_data.is_protected(protected_feature, recommendation.item):
-                    mrr_for_query = max(mrr_for_query, 1.0 / idx)
-                    mrr.append(mrr_for_query)
-                    break
-                if idx == len(results):
-                    mrr.append(0)
+            if result.get_length() == 0:
+                continue
+            protected = np.flatnonzero(item_data.is_protected_many(protected_feature,
+                                                                   list(result.result_item_iter())))
+            # Reciprocal rank of the first protected item, 0 if there is none
+            if len(protected) > 0:
+                mrr.append(1.0 / (int(protected[0]) + 1))
+            else:
+                mrr.append(0)
         avg_mrr = mean(mrr)
         fair_mrr = avg_mrr/target_mrr
         fairness_score = min(1.0, fair_mrr)
 
         return fairness_score
 
+    def compute_fairness_from_stats(self, stats):
+        if stats['list_count'] == 0:
+            return 1.0
+        target_mrr = self.target
+        avg_mrr = stats['reciprocal_rank_sum'] / stats['non_empty_count']
+        return min(1.0, avg_mrr / target_mrr)
+
     def compute_test_fairness(self, history):
 
-        protected_feature = self.get_property('feature')
+        protected_feature = self.feature
         item_data = scruf.Scruf.state.item_features
-        target_mrr = float(self.get_property('target'))
+        target_mrr = self.target
         mrr = []
 
         for result in history:
-            mrr_for_query = 0.0
-            for idx, recommendation in enumerate(result, start=1):
-                if item_data.is_protected(protected_feature, recommendation):
-                    mrr_for_query = max(mrr_for_query, 1.0 / idx)
-                    mrr.append(mrr_for_query)
-                    break
-                if idx == 10:
-                    mrr.append(0)
+            protected = np.flatnonzero(item_data.is_protected_many(protected_feature, result))
+            first = int(protected[0]) + 1 if len(protected) > 0 else None
+            # A 0 is recorded once the 10th position is passed without a protected item
+            if len(result) >= 10 and (first is None or first > 10):
+                mrr.append(0)
+            if first is not None:
+                mrr.append(1.0 / first)
         avg_mrr = mean(mrr)
         fair_mrr = avg_mrr/target_mrr
         fairness_score = min(1.0, fair_mrr)
@@ -83,6 +91,8 @@ class DisparateExposureFM(ItemFeatureFairnessMetric):
     proportional visibility/exposure in the recommendation lists, relative to their representation.
     """
     _PROPERTY_NAMES = ['n_protected', 'target']
+    _PROPERTY_TYPES = {'n_protected': float, 'target': float}
+    WINDOW_STATS = ['protected_exposure', 'unprotected_exposure']
 
     def __init__(self):
         super().__init__()
@@ -104,55 +114,47 @@ class DisparateExposureFM(ItemFeatureFairnessMetric):
 
         utility_protected = 0
         utility_non_protected = 0
-        protected_feature = self.get_property('feature')
-        n_prot = self.get_property('n_protected')
-        n_unprot= 1-self.get_property('n_protected')
-        target = self.get_property('target')
+        protected_feature = self.feature
         item_data = scruf.Scruf.state.item_features
 
         for result in history.choice_output_history.get_recent(-1):
-            rank = 0
-            for recommendation in result.get_results():
-                rank +=1
-                if item_data.is_protected(protected_feature, recommendation.item):
-                    utility_protected += 1 / np.log2(rank + 1)
-                else:
-                    utility_non_protected += 1 / np.log2(rank + 1)
-
-        # the proportion of exposure between protected and non-protected items has been considered.
-        # Adjust this formula based on fairness definition.
-        exposure = ((utility_protected/n_prot) / (utility_non_protected/n_unprot))
-        fair_exposure = exposure/target
-        fairness_score = min(1, fair_exposure)
+            protected = item_data.is_protected_many(protected_feature, list(result.result_item_iter()))
+            discount = 1 / np.log2(np.arange(1, len(protected) + 1) + 1)
+            utility_protected += discount[protected].sum()
+            utility_non_protected += discount[~protected].sum()
 
-        return fairness_score
+        return self.exposure_fairness(utility_protected, utility_non_protected)
+
+    def compute_fairness_from_stats(self, stats):
+        if stats['list_count'] == 0:
+            return 1.0
+        return self.exposure_fairness(stats['protected_exposure'], stats['unprotected_exposure'])
+
+    # The proportion of exposure between protected and non-protected items, relative to their shares and
+    # the target. With no unprotected exposure the protected items are over-exposed (1.0); with no
+    # protected exposure, and some unprotected exposure, the score is 0.
+    def exposure_fairness(self, protected_exposure, unprotected_exposure):
+        if unprotected_exposure == 0:
+            return 1.0
+        if protected_exposure == 0:
+            return 0.0
+        exposure = (protected_exposure / self.n_protected) / (unprotected_exposure / (1 - self.n_protected))
+        return min(1, exposure / self.target)
 
     def compute_test_fairness(self, history):
 
         utility_protected = 0
         utility_non_protected = 0
-        protected_feature = self.get_property('feature')
-        n_prot = self.get_property('n_protected')
-        n_unprot= 1-self.get_property('n_protected')
-        target = self.get_property('target')
+        protected_feature = self.feature
         item_data = scruf.Scruf.state.item_features
 
         for result in history:
-            rank = 0
-            for recommendation in result:
-                rank +=1
-                if item_data.is_protected(protected_feature, recommendation):
-                    utility_protected += 1 / np.log2(rank + 1)
-                else:
-                    utility_non_protected += 1 / np.log2(rank + 1)
-
-        # the proportion of exposure between protected and non-protected items has been considered.
-        # Adjust this formula based on fairness definition.
-        exposure = ((utility_protected/n_prot) / (utility_non_protected/n_unprot))
-        fair_exposure = exposure/target
-        fairness_score = min(1, fair_exposure)
+            protected = item_data.is_protected_many(protected_feature, result)
+            discount = 1 / np.log2(np.arange(1, len(protected) + 1) + 1)
+            utility_protected += discount[protected].sum()
+            utility_non_protected += discount[~protected].sum()
 
-        return fairness_score
+        return self.exposure_fairness(utility_protected, utility_non_protected)
 
 # Register the metrics created above
 metric_specs = [("mrr", MeanReciprocalRankFM), ('disparate_exposure', DisparateExposureFM)]
@@ -1,10 +1,13 @@
-import copy
 from abc import ABC, abstractmethod
 from scruf.util import InvalidPreferenceFunctionError, UnregisteredPreferenceFunctionError, \
     PropertyMixin, ResultList
 
 class PreferenceFunction(PropertyMixin,ABC):
 
+    # Input data that the function reads, and whether it walks the output window (see FairnessMetric)
+    DATA_SOURCES = []
+    READS_WINDOW = False
+
     def setup(self, input_props, names=None):
         super().setup(input_props, names=names)
 
@@ -16,7 +19,7 @@ class ZeroPreference(PreferenceFunction):
 
     # Return a new result list with all zeros.
     def compute_preferences(self, recommendations: ResultList) -> ResultList:
-        rec_list = copy.deepcopy(recommendations)
+        rec_list = recommendations.view()
         rec_list.rescore_no_sort(lambda entry: 0.0)
         return rec_list
 
@@ -9,6 +9,8 @@ class UserAgentCompatibilityMetric(CompatibilityMetric):
     a fairness agent.
     """
 
+    DATA_SOURCES = ['context']
+
     def __init__(self):
         super().__init__()
 
@@ -3,3 +3,4 @@ from .allocation_mechanism import AllocationMechanism, AllocationMechanismFactor
     ScoredAllocationMechanism, ProductAllocationMechanism
 from .lottery_allocation import ProductAllocationLottery, WeightedProductAllocationLottery, \
     FairnessAllocationLottery, StaticAllocationLottery
+from .probabilistic_serial import ProbabilisticSerialAllocation
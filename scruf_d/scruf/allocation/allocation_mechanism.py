@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from scruf.util import PropertyMixin, InvalidAllocationMechanismError, UnregisteredAllocationMechanismError, \
     normalize_score_dict, collapse_score_dict, ContextNotFoundError
 from scruf.agent import AgentCollection
+import numpy as np
 import scruf
 import random
 
@@ -10,8 +11,18 @@ class AllocationMechanism(PropertyMixin,ABC):
     An AllocationMechanism computes allocation probabilities for a
     collection of FairnessAgents based on their fairness and compatibility scores. All mechanisms are
     initialized with a dictionary of property name, value pairs. Each subclass has to specify the
-    property names that it expects.
+    property names that it expects. The compatibilities come from the context, which every mechanism
+    reads for each user. A mechanism lists the agent scores that its allocation uses in INPUTS. The
+    scores that the choice mechanism reads from the agents (its AGENT_SCORES) are computed too, except by
+    LeastFair.
+    The others are only computed if the history needs them (see recorded_scores).
     """
+
+    DATA_SOURCES = ['context']
+    FAIRNESS = 'fairness'
+    COMPATIBILITY = 'compatibility'
+    INPUTS = [FAIRNESS, COMPATIBILITY]
+
     def setup(self, input_props, names=None):
         super().setup(input_props, names=names)
 
@@ -31,6 +42,32 @@ class AllocationMechanism(PropertyMixin,ABC):
     def compute_allocation_probabilities(self, agents, history, context):
         pass
 
+    # Whether the score is needed for this user: by the allocation or by the choice mechanism, which may
+    # read the agents' latest scores (e.g. PFAR, their compatibility)
+    def uses_score(self, score_type):
+        if score_type in self.INPUTS:
+            return True
+        choice_mechanism = getattr(scruf.Scruf.state, 'choice_mechanism', None)
+        return choice_mechanism is not None and score_type in choice_mechanism.AGENT_SCORES
+
+    # Fairness and compatibility arrays in agent order, None for a score that is not used
+    def score_inputs(self, agents: AgentCollection, history, context):
+        fairness = agents.fairness_vector(history) if self.uses_score(self.FAIRNESS) else None
+        compatibility = agents.compatibility_vector(context) if self.uses_score(self.COMPATIBILITY) else None
+        return fairness, compatibility
+
+    # Agent name -> score for the allocation history. A score that the mechanism did not compute
+    # (vector is None) is NaN, unless the history needs it (skipped_values = "lazy" and it is written
+    # or read).
+    def recorded_scores(self, agents: AgentCollection, vector, score_type, history, context):
+        if vector is not None:
+            return agents.to_dict(vector)
+        if history is not None and history.needs_skipped_scores():
+            if score_type == self.FAIRNESS:
+                return agents.compute_fairnesses(history)
+            return agents.compute_compatibilities(context)
+        return agents.agent_value_pairs(default=float('NaN'))
+
 
 class RandomAllocationMechanism(AllocationMechanism):
 
@@ -57,6 +94,14 @@ class ScoredAllocationMechanism(AllocationMechanism):
     def score(self, agent_name, fairness_values, compatibility_values):
         pass
 
+    # Scores of all agents: fairness and compatibility are arrays in agent order. Subclasses override
+    # this with array arithmetic; the default calls score() for each agent.
+    def score_vector(self, names, fairness, compatibility):
+        fairness_values = dict(zip(names, fairness))
+        compat_values = dict(zip(names, compatibility))
+        return np.array([self.score(name, fairness_values, compat_values) for name in names],
+                        dtype=np.float64)
+
     def compute_allocation_probabilities(self, agents: AgentCollection, history, context):
         """
         Computes the allocation probabilities for a collection of FairnessAgents based on the product of
@@ -67,16 +112,16 @@ class ScoredAllocationMechanism(AllocationMechanism):
         :return: a dictionary mapping agent names to allocation probabilities
         """
         # Compute the fairness and compatibility scores for each agent
-        fairness_values = agents.compute_fairnesses(history)
-        compat_values = agents.compute_compatibilities(context)
-        scores = {agent_name: self.score(agent_name, fairness_values, compat_values) \
-                    for agent_name in agents.agent_names()}
+        fairness, compatibility = self.score_inputs(agents, history, context)
+        scores = self.score_vector(agents.agent_names(), fairness, compatibility)
 
         # Normalize the scores to sum to 1
-        scores = normalize_score_dict(scores, inplace=True)
-        return {'fairness scores': fairness_values,
-                'compatibility scores': compat_values,
-                'output': scores}
+        magnitude = scores.sum()
+        scores = scores / magnitude if magnitude > 0 else np.zeros(len(scores))
+        return {'fairness scores': self.recorded_scores(agents, fairness, self.FAIRNESS, history, context),
+                'compatibility scores': self.recorded_scores(agents, compatibility, self.COMPATIBILITY,
+                                                             history, context),
+                'output': agents.to_dict(scores)}
 
 
 class ProductAllocationMechanism(ScoredAllocationMechanism):
@@ -87,6 +132,9 @@ class ProductAllocationMechanism(ScoredAllocationMechanism):
     def score(self, agent_name, fairness_values, compatibility_values):
         return (1.0 - fairness_values[agent_name]) * compatibility_values[agent_name]
 
+    def score_vector(self, names, fairness, compatibility):
+        return (1.0 - fairness) * compatibility
+
 
 class WeightedProductAllocationMechanism(ScoredAllocationMechanism):
     """Computes the allocation as the product of (1-fairness)^e1 and compatibility^e2
@@ -100,22 +148,30 @@ class WeightedProductAllocationMechanism(ScoredAllocationMechanism):
     def setup(self, input_props, names=None):
         super().setup(input_props,
                       names=self.configure_names(WeightedProductAllocationMechanism._PROPERTY_NAMES, names))
+        # Read once rather than for every agent and user
+        self.fairness_exp = float(self.get_property('fairness_exponent'))
+        self.compat_exp = float(self.get_property('compatibility_exponent'))
 
     def __str__(self):
         return f"WeightedProductAllocation: fairness = {self.get_propery('fairness_exponent')}, compatibility = {self.get_propery('compatibility_exponent')}"
 
     def score(self, agent_name, fairness_values, compatibility_values):
-        fairness_exp = self.get_property('fairness_exponent')
-        compat_exp = self.get_property('compatibility_exponent')
-        fairness_term = (1.0 - fairness_values[agent_name]) ** fairness_exp
-        compat_term =  compatibility_values[agent_name] ** compat_exp
+        fairness_term = (1.0 - fairness_values[agent_name]) ** self.fairness_exp
+        compat_term =  compatibility_values[agent_name] ** self.compat_exp
         return fairness_term * compat_term
 
+    def score_vector(self, names, fairness, compatibility):
+        return (1.0 - fairness) ** self.fairness_exp * compatibility ** self.compat_exp
+
 class LeastFairAllocationMechanism(AllocationMechanism):
     """
-    The LeastFair allocation mechanism allocates to the agent with the lowest fairness score.
+    The LeastFair allocation mechanism allocates to the agent with the lowest fairness score. Its
+    compatibility scores are always recorded as NaN, and are not computed even if the choice mechanism
+    reads them.
     """
 
+    INPUTS = [AllocationMechanism.FAIRNESS]
+
     def __init__(self):
         super().__init__()
 
@@ -142,6 +198,8 @@ class MostCompatibleAllocationMechanism(AllocationMechanism):
     The MostCompatible allocation mechanism allocates to the agent with the highest compatibility score.
     """
 
+    INPUTS = [AllocationMechanism.COMPATIBILITY]
+
     def __init__(self):
         super().__init__()
 
@@ -166,7 +224,8 @@ class MostCompatibleAllocationMechanism(AllocationMechanism):
 
         if highest_agent is not None:
             probs[highest_agent] = 1.0
-        fairness_values = agents.compute_fairnesses(history)
+        fairness = agents.fairness_vector(history) if self.uses_score(self.FAIRNESS) else None
+        fairness_values = self.recorded_scores(agents, fairness, self.FAIRNESS, history, context)
         return {'fairness scores': fairness_values,
                 'compatibility scores': scores,
                 'output': probs}
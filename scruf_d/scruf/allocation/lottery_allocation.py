@@ -2,30 +2,67 @@ from .allocation_mechanism import AllocationMechanism, AllocationMechanismFactor
 from scruf.agent import AgentCollection
 from scruf.util import normalize_score_dict
 from abc import abstractmethod
-from icecream import ic
+from bisect import bisect_right
+from itertools import accumulate
+import numpy as np
 import scruf
 
 # Similar to a scored allocation but the weights are treated like lottery and
-# only a single agent is chosen
+# only a single agent is chosen.
+# The scores are computed for all agents at once as arrays in agent order (score_vector) and the
+# winner is drawn from a numpy Generator. The generator is seeded from the experiment's random
+# number generator (parameters.random_seed) the first time it is needed, so a run is reproducible
+# from the seed: the winner for each user depends on the seed and on the scores up to that user.
+# Negative scores are treated as zero.
 class LotteryAllocationMechanism(AllocationMechanism):
 
-    def score_dict_lottery(self, score_dict: dict, agents):
-        lottery = normalize_score_dict(score_dict)
-        result = scruf.Scruf.state.agents.agent_value_pairs(default=0.0)
-        if sum([val for val in lottery.values()]) == 0:
-            return result
-        else:
-            winner = scruf.Scruf.state.rand.choices(list(lottery.keys()), list(lottery.values()))
-            result[winner[0]] = 1.0
-            return result
-
     def __init__(self):
         super().__init__()
+        self.generator: np.random.Generator = None
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=names)
+        self.generator = None
+
+    def get_generator(self):
+        if self.generator is None:
+            self.generator = np.random.default_rng(scruf.Scruf.state.rand.getrandbits(64))
+        return self.generator
+
+    # Index of the winner, drawn with probability proportional to the weights. None if they are all zero.
+    # There are only a few agents, so the cumulative weights are summed in Python: the numpy calls
+    # cost more than the arithmetic at this size.
+    def draw_winner(self, weights):
+        cumulative = list(accumulate(weight if weight > 0.0 else 0.0 for weight in weights.tolist()))
+        if len(cumulative) == 0 or cumulative[-1] <= 0:
+            return None
+        winner = bisect_right(cumulative, self.get_generator().random() * cumulative[-1])
+        # Guards against rounding in the last bucket
+        return min(winner, len(cumulative) - 1)
+
+    def score_dict_lottery(self, score_dict: dict, agents):
+        return self.vector_lottery(agents.from_dict(score_dict), agents)
+
+    # weights: array in agent order. Returns agent name -> 1.0 for the winner, 0.0 for the others.
+    def vector_lottery(self, weights, agents):
+        result = agents.agent_value_pairs(default=0.0)
+        winner = self.draw_winner(weights)
+        if winner is not None:
+            result[agents.agent_names()[winner]] = 1.0
+        return result
 
     @abstractmethod
     def score(self, agent_name, fairness_values, compatibility_values):
         pass
 
+    # Scores of all agents: fairness and compatibility are arrays in agent order. Subclasses override
+    # this with array arithmetic; the default calls score() for each agent.
+    def score_vector(self, names, fairness, compatibility):
+        fairness_values = dict(zip(names, fairness))
+        compat_values = dict(zip(names, compatibility))
+        return np.array([self.score(name, fairness_values, compat_values) for name in names],
+                        dtype=np.float64)
+
     def compute_allocation_probabilities(self, agents: AgentCollection, history, context):
         """
         Computes the allocation probabilities for a collection of FairnessAgents based on the product of
@@ -36,16 +73,15 @@ class LotteryAllocationMechanism(AllocationMechanism):
         :return: a dictionary mapping agent names to allocation probabilities
         """
         # Compute the fairness and compatibility scores for each agent
-        fairness_values = agents.compute_fairnesses(history)
-        compat_values = agents.compute_compatibilities(context)
-        scores = {agent_name: self.score(agent_name, fairness_values, compat_values) \
-                    for agent_name in agents.agent_names()}
+        fairness, compatibility = self.score_inputs(agents, history, context)
+        scores = self.score_vector(agents.agent_names(), fairness, compatibility)
 
-        # Normalize the scores to sum to 1
-        scores = self.score_dict_lottery(scores, agents)
-        return {'fairness scores': fairness_values,
-                'compatibility scores': compat_values,
-                'output': scores}
+        # Draw the winner
+        output = self.vector_lottery(scores, agents)
+        return {'fairness scores': self.recorded_scores(agents, fairness, self.FAIRNESS, history, context),
+                'compatibility scores': self.recorded_scores(agents, compatibility, self.COMPATIBILITY,
+                                                             history, context),
+                'output': output}
 
 class ProductAllocationLottery(LotteryAllocationMechanism):
 
@@ -55,6 +91,9 @@ class ProductAllocationLottery(LotteryAllocationMechanism):
     def score(self, agent_name, fairness_values, compatibility_values):
         return (1.0 - fairness_values[agent_name]) * compatibility_values[agent_name]
 
+    def score_vector(self, names, fairness, compatibility):
+        return (1.0 - fairness) * compatibility
+
 
 class WeightedProductAllocationLottery(LotteryAllocationMechanism):
 
@@ -66,26 +105,35 @@ class WeightedProductAllocationLottery(LotteryAllocationMechanism):
     def setup(self, input_props, names=None):
         super().setup(input_props,
                       names=self.configure_names(WeightedProductAllocationLottery._PROPERTY_NAMES, names))
+        # Read once rather than for every agent and user
+        self.fairness_exp = float(self.get_property('fairness_exponent'))
+        self.compat_exp = float(self.get_property('compatibility_exponent'))
 
 
     def __str__(self):
         return f"WeightedProductAllocation: fairness = {self.get_property('fairness_exponent')}, compatibility = {self.get_property('compatibility_exponent')}"
 
     def score(self, agent_name, fairness_values, compatibility_values):
-        fairness_exp = self.get_property('fairness_exponent')
-        compat_exp = self.get_property('compatibility_exponent')
-        fairness_term = (1.0 - fairness_values[agent_name]) ** fairness_exp
-        compat_term = compatibility_values[agent_name] ** compat_exp
+        fairness_term = (1.0 - fairness_values[agent_name]) ** self.fairness_exp
+        compat_term = compatibility_values[agent_name] ** self.compat_exp
         return fairness_term * compat_term
 
+    def score_vector(self, names, fairness, compatibility):
+        return (1.0 - fairness) ** self.fairness_exp * compatibility ** self.compat_exp
+
 class FairnessAllocationLottery(LotteryAllocationMechanism):
 
+    INPUTS = [LotteryAllocationMechanism.FAIRNESS]
+
     def __init__(self):
         super().__init__()
 
     def score(self, agent_name, fairness_values, compatibility_values):
         return 1.0 - fairness_values[agent_name]
 
+    def score_vector(self, names, fairness, compatibility):
+        return 1.0 - fairness
+
 class StaticAllocationLottery(LotteryAllocationMechanism):
 
     # Weights are specified in the config file as a list of pairs:
@@ -93,12 +141,23 @@ class StaticAllocationLottery(LotteryAllocationMechanism):
     # If the total is less than 1, then a dummy agent is added. If the
     # dummy is selected by the lottery, then no agents are allocated.
     # Note that you can't have mixed lists in TOML, so everything has to be a string
+    # The weights never change, so the cumulative weights are computed once and the winners are drawn
+    # in blocks of BLOCK_SIZE users. The generator has the same seed as for the other lotteries and a
+    # block of uniform draws is the same as drawing them one at a time, so the winner for the i-th user
+    # depends only on the seed and i (not on the block size).
     _PROPERTY_NAMES = ['weights']
     _DUMMY_AGENT = "__dummy__"
+    # The weights do not depend on the agents' scores
+    INPUTS = []
+    BLOCK_SIZE = 4096
 
     def __init__(self):
         super().__init__()
         self.lottery = None
+        self.lottery_names = None
+        self.cumulative = None
+        self.winners = np.zeros(0, dtype=np.int64)
+        self.next_winner = 0
 
     def setup(self, input_properties: dict, names=None):
         super().setup(input_properties,
@@ -108,19 +167,36 @@ class StaticAllocationLottery(LotteryAllocationMechanism):
         if weights_sum < 1.0:
             weights.append([self._DUMMY_AGENT, 1 - weights_sum])
         self.lottery = normalize_score_dict({agent: float(wt) for agent, wt in weights})
+        self.lottery_names = list(self.lottery.keys())
+        self.cumulative = np.cumsum(np.maximum(list(self.lottery.values()), 0.0))
+        self.winners = np.zeros(0, dtype=np.int64)
+        self.next_winner = 0
+
+    def draw_block(self):
+        draws = self.get_generator().random(self.BLOCK_SIZE) * self.cumulative[-1]
+        self.winners = np.minimum(np.searchsorted(self.cumulative, draws, side='right'), len(self.cumulative) - 1)
+        self.next_winner = 0
 
     def score_dict_lottery(self, _, agents):
-        # ic(list(self.lottery.keys()), list(self.lottery.values()))
-        winner = scruf.Scruf.state.rand.choices(list(self.lottery.keys()), list(self.lottery.values()))[0]
-        #ic(winner)
-        result = scruf.Scruf.state.agents.agent_value_pairs(default=0.0)
+        if self.next_winner == len(self.winners):
+            self.draw_block()
+        winner = self.lottery_names[self.winners[self.next_winner]]
+        self.next_winner += 1
+        result = agents.agent_value_pairs(default=0.0)
         if winner != self._DUMMY_AGENT:
             result[winner] = 1.0
         return result
 
+    # The weights are fixed, so the scores are ignored
+    def vector_lottery(self, weights, agents):
+        return self.score_dict_lottery(None, agents)
+
     def score(self, agent_name, fairness_values, compatibility_values):
         return float("nan")
 
+    def score_vector(self, names, fairness, compatibility):
+        return np.full(len(names), float("nan"))
+
 mechanism_specs = [("product_lottery", ProductAllocationLottery),
                    ("weighted_product_lottery", WeightedProductAllocationLottery),
                    ("fairness_lottery", FairnessAllocationLottery),
@@ -0,0 +1,131 @@
+import heapq
+import numpy as np
+from .allocation_mechanism import AllocationMechanism, AllocationMechanismFactory
+from scruf.agent import AgentCollection
+
+
+class ProbabilisticSerialAllocation(AllocationMechanism):
+    """
+    Probabilistic serial (simultaneous eating) allocation. Users are the eaters and agents the objects.
+    Each agent's supply is its share of the total need (1 - fairness) times the number of users being
+    allocated. Each user ranks the agents by (1 - fairness) * compatibility, ignoring those with a zero
+    score, and all users eat their best remaining agent at the same speed for one unit of time. The
+    fraction of an agent that a user has eaten is the probability that the user is allocated to it.
+    If a user runs out of acceptable agents, the rest of its probability goes to no agent.
+
+    The allocation is computed for a batch of users at once by allocate_batch(). The simulation
+    allocates one user at a time, which is a batch of one: the user gets its agents in order of
+    preference, each up to that agent's share of the need.
+    """
+
+    EPSILON = 1e-12
+
+    def __init__(self):
+        super().__init__()
+
+    @staticmethod
+    def allocate_batch(fairness, compatibility):
+        """
+        Event-driven eating algorithm. Rather than stepping time, it jumps from one agent running out
+        to the next: each agent's run-out time (remaining supply / number of eaters) is kept in a heap
+        and recomputed when its eaters change. Sorting the preferences costs O(users * agents log agents)
+        and each user moves past each agent at most once.
+        :param fairness: array of fairness values, one per agent
+        :param compatibility: users x agents array of compatibility values
+        :return: users x agents array of allocation probabilities
+        """
+        compatibility = np.atleast_2d(np.asarray(compatibility, dtype=np.float64))
+        num_users, num_agents = compatibility.shape
+        allocation = np.zeros((num_users, num_agents))
+        need = np.maximum(1.0 - np.asarray(fairness, dtype=np.float64), 0.0)
+        if num_users == 0 or need.sum() <= 0:
+            return allocation
+
+        supply = (num_users * need / need.sum()).tolist()
+        scores = need * compatibility
+        # Stable, so that ties go to the earlier agent
+        preferences = np.argsort(-scores, axis=1, kind='stable').tolist()
+        acceptable = (scores > 0).sum(axis=1).tolist()
+
+        if num_users == 1:
+            # A single eater: it takes each acceptable agent in turn, up to that agent's supply
+            remaining = 1.0
+            for agent in preferences[0][0:acceptable[0]]:
+                allocation[0, agent] = min(supply[agent], remaining)
+                remaining -= allocation[0, agent]
+                if remaining <= ProbabilisticSerialAllocation.EPSILON:
+                    break
+            return allocation
+
+        eaters = [set() for _ in range(num_agents)]
+        last_update = [0.0] * num_agents
+        version = [0] * num_agents
+        position = [0] * num_users
+        started = [0.0] * num_users
+        heap = []
+
+        def update_supply(agent, time):
+            supply[agent] -= len(eaters[agent]) * (time - last_update[agent])
+            last_update[agent] = time
+
+        def schedule(agent, time):
+            version[agent] += 1
+            if len(eaters[agent]) > 0:
+                heapq.heappush(heap, (time + max(supply[agent], 0.0) / len(eaters[agent]), agent, version[agent]))
+
+        # Moves the user to its next acceptable agent with supply left, if any
+        def advance(user, time, changed):
+            while position[user] < acceptable[user]:
+                agent = preferences[user][position[user]]
+                if agent not in changed:
+                    update_supply(agent, time)
+                    changed.add(agent)
+                # Agents that run out at the same moment may still show a rounding error of supply
+                if supply[agent] > ProbabilisticSerialAllocation.EPSILON:
+                    eaters[agent].add(user)
+                    started[user] = time
+                    return
+                position[user] += 1
+
+        changed = set()
+        for user in range(num_users):
+            advance(user, 0.0, changed)
+        for agent in changed:
+            schedule(agent, 0.0)
+
+        while heap and heap[0][0] < 1.0:
+            time, agent, agent_version = heapq.heappop(heap)
+            if agent_version != version[agent]:
+                continue
+            update_supply(agent, time)
+            supply[agent] = 0.0
+            version[agent] += 1
+            finished = eaters[agent]
+            eaters[agent] = set()
+            changed = set()
+            for user in finished:
+                allocation[user, agent] += time - started[user]
+                position[user] += 1
+                advance(user, time, changed)
+            for other in changed:
+                schedule(other, time)
+
+        # Everyone still eating stops at time 1
+        for agent in range(num_agents):
+            for user in eaters[agent]:
+                allocation[user, agent] += 1.0 - started[user]
+        return allocation
+
+    def compute_allocation_probabilities(self, agents: AgentCollection, history, context):
+        fairness = agents.fairness_vector(history)
+        compatibility = agents.compatibility_vector(context)
+        allocation = self.allocate_batch(fairness, compatibility[np.newaxis, :])[0]
+        return {'fairness scores': agents.to_dict(fairness),
+                'compatibility scores': agents.to_dict(compatibility),
+                'output': agents.to_dict(allocation)}
+
+
+# Register the mechanisms created above
+mechanism_specs = [("probabilistic_serial", ProbabilisticSerialAllocation)]
+
+AllocationMechanismFactory.register_allocation_mechanisms(mechanism_specs)
@@ -1,5 +1,13 @@
+from scruf.util import lazy_attributes
 from .choice_mechanism import ChoiceMechanism, ChoiceMechanismFactory, NullChoiceMechanism
 from .wscoring_choice_mechanism import WScoringChoiceMechanism
-from .whalrus_wrapper_mechanism import WhalrusWrapperScoring, WhalrusWrapperOrdinal
 from .greedy_sublist_choice import GreedySublistChoiceMechanism, xQuadChoiceMechanism
-from .fair_rerank_choice import FARChoiceMechanism, PFARChoiceMechanism, OFairChoiceMechanism
\ No newline at end of file
+from .fair_rerank_choice import FARChoiceMechanism, PFARChoiceMechanism, OFairChoiceMechanism
+
+# The whalrus mechanisms (and whalrus itself) are imported when they are first used
+ChoiceMechanismFactory.register_lazy_choice_mechanisms(
+    [('whalrus_scoring', 'scruf.choice.whalrus_wrapper_mechanism', 'WhalrusWrapperScoring'),
+     ('whalrus_ordinal', 'scruf.choice.whalrus_wrapper_mechanism', 'WhalrusWrapperOrdinal')])
+
+__getattr__ = lazy_attributes(__name__, {'WhalrusWrapperScoring': '.whalrus_wrapper_mechanism',
+                                         'WhalrusWrapperOrdinal': '.whalrus_wrapper_mechanism'})
@@ -1,16 +1,25 @@
-import copy
 from abc import ABC, abstractmethod
 
 from scruf.agent import AgentCollection
 from scruf.util import BallotCollection, InvalidChoiceMechanismError, UnregisteredChoiceMechanismError, \
-    ResultList, PropertyMixin
+    ResultList, PropertyMixin, resolve_class
 import scruf
 
 class ChoiceMechanism(PropertyMixin,ABC):
     """
     A ChoiceMechanism takes in a list of weights, a list of agents, a list of recommended items. The agents generate
     their own preference lists and the specific compute_choice method combines the weights and the preferences.
+    A mechanism that reads input data (other than the ballots) lists the data sources in DATA_SOURCES.
+    A mechanism that ignores the agents' ballots leaves BALLOTS out of INPUTS, and their preferences
+    are not computed. A mechanism that reads the agents' latest fairness or compatibility lists them in
+    AGENT_SCORES, so that the allocation computes them even if it does not use them itself.
     """
+
+    DATA_SOURCES = []
+    BALLOTS = 'ballots'
+    INPUTS = [BALLOTS]
+    AGENT_SCORES = []
+
     def setup(self, input_props, names=None):
         super().setup(input_props, names=names)
 
@@ -19,10 +28,13 @@ class ChoiceMechanism(PropertyMixin,ABC):
     def do_choice(self, allocation_probabilities, recommendations: ResultList):
         agents = scruf.Scruf.state.agents
         list_size = scruf.Scruf.state.output_list_size
-        agent_ballots = self.compute_agent_ballots(agents, allocation_probabilities, recommendations)
+        if self.BALLOTS in self.INPUTS:
+            agent_ballots = self.compute_agent_ballots(agents, allocation_probabilities, recommendations)
+        else:
+            agent_ballots = BallotCollection()
         bcoll, results = self.compute_choice(agents, agent_ballots, recommendations, list_size)
         scruf.Scruf.state.history.choice_input_history.add_item(bcoll)
-        scruf.Scruf.state.history.choice_output_history.add_item(results)
+        scruf.Scruf.state.history.add_choice_output(results)
         return results
 
     def compute_agent_ballots(self, agents, allocation_probabilities, recommendations: ResultList):
@@ -45,6 +57,8 @@ class NullChoiceMechanism(ChoiceMechanism):
     The agents have no influence on the recommendations
     """
 
+    INPUTS = []
+
     def __init__(self):
         super().__init__()
         
@@ -56,7 +70,7 @@ class NullChoiceMechanism(ChoiceMechanism):
         bcoll = BallotCollection()
         recommended_items.sort()
         bcoll.set_ballot(BallotCollection.REC_NAME, recommended_items, 1.0)
-        output = copy.deepcopy(recommended_items)
+        output = recommended_items.view()
         output.trim(list_size)
         return bcoll, output
 
@@ -66,6 +80,8 @@ class ChoiceMechanismFactory:
     """
 
     _choice_mechanisms = {}
+    # Types whose classes are imported when first created: type -> (module name, class name)
+    _lazy_choice_mechanisms = {}
 
     @classmethod
     def register_choice_mechanism(cls, mechanism_type, mechanism_class):
@@ -78,9 +94,17 @@ class ChoiceMechanismFactory:
         for mechanism_type, mechanism_class in mechanism_specs:
             cls.register_choice_mechanism(mechanism_type, mechanism_class)
 
+    @classmethod
+    def register_lazy_choice_mechanisms(cls, mechanism_specs):
+        for mechanism_type, module_name, class_name in mechanism_specs:
+            cls._lazy_choice_mechanisms[mechanism_type] = (module_name, class_name)
+
     @classmethod
     def create_choice_mechanism(cls, mechanism_type):
         mechanism_class = cls._choice_mechanisms.get(mechanism_type)
+        if mechanism_class is None and mechanism_type in cls._lazy_choice_mechanisms:
+            mechanism_class = resolve_class(*cls._lazy_choice_mechanisms[mechanism_type])
+            cls.register_choice_mechanism(mechanism_type, mechanism_class)
         if mechanism_class is None:
             raise UnregisteredChoiceMechanismError(mechanism_type)
         return mechanism_class()
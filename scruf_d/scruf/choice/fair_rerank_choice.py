@@ -1,4 +1,3 @@
-from icecream import ic
 from .choice_mechanism import ChoiceMechanism, ChoiceMechanismFactory
 from scruf.agent import AgentCollection
 from scruf.util import ResultList, BallotCollection, Ballot, \
@@ -38,6 +37,7 @@ import scruf
 
 class FARChoiceMechanism(GreedySublistChoiceMechanism):
     _PROPERTY_NAMES = ['use_allocation_weight', 'binary']
+    _PROPERTY_TYPES = {'binary': bool}
 
     def __init__(self):
         super().__init__()
@@ -60,7 +60,7 @@ class FARChoiceMechanism(GreedySublistChoiceMechanism):
     # but that isn't supported yet.
     # TODO: List-wise fairness scoring where possible.
     def representation_score(self, results: ResultList, agent):
-        binary = self.get_property('binary') in {'True', 'true'}
+        binary = self.binary
         agent_item_set = self.feature_map[agent]
         count = 0
         agent_count = 0
@@ -131,6 +131,9 @@ class FARChoiceMechanism(GreedySublistChoiceMechanism):
 # Does the non-binary definition make sense here? It will run that way but not sure that it should.
 class PFARChoiceMechanism(FARChoiceMechanism):
 
+    # Ballots are weighted by the agents' recent_compatibility
+    AGENT_SCORES = ['compatibility']
+
     def sublist_scorer(self, list_so_far: ResultList, candidates: ResultList, ballots: BallotCollection):
 
         agents = scruf.Scruf.state.agents
@@ -157,6 +160,7 @@ class PFARChoiceMechanism(FARChoiceMechanism):
 # TODO: This does not work. Needs to access item representations, not just agent information.
 class OFairChoiceMechanism(MMRAbstractChoiceMechanism):
     _PROPERTY_NAMES = ['alpha', 'epsilon', 'non_sensitive_discount']
+    DATA_SOURCES = ['item_features', 'context']
 
     def __init__(self):
         super().__init__()
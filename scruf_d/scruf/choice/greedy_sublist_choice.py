@@ -1,7 +1,6 @@
-from icecream import ic
 from .choice_mechanism import ChoiceMechanism, ChoiceMechanismFactory
 from scruf.agent import AgentCollection
-from scruf.util import ResultList, BallotCollection, MultipleBallotsGreedyError
+from scruf.util import ResultList, ResultEntry, BallotCollection, MultipleBallotsGreedyError
 from collections import defaultdict
 from copy import copy, deepcopy
 from numpy import array
@@ -13,6 +12,7 @@ from abc import abstractmethod
 class GreedySublistChoiceMechanism(ChoiceMechanism):
 
     _PROPERTY_NAMES = ['recommender_weight']
+    _PROPERTY_TYPES = {'recommender_weight': float}
 
     def __init__(self):
         super().__init__()
@@ -27,13 +27,15 @@ class GreedySublistChoiceMechanism(ChoiceMechanism):
 
     def compute_choice(self, agents: AgentCollection, bcoll: BallotCollection, recommendations: ResultList,
                        list_size):
-        rec_weight = float(self.get_property('recommender_weight'))
-        bcoll.set_ballot('__rec', deepcopy(recommendations), rec_weight)
+        bcoll.set_ballot('__rec', recommendations.view(), self.recommender_weight)
 
-        ballots = deepcopy(bcoll)
+        # The sublist scorers may change the ballots, but copy on write keeps those changes out of bcoll,
+        # which goes into the history.
+        ballots = bcoll.view()
 
         output = ResultList()
-        candidates = copy(recommendations)
+        # The scorers also change candidate scores in place, so the candidates get their own entries
+        candidates = deepcopy(recommendations)
         score = list_size
         while len(output.get_results()) < list_size or candidates.get_length() == 0:
             # If output has nothing, you can't score, just add top current candidate
@@ -41,13 +43,13 @@ class GreedySublistChoiceMechanism(ChoiceMechanism):
                 # score recommendation list
                 candidates = self.sublist_scorer(output, candidates, ballots)
             # remove top item and add to output
-            top_item = candidates.get_results()[0]
+            top_item = candidates.get_top()
             candidates.remove_top()
             # Note that we can't use the score that comes out of the sublist_score because that is
             # relative to each iteration, so we just use ordinals here.
-            top_item.score = score
+            score_entry = ResultEntry(user=top_item.user, item=top_item.item, score=score, rank=top_item.rank)
             score -= 1
-            output.add_result_entry(top_item, sort=False)
+            output.add_result_entry(score_entry, sort=False)
 
         return bcoll, output
 
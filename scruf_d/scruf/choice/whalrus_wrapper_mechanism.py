@@ -1,7 +1,6 @@
 import whalrus
 import importlib
 from abc import abstractmethod
-from icecream import ic
 from .choice_mechanism import ChoiceMechanism, ChoiceMechanismFactory
 from scruf.agent import AgentCollection
 from scruf.util import ResultList, BallotCollection, MismatchedWhalrusRuleError, UnknownWhalrusTiebreakError
@@ -10,6 +9,7 @@ from scruf.util import ResultList, BallotCollection, MismatchedWhalrusRuleError,
 class WhalrusWrapperMechanism (ChoiceMechanism):
     _PROPERTY_NAMES = ['whalrus_rule', 'recommender_weight', 'tie_breaker',
                        'ignore_weights']
+    _PROPERTY_TYPES = {'recommender_weight': float, 'ignore_weights': bool}
 
     _LEGAL_MECHANISMS = []
     _LEGAL_TIEBREAKERS = []
@@ -29,7 +29,6 @@ class WhalrusWrapperMechanism (ChoiceMechanism):
         super().setup(input_props, names=self.configure_names(WhalrusWrapperMechanism._PROPERTY_NAMES, names))
         self.whalrus_class = self.get_whalrus_mechanism()
         self.tiebreak_class = self.get_tie_breaker()
-        self.ignore_weights = self.get_property('ignore_weights')
         self.converter = whalrus.ConverterBallotGeneral()
 
     def get_whalrus_mechanism(self):
@@ -66,15 +65,12 @@ class WhalrusWrapperMechanism (ChoiceMechanism):
         pass
 
     def compute_choice(self, agents: AgentCollection, bcoll: BallotCollection, recommended_items: ResultList, list_size):
-       if self.ignore_weights == "false":
-            self.ignore_weights = False
        if self.ignore_weights:
             bcoll.set_ballot('__rec', recommended_items, 1.0) # weight doesn't matter
             wballots, weights = self.wrap_ballots(bcoll)
             self.invoke_whalrus_rule(wballots, weights=None)
        else:
-            rec_weight = float(self.get_property('recommender_weight'))
-            bcoll.set_ballot('__rec', recommended_items, rec_weight)
+            bcoll.set_ballot('__rec', recommended_items, self.recommender_weight)
             wballots, weights = self.wrap_ballots(bcoll)
             self.invoke_whalrus_rule(wballots, weights=weights)
             user = recommended_items.get_user()
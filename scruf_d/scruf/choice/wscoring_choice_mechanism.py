@@ -1,4 +1,3 @@
-from icecream import ic
 from .choice_mechanism import ChoiceMechanism, ChoiceMechanismFactory
 from scruf.agent import AgentCollection
 from scruf.util import ResultList, BallotCollection, ScrufError
@@ -9,6 +8,7 @@ from collections import defaultdict
 class WScoringChoiceMechanism(ChoiceMechanism):
 
     _PROPERTY_NAMES = ['recommender_weight']
+    _PROPERTY_TYPES = {'recommender_weight': float}
 
     def __init__(self):
         super().__init__()
@@ -22,8 +22,9 @@ class WScoringChoiceMechanism(ChoiceMechanism):
 
     # This function computes its ballot output by combining the weighted scores of items. If there is no score
     # for an item for one agent, then a default score is applied. If there is no score table, then all
-    # ballots must contain the same set of items. default score not implemented yet.
-    def weighted_combine(self, user, bcoll, default_score_table: None):
+    # ballots must contain the same set of items. default score not implemented yet. If k is given, only the
+    # top k items are returned.
+    def weighted_combine(self, user, bcoll, default_score_table: None, k=None):
         if len(bcoll.get_ballots()) == 0:
             return ResultList()
 
@@ -36,14 +37,13 @@ class WScoringChoiceMechanism(ChoiceMechanism):
             if len(item_set.symmetric_difference(ballot_items)) != 0:
                 raise ScrufError('Ballots must contain identical items if no default score table provided.')
 
-        return bcoll.merge(user)
+        return bcoll.merge(user, k=k)
 
     def compute_choice(self, agents: AgentCollection, bcoll: BallotCollection, recommended_items: ResultList, list_size):
-        rec_weight = float(self.get_property('recommender_weight'))
-        bcoll.set_ballot('__rec', recommended_items, rec_weight)
+        bcoll.set_ballot('__rec', recommended_items, self.recommender_weight)
         user = recommended_items.get_user()
-        output = self.weighted_combine(user, bcoll, default_score_table=None)
-        output.trim(list_size)
+        # Only the top list_size items are sorted and ranked
+        output = self.weighted_combine(user, bcoll, default_score_table=None, k=list_size)
         return bcoll, output
 
 
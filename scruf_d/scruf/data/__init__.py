@@ -1,5 +1,6 @@
 # This is the location for the classes for loading and storing item features,
 # generated recommendations and training data.
 from .item_feature_data import ItemFeatureData
-from .user_arrival_data import UserArrivalData, BulkLoadedUserData
-from .context import ContextFactory, Context, NullContext, CSVContext, LoadPopularityData
\ No newline at end of file
+from .user_arrival_data import UserArrivalData, BulkLoadedUserData, OnlineUserData
+from .context import ContextFactory, Context, NullContext, CSVContext, RequestContext, LoadPopularityData
+from .data_loader import DataLoader
@@ -2,8 +2,8 @@
 # opportunity (i.e. a user).
 from abc import ABC, abstractmethod
 from collections import defaultdict
-from scruf.util import PropertyMixin, InvalidContextClassError, UnregisteredContextClassError, get_path_from_keys
-import csv
+from scruf.util import PropertyMixin, InvalidContextClassError, UnregisteredContextClassError, get_path_from_keys, \
+    is_valid_keys, CSVRowCache
 
 
 class Context(PropertyMixin,ABC):
@@ -41,17 +41,41 @@ class CSVContext(Context):
         comp_file = get_path_from_keys(['context', 'properties', 'compatibility_file'], config,
                                        check_exists=True)
 
-        with open(comp_file, "r") as f:
-            reader = csv.DictReader(f, fieldnames=['user_id', 'agent', 'compatibility'])
-            for row in reader:
-                user_id = row['user_id']
-                agent = row['agent']
-                compatibility = float(row['compatibility'])
-                self.compatibility_dict[user_id][agent] = compatibility
+        for row in CSVRowCache.read_rows(comp_file):
+            if len(row) == 0:
+                continue
+            user_id, agent, compatibility = row[0:3]
+            self.compatibility_dict[user_id][agent] = float(compatibility)
     
     def get_context(self, user_id):
         return self.compatibility_dict[user_id]
 
+    # Sets (or replaces) the compatibilities of a user, e.g. from a live request
+    def set_context(self, user_id, compatibilities):
+        self.compatibility_dict[user_id] = {agent: float(value) for agent, value in compatibilities.items()}
+
+class RequestContext(Context):
+    """
+    Compatibilities that come with each user's request (embedded re-ranking or the re-ranking service)
+    rather than from a file. Only those of the current user are kept.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.current_user = None
+        self.current_context = {}
+
+    def setup(self, config, names=None):
+        pass
+
+    def get_context(self, user_id):
+        return self.current_context if user_id == self.current_user else {}
+
+    def set_context(self, user_id, compatibilities):
+        self.current_user = user_id
+        self.current_context = {agent: float(value) for agent, value in compatibilities.items()}
+
+
 class LoadPopularityData(Context):
     _PROPERTY_NAMES = ["compatibility_file", "popularity_data"]
     def __init__(self):
@@ -59,17 +83,19 @@ class LoadPopularityData(Context):
         self.data_file = None
         self.popularity_dict = {}
 
+    # The popularity file is optional: without it, the counts start empty
     def setup(self, config, names=None):
+        if not is_valid_keys(['context', 'properties', 'popularity_data'], config):
+            return
         self.data_file = get_path_from_keys(['context', 'properties', 'popularity_data'], config, check_exists=True)
         self._load_data()
 
     def _load_data(self):
-        with open(self.data_file, "r") as f:
-            reader = csv.DictReader(f, fieldnames=['item_id', 'popularity'])
-            for row in reader:
-                item_id = row['item_id']
-                popularity = float(row['popularity'])
-                self.popularity_dict[item_id] = popularity
+        for row in CSVRowCache.read_rows(self.data_file):
+            if len(row) == 0:
+                continue
+            item_id, popularity = row[0:2]
+            self.popularity_dict[item_id] = float(popularity)
 
     def get_popularity(self, item_id):
         return self.popularity_dict.get(item_id, 0.0)
@@ -107,6 +133,7 @@ class ContextFactory:
 
 
 # Register the context classes created above
-context_specs = [("null_context", NullContext), ("csv_context", CSVContext), ("popularity", LoadPopularityData)]
+context_specs = [("null_context", NullContext), ("csv_context", CSVContext), ("request_context", RequestContext),
+                 ("popularity", LoadPopularityData)]
 
 ContextFactory.register_context_classes(context_specs)
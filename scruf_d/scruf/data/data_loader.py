@@ -0,0 +1,88 @@
+import time
+import tracemalloc
+from scruf.util import UnknownDataSourceError
+
+# Components (fairness and compatibility metrics, preference functions, mechanisms, evaluators and
+# post-processors) list the input data they read in DATA_SOURCES, as for WINDOW_STATS. Scruf.setup_data
+# collects these into a map from data source to the components that need it, and only the sources in
+# that map are loaded. The user arrivals (recs) are always needed by a simulation.
+
+
+class DataLoader:
+    """
+    Loads each data source at most once and records the time its setup took. With trace_memory, it also
+    records the peak memory allocated while the setup ran and the memory still allocated after it, as seen
+    by tracemalloc (Python allocations, including NumPy arrays). Tracing makes loading about three times
+    slower, so it is off by default.
+    """
+
+    RECS = 'recs'
+    ITEM_FEATURES = 'item_features'
+    CONTEXT = 'context'
+    POPULARITY = 'popularity'
+
+    # In loading order
+    SOURCES = [RECS, ITEM_FEATURES, CONTEXT, POPULARITY]
+    REPORT_SUFFIX = '_data.json'
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        # source -> seconds, peak_mb and retained_mb of its setup
+        self.loaded = {}
+        # source -> components that need it
+        self.dependencies = {}
+
+    @staticmethod
+    def check_sources(sources, component=None):
+        for source in sources:
+            if source not in DataLoader.SOURCES:
+                raise UnknownDataSourceError(source, component)
+
+    # Adds the data sources of the components, given as (description, component) pairs
+    def add_dependencies(self, components):
+        for description, component in components:
+            sources = getattr(component, 'DATA_SOURCES', [])
+            DataLoader.check_sources(sources, description)
+            for source in sources:
+                needed_by = self.dependencies.setdefault(source, [])
+                if description not in needed_by:
+                    needed_by.append(description)
+        return self.dependencies
+
+    def is_loaded(self, source):
+        return source in self.loaded
+
+    # Calls setup_fn, unless the source has already been loaded. Returns True if it was called.
+    def load(self, source, setup_fn):
+        DataLoader.check_sources([source])
+        if source in self.loaded:
+            return False
+        tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            base, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            setup_fn()
+        finally:
+            seconds = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory() if self.trace_memory else (0, 0)
+            if tracing:
+                tracemalloc.stop()
+        entry = {'seconds': seconds}
+        if self.trace_memory:
+            entry['peak_mb'] = (peak - base) / 2 ** 20
+            entry['retained_mb'] = (current - base) / 2 ** 20
+        self.loaded[source] = entry
+        return True
+
+    # source -> whether it was loaded, its cost and the components that need it
+    def report(self):
+        report = {}
+        for source in DataLoader.SOURCES:
+            entry = {'loaded': source in self.loaded, 'needed_by': self.dependencies.get(source, [])}
+            entry.update(self.loaded.get(source, {}))
+            report[source] = entry
+        return report
@@ -1,10 +1,14 @@
-from scruf.util import is_valid_keys, get_path_from_keys, ConfigKeys, ensure_list, maybe_number, FeatureFileFormatError
-import csv
+from scruf.util import is_valid_keys, get_path_from_keys, ConfigKeys, ensure_list, maybe_number, FeatureFileFormatError, \
+    CSVRowCache
 from collections import defaultdict
-from icecream import ic
+import numpy as np
 
 # Reads in item, feature, value triples.
 # Allows lookup: what features does this item have? what items have this feature? etc.
+# The values are stored in a dense items x features matrix (None where an item has no value for a feature)
+# and each named protected feature has a boolean mask over the items, so protection can be checked for a
+# whole list at once with is_protected_many. The dictionary indices from the earlier implementation are
+# still available but are built on first use.
 # TODO: Broke item feature data. protected_feature should be binary
 # Communicate with Amanda and Cassidy about this.
 
@@ -13,17 +17,30 @@ class ItemFeatureData:
     def __init__(self):
         self.known_features: dict = None
         self.feature_file = None
-        # feature id -> dict mapping value -> set of items
-        self.feature_value_index: dict = None
-        # item id -> dict mapping feature -> value
-        self.item_feature_index: dict = None
-        # feature id -> set of items with protected values for it
-        self.protected_item_index: dict = None
-
-    def setup(self, config):
-        self.feature_file = get_path_from_keys(ConfigKeys.FEATURE_FILENAME_KEYS, check_exists=True, config=config)
-
-        self.load_item_features()
+        # item id -> row of the value matrix
+        self.item_index: dict = {}
+        self.item_ids: list = []
+        # feature id -> column of the value matrix
+        self.feature_index: dict = {}
+        self.feature_ids: list = []
+        # items x features, dtype object because values may be strings or numbers
+        self.values: np.ndarray = np.empty((0, 0), dtype=object)
+        # feature name -> boolean array with one entry per item plus a final False entry, which is
+        # what unknown items (position -1) pick up.
+        self.protected_masks: dict = {}
+        self._item_feature_index = None
+        self._assigned_index = None
+        self._feature_value_index = None
+        self._protected_item_index = None
+
+    # triples: (item id, feature name, value) triples to use instead of the feature file, e.g. for
+    # embedded use without file access
+    def setup(self, config, triples=None):
+        if triples is None:
+            self.feature_file = get_path_from_keys(ConfigKeys.FEATURE_FILENAME_KEYS, check_exists=True, config=config)
+            self.load_item_features()
+        else:
+            self.load_triples(triples)
 
         self.known_features = {}
         self.setup_features(config['feature'])
@@ -43,44 +60,140 @@ class ItemFeatureData:
 
     # Item features in triple format: item id, feature name, value
     def load_item_features(self):
-        self.item_feature_index = defaultdict(dict)
-        with open(self.feature_file, 'r') as csvfile:
-            reader = csv.DictReader(csvfile, fieldnames=['item', 'feature', 'value'],
-                                    skipinitialspace=True)
-            for row in reader:
-                if None in row and len(row[None]) > 0:
-                    raise FeatureFileFormatError(csvfile, row)
-                feature_value = maybe_number(row['value'])
-                self.item_feature_index[row['item']][row['feature']] = feature_value
-
+        item_index = {}
+        feature_index = {}
+        triples = []
+        for row in CSVRowCache.read_rows(self.feature_file, skipinitialspace=True):
+            if len(row) == 0:
+                continue
+            if len(row) > 3 and any(len(extra) > 0 for extra in row[3:]):
+                raise FeatureFileFormatError(self.feature_file, row)
+            item, feature, value = (row + [None, None])[0:3]
+            item_pos = item_index.setdefault(item, len(item_index))
+            feature_pos = feature_index.setdefault(feature, len(feature_index))
+            triples.append((item_pos, feature_pos, maybe_number(value)))
+        self._set_values(item_index, feature_index, triples)
+
+    # Item features from (item id, feature name, value) triples in memory. Values are used as given.
+    def load_triples(self, triples):
+        item_index = {}
+        feature_index = {}
+        positions = []
+        for item, feature, value in triples:
+            item_pos = item_index.setdefault(item, len(item_index))
+            feature_pos = feature_index.setdefault(feature, len(feature_index))
+            positions.append((item_pos, feature_pos, value))
+        self._set_values(item_index, feature_index, positions)
+
+    def _set_values(self, item_index, feature_index, triples):
+        self.item_index = item_index
+        self.item_ids = list(item_index.keys())
+        self.feature_index = feature_index
+        self.feature_ids = list(feature_index.keys())
+        self.values = np.full((len(item_index), len(feature_index)), None, dtype=object)
+        for item_pos, feature_pos, value in triples:
+            self.values[item_pos, feature_pos] = value
+        self._item_feature_index = None
+
+    # Builds the protected masks from the value matrix. If item_feature_index has been assigned directly,
+    # the matrix is rebuilt from it first.
     def setup_indices(self):
-        # Map from features and their values to the items that have those values
-        self.feature_value_index = defaultdict(lambda: defaultdict(set))
-        for item_id, item_dict in self.item_feature_index.items():
-            for feature, value in item_dict.items():
-                self.feature_value_index[feature][value].add(item_id)
+        if self._assigned_index is not None:
+            self._index_to_values(self._assigned_index)
+            self._assigned_index = None
+        self._feature_value_index = None
+        self._protected_item_index = None
 
-        self.protected_item_index = {}
+        self.protected_masks = {}
         for feature_name, entry in self.known_features.items():
             feature_id, vals = entry
             if vals is not None:
-                protected_items = set()
+                mask = np.zeros(len(self.item_ids) + 1, dtype=bool)
+                column = self.feature_index.get(feature_id)
+                if column is not None:
+                    feature_values = self.values[:, column]
+                    for val in ensure_list(vals):
+                        mask[:-1] |= np.array([value is not None and value == val for value in feature_values],
+                                              dtype=bool)
+                self.protected_masks[feature_name] = mask
+
+    def _index_to_values(self, item_feature_index):
+        item_index = {}
+        feature_index = {}
+        triples = []
+        for item, item_dict in item_feature_index.items():
+            item_pos = item_index.setdefault(item, len(item_index))
+            for feature, value in item_dict.items():
+                feature_pos = feature_index.setdefault(feature, len(feature_index))
+                triples.append((item_pos, feature_pos, value))
+        self._set_values(item_index, feature_index, triples)
 
-                feature_dict = self.feature_value_index[feature_id]
-                for val in ensure_list(vals):
-                    items = feature_dict[val]
-                    protected_items.update(items)
+    # Row positions for a sequence of items, -1 for items that are not in the feature data
+    def item_positions(self, items):
+        index = self.item_index
+        return np.fromiter((index.get(item, -1) for item in items), dtype=np.int64, count=len(items))
 
-                self.protected_item_index[feature_name] = protected_items
+    def get_num_items(self):
+        return len(self.item_ids)
 
     def is_protected(self, feature_name, item):
-        return item in self.protected_item_index[feature_name]
+        pos = self.item_index.get(item, -1)
+        return bool(self.protected_masks[feature_name][pos])
+
+    # Boolean array: is each of the items protected with respect to the feature
+    def is_protected_many(self, feature_name, items):
+        if not isinstance(items, (list, tuple)):
+            items = list(items)
+        return self.protected_masks[feature_name][self.item_positions(items)]
 
     def get_sensitive_features(self):
-        return list(self.protected_item_index.keys())
+        return list(self.protected_masks.keys())
 
     def get_item_features(self, item):
-        return self.item_feature_index[item]
+        return self.item_feature_index.get(item, {})
+
+    def _row_features(self, pos):
+        row = self.values[pos]
+        return {feature: row[col] for feature, col in self.feature_index.items() if row[col] is not None}
+
+    # Dictionary views kept for compatibility. These are built from the arrays on first use.
+
+    # item id -> dict mapping feature -> value
+    @property
+    def item_feature_index(self):
+        if self._item_feature_index is None:
+            index = defaultdict(dict)
+            for pos, item in enumerate(self.item_ids):
+                index[item] = self._row_features(pos)
+            self._item_feature_index = index
+        return self._item_feature_index
+
+    # Assigning the index directly (as some tests do) takes effect at the next setup_indices()
+    @item_feature_index.setter
+    def item_feature_index(self, index):
+        self._assigned_index = index
+        self._item_feature_index = index
+
+    # feature id -> dict mapping value -> set of items
+    @property
+    def feature_value_index(self):
+        if self._feature_value_index is None:
+            index = defaultdict(lambda: defaultdict(set))
+            for feature, col in self.feature_index.items():
+                for item, value in zip(self.item_ids, self.values[:, col]):
+                    if value is not None:
+                        index[feature][value].add(item)
+            self._feature_value_index = index
+        return self._feature_value_index
+
+    # feature name -> set of items with protected values for it
+    @property
+    def protected_item_index(self):
+        if self._protected_item_index is None:
+            item_ids = np.array(self.item_ids + [None], dtype=object)
+            self._protected_item_index = {feature_name: set(item_ids[mask].tolist())
+                                          for feature_name, mask in self.protected_masks.items()}
+        return self._protected_item_index
 
     # This is needed for OFAIR.
     # we convert the feature vector ϕ® to a smoothed binary vector of dummy variables bi with one dimension
@@ -4,12 +4,10 @@
 # All rows are grouped by userID and there should be the same number of rows for each user.
 # Later on, we might want a streaming method
 from abc import ABC, abstractmethod
-from scruf.util import get_path_from_keys, get_value_from_keys, ConfigKeys, InputListLengthError
-import csv
+from scruf.util import get_path_from_keys, get_value_from_keys, ConfigKeys, InputListLengthError, CSVRowCache
 from scruf.util import ResultList, ResultEntry
 from collections import defaultdict
 import scruf
-from icecream import ic
 
 
 class UserArrivalData(ABC):
@@ -25,6 +23,8 @@ class UserArrivalData(ABC):
 
 class BulkLoadedUserData(UserArrivalData):
 
+    DATA_SOURCES = ['recs']
+
     def __init__(self):
         self.data_file = None
         self.current_user_index = -1
@@ -44,21 +44,19 @@ class BulkLoadedUserData(UserArrivalData):
         self.user_table = defaultdict()
         last_user_id = None
         current_user_collect = []
-        with open(self.data_file, 'r') as csvfile:
-            reader = csv.reader(csvfile, skipinitialspace=True)
-            for row in reader:
-                user_id = row[0]
-                if last_user_id != user_id:  # On to the next user
-                    if last_user_id is not None:  # Not the first user
-                        rlist = ResultList()
-                        rlist.setup(current_user_collect)
-                        self.user_table[last_user_id] = rlist
-                        self.arrival_sequence.append(last_user_id)
-                    # Always reset
-                    current_user_collect = []
-                    last_user_id = user_id
-
-                current_user_collect.append(row)
+        for row in CSVRowCache.read_rows(self.data_file, skipinitialspace=True):
+            user_id = row[0]
+            if last_user_id != user_id:  # On to the next user
+                if last_user_id is not None:  # Not the first user
+                    rlist = ResultList()
+                    rlist.setup(current_user_collect)
+                    self.user_table[last_user_id] = rlist
+                    self.arrival_sequence.append(last_user_id)
+                # Always reset
+                current_user_collect = []
+                last_user_id = user_id
+
+            current_user_collect.append(row)
         # Need to assemble last result list
         rlist = ResultList()
         rlist.setup(current_user_collect)
@@ -99,7 +97,50 @@ class BulkLoadedUserData(UserArrivalData):
             arrived_user = self.get_current_user()
             yield self.user_table[arrived_user]
 
+    # Number of users that user_iterator(iterations) goes through
+    def num_users(self, iterations=-1):
+        if iterations == -1 or iterations > len(self.arrival_sequence):
+            return len(self.arrival_sequence)
+        return iterations
+
+    # The users of one shard in a sharded run: those with index start <= i < stop and i % shards == shard.
+    # current_user_index stays the index in the whole arrival sequence.
+    def shard_iterator(self, shard, shards, start, stop):
+        first = start + (shard - start) % shards
+        for index in range(first, stop, shards):
+            self.current_user_index = index
+            yield self.user_table[self.get_current_user()]
+
     def get_current_user(self):
         return self.arrival_sequence[self.current_user_index]
 
 
+class OnlineUserData(UserArrivalData):
+    """
+    Users that arrive one at a time from outside the simulation (embedded re-ranking or the re-ranking
+    service) rather than from a recommendations file. Each arrival brings its own candidate list. Only
+    the current user is kept; current_user_index counts the arrivals, as the time step of the history.
+    """
+
+    def __init__(self):
+        self.current_user_index = -1
+        self.current_user = None
+
+    def __str__(self):
+        return f"OnlineUserData: currentUser = {self.current_user}"
+
+    def setup(self, config):
+        pass
+
+    # Users are not iterated: they arrive through add_user
+    def user_iterator(self, iterations=-1, restart=True):
+        return iter(())
+
+    # user_info: the recommender's candidate list for the user
+    def add_user(self, user_id, user_info: ResultList):
+        self.current_user_index += 1
+        self.current_user = user_id
+        return user_info
+
+    def get_current_user(self):
+        return self.current_user
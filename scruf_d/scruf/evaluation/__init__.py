@@ -0,0 +1,4 @@
+from .evaluator import Evaluator, EvaluatorCollection, EvaluatorFactory
+from .accuracy_evaluator import NDCGEvaluator, RBOEvaluator
+from .exposure_evaluator import CoverageEvaluator, ExposureEvaluator, ExposureSketchEvaluator, \
+    ProportionalFairnessEvaluator
\ No newline at end of file
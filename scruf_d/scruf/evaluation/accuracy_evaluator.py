@@ -0,0 +1,117 @@
+from array import array
+import numpy as np
+from .evaluator import Evaluator, EvaluatorFactory
+from scruf.util import ResultList, ensure_boolean
+
+
+# Note: Like the NDCGPostProcessor, this is not really NDCG because there is no separate test data.
+# The recommender scores of the input list are used as the relevance values.
+class NDCGEvaluator(Evaluator):
+    _PROPERTY_NAMES = ['binary', 'threshold']
+
+    def __init__(self):
+        super().__init__()
+        self.binary = False
+        self.threshold = -np.inf
+        self.scores = array('d')
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=self.configure_names(NDCGEvaluator._PROPERTY_NAMES, names))
+        self.binary = ensure_boolean(self.get_property('binary')) is True
+        threshold = self.get_property('threshold')
+        if isinstance(threshold, str) and threshold.casefold() == 'none':
+            self.threshold = -np.inf
+        else:
+            self.threshold = float(threshold)
+        self.scores = array('d')
+
+    def relevance(self, score):
+        if score <= self.threshold:
+            return 0.0
+        if self.binary:
+            return 1.0
+        return 2.0 ** score - 1
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        length = output.get_length()
+        rec_scores = {entry.item: entry.score for entry in rec_list.get_results()}
+        discount = 1.0 / np.log2(np.arange(length) + 2)
+        gains = np.array([self.relevance(rec_scores.get(entry.item, -np.inf)) for entry in output.get_results()])
+        ideal_scores = sorted(rec_scores.values(), reverse=True)[0:length]
+        ideal = np.array([self.relevance(score) for score in ideal_scores])
+        idcg = float(np.dot(ideal, discount[0:len(ideal)]))
+        if idcg == 0:
+            self.scores.append(0.0)
+        else:
+            self.scores.append(float(np.dot(gains, discount)) / idcg)
+
+    def summary(self):
+        if len(self.scores) == 0:
+            return {'mean': float('nan')}
+        return {'mean': float(np.mean(self.scores))}
+
+    def per_user(self):
+        return {'value': self.scores}
+
+
+# Rank-biased overlap between the top of the recommender input and the output list.
+# With p = 1.0, this is the average overlap (the same convention as the rbo package).
+class RBOEvaluator(Evaluator):
+    _PROPERTY_NAMES = ['p']
+
+    def __init__(self):
+        super().__init__()
+        self.p = 1.0
+        self.scores = array('d')
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=self.configure_names(RBOEvaluator._PROPERTY_NAMES, names))
+        self.p = float(self.get_property('p'))
+        self.scores = array('d')
+
+    @staticmethod
+    def rbo(list1, list2, p=1.0):
+        depth = min(len(list1), len(list2))
+        if depth == 0:
+            return 0.0
+        seen1 = set()
+        seen2 = set()
+        overlap = 0
+        total = 0.0
+        weight_sum = 0.0
+        for d in range(depth):
+            item1 = list1[d]
+            item2 = list2[d]
+            if item1 == item2:
+                overlap += 1
+            else:
+                overlap += (item1 in seen2) + (item2 in seen1)
+            seen1.add(item1)
+            seen2.add(item2)
+            weight = 1.0 if p == 1.0 else (1 - p) * p ** d
+            total += weight * overlap / (d + 1)
+            weight_sum += weight
+        if p == 1.0:
+            return total / weight_sum
+        return total
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        length = output.get_length()
+        original = [entry.item for entry in rec_list.get_results()[0:length]]
+        reranked = [entry.item for entry in output.get_results()]
+        self.scores.append(RBOEvaluator.rbo(original, reranked, self.p))
+
+    def summary(self):
+        if len(self.scores) == 0:
+            return {'mean': float('nan')}
+        return {'mean': float(np.mean(self.scores))}
+
+    def per_user(self):
+        return {'value': self.scores}
+
+
+# Register the evaluators created above
+evaluator_specs = [("ndcg", NDCGEvaluator),
+                   ("rbo", RBOEvaluator)]
+
+EvaluatorFactory.register_evaluators(evaluator_specs)
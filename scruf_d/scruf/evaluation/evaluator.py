@@ -0,0 +1,181 @@
+from abc import ABC, abstractmethod
+import csv
+import json
+from pathlib import Path
+from scruf.util import PropertyMixin, InvalidEvaluatorError, UnregisteredEvaluatorError, get_value_from_keys, \
+    get_path_from_keys, is_valid_keys, ConfigKeys, ResultList
+
+
+class Evaluator(PropertyMixin, ABC):
+    """
+    An Evaluator consumes the recommender input and the final output for each user as the simulation
+    runs and keeps streaming accumulators (sums, counts, per-item and per-user arrays) so that aggregate
+    metrics are available at the end of the experiment without re-reading the history file. All
+    evaluators are initialized with a dictionary of property name, value pairs. Each subclass has to
+    specify the property names that it expects. An evaluator that reads input data lists the data sources
+    in DATA_SOURCES.
+    """
+
+    DATA_SOURCES = []
+
+    def __init__(self):
+        super().__init__()
+        self.name = None
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=names)
+
+    def set_name(self, name):
+        self.name = name
+
+    @abstractmethod
+    def consume(self, rec_list: ResultList, output: ResultList):
+        pass
+
+    # Returns a flat dictionary of metric name -> value
+    @abstractmethod
+    def summary(self):
+        pass
+
+    # Returns a dictionary of metric name -> per-user array. Most evaluators only keep aggregates.
+    def per_user(self):
+        return {}
+
+
+class EvaluatorCollection:
+    """
+    The EvaluatorCollection holds the evaluators configured in the [evaluation] section and feeds each
+    of them the (__rec ballot, output list) pair produced for every user. If no evaluators are configured,
+    the collection is empty and the stage is skipped.
+    """
+
+    SUMMARY_FILENAME_KEYS = ['output', 'evaluation_filename']
+
+    def __init__(self):
+        self.evaluators = []
+        self.summary_path: Path = None
+        self.per_user_output = False
+
+    def is_empty(self):
+        return len(self.evaluators) == 0
+
+    @staticmethod
+    def get_summary_path(config):
+        if is_valid_keys(EvaluatorCollection.SUMMARY_FILENAME_KEYS, config):
+            return get_path_from_keys(EvaluatorCollection.SUMMARY_FILENAME_KEYS, config)
+        # Without any output file, the evaluations are only kept in memory (see summary())
+        if not is_valid_keys(ConfigKeys.OUTPUT_PATH_KEYS, config):
+            return None
+        # Default is next to the history file
+        history_path = get_path_from_keys(ConfigKeys.OUTPUT_PATH_KEYS, config)
+        return history_path.with_name(history_path.stem + '_metrics')
+
+    # Files that cleanup() writes for this configuration, keyed by role. Empty if there is no evaluation.
+    @staticmethod
+    def artifact_paths(config):
+        if len(get_value_from_keys(['evaluation'], config, default={})) == 0:
+            return {}
+        summary_path = EvaluatorCollection.get_summary_path(config)
+        paths = {'metrics_json': summary_path.with_suffix('.json'),
+                 'metrics_csv': summary_path.with_suffix('.csv')}
+        if get_value_from_keys(['output', 'evaluation_per_user'], config, default=False):
+            paths['metrics_users'] = summary_path.with_name(summary_path.stem + '_users.csv')
+        return paths
+
+    # The configured evaluators as (description, evaluator) pairs, created but not set up
+    @staticmethod
+    def configured_components(config):
+        for eval_key, eval_spec in get_value_from_keys(['evaluation'], config, default={}).items():
+            evaluator = EvaluatorFactory.create_evaluator(eval_spec['evaluator_class'])
+            yield f'evaluator {eval_spec.get("name", eval_key)}', evaluator
+
+    # Note: Overwrites the evaluator list
+    def setup(self, config):
+        self.evaluators = []
+        eval_config = get_value_from_keys(['evaluation'], config, default={})
+        if len(eval_config) == 0:
+            return
+
+        for eval_key, eval_spec in eval_config.items():
+            evaluator = EvaluatorFactory.create_evaluator(eval_spec['evaluator_class'])
+            evaluator.set_name(eval_spec.get('name', eval_key))
+            evaluator.setup(eval_spec.get('properties', dict()))
+            self.evaluators.append(evaluator)
+
+        self.summary_path = EvaluatorCollection.get_summary_path(config)
+        self.per_user_output = get_value_from_keys(['output', 'evaluation_per_user'], config, default=False)
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        for evaluator in self.evaluators:
+            evaluator.consume(rec_list, output)
+
+    def summary(self):
+        summary = {}
+        for evaluator in self.evaluators:
+            for metric, value in evaluator.summary().items():
+                summary[f'{evaluator.name}_{metric}'] = value
+        return summary
+
+    def per_user(self):
+        columns = {}
+        for evaluator in self.evaluators:
+            for metric, values in evaluator.per_user().items():
+                columns[f'{evaluator.name}_{metric}'] = values
+        return columns
+
+    # Writes the summary as both JSON and a one-row CSV next to each other.
+    def cleanup(self):
+        if self.is_empty() or self.summary_path is None:
+            return
+        summary = self.summary()
+        json_path = self.summary_path.with_suffix('.json')
+        with open(json_path, 'w') as json_file:
+            json.dump(summary, json_file, indent=4)
+
+        csv_path = self.summary_path.with_suffix('.csv')
+        with open(csv_path, 'w', newline='') as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=list(summary.keys()))
+            writer.writeheader()
+            writer.writerow(summary)
+
+        if self.per_user_output:
+            self.write_per_user(self.summary_path.with_name(self.summary_path.stem + '_users.csv'))
+
+    def write_per_user(self, path):
+        columns = self.per_user()
+        if len(columns) == 0:
+            return
+        names = list(columns.keys())
+        with open(path, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(names)
+            for row in zip(*[columns[name] for name in names]):
+                writer.writerow(row)
+
+
+class EvaluatorFactory:
+    """
+    The EvaluatorFactory associates names with class objects so these can be instantiated
+    based on configuration information. An evaluator must registered in the factory before it can be
+    created. Note these are all class methods, so an instance of this object never needs to be created.
+    """
+
+    _evaluators = {}
+
+    @classmethod
+    def register_evaluator(cls, evaluator_type, evaluator_class):
+        if not issubclass(evaluator_class, Evaluator):
+            raise InvalidEvaluatorError(evaluator_class)
+        cls._evaluators[evaluator_type] = evaluator_class
+
+    @classmethod
+    def register_evaluators(cls, evaluator_specs):
+        for evaluator_type, evaluator_class in evaluator_specs:
+            cls.register_evaluator(evaluator_type, evaluator_class)
+
+    @classmethod
+    def create_evaluator(cls, evaluator_type):
+        evaluator_class = cls._evaluators.get(evaluator_type)
+        if evaluator_class is None:
+            raise UnregisteredEvaluatorError(evaluator_type)
+        return evaluator_class()
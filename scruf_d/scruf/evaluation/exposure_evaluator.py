@@ -0,0 +1,154 @@
+import numpy as np
+import scruf
+from .evaluator import Evaluator, EvaluatorFactory
+from scruf.util import ResultList, ExposureSketch
+
+
+# Fraction of the catalog that appears in at least one output list.
+class CoverageEvaluator(Evaluator):
+    _PROPERTY_NAMES = ['num_items']
+
+    def __init__(self):
+        super().__init__()
+        self.num_items = None
+        self.items_seen = set()
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=self.configure_names(CoverageEvaluator._PROPERTY_NAMES, names))
+        self.num_items = int(self.get_property('num_items'))
+        self.items_seen = set()
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        self.items_seen.update(output.result_item_iter())
+
+    def summary(self):
+        return {'distinct_items': len(self.items_seen),
+                'coverage': len(self.items_seen) / self.num_items}
+
+
+# Per-item exposure counts and rank-discounted exposure. Items are assigned array positions in
+# the order they are first seen and the arrays grow geometrically.
+class ExposureEvaluator(Evaluator):
+
+    _INITIAL_SIZE = 1024
+
+    def __init__(self):
+        super().__init__()
+        self.item_index = {}
+        self.counts = np.zeros(ExposureEvaluator._INITIAL_SIZE, dtype=np.int64)
+        self.discounted = np.zeros(ExposureEvaluator._INITIAL_SIZE, dtype=np.float64)
+        self.discount = np.zeros(0)
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=names)
+        self.item_index = {}
+        self.counts = np.zeros(ExposureEvaluator._INITIAL_SIZE, dtype=np.int64)
+        self.discounted = np.zeros(ExposureEvaluator._INITIAL_SIZE, dtype=np.float64)
+
+    def get_positions(self, items):
+        positions = np.empty(len(items), dtype=np.int64)
+        for i, item in enumerate(items):
+            pos = self.item_index.get(item)
+            if pos is None:
+                pos = len(self.item_index)
+                self.item_index[item] = pos
+            positions[i] = pos
+        if len(self.item_index) > len(self.counts):
+            new_size = max(len(self.item_index), 2 * len(self.counts))
+            self.counts = np.concatenate([self.counts, np.zeros(new_size - len(self.counts), dtype=np.int64)])
+            self.discounted = np.concatenate([self.discounted,
+                                              np.zeros(new_size - len(self.discounted), dtype=np.float64)])
+        return positions
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        items = list(output.result_item_iter())
+        if len(items) > len(self.discount):
+            self.discount = 1.0 / np.log2(np.arange(len(items)) + 2)
+        positions = self.get_positions(items)
+        # Items appear at most once per list, so plain fancy indexing is safe
+        self.counts[positions] += 1
+        self.discounted[positions] += self.discount[0:len(items)]
+
+    def item_counts(self):
+        return {item: int(self.counts[pos]) for item, pos in self.item_index.items()}
+
+    def summary(self):
+        n_items = len(self.item_index)
+        counts = self.counts[0:n_items]
+        if n_items == 0:
+            return {'items': 0, 'total': 0, 'max': 0, 'mean': float('nan')}
+        return {'items': n_items,
+                'total': int(counts.sum()),
+                'max': int(counts.max()),
+                'mean': float(counts.mean()),
+                'discounted_total': float(self.discounted[0:n_items].sum())}
+
+
+# Approximate version of the exposure statistics for very large catalogs: count-min per-item counts,
+# HyperLogLog coverage and a quantile sketch of the count distribution over a sample of the items (min,
+# median, max, Gini over the whole catalog, including unexposed items). See scruf.util.sketches.
+class ExposureSketchEvaluator(Evaluator):
+    _PROPERTY_NAMES = ['num_items', 'epsilon', 'delta', 'hll_error', 'relative_accuracy', 'sample_rate']
+
+    def __init__(self):
+        super().__init__()
+        self.sketch = None
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props, names=self.configure_names(ExposureSketchEvaluator._PROPERTY_NAMES, names))
+        self.sketch = ExposureSketch(int(self.get_property('num_items')),
+                                     epsilon=float(self.get_property('epsilon')),
+                                     delta=float(self.get_property('delta')),
+                                     hll_error=float(self.get_property('hll_error')),
+                                     alpha=float(self.get_property('relative_accuracy')),
+                                     sample_rate=float(self.get_property('sample_rate')))
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        self.sketch.add_items(output.result_item_iter())
+
+    def summary(self):
+        return self.sketch.summary()
+
+
+# Overall proportion of protected items in the outputs relative to a target, computed over the whole
+# experiment rather than the agent's window.
+class ProportionalFairnessEvaluator(Evaluator):
+    _PROPERTY_NAMES = ['feature', 'proportion']
+    DATA_SOURCES = ['item_features']
+
+    def __init__(self):
+        super().__init__()
+        self.feature = None
+        self.proportion = None
+        self.protected_count = 0
+        self.total_count = 0
+
+    def setup(self, input_props, names=None):
+        super().setup(input_props,
+                      names=self.configure_names(ProportionalFairnessEvaluator._PROPERTY_NAMES, names))
+        self.feature = self.get_property('feature')
+        self.proportion = float(self.get_property('proportion'))
+        self.protected_count = 0
+        self.total_count = 0
+
+    def consume(self, rec_list: ResultList, output: ResultList):
+        item_data = scruf.Scruf.state.item_features
+        protected = item_data.is_protected_many(self.feature, list(output.result_item_iter()))
+        self.protected_count += int(protected.sum())
+        self.total_count += output.get_length()
+
+    def summary(self):
+        if self.total_count == 0:
+            return {'protected_ratio': float('nan'), 'fairness': float('nan')}
+        ratio = self.protected_count / self.total_count
+        return {'protected_ratio': ratio,
+                'fairness': ratio / self.proportion}
+
+
+# Register the evaluators created above
+evaluator_specs = [("coverage", CoverageEvaluator),
+                   ("exposure", ExposureEvaluator),
+                   ("exposure_sketch", ExposureSketchEvaluator),
+                   ("proportional_fairness", ProportionalFairnessEvaluator)]
+
+EvaluatorFactory.register_evaluators(evaluator_specs)
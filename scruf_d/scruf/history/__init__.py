@@ -1,2 +1,4 @@
 from .results_history import ResultsHistory
 from .history import ScrufHistory
+from .item_window import ItemWindow
+from .decayed_window import DecayedWindow
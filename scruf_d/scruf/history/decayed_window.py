@@ -0,0 +1,83 @@
+import copy
+import numpy as np
+from scruf.util import HistoryCollection
+
+# Exponentially decayed alternative to ItemWindow (parameters.window = "decay"). Instead of keeping the
+# lists in the window, it keeps one decayed accumulator per statistic and protected feature. Each new list
+# multiplies the accumulators by 0.5 ** (1 / half_life) and adds its own statistics, so a list counts half
+# as much after half_life more users. An update costs O(list size x protected features) and the memory
+# does not depend on the horizon.
+#
+# compute_stats() returns the same statistics as ItemWindow.compute_stats(), as decayed sums. Counts
+# become weights, so the ratios that the metrics compute from them are decayed averages.
+
+
+class DecayedWindow:
+
+    def __init__(self, source: HistoryCollection, item_features, half_life):
+        self.source = source
+        self.item_features = item_features
+        self.half_life = float(half_life)
+        self.decay = 0.5 ** (1.0 / self.half_life)
+        self.features = list(item_features.protected_masks.keys())
+        self.totals = {'list_count': 0.0, 'item_count': 0.0, 'non_empty_count': 0.0}
+        # One row per feature: protected_count, reciprocal_rank_sum, protected_exposure, unprotected_exposure
+        self.feature_totals = np.zeros((len(self.features), 4))
+        self.synced_time = 0
+
+    def __repr__(self):
+        return f"<DecayedWindow: half life {self.half_life}, weight {self.totals['list_count']:.2f}>"
+
+    def sync(self):
+        new_entries = self.source.time - self.synced_time
+        if new_entries > 0:
+            # The source history only needs to hold the entries added since the last sync
+            recent = self.source.get_recent(min(new_entries, len(self.source.collection)))
+            for result in reversed(recent):
+                self.add_list(result)
+        self.synced_time = self.source.time
+
+    # Copy that follows another collection with the same entries (see HistoryCollection.copy)
+    def copy(self, source):
+        window = copy.copy(self)
+        window.source = source
+        window.totals = dict(self.totals)
+        window.feature_totals = self.feature_totals.copy()
+        return window
+
+    def add_list(self, result):
+        items = list(result.result_item_iter())
+        length = len(items)
+        for name in self.totals:
+            self.totals[name] *= self.decay
+        self.feature_totals *= self.decay
+
+        self.totals['list_count'] += 1.0
+        self.totals['item_count'] += length
+        if length == 0:
+            return
+        self.totals['non_empty_count'] += 1.0
+
+        positions = self.item_features.item_positions(items)
+        discount = 1 / np.log2(np.arange(1, length + 1) + 1)
+        for row, feature in enumerate(self.features):
+            protected = self.item_features.protected_masks[feature][positions]
+            protected_positions = np.flatnonzero(protected)
+            protected_exposure = discount[protected].sum()
+            self.feature_totals[row] += [len(protected_positions),
+                                         1.0 / (protected_positions[0] + 1) if len(protected_positions) > 0 else 0.0,
+                                         protected_exposure,
+                                         discount.sum() - protected_exposure]
+
+    def compute_stats(self, requests):
+        stats = {}
+        for feature, stat_names in requests.items():
+            protected_count, reciprocal_rank_sum, protected_exposure, unprotected_exposure = \
+                self.feature_totals[self.features.index(feature)].tolist()
+            all_stats = dict(self.totals)
+            all_stats.update({'protected_count': protected_count,
+                              'reciprocal_rank_sum': reciprocal_rank_sum,
+                              'protected_exposure': protected_exposure,
+                              'unprotected_exposure': unprotected_exposure})
+            stats[feature] = {name: all_stats[name] for name in ['list_count'] + list(stat_names)}
+        return stats
@@ -1,8 +1,6 @@
-import jsons
 import pathlib
 import scruf
 import os
-from pyarrow import csv, parquet
 
 from scruf.util import (
     HistoryCollection,
@@ -10,17 +8,30 @@ from scruf.util import (
     check_key_lists,
     ConfigKeys,
     get_working_dir_path,
+    is_valid_keys,
     ConfigKeyMissingError,
+    InvalidWindowModeError,
+    InvalidSkippedValuesError,
 )
 from .results_history import ResultsHistory
+from .item_window import ItemWindow
+from .decayed_window import DecayedWindow
 
 
 class ScrufHistory:
 
     CONFIG_ELEMENTS = [
+        ConfigKeys.WINDOW_SIZE_KEYS,
+    ]
+
+    # What goes into the allocation history for the scores that a mechanism does not use (see
+    # AllocationMechanism.INPUTS): NaN, or with "lazy", the scores themselves if something reads them
+    SKIPPED_VALUES = ['lazy', 'nan']
+
+    # The history file is optional: without an output file name, the history is only kept in memory
+    SINK_ELEMENTS = [
         ConfigKeys.WORKING_PATH_KEYS,
         ConfigKeys.OUTPUT_PATH_KEYS,
-        ConfigKeys.WINDOW_SIZE_KEYS,
     ]
 
     @classmethod
@@ -28,6 +39,13 @@ class ScrufHistory:
         if not check_key_lists(ScrufHistory.CONFIG_ELEMENTS, config):
             raise ConfigKeyMissingError(ScrufHistory.CONFIG_ELEMENTS)
 
+    # Location of the compressed history file that cleanup() produces
+    @staticmethod
+    def artifact_path(config):
+        working_dir = get_working_dir_path(config)
+        history_file_name = get_value_from_keys(ConfigKeys.OUTPUT_PATH_KEYS, config)
+        return working_dir / (os.path.splitext(history_file_name)[0] + ".parquet")
+
     def __init__(self):
         self.allocation_history: HistoryCollection = None
         self.choice_input_history: HistoryCollection = None
@@ -38,24 +56,61 @@ class ScrufHistory:
         self.working_dir: pathlib.Path = None
         self.history_file_name: str = None
         self._history_file = None
+        self._output_window: ItemWindow = None
+        self.window_mode = 'fixed'
+        self.half_life = None
+        self.skipped_values = 'lazy'
+        self._sync_output_window = False
+        # Set by runs that read the fairness scores of every user (replicates, sharding)
+        self.record_scores = False
 
     def setup(self, config):
         ScrufHistory.check_config(config)
 
-        self.working_dir = get_working_dir_path(config)
-        self.history_file_name = get_value_from_keys(
-            ConfigKeys.OUTPUT_PATH_KEYS, config
-        )
         window_size = get_value_from_keys(ConfigKeys.WINDOW_SIZE_KEYS, config)
-
-        self.allocation_history = HistoryCollection(window_size)
-        self.choice_input_history = HistoryCollection(window_size)
-        self.choice_output_history = HistoryCollection(window_size)
+        self.window_mode = get_value_from_keys(ConfigKeys.WINDOW_MODE_KEYS, config, default='fixed')
+        if self.window_mode == 'decay':
+            self.half_life = get_value_from_keys(ConfigKeys.HALF_LIFE_KEYS, config, default=0)
+            if float(self.half_life) <= 0:
+                raise InvalidWindowModeError(self.window_mode, self.half_life)
+            # The window statistics are decayed accumulators, so the allocation and choice input only
+            # need the current user. The output window is kept at its full size only for metrics and
+            # preference functions that walk it; otherwise the decayed window takes in each list as it
+            # is added (see add_choice_output).
+            self.allocation_history = HistoryCollection(1)
+            self.choice_input_history = HistoryCollection(1)
+            agents = getattr(scruf.Scruf.state, 'agents', None)
+            if agents is None or agents.reads_output_window():
+                self.choice_output_history = HistoryCollection(window_size)
+                self._sync_output_window = False
+            else:
+                self.choice_output_history = HistoryCollection(1)
+                self._sync_output_window = agents.uses_window_stats()
+        elif self.window_mode == 'fixed':
+            self.allocation_history = HistoryCollection(window_size)
+            self.choice_input_history = HistoryCollection(window_size)
+            self.choice_output_history = HistoryCollection(window_size)
+            self._sync_output_window = False
+        else:
+            raise InvalidWindowModeError(self.window_mode, self.half_life)
+        self._output_window = None
+        self.skipped_values = get_value_from_keys(ConfigKeys.SKIPPED_VALUES_KEYS, config, default='lazy')
+        if self.skipped_values not in ScrufHistory.SKIPPED_VALUES:
+            raise InvalidSkippedValuesError(self.skipped_values)
 
         # self.recommendation_input_history = ResultsHistory(window_size)
         # self.recommendation_output_history = ResultsHistory(window_size)
 
 
+        if not is_valid_keys(ConfigKeys.OUTPUT_PATH_KEYS, config):
+            self._history_file = None
+            return
+        if not check_key_lists(ScrufHistory.SINK_ELEMENTS, config):
+            raise ConfigKeyMissingError(ScrufHistory.SINK_ELEMENTS)
+        self.working_dir = get_working_dir_path(config)
+        self.history_file_name = get_value_from_keys(
+            ConfigKeys.OUTPUT_PATH_KEYS, config
+        )
         history_path = self.working_dir / self.history_file_name
         if get_value_from_keys(["location", "overwrite"], config) == "true":
             if history_path.exists():
@@ -63,7 +118,65 @@ class ScrufHistory:
 
         self._history_file = open(history_path, "xt")
 
-    def write_current_state(self):
+    # The open history file is not part of a checkpoint: reopen() picks it up again on resume
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_history_file'] = None
+        return state
+
+    # Length of the history file written so far
+    def history_offset(self):
+        self._history_file.flush()
+        return os.fstat(self._history_file.fileno()).st_size
+
+    # Continues the history file of an interrupted run, dropping anything written after the checkpoint
+    def reopen(self, offset):
+        history_path = self.working_dir / self.history_file_name
+        os.truncate(history_path, offset)
+        self._history_file = open(history_path, "at")
+
+    def add_choice_output(self, results):
+        self.choice_output_history.add_item(results)
+        if self._sync_output_window and scruf.Scruf.state.item_features is not None:
+            self.get_output_window()
+
+    # Array-backed copy of the choice output window (or its decayed accumulators, in decay mode),
+    # brought up to date with choice_output_history
+    def get_output_window(self):
+        item_features = scruf.Scruf.state.item_features
+        window = self._output_window
+        if window is None or window.source is not self.choice_output_history \
+                or window.item_features is not item_features:
+            if self.window_mode == 'decay':
+                window = DecayedWindow(self.choice_output_history, item_features, self.half_life)
+            else:
+                window = ItemWindow(self.choice_output_history, item_features)
+            self._output_window = window
+        window.sync()
+        return window
+
+    # For sharded runs (see scruf.runner.sharding): a copy of the output window with its array-backed
+    # window, and setting the output window to such a copy
+    def copy_outputs(self):
+        outputs = self.choice_output_history.copy()
+        return outputs, self.get_output_window().copy(outputs)
+
+    def set_outputs(self, outputs, window):
+        self.choice_output_history = outputs
+        self._output_window = window
+
+    def has_sink(self):
+        return self._history_file is not None
+
+    # Whether the scores that the allocation mechanism does not use should be computed anyway: they are
+    # written to the history file or read by the run. They depend on the output window before the user's
+    # list is added, so they are computed with the allocation, not when the history is written.
+    def needs_skipped_scores(self):
+        return self.skipped_values == 'lazy' and (self.has_sink() or self.record_scores)
+
+    def write_current_state(self, flush=True):
+        if self._history_file is None:
+            return
         current_time = scruf.Scruf.state.user_data.current_user_index
         current_user = scruf.Scruf.state.user_data.get_current_user()
         alloc = self.allocation_history.get_most_recent()
@@ -136,19 +249,33 @@ class ScrufHistory:
             output = [str(item) for item in output]
             self._history_file.write(", ".join(output) + "\n")
 
-        self._history_file.flush()
+        if flush:
+            self._history_file.flush()
+
+    def flush(self):
+        if self._history_file is not None:
+            self._history_file.flush()
 
     def cleanup(self, no_compress=False):
+        if self._history_file is None:
+            return
         if not self._history_file.closed:
             self._history_file.close()
         if no_compress:
             return
-        table = csv.read_csv(str(self.working_dir) + "/" + self.history_file_name)
+        ScrufHistory.compress(self.working_dir, self.history_file_name)
+
+    # Converts a history file to parquet, next to it, and removes it
+    @staticmethod
+    def compress(working_dir, history_file_name):
+        # pyarrow is only needed here, so it is not imported with the package
+        from pyarrow import csv, parquet
+        table = csv.read_csv(str(working_dir) + "/" + history_file_name)
         parquet.write_table(
             table,
-            str(self.working_dir)
+            str(working_dir)
             + "/"
-            + os.path.splitext(self.history_file_name)[0]
+            + os.path.splitext(history_file_name)[0]
             + ".parquet",
         )
-        os.remove(str(self.working_dir) + "/" + self.history_file_name)
+        os.remove(str(working_dir) + "/" + history_file_name)
@@ -0,0 +1,124 @@
+import copy
+import numpy as np
+from scruf.util import HistoryCollection
+
+# Array-backed copy of the choice output window. Each output list is stored once as a row of item
+# positions (rows of the ItemFeatureData matrix), padded with -1, in a ring buffer the size of the
+# history window. Fairness metrics that declare which per-list statistics they need (see
+# FairnessMetric.WINDOW_STATS) are computed from compute_stats(), which gathers the protected mask of
+# each feature over the whole window in one vectorized pass, instead of each metric walking the
+# window separately.
+#
+# The window follows a HistoryCollection rather than being written to directly: sync() copies in
+# whatever entries were added to the collection since the last call, using the collection's time stamps.
+# Assumes that result lists are not changed after they are added to the history.
+
+
+class ItemWindow:
+
+    # The statistics compute_stats() knows about. All of them are for a single protected feature.
+    # list_count: number of lists in the window
+    # item_count: number of items in the window
+    # protected_count: number of protected items in the window
+    # non_empty_count: number of lists with at least one item
+    # reciprocal_rank_sum: sum over non-empty lists of 1/rank of the first protected item (0 if there is none)
+    # protected_exposure, unprotected_exposure: sum over the window of 1/log2(rank + 1)
+    STAT_NAMES = ['list_count', 'item_count', 'protected_count', 'non_empty_count', 'reciprocal_rank_sum',
+                  'protected_exposure', 'unprotected_exposure']
+
+    # Starting capacity if the window size is unbounded. The buffer doubles as needed.
+    INITIAL_CAPACITY = 64
+
+    def __init__(self, source: HistoryCollection, item_features):
+        self.source = source
+        self.item_features = item_features
+        self.bounded = source.window_size is not None
+        capacity = source.window_size if self.bounded else ItemWindow.INITIAL_CAPACITY
+        self.positions = np.full((capacity, 1), -1, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.next_slot = 0
+        self.count = 0
+        self.synced_time = 0
+
+    def __repr__(self):
+        return f"<ItemWindow: {self.count} lists, width {self.positions.shape[1]}>"
+
+    def sync(self):
+        new_entries = self.source.time - self.synced_time
+        if new_entries > 0:
+            # Most recent first. Entries that have already left the source window are skipped.
+            recent = self.source.get_recent(min(new_entries, len(self.source.collection)))
+            for result in reversed(recent):
+                self.add_list(result)
+        self.synced_time = self.source.time
+
+    # Copy that follows another collection with the same entries (see HistoryCollection.copy)
+    def copy(self, source):
+        window = copy.copy(self)
+        window.source = source
+        window.positions = self.positions.copy()
+        window.lengths = self.lengths.copy()
+        return window
+
+    def add_list(self, result):
+        items = list(result.result_item_iter())
+        length = len(items)
+        if length > self.positions.shape[1]:
+            self._widen(length)
+        if not self.bounded and self.count == len(self.lengths):
+            self._grow()
+
+        slot = self.next_slot
+        self.positions[slot, :] = -1
+        self.positions[slot, 0:length] = self.item_features.item_positions(items)
+        self.lengths[slot] = length
+        self.next_slot = (slot + 1) % len(self.lengths)
+        self.count = min(self.count + 1, len(self.lengths))
+
+    def _widen(self, width):
+        padding = np.full((len(self.lengths), width - self.positions.shape[1]), -1, dtype=np.int64)
+        self.positions = np.hstack([self.positions, padding])
+
+    def _grow(self):
+        capacity = 2 * len(self.lengths)
+        positions = np.full((capacity, self.positions.shape[1]), -1, dtype=np.int64)
+        positions[0:self.count] = self.positions
+        lengths = np.zeros(capacity, dtype=np.int64)
+        lengths[0:self.count] = self.lengths
+        self.positions = positions
+        self.lengths = lengths
+        # The buffer was full, so next_slot had wrapped around to the oldest list
+        self.next_slot = self.count
+
+    # requests: feature name -> collection of statistic names. Returns feature name -> {statistic: value}.
+    # Sums are over the window in storage order, which is not the order of the history, so
+    # floating point totals may differ from a list-by-list loop in the last digits.
+    def compute_stats(self, requests):
+        positions = self.positions[0:self.count]
+        lengths = self.lengths[0:self.count]
+        width = positions.shape[1]
+        valid = np.arange(width) < lengths[:, np.newaxis]
+        discount = 1 / np.log2(np.arange(1, width + 1) + 1)
+
+        stats = {}
+        for feature, stat_names in requests.items():
+            # Padding (-1) maps to the last element of the mask, which is always False
+            protected = self.item_features.protected_masks[feature][positions]
+            feature_stats = {'list_count': self.count}
+            for stat_name in stat_names:
+                if stat_name == 'item_count':
+                    feature_stats[stat_name] = int(lengths.sum())
+                elif stat_name == 'protected_count':
+                    feature_stats[stat_name] = int(protected.sum())
+                elif stat_name == 'non_empty_count':
+                    feature_stats[stat_name] = int((lengths > 0).sum())
+                elif stat_name == 'reciprocal_rank_sum':
+                    first = protected.argmax(axis=1)
+                    reciprocal = np.where(protected.any(axis=1), 1.0 / (first + 1), 0.0)
+                    feature_stats[stat_name] = float(reciprocal.sum())
+                elif stat_name == 'protected_exposure':
+                    feature_stats[stat_name] = float((protected * discount).sum())
+                elif stat_name == 'unprotected_exposure':
+                    feature_stats[stat_name] = float(((valid & ~protected) * discount).sum())
+            stats[feature] = feature_stats
+        return stats
@@ -1,2 +1,12 @@
+from scruf.util import lazy_attributes
 from .post_processor import PostProcessor, NullPostProcessor, PostProcessorFactory
-from .default_post_processor import DefaultPostProcessor
\ No newline at end of file
+
+# The default post-processors (and pandas) are imported when they are first used
+PostProcessorFactory.register_lazy_post_processors(
+    [('default', 'scruf.post.default_post_processor', 'DefaultPostProcessor'),
+     ('ndcg', 'scruf.post.default_post_processor', 'NDCGPostProcessor'),
+     ('exposure', 'scruf.post.default_post_processor', 'ExposurePostProcessor')])
+
+__getattr__ = lazy_attributes(__name__, {'DefaultPostProcessor': '.default_post_processor',
+                                         'NDCGPostProcessor': '.default_post_processor',
+                                         'ExposurePostProcessor': '.default_post_processor'})
@@ -3,7 +3,6 @@ from scruf.util import get_path_from_keys
 from .post_processor import PostProcessor, PostProcessorFactory
 import scruf
 from numpy import log2, NINF
-from icecream import ic
 from scruf.agent import FairnessAgent, AgentCollection
 
 
@@ -165,6 +164,8 @@ class NDCGPostProcessor(DefaultPostProcessor):
 # Or we could implement the original default in the same way ? Apply the decorators line-by-line. Whoa!
 
 class ExposurePostProcessor(NDCGPostProcessor):
+    DATA_SOURCES = ['item_features']
+
     def __init__(self):
         super().__init__()
         self.feature_proportions = None
@@ -1,13 +1,15 @@
 from abc import ABC, abstractmethod
 from scruf.util import PropertyMixin
-import jsonlines
 from pathlib import Path
 import scruf
 from scruf.util import get_path_from_keys, get_value_from_keys, ConfigKeys, InvalidPostProcessorError, \
-    UnregisteredPostProcessorError
+    UnregisteredPostProcessorError, resolve_class
 
 class PostProcessor(PropertyMixin,ABC):
 
+    # Input data that the processor reads (see FairnessMetric)
+    DATA_SOURCES = []
+
     def __init__(self):
         super().__init__()
         self.history = None
@@ -17,6 +19,7 @@ class PostProcessor(PropertyMixin,ABC):
 
     @staticmethod
     def read_history(history_file):
+        import jsonlines
         entries = []
         with jsonlines.open(history_file) as reader:
             for obj in reader:
@@ -51,6 +54,8 @@ class PostProcessorFactory:
         A factory class for creating PostProcessor objects.
         """
         _post_processor = {}
+        # Types whose classes are imported when first created: type -> (module name, class name)
+        _lazy_post_processors = {}
 
         @classmethod
         def register_post_processor(cls, mechanism_type, mechanism_class):
@@ -63,9 +68,17 @@ class PostProcessorFactory:
             for mechanism_type, mechanism_class in mechanism_specs:
                 cls.register_post_processor(mechanism_type, mechanism_class)
 
+        @classmethod
+        def register_lazy_post_processors(cls, mechanism_specs):
+            for mechanism_type, module_name, class_name in mechanism_specs:
+                cls._lazy_post_processors[mechanism_type] = (module_name, class_name)
+
         @classmethod
         def create_post_processor(cls, mechanism_type):
             mechanism_class = cls._post_processor.get(mechanism_type)
+            if mechanism_class is None and mechanism_type in cls._lazy_post_processors:
+                mechanism_class = resolve_class(*cls._lazy_post_processors[mechanism_type])
+                cls.register_post_processor(mechanism_type, mechanism_class)
             if mechanism_class is None:
                 raise UnregisteredPostProcessorError(mechanism_type)
             return mechanism_class()
@@ -0,0 +1,20 @@
+from scruf.util import lazy_attributes
+from .result_cache import ResultCache
+from .checkpoint import Checkpoint
+from .config_grid import ConfigGrid, GridAxis, set_config_value
+
+# The runners (with multiprocessing and asyncio) are imported when they are first used
+__getattr__ = lazy_attributes(__name__, {'run_grid': '.grid_runner',
+                                         'run_configs': '.grid_runner',
+                                         'Reranker': '.reranker',
+                                         'RerankService': '.rerank_service',
+                                         'RerankClient': '.rerank_service',
+                                         'ServiceStats': '.rerank_service',
+                                         'ReplicateRunner': '.replicates',
+                                         'ReplicateSummary': '.replicates',
+                                         'ReplicateResult': '.replicates',
+                                         'ShardedRun': '.sharding',
+                                         'ShardedRunReport': '.sharding',
+                                         'WorkQueue': '.work_queue',
+                                         'QueueWorker': '.work_queue',
+                                         'run_local_workers': '.work_queue'})
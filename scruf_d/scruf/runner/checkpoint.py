@@ -0,0 +1,138 @@
+import io
+import os
+import pickle
+import random
+import threading
+import zlib
+from pathlib import Path
+from scruf.util import get_value_from_keys, is_valid_keys, ConfigKeys, get_artifact_path, CheckpointFormatError
+
+# Periodic snapshots of the simulation state, so that a long run can be resumed after a crash or
+# preemption (python -m scruf_d ... --resume) and produce the same output as an uninterrupted run.
+#
+# A checkpoint holds everything that changes as users are processed: the agents (with their metrics
+# and preference functions), the allocation and choice mechanisms (including their random generators),
+# the history windows, the online evaluators, the random number generators, the index of the last user
+# processed and the length of the history file at that point. The popularity data is stored too, since
+# the individual preference functions add the recommended items to its counts. The other input data
+# (user arrivals, item features and context) and the configuration are not stored: they are loaded
+# again on resume and the references to them are stored by name (pickle persistent ids).
+#
+# The file is a magic header followed by the zlib-compressed pickle of the state. The state is pickled
+# in the simulation thread, so that it is a consistent snapshot; compressing and writing happen in a
+# background thread. The file is written to a temporary name and renamed into place, so a crash while
+# writing leaves the previous checkpoint intact.
+
+
+class Checkpoint:
+
+    MAGIC = b'SCRUFCK1'
+    DEFAULT_SUFFIX = '.checkpoint'
+
+    def __init__(self, path, interval):
+        self.path = Path(path)
+        self.interval = int(interval)
+        self._writer: threading.Thread = None
+        self._error = None
+
+    @classmethod
+    def from_config(cls, config):
+        if not is_valid_keys(ConfigKeys.CHECKPOINT_INTERVAL_KEYS, config):
+            return None
+        interval = get_value_from_keys(ConfigKeys.CHECKPOINT_INTERVAL_KEYS, config)
+        return cls(Checkpoint.checkpoint_path(config), interval)
+
+    # Default: next to the history file, with the checkpoint suffix
+    @staticmethod
+    def checkpoint_path(config):
+        return get_artifact_path(ConfigKeys.CHECKPOINT_PATH_KEYS, config, Checkpoint.DEFAULT_SUFFIX)
+
+    def exists(self):
+        return self.path.exists()
+
+    # Data objects that are loaded from the input files rather than stored, by name
+    @staticmethod
+    def shared_objects(state):
+        return {'config': state.config,
+                'user_data': state.user_data,
+                'item_features': state.item_features,
+                'context': state.context}
+
+    # users_done: number of users processed so far (the checkpoint is due every interval users)
+    def is_due(self, users_done):
+        return users_done % self.interval == 0
+
+    def save(self, state):
+        snapshot = {'user_index': state.user_data.current_user_index,
+                    'rand': state.rand.getstate(),
+                    'global_rand': random.getstate(),
+                    'history_offset': state.history.history_offset(),
+                    'agents': state.agents,
+                    'allocation_mechanism': state.allocation_mechanism,
+                    'choice_mechanism': state.choice_mechanism,
+                    'history': state.history,
+                    'evaluators': state.evaluators,
+                    'popularity': state.popularity}
+        shared_ids = {id(obj): name for name, obj in Checkpoint.shared_objects(state).items()}
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        pickler.persistent_id = lambda obj: shared_ids.get(id(obj))
+        pickler.dump(snapshot)
+
+        # One write at a time, in order
+        self.wait()
+        self._writer = threading.Thread(target=self._write, args=(buffer.getvalue(),))
+        self._writer.start()
+
+    def _write(self, data):
+        try:
+            temp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(temp_path, 'wb') as f:
+                f.write(Checkpoint.MAGIC)
+                f.write(zlib.compress(data, 1))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception as error:
+            self._error = error
+
+    # Waits for the checkpoint being written (if any) and raises the error from writing it (if any)
+    def wait(self):
+        if self._writer is not None:
+            self._writer.join()
+            self._writer = None
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+    def load(self, state):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(Checkpoint.MAGIC):
+            raise CheckpointFormatError(self.path)
+        shared = Checkpoint.shared_objects(state)
+        unpickler = pickle.Unpickler(io.BytesIO(zlib.decompress(data[len(Checkpoint.MAGIC):])))
+        unpickler.persistent_load = lambda name: shared[name]
+        return unpickler.load()
+
+    # Puts the state from the checkpoint in place. The data sources must already be set up.
+    def restore(self, state):
+        snapshot = self.load(state)
+        state.agents = snapshot['agents']
+        state.allocation_mechanism = snapshot['allocation_mechanism']
+        state.choice_mechanism = snapshot['choice_mechanism']
+        state.evaluators = snapshot['evaluators']
+        state.popularity = snapshot['popularity']
+        state.history = snapshot['history']
+        state.history.reopen(snapshot['history_offset'])
+        state.rand.setstate(snapshot['rand'])
+        random.setstate(snapshot['global_rand'])
+        state.user_data.current_user_index = snapshot['user_index']
+        return snapshot['user_index']
+
+    # The run is complete, so the checkpoint is no longer needed
+    def finish(self):
+        self.wait()
+        if self.path.exists():
+            self.path.unlink()
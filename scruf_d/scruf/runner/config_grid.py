@@ -0,0 +1,142 @@
+import copy
+import itertools
+import os
+from scruf.util import get_value_from_keys, is_valid_keys, ConfigKeys
+
+# Expands a base configuration over a parameter space in memory. Each axis of the space has a list of
+# values, a function that applies a value to a configuration dict and a function that turns a value
+# into a label. The labels of a grid point are appended to the output file name so that every
+# configuration writes its own history.
+
+
+def set_config_value(config, key_list, value):
+    for key in key_list[:-1]:
+        config = config.setdefault(key, {})
+    config[key_list[-1]] = value
+
+
+class GridAxis:
+
+    def __init__(self, name, values, apply=None, label=None):
+        self.name = name
+        self.values = list(values)
+        # Default: the axis name is a dotted config key, e.g. 'choice.properties.recommender_weight'
+        if apply is None:
+            key_list = name.split('.')
+            apply = lambda config, value: set_config_value(config, key_list, value)
+        self.apply = apply
+        self.label = label if label is not None else str
+
+
+class ConfigGrid:
+    """
+    A ConfigGrid yields one configuration dict per combination of axis values, without writing anything
+    to disk. Configurations that use the same input data can be grouped so that data loading is shared
+    (see run_grid), and ordered by an estimated cost so that the most expensive runs start first.
+    """
+
+    # Rough relative cost of the mechanisms per user, used only to order the runs. Social choice rules
+    # and greedy re-rankers do much more work per user than a weighted sum.
+    MECHANISM_COSTS = {'null_choice': 1.0, 'weighted_scoring': 2.0,
+                       'whalrus_scoring': 8.0, 'whalrus_ordinal': 8.0,
+                       'xquad': 6.0, 'mmr_sum': 10.0, 'mmr_max': 10.0,
+                       'FAR': 6.0, 'PFAR': 6.0, 'OFAIR': 8.0,
+                       'random_allocation': 1.0, 'static_lottery': 1.0,
+                       'least_fair': 1.5, 'most_compatible': 1.5,
+                       'product_allocation': 1.5, 'weighted_product_allocation': 1.5,
+                       'product_lottery': 1.5, 'weighted_product_lottery': 1.5, 'fairness_lottery': 1.5}
+    DEFAULT_COST = 2.0
+
+    # Config keys that name the data files. Configurations that agree on all of them share their data.
+    DATA_KEYS = [ConfigKeys.WORKING_PATH_KEYS,
+                 ConfigKeys.DATA_FILENAME_KEYS,
+                 ConfigKeys.FEATURE_FILENAME_KEYS,
+                 ['context', 'properties', 'compatibility_file'],
+                 ['context', 'properties', 'popularity_data']]
+
+    def __init__(self, base_config, name_fn=None):
+        self.base_config = base_config
+        self.axes = []
+        self.name_fn = name_fn if name_fn is not None else ConfigGrid.default_name
+
+    def add_axis(self, name, values, apply=None, label=None):
+        self.axes.append(GridAxis(name, values, apply=apply, label=label))
+        return self
+
+    def __len__(self):
+        size = 1
+        for axis in self.axes:
+            size *= len(axis.values)
+        return size
+
+    # history.csv + ['FAR', '0.5'] -> history_FAR_0.5.csv
+    @staticmethod
+    def default_name(filename, labels):
+        stem, suffix = os.path.splitext(filename)
+        return '_'.join([stem] + labels) + suffix
+
+    def points(self):
+        for values in itertools.product(*[axis.values for axis in self.axes]):
+            yield dict(zip([axis.name for axis in self.axes], values))
+
+    def labels(self, point):
+        return [axis.label(point[axis.name]) for axis in self.axes]
+
+    def make_config(self, point):
+        config = copy.deepcopy(self.base_config)
+        for axis in self.axes:
+            axis.apply(config, point[axis.name])
+        if is_valid_keys(ConfigKeys.OUTPUT_PATH_KEYS, config):
+            filename = get_value_from_keys(ConfigKeys.OUTPUT_PATH_KEYS, config)
+            set_config_value(config, ConfigKeys.OUTPUT_PATH_KEYS, self.name_fn(filename, self.labels(point)))
+        return config
+
+    def __iter__(self):
+        for point in self.points():
+            yield self.make_config(point)
+
+    @staticmethod
+    def data_key(config):
+        return tuple(str(get_value_from_keys(keys, config, default=''))
+                     for keys in ConfigGrid.DATA_KEYS)
+
+    @staticmethod
+    def estimate_cost(config):
+        choice = get_value_from_keys(['choice', 'choice_class'], config, default='')
+        allocation = get_value_from_keys(['allocation', 'allocation_class'], config, default='')
+        agents = len(get_value_from_keys(['agent'], config, default={}))
+        return (ConfigGrid.MECHANISM_COSTS.get(choice, ConfigGrid.DEFAULT_COST)
+                * ConfigGrid.MECHANISM_COSTS.get(allocation, ConfigGrid.DEFAULT_COST)
+                * max(agents, 1))
+
+    # Returns a list of config lists, one per distinct data set, each ordered most expensive first.
+    # The groups themselves are also ordered by total cost.
+    def groups(self, cost_fn=None):
+        cost_fn = cost_fn if cost_fn is not None else ConfigGrid.estimate_cost
+        grouped = {}
+        for config in self:
+            grouped.setdefault(ConfigGrid.data_key(config), []).append((cost_fn(config), config))
+        groups = [sorted(specs, key=lambda spec: -spec[0]) for specs in grouped.values()]
+        groups.sort(key=lambda specs: -sum(cost for cost, _ in specs))
+        return [[config for _, config in specs] for specs in groups]
+
+    # Splits the grid into one ordered work list per worker. Whole data groups are assigned to the
+    # least loaded worker, most expensive first (longest processing time first). If there are fewer groups
+    # than workers, groups are split so that no worker is idle.
+    def schedule(self, workers=1, cost_fn=None):
+        cost_fn = cost_fn if cost_fn is not None else ConfigGrid.estimate_cost
+        groups = self.groups(cost_fn=cost_fn)
+        while len(groups) < workers and any(len(group) > 1 for group in groups):
+            largest = max(groups, key=len)
+            groups.remove(largest)
+            groups.extend([largest[0::2], largest[1::2]])
+        groups.sort(key=lambda group: -sum(cost_fn(config) for config in group))
+
+        loads = [0.0] * workers
+        work_lists = [[] for _ in range(workers)]
+        for group in groups:
+            worker = loads.index(min(loads))
+            work_lists[worker].extend(group)
+            loads[worker] += sum(cost_fn(config) for config in group)
+        # Each work list keeps its groups contiguous so that data loading can be shared
+        return [work_list for work_list in work_lists if len(work_list) > 0]
@@ -0,0 +1,55 @@
+from multiprocessing import Pool
+import scruf
+from scruf.util import CSVRowCache
+from .config_grid import ConfigGrid
+
+
+# Runs a list of configurations in order in the current process. Consecutive configurations on the
+# same data read the input files only once.
+def run_configs(configs, progress=False, force=False, callback=None):
+    last_key = None
+    finished = []
+    CSVRowCache.enable()
+    try:
+        for config in configs:
+            data_key = ConfigGrid.data_key(config)
+            if data_key != last_key:
+                # New data: release the rows of the previous group
+                CSVRowCache.disable()
+                CSVRowCache.enable()
+                last_key = data_key
+            experiment = scruf.Scruf(config)
+            experiment.run_experiment(progress=progress, force=force)
+            finished.append(config['output']['filename'])
+            if callback is not None:
+                callback(config['output']['filename'])
+    finally:
+        CSVRowCache.disable()
+    return finished
+
+
+def _run_work_list(args):
+    configs, force = args
+    return run_configs(configs, force=force)
+
+
+# Runs all of the configurations in a grid. With more than one worker, each worker process gets
+# a work list from ConfigGrid.schedule(); the simulation state is global, so workers must be processes.
+# Returns the output file names of the finished runs. The callback (if any) is called with each output
+# file name; with several workers, this happens when a worker has finished its whole work list.
+def run_grid(grid: ConfigGrid, workers=1, progress=False, force=False, cost_fn=None, callback=None):
+    work_lists = grid.schedule(workers=workers, cost_fn=cost_fn)
+    if workers == 1 or len(work_lists) <= 1:
+        finished = []
+        for work_list in work_lists:
+            finished.extend(run_configs(work_list, progress=progress, force=force, callback=callback))
+        return finished
+
+    finished = []
+    with Pool(processes=len(work_lists)) as pool:
+        for names in pool.imap_unordered(_run_work_list, [(work_list, force) for work_list in work_lists]):
+            finished.extend(names)
+            if callback is not None:
+                for name in names:
+                    callback(name)
+    return finished
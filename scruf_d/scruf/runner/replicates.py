@@ -0,0 +1,322 @@
+import copy
+import json
+import math
+import queue
+import random
+import warnings
+from multiprocessing import Pool
+from statistics import NormalDist
+import numpy as np
+import scruf
+from scruf.util import CSVRowCache, ConfigKeys, get_value_from_keys, ensure_boolean, get_artifact_path
+from .config_grid import ConfigGrid, set_config_value
+
+# Replicate runs of one configuration over different random seeds, for results that depend on
+# parameters.random_seed (lotteries, perturbed preference functions, random allocation).
+#
+# Replicate i runs with seed first_seed + i. Each run records the fairness of every agent after every
+# user (the fairness trajectory) and its final metrics: the last fairness value of each agent and the
+# summary of the online evaluators, if any. Per-seed history and evaluation files are only written with
+# keep_history=True. The runs are aggregated into means and confidence intervals (Student t) over the
+# seeds, and written out as one JSON file.
+#
+# With more than one worker, the seeds run in worker processes. Each worker keeps the rows of the input
+# files it has parsed (CSVRowCache), so the data is read once per worker rather than once per seed.
+# If a CI width target is set, no more seeds are started once the confidence intervals of the target
+# metrics are all at most that wide (after at least min_seeds seeds). The decision is made on the
+# replicates in seed order, so the seeds used, and the result, do not depend on which worker finishes
+# first.
+
+
+# Two-sided Student t critical values for 1-30 degrees of freedom
+T_TABLE = {0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+                  1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+                  1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+           0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                  2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                  2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+           0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+                  3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+                  2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750]}
+
+
+# Outside the table, the Cornish-Fisher expansion of the t quantile in terms of the normal quantile
+# (Abramowitz & Stegun 26.7.5), which is accurate to about 1e-3 from 5 degrees of freedom.
+def t_critical(df, confidence=0.95):
+    if df < 1:
+        return float('nan')
+    if confidence in T_TABLE and df <= len(T_TABLE[confidence]):
+        return T_TABLE[confidence][df - 1]
+    x = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    g1 = (x ** 3 + x) / 4.0
+    g2 = (5 * x ** 5 + 16 * x ** 3 + 3 * x) / 96.0
+    g3 = (3 * x ** 7 + 19 * x ** 5 + 17 * x ** 3 - 15 * x) / 384.0
+    g4 = (79 * x ** 9 + 776 * x ** 7 + 1482 * x ** 5 - 1920 * x ** 3 - 945 * x) / 92160.0
+    return x + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+# Mean and CI half-width over the first axis (the seeds). NaN values (e.g. the fairness of random
+# allocation) are left out.
+def mean_ci(values, confidence=0.95):
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.sum(~np.isnan(values), axis=0)
+    # Columns with fewer than two values have no CI (NaN)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+        t_values = np.vectorize(lambda count: t_critical(int(count) - 1, confidence), otypes=[np.float64])(counts)
+        half_width = t_values * std / np.sqrt(counts)
+    return mean, std, half_width
+
+
+class ReplicateResult:
+
+    def __init__(self, seed, agent_names, trajectory, final):
+        self.seed = seed
+        self.agent_names = agent_names
+        # users x agents
+        self.trajectory = trajectory
+        # metric name -> value
+        self.final = final
+
+
+# Runs one replicate in the current process. The global random generator is seeded too, since the
+# random allocation mechanism draws from it.
+def run_replicate(config):
+    seed = get_value_from_keys(['parameters', 'random_seed'], config)
+    random.seed(seed)
+    experiment = scruf.Scruf(config)
+    state = experiment.state
+    scruf.Scruf.setup_experiment()
+    # The fairness trajectory is recorded even if the allocation mechanism does not use fairness
+    state.history.record_scores = True
+    names = list(state.agents.agent_names())
+    trajectory = []
+
+    def record(output):
+        fairness = state.history.allocation_history.get_most_recent()['fairness scores']
+        trajectory.append([fairness[name] for name in names])
+
+    experiment.run_loop(iterations=state.iterations, callback=record)
+    scruf.Scruf.cleanup_experiment()
+
+    trajectory = np.array(trajectory, dtype=np.float64).reshape(-1, len(names))
+    final = {}
+    if len(trajectory) > 0:
+        for position, name in enumerate(names):
+            final[f'fairness_{name}'] = float(trajectory[-1, position])
+    final.update({metric: float(value) for metric, value in state.evaluators.summary().items()})
+    return ReplicateResult(seed, names, trajectory, final)
+
+
+def _init_worker():
+    CSVRowCache.enable()
+
+
+class ReplicateSummary:
+    """
+    Means and confidence intervals over a set of replicates: for each final metric, and for the fairness
+    trajectory of each agent at each time step.
+    """
+
+    def __init__(self, results, confidence=0.95, converged=None):
+        self.results = results
+        self.confidence = confidence
+        self.converged = converged
+        self.seeds = [result.seed for result in results]
+        self.agent_names = results[0].agent_names if len(results) > 0 else []
+        self.metric_names = sorted(set().union(*[result.final.keys() for result in results]))
+
+        self.final = {}
+        for metric in self.metric_names:
+            values = np.array([result.final.get(metric, np.nan) for result in results])
+            mean, std, half_width = mean_ci(values, confidence)
+            self.final[metric] = {'mean': float(mean), 'std': float(std),
+                                  'ci_low': float(mean - half_width), 'ci_high': float(mean + half_width),
+                                  'n': int(np.sum(~np.isnan(values)))}
+
+        # Runs of the same data have the same number of users; stop at the shortest just in case
+        length = min((len(result.trajectory) for result in results), default=0)
+        stacked = np.stack([result.trajectory[:length] for result in results]) if len(results) > 0 \
+            else np.zeros((0, 0, 0))
+        self.trajectory_mean, self.trajectory_std, half_width = mean_ci(stacked, confidence)
+        self.trajectory_low = self.trajectory_mean - half_width
+        self.trajectory_high = self.trajectory_mean + half_width
+
+    def ci_width(self, metric):
+        return self.final[metric]['ci_high'] - self.final[metric]['ci_low']
+
+    def to_dict(self):
+        def values(array):
+            return [None if math.isnan(value) else value for value in array.tolist()]
+
+        trajectory = {}
+        for position, name in enumerate(self.agent_names):
+            trajectory[name] = {'mean': values(self.trajectory_mean[:, position]),
+                                'ci_low': values(self.trajectory_low[:, position]),
+                                'ci_high': values(self.trajectory_high[:, position])}
+        return {'seeds': self.seeds,
+                'confidence': self.confidence,
+                'converged': self.converged,
+                'final': {metric: {key: (None if isinstance(value, float) and math.isnan(value) else value)
+                                   for key, value in stats.items()}
+                          for metric, stats in self.final.items()},
+                'trajectory': trajectory}
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+class ReplicateRunner:
+
+    DEFAULT_SUFFIX = '_replicates.json'
+
+    def __init__(self, config, max_seeds=10, min_seeds=3, workers=1, ci_width=None, confidence=0.95,
+                 metrics=None, first_seed=None, keep_history=False):
+        """
+        :param config: base configuration
+        :param max_seeds: the most replicates to run
+        :param min_seeds: the fewest replicates to run before stopping at the CI width target
+        :param ci_width: stop once the CI of every target metric is at most this wide (None: run max_seeds)
+        :param metrics: target metrics for ci_width (default: all of the final metrics)
+        :param first_seed: seed of the first replicate (default: parameters.random_seed, or 420)
+        :param keep_history: write the history and evaluation files of each seed
+        """
+        self.config = config
+        self.max_seeds = int(max_seeds)
+        self.min_seeds = max(min(int(min_seeds), self.max_seeds), 2)
+        self.workers = max(int(workers), 1)
+        self.ci_width = ci_width
+        self.confidence = float(confidence)
+        self.metrics = metrics
+        if first_seed is None:
+            first_seed = get_value_from_keys(['parameters', 'random_seed'], config, default=420)
+        self.first_seed = int(first_seed)
+        self.keep_history = keep_history
+
+    @classmethod
+    def from_config(cls, config):
+        settings = get_value_from_keys(ConfigKeys.REPLICATES_KEYS, config, default={})
+        return cls(config,
+                   max_seeds=settings.get('max_seeds', 10),
+                   min_seeds=settings.get('min_seeds', 3),
+                   workers=settings.get('workers', 1),
+                   ci_width=settings.get('ci_width'),
+                   confidence=settings.get('confidence', 0.95),
+                   metrics=settings.get('metrics'),
+                   keep_history=ensure_boolean(settings.get('keep_history', False)) is True)
+
+    # Default: next to the history file, with the replicates suffix
+    @staticmethod
+    def summary_path(config):
+        return get_artifact_path(ConfigKeys.REPLICATES_KEYS + ['filename'], config, ReplicateRunner.DEFAULT_SUFFIX)
+
+    def seed(self, index):
+        return self.first_seed + index
+
+    def seed_config(self, index):
+        config = copy.deepcopy(self.config)
+        seed = self.seed(index)
+        set_config_value(config, ['parameters', 'random_seed'], seed)
+        # A replicate does not use the cache or checkpoints: it always simulates
+        for section in ['cache', 'checkpoint', 'replicates']:
+            config.pop(section, None)
+        if self.keep_history:
+            filename = config['output']['filename']
+            config['output']['filename'] = ConfigGrid.default_name(filename, [f'seed{seed}'])
+            if 'evaluation_filename' in config['output']:
+                evaluation_filename = config['output']['evaluation_filename']
+                config['output']['evaluation_filename'] = ConfigGrid.default_name(evaluation_filename,
+                                                                                  [f'seed{seed}'])
+        else:
+            config.pop('output', None)
+        return config
+
+    # Whether the first n replicates (in seed order) meet the CI width target
+    def is_converged(self, results):
+        if self.ci_width is None or len(results) < self.min_seeds:
+            return False
+        summary = ReplicateSummary(results, self.confidence)
+        metrics = self.metrics if self.metrics is not None else summary.metric_names
+        for metric in metrics:
+            if metric not in summary.final or not summary.ci_width(metric) <= self.ci_width:
+                return False
+        return True
+
+    def run(self, callback=None):
+        """
+        Runs the replicates and returns their ReplicateSummary. The callback (if any) is called with each
+        ReplicateResult as it finishes.
+        """
+        if self.workers == 1:
+            results = []
+            CSVRowCache.enable()
+            try:
+                for index in range(self.max_seeds):
+                    results.append(run_replicate(self.seed_config(index)))
+                    if callback is not None:
+                        callback(results[-1])
+                    if self.is_converged(results):
+                        return ReplicateSummary(results, self.confidence, converged=True)
+            finally:
+                CSVRowCache.disable()
+            return ReplicateSummary(results, self.confidence, converged=self.converged_flag())
+
+        finished = {}
+        done = queue.Queue()
+        with Pool(processes=min(self.workers, self.max_seeds), initializer=_init_worker) as pool:
+            def submit(index):
+                pool.apply_async(run_replicate, (self.seed_config(index),),
+                                 callback=lambda result: done.put((index, result, None)),
+                                 error_callback=lambda error: done.put((index, None, error)))
+
+            next_index = 0
+            running = 0
+            while next_index < min(self.workers, self.max_seeds):
+                submit(next_index)
+                next_index += 1
+                running += 1
+            # Length of the prefix of seeds that has been checked against the target
+            checked = 0
+            stop_at = None
+            while running > 0:
+                index, result, error = done.get()
+                running -= 1
+                if error is not None:
+                    raise error
+                finished[index] = result
+                if callback is not None:
+                    callback(result)
+                while stop_at is None and checked in finished:
+                    checked += 1
+                    if self.is_converged([finished[position] for position in range(checked)]):
+                        stop_at = checked
+                if stop_at is not None:
+                    # Replicates after the stopping point are not needed
+                    pool.terminate()
+                    break
+                if next_index < self.max_seeds:
+                    submit(next_index)
+                    next_index += 1
+                    running += 1
+
+        if stop_at is not None:
+            return ReplicateSummary([finished[position] for position in range(stop_at)], self.confidence,
+                                    converged=True)
+        results = [finished[position] for position in sorted(finished)]
+        return ReplicateSummary(results, self.confidence, converged=self.converged_flag())
+
+    # Reported when max_seeds ran out: False if there was a target, None if there was none
+    def converged_flag(self):
+        return None if self.ci_width is None else False
+
+    # Runs the replicates and writes the summary. Returns the summary.
+    def run_and_write(self, progress=False):
+        callback = None
+        if progress:
+            callback = lambda result: print(f'Replicate with seed {result.seed} finished')
+        summary = self.run(callback=callback)
+        summary.write(ReplicateRunner.summary_path(self.config))
+        return summary
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from scruf.util import get_value_from_keys, ConfigKeys, ScrufError, RerankRequestError
+from .reranker import Reranker
+
+# Online re-ranking: the allocation and choice pipeline of a simulation, in front of a live recommender.
+#
+# A small HTTP/1.1 server (asyncio, no dependencies) in front of a Reranker, which keeps a live
+# simulation state. Each request brings a user and the recommender's candidate list:
+#
+#   POST /rerank  {"user": "u1", "candidates": [["i1", 4.5], ["i2", 3.1], ...],
+#                  "compatibility": {"Agent A": 0.3, ...}}     (compatibility is optional)
+#   -> {"user": "u1", "time": 17, "results": [{"item": "i2", "score": 3.4, "rank": 0}, ...]}
+#
+# and is answered with the re-ranked list. The output goes into the fairness history (and the history
+# file and online evaluators) as it is served, exactly as in the simulation loop. GET /stats reports the
+# latency (p50/p99), throughput and batch sizes.
+#
+# Concurrent requests are coalesced into micro-batches: a batch is closed when it has max_batch_size
+# requests or max_wait_ms after its first request arrived, whichever comes first. A batch is handed to a
+# single worker thread, so the event loop keeps accepting requests while it runs, and the next batch
+# collects whatever arrived in the meantime. Within a batch the users are processed in arrival order,
+# since each user's allocation depends on the fairness history left by the ones before. The history
+# file is flushed once per batch.
+
+
+class ServiceStats:
+
+    def __init__(self, max_samples=100000):
+        self.latencies = deque(maxlen=max_samples)
+        self.batch_sizes = deque(maxlen=max_samples)
+        self.served = 0
+        self.errors = 0
+        self.first_arrival = None
+        self.last_done = None
+
+    def record_batch(self, size):
+        self.batch_sizes.append(size)
+
+    def record(self, arrival, done, error=False):
+        if self.first_arrival is None:
+            self.first_arrival = arrival
+        self.last_done = done
+        self.latencies.append(done - arrival)
+        if error:
+            self.errors += 1
+        else:
+            self.served += 1
+
+    def summary(self):
+        if len(self.latencies) == 0:
+            return {'served': 0, 'errors': self.errors}
+        latencies_ms = 1000 * np.array(self.latencies)
+        elapsed = self.last_done - self.first_arrival
+        return {'served': self.served,
+                'errors': self.errors,
+                'latency_p50_ms': float(np.percentile(latencies_ms, 50)),
+                'latency_p99_ms': float(np.percentile(latencies_ms, 99)),
+                'throughput_per_s': (self.served + self.errors) / elapsed if elapsed > 0 else 0.0,
+                'batches': len(self.batch_sizes),
+                'mean_batch_size': float(np.mean(self.batch_sizes)),
+                'max_batch_size': int(np.max(self.batch_sizes))}
+
+
+class RerankRequest:
+
+    def __init__(self, user, candidates, compatibility, future, arrival):
+        self.user = user
+        self.candidates = candidates
+        self.compatibility = compatibility
+        self.future = future
+        self.arrival = arrival
+
+
+class RerankService:
+
+    DEFAULT_HOST = '127.0.0.1'
+    DEFAULT_PORT = 8080
+    DEFAULT_MAX_BATCH_SIZE = 32
+    DEFAULT_MAX_WAIT_MS = 2.0
+
+    STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error'}
+
+    def __init__(self, reranker: Reranker, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+        self.reranker = reranker
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = float(max_wait_ms) / 1000.0
+        self.stats = ServiceStats()
+        self.host = None
+        self.port = None
+        self._queue: asyncio.Queue = None
+        self._arrival: asyncio.Event = None
+        # Requests submitted and not yet answered
+        self._pending = 0
+        self._server = None
+        self._batcher = None
+        self._executor = None
+
+    # Creates the simulation state for the configuration, with users arriving through the service.
+    # The [service] section gives host, port, max_batch_size and max_wait_ms.
+    @classmethod
+    def from_config(cls, config):
+        service = cls(Reranker(config),
+                      max_batch_size=cls.get_service_value('max_batch_size', config, cls.DEFAULT_MAX_BATCH_SIZE),
+                      max_wait_ms=cls.get_service_value('max_wait_ms', config, cls.DEFAULT_MAX_WAIT_MS))
+        service.host = cls.get_service_value('host', config, cls.DEFAULT_HOST)
+        service.port = int(cls.get_service_value('port', config, cls.DEFAULT_PORT))
+        return service
+
+    @staticmethod
+    def get_service_value(key, config, default):
+        return get_value_from_keys(ConfigKeys.SERVICE_KEYS + [key], config, default=default)
+
+    # port=0 picks a free port; the port in use is in self.port afterwards
+    async def start(self, host=None, port=None):
+        host = host if host is not None else self.host if self.host is not None else self.DEFAULT_HOST
+        port = port if port is not None else self.port if self.port is not None else self.DEFAULT_PORT
+        self._queue = asyncio.Queue()
+        self._arrival = asyncio.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._batcher = asyncio.ensure_future(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        self.host, self.port = self._server.sockets[0].getsockname()[0:2]
+        return self.port
+
+    # Stops accepting requests, lets the queued ones finish and writes out the history and evaluations
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        while self._pending > 0:
+            await asyncio.sleep(self.max_wait)
+        self._batcher.cancel()
+        try:
+            await self._batcher
+        except asyncio.CancelledError:
+            pass
+        self._executor.shutdown(wait=True)
+        self.reranker.close()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f'SCRUF-D re-ranking service on http://{self.host}:{self.port}')
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.stop()
+
+    def run(self):
+        try:
+            asyncio.run(self.serve_forever())
+        except KeyboardInterrupt:
+            pass
+
+    # Re-ranks one candidate list (a list of (item, score) pairs) for the user, through the batching
+    # queue. The result is the response dictionary of /rerank.
+    async def rerank(self, user, candidates, compatibility=None):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(RerankRequest(user, candidates, compatibility, future, time.perf_counter()))
+        self._pending += 1
+        self._arrival.set()
+        return await future
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        deadline = batch[0].arrival + self.max_wait
+        while True:
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.perf_counter()
+            if len(batch) == self.max_batch_size or remaining <= 0:
+                return batch
+            # Waiting on an event rather than on the queue, so that a timeout cannot lose a request
+            self._arrival.clear()
+            try:
+                await asyncio.wait_for(self._arrival.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            self.stats.record_batch(len(batch))
+            results = await loop.run_in_executor(self._executor, self.process_batch, batch)
+            done = time.perf_counter()
+            for request, result in zip(batch, results):
+                is_error = isinstance(result, Exception)
+                self.stats.record(request.arrival, done, error=is_error)
+                self._pending -= 1
+                if request.future.done():
+                    continue
+                if is_error:
+                    request.future.set_exception(result)
+                else:
+                    request.future.set_result(result)
+
+    # Runs in the worker thread, which is the only one that touches the simulation state. Returns the
+    # result (or the exception) for each request.
+    def process_batch(self, batch):
+        results = []
+        for request in batch:
+            try:
+                results.append(self.process_request(request))
+            except Exception as error:
+                results.append(error)
+        self.reranker.flush()
+        return results
+
+    def process_request(self, request: RerankRequest):
+        output = self.reranker.rerank(request.user, request.candidates, compatibility=request.compatibility)
+        return {'user': request.user,
+                'time': self.reranker.current_time(),
+                'results': [{'item': entry.item, 'score': entry.score, 'rank': entry.rank}
+                            for entry in output.get_results()]}
+
+    @staticmethod
+    def parse_rerank(body):
+        try:
+            request = json.loads(body)
+        except ValueError as error:
+            raise RerankRequestError(f'body is not JSON ({error})')
+        if not isinstance(request, dict) or 'user' not in request or 'candidates' not in request:
+            raise RerankRequestError('expecting an object with "user" and "candidates"')
+        try:
+            candidates = [(str(item), float(score)) for item, score in request['candidates']]
+        except (TypeError, ValueError):
+            raise RerankRequestError('candidates must be a list of [item, score] pairs')
+        compatibility = request.get('compatibility')
+        if compatibility is not None and not isinstance(compatibility, dict):
+            raise RerankRequestError('compatibility must be an object of agent: value')
+        return str(request['user']), candidates, compatibility
+
+    async def _route(self, method, target, body):
+        if method == 'POST' and target == '/rerank':
+            try:
+                user, candidates, compatibility = self.parse_rerank(body)
+                return 200, await self.rerank(user, candidates, compatibility)
+            except ScrufError as error:
+                return 400, {'error': str(error)}
+            except Exception as error:
+                return 500, {'error': f'{type(error).__name__}: {error}'}
+        if method == 'GET' and target == '/stats':
+            return 200, self.stats.summary()
+        return 404, {'error': f'No route for {method} {target}'}
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                parts = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                if len(parts) != 3:
+                    self._write_response(writer, 400, {'error': 'Malformed request line'}, False)
+                    break
+                method, target, version = parts
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+                status, payload = await self._route(method, target, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def _write_response(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode('utf-8')
+        head = f'HTTP/1.1 {status} {self.STATUS_TEXT[status]}\r\n' \
+               f'Content-Type: application/json\r\n' \
+               f'Content-Length: {len(body)}\r\n' \
+               f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        writer.write(head.encode('latin-1') + body)
+
+
+class RerankClient:
+    """
+    Minimal client for the service, over one keep-alive connection (for tests and load generation).
+    Requests on one client are sent one at a time; use several clients for concurrency.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            await self._writer.wait_closed()
+            self._writer = None
+
+    # Returns the status and the decoded JSON body
+    async def request(self, method, target, payload=None):
+        if self._writer is None:
+            await self.connect()
+        body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        head = f'{method} {target} HTTP/1.1\r\nHost: {self.host}\r\n' \
+               f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'
+        self._writer.write(head.encode('latin-1') + body)
+        await self._writer.drain()
+        status = int((await self._reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        response = json.loads(await self._reader.readexactly(int(headers['content-length'])))
+        if headers.get('connection') == 'close':
+            await self.close()
+        return status, response
+
+    async def rerank(self, user, candidates, compatibility=None):
+        payload = {'user': user, 'candidates': [list(pair) for pair in candidates]}
+        if compatibility is not None:
+            payload['compatibility'] = compatibility
+        return await self.request('POST', '/rerank', payload)
+
+    async def stats(self):
+        return await self.request('GET', '/stats')
@@ -0,0 +1,96 @@
+import copy
+import numpy as np
+import scruf
+from scruf.data import OnlineUserData, DataLoader
+from scruf.util import ResultList, ConfigKeys, InputListLengthError, RerankRequestError
+
+# In-process re-ranking, for calling SCRUF-D directly in a serving path.
+#
+# Reranker sets up the same state as a simulation, except that users arrive through rerank() with their
+# candidate lists (and, optionally, their compatibilities) rather than from a recommendations file. The
+# history windows are updated in memory as outputs are produced. The history file and the evaluation
+# files are only written if the configuration names them ([output] filename), and the context and
+# popularity files are optional too, so a configuration with agents, mechanisms and item features (a
+# file, or triples passed in) needs no file access after construction.
+#
+# The simulation state is global (Scruf.state), so there is one Reranker per process.
+
+
+class Reranker:
+
+    # Sections that an embedded configuration may leave out
+    DEFAULTS = {'context': {'context_class': 'request_context'},
+                'post': {'postprocess_class': 'null'}}
+
+    def __init__(self, config, item_features=None, popularity=None):
+        """
+        :param config: configuration as for a simulation; [data] rec_filename is not used, and [output],
+            [context] and [post] are optional (by default, compatibilities come with each request)
+        :param item_features: (item id, feature name, value) triples to use instead of the feature file
+        :param popularity: item id -> count, instead of the popularity file
+        """
+        self.config = Reranker.embedded_config(config)
+        experiment = scruf.Scruf(self.config)
+        self.state = experiment.state
+        self.state.user_data = OnlineUserData()
+        # Data passed in takes the place of the files. The rest is loaded if the components need it.
+        loader = self.state.data_loader
+        if popularity is not None:
+            loader.load(DataLoader.POPULARITY, lambda: self.state.popularity.popularity_dict.update(popularity))
+        if item_features is not None:
+            loader.load(DataLoader.ITEM_FEATURES,
+                        lambda: self.state.item_features.setup(self.config, triples=item_features))
+        scruf.Scruf.setup_data()
+        scruf.Scruf.setup_pipeline()
+
+    @staticmethod
+    def embedded_config(config):
+        config = copy.deepcopy(config)
+        for section, defaults in Reranker.DEFAULTS.items():
+            for key, value in defaults.items():
+                config.setdefault(section, {}).setdefault(key, value)
+        config.setdefault('parameters', {}).setdefault('iterations', -1)
+        return config
+
+    # Builds the candidate ResultList: a ResultList is used as it is, items with a parallel array of
+    # scores are sorted by score, and otherwise candidates are (item, score) pairs.
+    @staticmethod
+    def candidate_list(user, candidates, scores=None):
+        if isinstance(candidates, ResultList):
+            return candidates
+        if scores is not None:
+            return ResultList.from_scores(user, list(candidates), np.asarray(scores, dtype=np.float64))
+        rlist = ResultList()
+        rlist.setup([(user, item, score) for item, score in candidates])
+        return rlist
+
+    def rerank(self, user, candidates, scores=None, compatibility=None, flush=False):
+        """
+        Re-ranks the candidates for the user and records the output in the history.
+        :param candidates: ResultList, sequence of items (with scores) or sequence of (item, score) pairs
+        :param scores: scores of the items in candidates, if it is a sequence of items
+        :param compatibility: agent name -> compatibility of the user, if the context takes them from
+            requests (request_context, csv_context)
+        :param flush: flush the history file (if any) after writing this user
+        :return: the output ResultList
+        """
+        user_info = Reranker.candidate_list(user, candidates, scores)
+        if user_info.get_length() < self.state.output_list_size:
+            raise InputListLengthError(user_info.get_length(), self.state.output_list_size)
+        if compatibility is not None:
+            if not hasattr(self.state.context, 'set_context'):
+                raise RerankRequestError('the context class does not take compatibility from requests')
+            self.state.context.set_context(user, compatibility)
+        self.state.user_data.add_user(user, user_info)
+        return scruf.Scruf.process_user(user_info, flush=flush)
+
+    # Time step of the last user re-ranked (-1 before the first)
+    def current_time(self):
+        return self.state.user_data.current_user_index
+
+    def flush(self):
+        self.state.history.flush()
+
+    # Writes out the history and evaluation files, if the configuration has them
+    def close(self):
+        scruf.Scruf.cleanup_experiment()
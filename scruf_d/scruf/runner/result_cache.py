@@ -0,0 +1,182 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+import scruf
+from scruf.util import get_value_from_keys, is_valid_keys, get_path_from_keys, ConfigKeys
+
+# Content-addressed cache for simulation results. The key is a hash of the canonicalized configuration
+# (with output locations removed), the digests of the input data files and the version of the code.
+# Each entry is a directory named by its key that holds the artifacts of one run (the history Parquet
+# file and the evaluation summaries) and a manifest. Entries are evicted least-recently-used first
+# when the total size exceeds the limit.
+
+
+class ResultCache:
+
+    # Config keys that only say where to put the output. They do not affect the results.
+    IGNORED_KEYS = [['location', 'path'],
+                    ['location', 'overwrite'],
+                    ConfigKeys.OUTPUT_PATH_KEYS,
+                    ['output', 'evaluation_filename'],
+                    ['post', 'properties', 'filename'],
+                    ['post', 'properties', 'full_filename'],
+                    ['post', 'properties', 'summary_filename'],
+                    ['cache'],
+                    ['checkpoint'],
+                    ConfigKeys.SERVICE_KEYS,
+                    ConfigKeys.REPLICATES_KEYS,
+                    ConfigKeys.SHARDING_KEYS]
+
+    # Config keys that name input data files. These are replaced by a digest of the file contents.
+    INPUT_FILE_KEYS = [ConfigKeys.DATA_FILENAME_KEYS,
+                       ConfigKeys.FEATURE_FILENAME_KEYS,
+                       ['context', 'properties', 'compatibility_file'],
+                       ['context', 'properties', 'popularity_data']]
+
+    MANIFEST_NAME = 'manifest.json'
+    DEFAULT_MAX_SIZE_MB = 1024
+
+    # (path, size, mtime) -> digest, so grids that share data hash each file only once per process
+    _file_digests = {}
+    _code_version = None
+
+    def __init__(self, cache_dir, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self.cache_dir = Path(cache_dir)
+        self.max_size = int(float(max_size_mb) * 1024 * 1024)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_config(cls, config):
+        if not is_valid_keys(['cache', 'path'], config):
+            return None
+        cache_dir = get_path_from_keys(['cache', 'path'], config)
+        max_size_mb = get_value_from_keys(['cache', 'max_size_mb'], config, default=cls.DEFAULT_MAX_SIZE_MB)
+        return cls(cache_dir, max_size_mb=max_size_mb)
+
+    @staticmethod
+    def file_digest(path):
+        path = Path(path)
+        stat = path.stat()
+        memo_key = (str(path.absolute()), stat.st_size, stat.st_mtime_ns)
+        digest = ResultCache._file_digests.get(memo_key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    hasher.update(block)
+            digest = hasher.hexdigest()
+            ResultCache._file_digests[memo_key] = digest
+        return digest
+
+    # The code version is a digest of the package sources, so any change to the code invalidates the cache.
+    @staticmethod
+    def code_version():
+        if ResultCache._code_version is None:
+            hasher = hashlib.sha256()
+            package_dir = Path(scruf.__file__).parent
+            for source in sorted(package_dir.rglob('*.py')):
+                hasher.update(str(source.relative_to(package_dir)).encode())
+                hasher.update(source.read_bytes())
+            ResultCache._code_version = hasher.hexdigest()
+        return ResultCache._code_version
+
+    @staticmethod
+    def canonical_config(config):
+        canonical = copy.deepcopy(config)
+        for keys in ResultCache.IGNORED_KEYS:
+            ResultCache._delete_keys(canonical, keys)
+        return json.dumps(canonical, sort_keys=True, separators=(',', ':'), default=str)
+
+    @staticmethod
+    def _delete_keys(config, keys):
+        for key in keys[:-1]:
+            if not isinstance(config, dict) or key not in config:
+                return
+            config = config[key]
+        if isinstance(config, dict):
+            config.pop(keys[-1], None)
+
+    def compute_key(self, config):
+        hasher = hashlib.sha256()
+        hasher.update(ResultCache.canonical_config(config).encode())
+        for keys in ResultCache.INPUT_FILE_KEYS:
+            if is_valid_keys(keys, config):
+                path = get_path_from_keys(keys, config, check_exists=True)
+                hasher.update('.'.join(keys).encode())
+                hasher.update(ResultCache.file_digest(path).encode())
+        hasher.update(ResultCache.code_version().encode())
+        return hasher.hexdigest()
+
+    def entry_path(self, key):
+        return self.cache_dir / key
+
+    def contains(self, key):
+        return (self.entry_path(key) / ResultCache.MANIFEST_NAME).exists()
+
+    # Copies the cached artifacts to their expected locations. Returns True on a hit. Artifacts that
+    # the original run did not produce (e.g. an empty per-user file) are not in the manifest and are skipped.
+    def restore(self, config, artifact_paths):
+        key = self.compute_key(config)
+        if not self.contains(key):
+            return False
+        entry = self.entry_path(key)
+        with open(entry / ResultCache.MANIFEST_NAME, 'r') as f:
+            manifest = json.load(f)
+        for role, target in artifact_paths.items():
+            if role in manifest['artifacts']:
+                Path(target).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(entry / manifest['artifacts'][role], target)
+        # Touch the manifest so that eviction treats this entry as recently used
+        os.utime(entry / ResultCache.MANIFEST_NAME)
+        return True
+
+    # Copies the artifacts of a finished run into the cache. The entry is assembled in a temporary
+    # directory and renamed into place so readers never see a partial entry.
+    def store(self, config, artifact_paths):
+        key = self.compute_key(config)
+        entry = self.entry_path(key)
+        staging = self.cache_dir / f'.{key}.{os.getpid()}.tmp'
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir()
+        manifest = {'key': key, 'created': time.time(), 'artifacts': {}}
+        for role, source in artifact_paths.items():
+            source = Path(source)
+            if source.exists():
+                name = role + ''.join(source.suffixes)
+                shutil.copyfile(source, staging / name)
+                manifest['artifacts'][role] = name
+        with open(staging / ResultCache.MANIFEST_NAME, 'w') as f:
+            json.dump(manifest, f)
+        if entry.exists():
+            shutil.rmtree(entry)
+        os.replace(staging, entry)
+        self.evict(keep=key)
+        return key
+
+    @staticmethod
+    def entry_size(entry):
+        return sum(f.stat().st_size for f in entry.iterdir() if f.is_file())
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        for entry in self.cache_dir.iterdir():
+            manifest = entry / ResultCache.MANIFEST_NAME
+            if entry.is_dir() and manifest.exists():
+                size = ResultCache.entry_size(entry)
+                entries.append((manifest.stat().st_mtime, entry, size))
+                total += size
+        # Least recently used first
+        entries.sort(key=lambda spec: spec[0])
+        for _, entry, size in entries:
+            if total <= self.max_size:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry)
+            total -= size
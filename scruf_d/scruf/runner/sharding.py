@@ -0,0 +1,299 @@
+import copy
+import heapq
+import json
+import math
+import os
+import random
+import time
+import traceback
+from multiprocessing import Process, Pipe
+import numpy as np
+import scruf
+from scruf.history import ScrufHistory
+from scruf.evaluation import EvaluatorCollection
+from scruf.util import BallotCollection, ConfigKeys, get_value_from_keys, get_working_dir_path, ensure_boolean, \
+    get_artifact_path, ShardFailedError
+from .config_grid import ConfigGrid
+from .replicates import run_replicate
+
+# Sharded simulation: one experiment split over several processes.
+#
+# The users are dealt out to K shards in turn (user i goes to shard i % K), and each shard runs the
+# pipeline on its users in its own process, with its own copy of the history window. Every M users
+# (sync_interval), the shards exchange what they have produced: the coordinator collects the output
+# lists of all shards, and every shard then rolls its window back to the merged window of the previous
+# exchange and adds the new output lists of all shards, in user order. Right after an exchange, all
+# shards have the same window, which is the window that a single process would have built from these
+# outputs. In between, a shard only sees its own new outputs, so the fairness it computes is an
+# approximation that gets better as M gets smaller (and slower, since every exchange copies the window).
+# The popularity counts (which the individual preference functions add to) are merged the same way,
+# as sums of the shards' increments.
+#
+# Shard k uses the seed parameters.random_seed + k, for its lotteries and for the global random
+# generator. The coordinator runs the online evaluators over the outputs of all shards in user order,
+# and the history files of the shards are merged into the configured one. With compare=True, the
+# experiment is also run in a single process afterwards (writing its history and evaluation files with an
+# _exact suffix), and the report gives the deviation of the sharded fairness trajectories (and metrics)
+# from the exact ones. With one shard, there is none.
+
+
+def _run_shard(config, shard, shards, sync_interval, evaluate, conn):
+    try:
+        random.seed(get_value_from_keys(['parameters', 'random_seed'], config))
+        experiment = scruf.Scruf(config)
+        state = experiment.state
+        scruf.Scruf.setup_experiment()
+        history = state.history
+        history.record_scores = True
+        user_data = state.user_data
+        names = list(state.agents.agent_names())
+        num_users = user_data.num_users(state.iterations)
+
+        # The merged window and popularity counts as of the last exchange
+        synced_outputs, synced_window = history.copy_outputs()
+        synced_popularity = dict(state.popularity.popularity_dict)
+        for start in range(0, num_users, sync_interval):
+            outputs = synced_outputs.copy()
+            history.set_outputs(outputs, synced_window.copy(outputs))
+            state.popularity.popularity_dict = dict(synced_popularity)
+
+            produced = []
+            for user_info in user_data.shard_iterator(shard, shards, start, min(start + sync_interval, num_users)):
+                output = scruf.Scruf.process_user(user_info, flush=False)
+                fairness = history.allocation_history.get_most_recent()['fairness scores']
+                rec_list = None
+                if evaluate:
+                    rec_list = history.choice_input_history.get_most_recent().get_ballot(BallotCollection.REC_NAME).prefs
+                produced.append((user_data.current_user_index, output, rec_list, [fairness[name] for name in names]))
+            increments = {item: count - synced_popularity.get(item, 0)
+                          for item, count in state.popularity.popularity_dict.items()
+                          if count != synced_popularity.get(item, 0)}
+            conn.send(('round', produced, increments))
+
+            merged, merged_increments = conn.recv()
+            synced_outputs.add_items(merged)
+            synced_window.sync()
+            for item, count in merged_increments.items():
+                synced_popularity[item] = synced_popularity.get(item, 0) + count
+
+        history.cleanup(no_compress=True)
+        conn.send(('done', names))
+    except Exception:
+        conn.send(('error', traceback.format_exc()))
+    finally:
+        conn.close()
+
+
+class ShardedRunReport:
+    """
+    Fairness trajectories of a sharded run (users x agents, in user order) and, if the exact run was done,
+    their deviation from it.
+    """
+
+    def __init__(self, shards, sync_interval, agent_names, trajectory, metrics, elapsed,
+                 exact_trajectory=None, exact_metrics=None, exact_elapsed=None):
+        self.shards = shards
+        self.sync_interval = sync_interval
+        self.agent_names = agent_names
+        self.trajectory = trajectory
+        self.metrics = metrics
+        self.elapsed = elapsed
+        self.exact_trajectory = exact_trajectory
+        self.exact_metrics = exact_metrics
+        self.exact_elapsed = exact_elapsed
+
+    # agent name -> mean and maximum absolute difference from the exact trajectory, and the final values
+    def deviation(self):
+        if self.exact_trajectory is None:
+            return None
+        difference = np.abs(self.trajectory - self.exact_trajectory)
+        result = {}
+        for position, name in enumerate(self.agent_names):
+            column = difference[:, position]
+            known = column[~np.isnan(column)]
+            result[name] = {'mean_abs': float(known.mean()) if len(known) > 0 else float('nan'),
+                            'max_abs': float(known.max()) if len(known) > 0 else float('nan'),
+                            'final_sharded': float(self.trajectory[-1, position]),
+                            'final_exact': float(self.exact_trajectory[-1, position])}
+        return result
+
+    def to_dict(self):
+        def clean(value):
+            if isinstance(value, dict):
+                return {key: clean(entry) for key, entry in value.items()}
+            if isinstance(value, float) and math.isnan(value):
+                return None
+            return value
+
+        report = {'shards': self.shards,
+                  'sync_interval': self.sync_interval,
+                  'users': len(self.trajectory),
+                  'elapsed_seconds': self.elapsed,
+                  'metrics': self.metrics}
+        if self.exact_trajectory is not None:
+            report['exact_elapsed_seconds'] = self.exact_elapsed
+            report['speedup'] = self.exact_elapsed / self.elapsed if self.elapsed > 0 else None
+            report['deviation'] = self.deviation()
+            report['exact_metrics'] = self.exact_metrics
+        return clean(report)
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+
+
+class ShardedRun:
+
+    DEFAULT_SUFFIX = '_sharded.json'
+
+    def __init__(self, config, shards=2, sync_interval=100, compare=True):
+        """
+        :param config: configuration of the experiment
+        :param shards: number of shard processes
+        :param sync_interval: number of users (over all shards) between exchanges
+        :param compare: also run the experiment in one process and report the deviation from it
+        """
+        self.config = config
+        self.shards = max(int(shards), 1)
+        self.sync_interval = max(int(sync_interval), 1)
+        self.compare = compare
+
+    @classmethod
+    def from_config(cls, config):
+        settings = get_value_from_keys(ConfigKeys.SHARDING_KEYS, config, default={})
+        return cls(config,
+                   shards=settings.get('shards', 2),
+                   sync_interval=settings.get('sync_interval', 100),
+                   compare=ensure_boolean(settings.get('compare', True)) is True)
+
+    # Default: next to the history file, with the sharded suffix
+    @staticmethod
+    def report_path(config):
+        return get_artifact_path(ConfigKeys.SHARDING_KEYS + ['filename'], config, ShardedRun.DEFAULT_SUFFIX)
+
+    def has_history(self):
+        return 'filename' in self.config.get('output', {})
+
+    def shard_file_name(self, shard):
+        return ConfigGrid.default_name(self.config['output']['filename'], [f'shard{shard}'])
+
+    # The evaluation is done by the coordinator, and shards do not use the cache or checkpoints
+    def shard_config(self, shard):
+        config = copy.deepcopy(self.config)
+        for section in ['cache', 'checkpoint', 'replicates', 'sharding', 'evaluation']:
+            config.pop(section, None)
+        seed = get_value_from_keys(['parameters', 'random_seed'], config, default=420)
+        config.setdefault('parameters', {})['random_seed'] = seed + shard
+        if self.has_history():
+            config['output']['filename'] = self.shard_file_name(shard)
+        return config
+
+    # The single-process run, with its own output files
+    def exact_config(self):
+        config = copy.deepcopy(self.config)
+        for section in ['cache', 'checkpoint', 'replicates', 'sharding']:
+            config.pop(section, None)
+        for key in ['filename', 'evaluation_filename']:
+            if key in config.get('output', {}):
+                config['output'][key] = ConfigGrid.default_name(config['output'][key], ['exact'])
+        return config
+
+    def run(self):
+        """
+        Runs the sharded experiment, writes its history and evaluation files and returns the report.
+        """
+        start_time = time.perf_counter()
+        evaluate = len(get_value_from_keys(['evaluation'], self.config, default={})) > 0
+        working_dir = get_working_dir_path(self.config)
+        if self.has_history():
+            # Left over from a failed run
+            for shard in range(self.shards):
+                shard_path = working_dir / self.shard_file_name(shard)
+                if shard_path.exists():
+                    shard_path.unlink()
+
+        connections = []
+        processes = []
+        for shard in range(self.shards):
+            parent, child = Pipe()
+            process = Process(target=_run_shard,
+                              args=(self.shard_config(shard), shard, self.shards, self.sync_interval, evaluate, child))
+            process.start()
+            child.close()
+            connections.append(parent)
+            processes.append(process)
+
+        # The coordinator keeps the state for the evaluators and post-processing
+        experiment = scruf.Scruf(self.config)
+        state = experiment.state
+        if evaluate:
+            scruf.Scruf.load_data(EvaluatorCollection.configured_components(self.config))
+            state.evaluators.setup(self.config)
+
+        fairness = []
+        names = None
+        try:
+            while names is None:
+                messages = [connection.recv() for connection in connections]
+                for shard, message in enumerate(messages):
+                    if message[0] == 'error':
+                        raise ShardFailedError(shard, message[1])
+                if messages[0][0] == 'done':
+                    names = messages[0][1]
+                    break
+                produced = sorted([entry for message in messages for entry in message[1]], key=lambda entry: entry[0])
+                increments = {}
+                for message in messages:
+                    for item, count in message[2].items():
+                        increments[item] = increments.get(item, 0) + count
+                merged = [output for _, output, _, _ in produced]
+                for connection in connections:
+                    connection.send((merged, increments))
+                for _, output, rec_list, values in produced:
+                    if evaluate:
+                        state.evaluators.consume(rec_list, output)
+                    fairness.append(values)
+        finally:
+            for process in processes:
+                if names is None:
+                    process.terminate()
+                process.join()
+
+        if self.has_history():
+            self.merge_histories(working_dir)
+        state.evaluators.cleanup()
+        scruf.Scruf.post_process()
+        elapsed = time.perf_counter() - start_time
+
+        trajectory = np.array(fairness, dtype=np.float64).reshape(-1, len(names))
+        report = ShardedRunReport(self.shards, self.sync_interval, names, trajectory,
+                                  {metric: float(value) for metric, value in state.evaluators.summary().items()},
+                                  elapsed)
+        if self.compare:
+            start_time = time.perf_counter()
+            exact = run_replicate(self.exact_config())
+            report.exact_elapsed = time.perf_counter() - start_time
+            report.exact_trajectory = exact.trajectory
+            report.exact_metrics = {metric: value for metric, value in exact.final.items()
+                                    if metric in report.metrics}
+        return report
+
+    # The rows of each shard's history file are in user order, and each user is in one shard
+    def merge_histories(self, working_dir):
+        history_file_name = self.config['output']['filename']
+        shard_files = [open(working_dir / self.shard_file_name(shard)) for shard in range(self.shards)]
+        try:
+            with open(working_dir / history_file_name, 'xt') as history_file:
+                history_file.writelines(heapq.merge(*shard_files, key=lambda line: int(line.split(',', 1)[0])))
+        finally:
+            for shard_file in shard_files:
+                shard_file.close()
+        for shard in range(self.shards):
+            os.remove(working_dir / self.shard_file_name(shard))
+        ScrufHistory.compress(working_dir, history_file_name)
+
+    # Runs the experiment and writes the report. Returns the report.
+    def run_and_write(self):
+        report = self.run()
+        report.write(ShardedRun.report_path(self.config))
+        return report
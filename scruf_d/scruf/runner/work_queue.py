@@ -0,0 +1,345 @@
+import json
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from multiprocessing import Process
+from pathlib import Path
+import scruf
+from scruf.util import CSVRowCache
+from .config_grid import ConfigGrid
+
+# A work queue of experiment configurations in a shared directory, for running grids on several machines
+# without a broker. Any process that can see the directory (a network file system, or the local disk for
+# several workers on one machine) can publish jobs or work on them.
+#
+# Layout of the queue directory:
+#   queue.json                 lease length and default number of attempts
+#   jobs/<job>.json            the configuration of the job
+#   claims/<job>               exists while a worker holds the job. It is linked into place from a complete
+#                              temporary file, which fails if it exists, so only one worker gets it. It
+#                              holds a lease id; its modification time is the lease, renewed by the worker
+#                              every lease / 3 seconds while the job runs
+#   claims/<job>.broken.<id>   created with O_EXCL by the worker that breaks the expired lease <id>
+#   attempts/<job>.<n>.json    one per attempt: worker, host, start time and, if it failed, the error
+#   done/<job>.json            status of a finished job: worker, time, output files and evaluation summary
+#   failed/<job>.json          the job has used up its attempts
+#   workers/<worker>           touched by each worker to read the time of the file system (see fs_time)
+#
+# A job whose attempt raises an error is released and tried again, up to max_attempts attempts in all. A
+# claim whose lease has run out (the worker died or lost the file system) is broken and the job is claimed
+# again; the abandoned attempt counts as one of its attempts. Checking the lease and removing the claim
+# are not one atomic step, so several workers can see the same lease as expired: only the one that
+# creates the tombstone of the lease breaks it, and the others leave the job alone. Lease ages are measured against the file system's clock rather than the worker's, so that hosts
+# with skewed clocks agree on them. Files that others read are written to a temporary name first and
+# renamed into place.
+#
+# Jobs are taken in the order of their ids. publish_grid() numbers the configurations of a grid so that
+# those on the same data are next to each other, and a worker keeps the parsed input data between
+# consecutive jobs on the same data (as in run_configs).
+
+
+def _write_json(path, content):
+    temp_path = path.with_name(f'.{path.name}.{uuid.uuid4().hex}.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump(content, f, indent=1, default=str)
+    os.replace(temp_path, path)
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+class WorkQueue:
+
+    SUBDIRECTORIES = ['jobs', 'claims', 'attempts', 'done', 'failed', 'workers']
+    SETTINGS_FILE = 'queue.json'
+
+    def __init__(self, path, lease_seconds=None, max_attempts=None):
+        """
+        :param path: queue directory, created if needed
+        :param lease_seconds: time after the last renewal at which a claim can be broken (default 60). The
+            settings are stored in the queue directory by the first process that opens it.
+        :param max_attempts: default number of attempts for each job (default 3)
+        """
+        self.path = Path(path)
+        for name in WorkQueue.SUBDIRECTORIES:
+            (self.path / name).mkdir(parents=True, exist_ok=True)
+        settings_path = self.path / WorkQueue.SETTINGS_FILE
+        if settings_path.exists():
+            settings = _read_json(settings_path)
+        else:
+            settings = {'lease_seconds': 60.0, 'max_attempts': 3}
+        if lease_seconds is not None:
+            settings['lease_seconds'] = float(lease_seconds)
+        if max_attempts is not None:
+            settings['max_attempts'] = int(max_attempts)
+        if not settings_path.exists() or lease_seconds is not None or max_attempts is not None:
+            _write_json(settings_path, settings)
+        self.lease_seconds = settings['lease_seconds']
+        self.max_attempts = settings['max_attempts']
+
+    def job_path(self, job_id):
+        return self.path / 'jobs' / f'{job_id}.json'
+
+    def claim_path(self, job_id):
+        return self.path / 'claims' / job_id
+
+    def done_path(self, job_id):
+        return self.path / 'done' / f'{job_id}.json'
+
+    def failed_path(self, job_id):
+        return self.path / 'failed' / f'{job_id}.json'
+
+    # Publishing
+
+    def publish(self, config, job_id=None, max_attempts=None):
+        if job_id is None:
+            job_id = f'{len(self.job_ids()):05d}'
+        job = {'id': job_id,
+               'config': config,
+               'max_attempts': max_attempts if max_attempts is not None else self.max_attempts}
+        _write_json(self.job_path(job_id), job)
+        return job_id
+
+    # Configurations on the same data get consecutive ids, most expensive first. Returns the job ids.
+    def publish_grid(self, grid: ConfigGrid, cost_fn=None):
+        return self.publish_configs([config for group in grid.groups(cost_fn=cost_fn) for config in group])
+
+    def publish_configs(self, configs):
+        first = len(self.job_ids())
+        job_ids = []
+        for position, config in enumerate(configs):
+            stem = os.path.splitext(os.path.basename(config.get('output', {}).get('filename', 'job')))[0]
+            job_ids.append(self.publish(config, job_id=f'{first + position:05d}_{stem}'))
+        return job_ids
+
+    # Status
+
+    def job_ids(self):
+        return sorted(path.stem for path in (self.path / 'jobs').glob('*.json') if not path.name.startswith('.'))
+
+    def read_job(self, job_id):
+        return _read_json(self.job_path(job_id))
+
+    def is_finished(self, job_id):
+        return self.done_path(job_id).exists() or self.failed_path(job_id).exists()
+
+    def attempts(self, job_id):
+        numbered = {}
+        for path in (self.path / 'attempts').glob(f'{job_id}.*.json'):
+            number = path.name[len(job_id) + 1:-len('.json')]
+            if number.isdigit():
+                numbered[int(number)] = path
+        return [numbered[number] for number in sorted(numbered)]
+
+    # Job ids by state: pending (not claimed), running (claimed), done and failed
+    def status(self):
+        status = {'pending': [], 'running': [], 'done': [], 'failed': []}
+        for job_id in self.job_ids():
+            if self.done_path(job_id).exists():
+                status['done'].append(job_id)
+            elif self.failed_path(job_id).exists():
+                status['failed'].append(job_id)
+            elif self.claim_path(job_id).exists():
+                status['running'].append(job_id)
+            else:
+                status['pending'].append(job_id)
+        return status
+
+    def results(self):
+        return {job_id: _read_json(self.done_path(job_id)) for job_id in self.status()['done']}
+
+    # Waits until every job is done or failed. Returns the final status, or None on timeout.
+    def wait(self, timeout=None, poll_interval=1.0):
+        start = time.monotonic()
+        while True:
+            status = self.status()
+            if len(status['pending']) == 0 and len(status['running']) == 0:
+                return status
+            if timeout is not None and time.monotonic() - start > timeout:
+                return None
+            time.sleep(poll_interval)
+
+
+class QueueWorker:
+    """
+    Takes jobs from a WorkQueue and runs them with Scruf.run_experiment, one at a time, until there is
+    nothing left to do.
+    """
+
+    def __init__(self, queue: WorkQueue, worker_id=None, force=False, poll_interval=1.0):
+        self.queue = queue
+        self.host = socket.gethostname()
+        self.worker_id = worker_id if worker_id is not None else f'{self.host}-{os.getpid()}-{uuid.uuid4().hex[:6]}'
+        self.force = force
+        self.poll_interval = poll_interval
+        self._last_data_key = None
+
+    # The current time on the file system that holds the queue
+    def fs_time(self):
+        marker = self.queue.path / 'workers' / self.worker_id
+        marker.touch()
+        return marker.stat().st_mtime
+
+    # Tries to take the job: True if this worker now holds its claim
+    def claim(self, job_id):
+        claim_path = self.queue.claim_path(job_id)
+        temp_path = claim_path.with_name(f'.{job_id}.{uuid.uuid4().hex}.tmp')
+        with open(temp_path, 'w') as f:
+            json.dump({'worker': self.worker_id, 'host': self.host, 'lease': uuid.uuid4().hex}, f)
+        try:
+            return self._claim(job_id, temp_path)
+        finally:
+            os.remove(temp_path)
+
+    def _claim(self, job_id, temp_path):
+        claim_path = self.queue.claim_path(job_id)
+        for _ in range(2):
+            try:
+                os.link(temp_path, claim_path)
+            except FileExistsError:
+                if not self.break_expired(job_id):
+                    return False
+                continue
+            if self.queue.is_finished(job_id):
+                # Finished by someone else since it was listed
+                self.release(job_id)
+                return False
+            return True
+        return False
+
+    # Removes the claim if its lease has run out. True if the job can be claimed again.
+    def break_expired(self, job_id):
+        claim_path = self.queue.claim_path(job_id)
+        try:
+            lease = _read_json(claim_path)['lease']
+            modified = claim_path.stat().st_mtime
+        except FileNotFoundError:
+            return True
+        if self.fs_time() - modified <= self.queue.lease_seconds:
+            return False
+        # Another worker may have broken this lease and claimed the job again since the stat. Only one
+        # worker can create the tombstone of the lease.
+        tombstone_path = claim_path.with_name(f'{job_id}.broken.{lease}')
+        try:
+            os.close(os.open(tombstone_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        stale_path = claim_path.with_name(f'.{job_id}.{self.worker_id}.stale')
+        try:
+            os.rename(claim_path, stale_path)
+        except FileNotFoundError:
+            return True
+        if _read_json(stale_path)['lease'] != lease:
+            # The holder released the job and another worker claimed it in between: put the claim back
+            try:
+                os.link(stale_path, claim_path)
+            except FileExistsError:
+                pass
+            os.remove(stale_path)
+            return False
+        os.remove(stale_path)
+        return True
+
+    def release(self, job_id):
+        try:
+            os.remove(self.queue.claim_path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def _renew(self, job_id, stop):
+        claim_path = self.queue.claim_path(job_id)
+        while not stop.wait(self.queue.lease_seconds / 3.0):
+            try:
+                os.utime(claim_path)
+            except FileNotFoundError:
+                # The lease was broken: another worker may be running the job too
+                return
+
+    # Runs a claimed job and records the outcome. Returns True if it finished, False if the attempt failed
+    # and None if the job had no attempts left (it is marked as failed).
+    def run_job(self, job_id):
+        job = self.queue.read_job(job_id)
+        attempt = len(self.queue.attempts(job_id))
+        if attempt >= job['max_attempts']:
+            _write_json(self.queue.failed_path(job_id),
+                        {'worker': self.worker_id, 'attempts': attempt, 'time': time.time()})
+            self.release(job_id)
+            return None
+        attempt_path = self.queue.path / 'attempts' / f'{job_id}.{attempt}.json'
+        record = {'worker': self.worker_id, 'host': self.host, 'start': time.time()}
+        _write_json(attempt_path, record)
+
+        stop = threading.Event()
+        renewer = threading.Thread(target=self._renew, args=(job_id, stop), daemon=True)
+        renewer.start()
+        try:
+            result = self.run_config(job['config'])
+        except Exception:
+            record['error'] = traceback.format_exc()
+            _write_json(attempt_path, record)
+            return False
+        finally:
+            stop.set()
+            renewer.join()
+            if 'error' in record:
+                self.release(job_id)
+
+        result.update({'worker': self.worker_id, 'host': self.host, 'attempt': attempt,
+                       'start': record['start'], 'end': time.time()})
+        _write_json(self.queue.done_path(job_id), result)
+        self.release(job_id)
+        return True
+
+    # Consecutive configurations on the same data share the parsed input files
+    def run_config(self, config):
+        data_key = ConfigGrid.data_key(config)
+        if data_key != self._last_data_key:
+            CSVRowCache.disable()
+            CSVRowCache.enable()
+            self._last_data_key = data_key
+        experiment = scruf.Scruf(config)
+        experiment.run_experiment(force=self.force)
+        return {'outputs': {role: str(path) for role, path in scruf.Scruf.artifact_paths(config).items()},
+                'metrics': experiment.state.evaluators.summary()}
+
+    def run(self, max_jobs=None):
+        """
+        Works on the queue until every job is done or failed (or after max_jobs attempts). Jobs held by
+        other workers are waited for, since they may need another attempt. Returns the number of attempts.
+        """
+        count = 0
+        CSVRowCache.enable()
+        try:
+            while max_jobs is None or count < max_jobs:
+                unfinished = [job_id for job_id in self.queue.job_ids() if not self.queue.is_finished(job_id)]
+                if len(unfinished) == 0:
+                    break
+                claimed = next((job_id for job_id in unfinished if self.claim(job_id)), None)
+                if claimed is None:
+                    time.sleep(self.poll_interval)
+                    continue
+                if self.run_job(claimed) is not None:
+                    count += 1
+        finally:
+            CSVRowCache.disable()
+            self._last_data_key = None
+        return count
+
+
+def _run_worker(path, force, poll_interval):
+    QueueWorker(WorkQueue(path), force=force, poll_interval=poll_interval).run()
+
+
+# Runs a number of worker processes on this machine until the queue is finished. Returns the final status.
+def run_local_workers(path, workers=2, force=False, poll_interval=0.2):
+    processes = [Process(target=_run_worker, args=(path, force, poll_interval)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return WorkQueue(path).status()
@@ -1,3 +1,4 @@
+import json
 import random
 
 import scruf
@@ -6,10 +7,12 @@ from scruf.agent import AgentCollection
 from scruf.allocation import AllocationMechanismFactory, AllocationMechanism
 from scruf.choice import ChoiceMechanismFactory, ChoiceMechanism
 from scruf.post import PostProcessorFactory, PostProcessor
-from scruf.data import ItemFeatureData, UserArrivalData, BulkLoadedUserData, Context, ContextFactory, LoadPopularityData
-from scruf.util import get_value_from_keys, is_valid_keys, check_key_lists, get_working_dir_path, get_path_from_keys
-from icecream import ic
-from tqdm import tqdm
+from scruf.evaluation import EvaluatorCollection
+from scruf.runner import ResultCache, Checkpoint
+from scruf.data import ItemFeatureData, UserArrivalData, BulkLoadedUserData, Context, ContextFactory, LoadPopularityData, \
+    DataLoader
+from scruf.util import get_value_from_keys, is_valid_keys, check_key_lists, get_working_dir_path, get_path_from_keys, \
+    BallotCollection, ConfigKeys
 
 
 class Scruf:
@@ -32,7 +35,10 @@ class Scruf:
                 ctx = ContextFactory.create_context_class(ctx_class)
                 self.context: Context = ctx
                 self.popularity = ContextFactory.create_context_class("popularity")
-                self.popularity.setup(config)
+                # Loads the data sources above that the components need (see setup_data). Memory is
+                # traced only for the data report.
+                self.data_loader = DataLoader(
+                    trace_memory=get_value_from_keys(ConfigKeys.DATA_REPORT_KEYS, config, default=False) is True)
                 # Mechanisms
                 amech_class = get_value_from_keys(['allocation', 'allocation_class'], config)
                 amech = AllocationMechanismFactory.create_allocation_mechanism(amech_class)
@@ -47,6 +53,9 @@ class Scruf:
                 post = PostProcessorFactory.create_post_processor(post_class)
                 self.post_processor: PostProcessor = post
 
+                # Online evaluation (optional)
+                self.evaluators: EvaluatorCollection = EvaluatorCollection()
+
                 # Parameters
                 self.output_list_size: int = get_value_from_keys(['parameters', 'list_size'], config)
                 self.iterations: int = get_value_from_keys(['parameters', 'iterations'], config)
@@ -59,12 +68,58 @@ class Scruf:
 
     @staticmethod
     def setup_experiment():
+        Scruf.setup_data()
+        Scruf.setup_pipeline()
+
+    # Data sources: only those that the configured components need (see DataLoader)
+    @staticmethod
+    def setup_data():
+        Scruf.load_data(Scruf.configured_components())
+
+    # The user data and the components of the configured pipeline, as (description, component) pairs. The
+    # agents and evaluators are created from the configuration, so this can be used before setup_pipeline().
+    @staticmethod
+    def configured_components():
+        state = Scruf.state
+        yield 'user data', state.user_data
+        yield 'allocation', state.allocation_mechanism
+        yield 'choice', state.choice_mechanism
+        yield from AgentCollection.configured_components(state.config)
+        yield from EvaluatorCollection.configured_components(state.config)
+
+    # Loads the data sources that the components need, each one at most once
+    @staticmethod
+    def load_data(components):
+        state = Scruf.state
+        dependencies = state.data_loader.add_dependencies(components)
+        setup_fns = {DataLoader.RECS: lambda: state.user_data.setup(state.config),
+                     DataLoader.ITEM_FEATURES: lambda: state.item_features.setup(state.config),
+                     DataLoader.CONTEXT: lambda: state.context.setup(state.config),
+                     DataLoader.POPULARITY: lambda: state.popularity.setup(state.config)}
+        for source in DataLoader.SOURCES:
+            if source in dependencies:
+                state.data_loader.load(source, setup_fns[source])
+
+    # Written at the end of the experiment with output.data_report = "true", next to the history file
+    @staticmethod
+    def data_report_path(config):
+        history_path = get_path_from_keys(ConfigKeys.OUTPUT_PATH_KEYS, config)
+        return history_path.with_name(history_path.stem + DataLoader.REPORT_SUFFIX)
+
+    @staticmethod
+    def write_data_report():
+        config = Scruf.state.config
+        if not is_valid_keys(ConfigKeys.OUTPUT_PATH_KEYS, config) \
+                or get_value_from_keys(ConfigKeys.DATA_REPORT_KEYS, config, default=False) is not True:
+            return
+        with open(Scruf.data_report_path(config), 'w') as f:
+            json.dump(Scruf.state.data_loader.report(), f, indent=4)
+
+    # Everything that processes the users, once the data sources are set up
+    @staticmethod
+    def setup_pipeline():
         # Fairness agents
         Scruf.state.agents.setup(Scruf.state.config)
-        # Data sources
-        Scruf.state.user_data.setup(Scruf.state.config)
-        Scruf.state.item_features.setup(Scruf.state.config)
-        Scruf.state.context.setup(Scruf.state.config)
         # Mechanisms
         amech_props = Scruf.get_value_from_keys(['allocation', 'properties'], default={})
         Scruf.state.allocation_mechanism.setup(amech_props)
@@ -75,13 +130,54 @@ class Scruf:
         Scruf.state.post_processor.setup(post_props)
         # Bookkeeping
         Scruf.state.history.setup(Scruf.state.config)
+        Scruf.state.evaluators.setup(Scruf.state.config)
 
-    def run_experiment(self, progress=False):
-        Scruf.setup_experiment()
-        self.run_loop(iterations=Scruf.state.iterations, progress=progress)
+    # Restores the simulation state from a checkpoint, in place of setup_experiment(). The input data
+    # is loaded again; everything else comes from the checkpoint. Returns the index of the last user
+    # processed before the checkpoint.
+    @staticmethod
+    def resume_experiment(checkpoint):
+        Scruf.setup_data()
+        post_props = Scruf.get_value_from_keys(['post', 'properties'], default={})
+        Scruf.state.post_processor.setup(post_props)
+        return checkpoint.restore(Scruf.state)
+
+    # If a [cache] section is configured, a run whose configuration, input data and code have been seen
+    # before restores the stored history and metrics instead of simulating. force=True always simulates
+    # (and refreshes the cache entry).
+    # If a [checkpoint] section is configured, the state is saved every `interval` users, and
+    # resume=True continues from the last checkpoint (if there is one) instead of starting over.
+    def run_experiment(self, progress=False, force=False, resume=False):
+        config = Scruf.state.config
+        cache = ResultCache.from_config(config)
+        if cache is not None and not force:
+            if cache.restore(config, Scruf.artifact_paths(config)):
+                Scruf.post_process()
+                return
+        checkpoint = Checkpoint.from_config(config)
+        iterations = Scruf.state.iterations
+        if resume and checkpoint is not None and checkpoint.exists():
+            last_user_index = Scruf.resume_experiment(checkpoint)
+            if iterations != -1:
+                iterations = max(iterations - (last_user_index + 1), 0)
+            self.run_loop(iterations=iterations, restart=False, progress=progress, checkpoint=checkpoint)
+        else:
+            Scruf.setup_experiment()
+            self.run_loop(iterations=iterations, progress=progress, checkpoint=checkpoint)
         Scruf.cleanup_experiment()
+        if checkpoint is not None:
+            checkpoint.finish()
+        if cache is not None:
+            cache.store(config, Scruf.artifact_paths(config))
         Scruf.post_process()
 
+    # Output files of a completed simulation (before post-processing), keyed by role
+    @staticmethod
+    def artifact_paths(config):
+        paths = {'history': ScrufHistory.artifact_path(config)}
+        paths.update(EvaluatorCollection.artifact_paths(config))
+        return paths
+
     # Get next user
     # Calculate fairness and compatibility
     # Run allocation mechanism
@@ -89,38 +185,51 @@ class Scruf:
     # Run choice mechanism
     # Produce final recommendation list
     # Update the history log
+    # Update the online evaluators (if any)
+    # Save a checkpoint (if due)
+    # Call the callback (if any) with the output
     # Loop
-    def run_loop(self, iterations=-1, restart=True, progress=False):
-        agents = Scruf.state.agents
-        history = Scruf.state.history
-        context = Scruf.state.context
-        amech = Scruf.state.allocation_mechanism
-        cmech = Scruf.state.choice_mechanism
-
-
+    def run_loop(self, iterations=-1, restart=True, progress=False, checkpoint=None, callback=None):
         if progress:
+            from tqdm import tqdm
             user_data = tqdm(Scruf.state.user_data.user_iterator(iterations, restart=restart))
         else:
             user_data = Scruf.state.user_data.user_iterator(iterations, restart=restart)
 
         for user_info in user_data:
-            allocation = amech.do_allocation(user_info)
-            cmech.do_choice(allocation, user_info)
-            history.write_current_state()
-
+            output = Scruf.process_user(user_info)
+            if checkpoint is not None and checkpoint.is_due(Scruf.state.user_data.current_user_index + 1):
+                checkpoint.save(Scruf.state)
+            if callback is not None:
+                callback(output)
 
+    # One step of the loop for the user that has just arrived. Returns the output list. flush=False leaves
+    # the history file unflushed, for callers that process users in batches.
+    @staticmethod
+    def process_user(user_info, flush=True):
+        history = Scruf.state.history
+        evaluators = Scruf.state.evaluators
+        allocation = Scruf.state.allocation_mechanism.do_allocation(user_info)
+        output = Scruf.state.choice_mechanism.do_choice(allocation, user_info)
+        history.write_current_state(flush=flush)
+        if not evaluators.is_empty():
+            rec_ballot = history.choice_input_history.get_most_recent().get_ballot(BallotCollection.REC_NAME)
+            evaluators.consume(rec_ballot.prefs, output)
+        return output
 
     @staticmethod
     def cleanup_experiment():
         Scruf.state.history.cleanup()
+        Scruf.state.evaluators.cleanup()
+        Scruf.write_data_report()
 
     @staticmethod
     def post_process():
         # Post processing needs setup
         post_props = Scruf.get_value_from_keys(['post', 'properties'], default={})
         Scruf.state.post_processor.setup(post_props)
-        # Also need item features
-        Scruf.state.item_features.setup(Scruf.state.config)
+        # And the data it reads, unless the simulation has loaded it
+        Scruf.load_data([('post', Scruf.state.post_processor)])
         # Do the evaluation
         Scruf.state.post_processor.process()
 
@@ -1,4 +1,4 @@
-from .errors import ScrufError, PropertyMismatchError, \
+from .errors import ScrufError, PropertyMismatchError, PropertyTypeError, \
     InvalidFairnessMetricError, UnregisteredFairnessMetricError, \
     InvalidCompatibilityMetricError, UnregisteredCompatibilityMetricError, \
     ConfigFileError, ConfigKeyMissingError, InputListLengthError, \
@@ -10,12 +10,17 @@ from .errors import ScrufError, PropertyMismatchError, \
     InvalidContextClassError, UnregisteredContextClassError, \
     MissingFeatureDataFilenameError, PathDoesNotExistError, ContextNotFoundError, \
     UnknownCollapseParameterError, InvalidPostProcessorError, UnregisteredPostProcessorError, \
-    FeatureFileFormatError
+    FeatureFileFormatError, InvalidEvaluatorError, UnregisteredEvaluatorError, InvalidWindowModeError, \
+    InvalidSkippedValuesError, CheckpointFormatError, RerankRequestError, ShardFailedError, UnknownDataSourceError
 from .result_list import ResultList, ResultEntry
 from .history_collection import HistoryCollection
 from .config_util import is_valid_keys, get_value_from_keys, check_key_lists, ConfigKeys, get_working_dir_path, \
-    get_path_from_keys
+    get_path_from_keys, ensure_boolean, get_artifact_path
 from .property_collection import PropertyCollection, PropertyMixin
 from .ballot_collection import Ballot, BallotCollection
+from .csv_cache import CSVRowCache
+from .exposure_distribution import FenwickTree, ExposureDistribution
+from .sketches import CountMinSketch, HyperLogLog, QuantileSketch, ExposureSketch, in_hash_sample
 from .util import normalize_score_dict, collapse_score_dict, ensure_list, maybe_number, \
     dict_vector_dot, dict_vector_multiply, dict_vector_scale
+from .lazy_import import resolve_class, lazy_attributes
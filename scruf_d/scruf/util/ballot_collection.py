@@ -1,7 +1,6 @@
 from .result_list import ResultList
-from collections import defaultdict
 from copy import deepcopy
-from icecream import ic
+import numpy as np
 
 class BallotCollection:
     REC_NAME = '__rec'
@@ -21,6 +20,12 @@ class BallotCollection:
         result.ballots = deepcopy(self.ballots, memo)
         return result
 
+    # Copy-on-write copy: new ballots whose preference lists share entries with these ones
+    def view(self):
+        result = BallotCollection()
+        result.ballots = {name: ballot.view() for name, ballot in self.ballots.items()}
+        return result
+
     def get_count(self):
         return len(self.ballots)
 
@@ -50,28 +55,46 @@ class BallotCollection:
             names = set(self.get_names()).difference(names)
         for name in names:
             if copy:
-                ballot = self.ballots[name]
-                new_bcoll.set_ballot(ballot.name, ballot.prefs, ballot.weight)
+                new_bcoll.ballots[name] = self.ballots[name].view()
             else:
                 new_bcoll.ballots[name] = self.ballots[name]
         return new_bcoll
 
-    def merge(self, user, ignore_weight=False):
-        output = ResultList()
-        score_table = defaultdict(float)
-        ballot_name = BallotCollection.REC_NAME
-        for ballot in self.get_ballots():
-            ballot_name = ballot.name
-            for entry in ballot.prefs.get_results():
-                if ignore_weight:
-                    score_table[entry.item] += entry.score
-                else:
-                    score_table[entry.item] += entry.score * ballot.weight
-
-        item_set = {entry.item for entry in self.get_ballot(ballot_name).entry_iterator()}
-        triples_list = [(user, item, score_table[item]) for item in item_set]
-        output.setup(triples_list, presorted=False)
-        return output
+    # Aligns the ballots to a shared candidate index: the items of the last ballot, in its order.
+    # Returns the candidate items, a ballots x candidates score matrix and the weight vector. Items that
+    # a ballot does not score get missing_score; items that are not in the last ballot are dropped.
+    # Assumes an item appears at most once per ballot.
+    def aligned_scores(self, missing_score=0.0):
+        ballots = list(self.get_ballots())
+        last_name = ballots[-1].name if len(ballots) > 0 else BallotCollection.REC_NAME
+        items = [entry.item for entry in self.get_ballot(last_name).entry_iterator()]
+        index = {item: pos for pos, item in enumerate(items)}
+
+        matrix = np.full((len(ballots), len(items)), missing_score, dtype=np.float64)
+        for row, ballot in enumerate(ballots):
+            positions = []
+            scores = []
+            for entry in ballot.entry_iterator():
+                pos = index.get(entry.item)
+                if pos is not None:
+                    positions.append(pos)
+                    scores.append(entry.score)
+            matrix[row, positions] = scores
+        weights = np.array([ballot.weight for ballot in ballots], dtype=np.float64)
+        return items, matrix, weights
+
+    # Weighted sum of the ballot scores for the items in the last ballot, sorted. If k is given, only
+    # the top k are kept. Ties keep the order of the last ballot.
+    def merge(self, user, ignore_weight=False, k=None, missing_score=0.0):
+        items, matrix, weights = self.aligned_scores(missing_score=missing_score)
+        if ignore_weight:
+            weights = np.ones(len(weights))
+        # Equivalent to weights @ matrix, but accumulated one ballot at a time so that the sums are
+        # added in the same order as before and come out bit-for-bit the same.
+        totals = np.zeros(len(items))
+        for row in range(len(weights)):
+            totals += matrix[row] * weights[row]
+        return ResultList.from_scores(user, items, totals, k=k)
 
 
 class Ballot:
@@ -92,6 +115,9 @@ class Ballot:
         result.prefs = deepcopy(self.prefs, memo)
         return result
 
+    def view(self):
+        return Ballot(self.name, self.prefs.view(), self.weight)
+
     def intersect_results(self, results: ResultList):
         return self.prefs.intersection(results)
 
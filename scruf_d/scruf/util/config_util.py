@@ -1,6 +1,7 @@
 # Utilities for working with the TOML input
 from scruf.util.errors import ConfigKeyMissingError, PathDoesNotExistError
 import scruf
+import os
 from pathlib import Path
 
 class ConfigKeys:
@@ -8,7 +9,16 @@ class ConfigKeys:
     FEATURE_FILENAME_KEYS = ['data', 'feature_filename']
     OUTPUT_PATH_KEYS = ['output', 'filename']
     WINDOW_SIZE_KEYS = ['parameters', 'history_window_size']
+    WINDOW_MODE_KEYS = ['parameters', 'window']
+    HALF_LIFE_KEYS = ['parameters', 'half_life']
+    SKIPPED_VALUES_KEYS = ['parameters', 'skipped_values']
     DATA_FILENAME_KEYS = ['data', 'rec_filename']
+    CHECKPOINT_INTERVAL_KEYS = ['checkpoint', 'interval']
+    CHECKPOINT_PATH_KEYS = ['checkpoint', 'path']
+    SERVICE_KEYS = ['service']
+    REPLICATES_KEYS = ['replicates']
+    SHARDING_KEYS = ['sharding']
+    DATA_REPORT_KEYS = ['output', 'data_report']
 
 
 def is_valid_keys(key_list, config):
@@ -64,3 +74,12 @@ def get_path_from_keys(keys, config, check_exists=False):
             raise PathDoesNotExistError(full_path, keys)
     else:
         return full_path
+
+
+# The file that the keys give, relative to the working directory, or by default the history file's name
+# with the suffix in place of its extension (for the files that a run writes next to its history)
+def get_artifact_path(keys, config, suffix):
+    if is_valid_keys(keys, config):
+        return get_path_from_keys(keys, config)
+    history_file_name = get_value_from_keys(ConfigKeys.OUTPUT_PATH_KEYS, config)
+    return get_working_dir_path(config) / (os.path.splitext(history_file_name)[0] + suffix)
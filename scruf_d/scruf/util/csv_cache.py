@@ -0,0 +1,46 @@
+import csv
+import os
+
+
+class CSVRowCache:
+    """
+    Holds the parsed rows of input CSV files so that a sequence of experiments on the same data
+    (e.g. a group of configurations from a ConfigGrid) only reads and tokenizes each file once.
+    Caching is off by default; when it is off, read_rows just reads the file. Rows are shared between
+    callers and must not be modified. Entries are keyed by path, size and modification time so a
+    changed file is read again. Note these are all class methods.
+    """
+
+    _rows = {}
+    _enabled = False
+
+    @classmethod
+    def enable(cls):
+        cls._enabled = True
+
+    # Turning the cache off also releases the memory it holds
+    @classmethod
+    def disable(cls):
+        cls._enabled = False
+        cls._rows = {}
+
+    @classmethod
+    def is_enabled(cls):
+        return cls._enabled
+
+    @classmethod
+    def read_rows(cls, path, skipinitialspace=False):
+        if not cls._enabled:
+            return cls._read(path, skipinitialspace)
+        stat = os.stat(path)
+        key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, skipinitialspace)
+        rows = cls._rows.get(key)
+        if rows is None:
+            rows = cls._read(path, skipinitialspace)
+            cls._rows[key] = rows
+        return rows
+
+    @staticmethod
+    def _read(path, skipinitialspace):
+        with open(path, 'r', newline='') as csvfile:
+            return list(csv.reader(csvfile, skipinitialspace=skipinitialspace))
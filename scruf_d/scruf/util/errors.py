@@ -10,6 +10,12 @@ class PropertyMismatchError(ScrufError):
         super().__init__(self.message)
 
 
+class PropertyTypeError(ScrufError):
+    def __init__(self, obj, name, value, property_type):
+        self.message = f'Creating {obj.__class__} Property {name} should be of type {property_type.__name__}: {value!r}'
+        super().__init__(self.message)
+
+
 class InvalidFairnessMetricError(ScrufError):
     def __init__(self, name):
         self.message = f'Cannot create fairness metric: Class {name} is not a subclass of FairnessMetric.'
@@ -165,4 +171,54 @@ class FeatureFileFormatError(ScrufError):
     def __init__(self, file, row):
 
         self.message = f'Error in item feature file {file} Row representation: {row}.'
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+
+class InvalidEvaluatorError(ScrufError):
+    def __init__(self, name):
+        self.message = f'Cannot create evaluator: Class {name} is not a subclass of Evaluator.'
+        super().__init__(self.message)
+
+
+class UnregisteredEvaluatorError(ScrufError):
+    def __init__(self, name):
+        self.message = f'Cannot create evaluator: Class {name} is not registered and may not exist.'
+        super().__init__(self.message)
+
+
+class InvalidWindowModeError(ScrufError):
+    def __init__(self, mode, half_life=None):
+        self.message = f'Unknown history window mode {mode} (half life {half_life}). ' \
+                       f'Use "fixed" or "decay" with a positive half_life.'
+        super().__init__(self.message)
+
+
+class InvalidSkippedValuesError(ScrufError):
+    def __init__(self, mode):
+        self.message = f'Unknown setting {mode} for the skipped values. Use "lazy" or "nan".'
+        super().__init__(self.message)
+
+
+class CheckpointFormatError(ScrufError):
+    def __init__(self, path):
+        self.message = f'File {path} is not a SCRUF checkpoint.'
+        super().__init__(self.message)
+
+
+class RerankRequestError(ScrufError):
+    def __init__(self, reason):
+        self.message = f'Invalid re-ranking request: {reason}'
+        super().__init__(self.message)
+
+
+class ShardFailedError(ScrufError):
+    def __init__(self, shard, details):
+        self.message = f'Shard {shard} of a sharded run failed:\n{details}'
+        super().__init__(self.message)
+
+
+class UnknownDataSourceError(ScrufError):
+    def __init__(self, source, component=None):
+        where = f' (needed by {component})' if component is not None else ''
+        self.message = f'Unknown data source {source}{where}. Known sources: recs, item_features, context, popularity.'
+        super().__init__(self.message)
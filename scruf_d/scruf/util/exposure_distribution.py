@@ -0,0 +1,132 @@
+import numpy as np
+
+# Distribution of per-item exposure counts over a catalog, with the Gini index kept up to date as
+# single exposures are added and removed.
+#
+# The Gini index is D / (n * S), where D is the sum over unordered pairs of items of |x_i - x_j|, n the
+# number of items and S the total exposure. When one item goes from count c to c + 1, each other item
+# with a count <= c is one further away and each other item with a count > c is one closer, so D changes
+# by (items <= c) - (items > c). A Fenwick tree indexed by count value gives the number of items at or
+# below a count in O(log max count), so an update costs O(log max count) instead of a sort.
+#
+# Items that have not been exposed count as zeros. The catalog size is given up front; an item beyond
+# it (not in the catalog data) adds one more item to the catalog.
+
+
+class FenwickTree:
+    """
+    Prefix sums over the counts of the values 0 .. size-1, with single-value updates. The size grows
+    (in powers of two) to fit whatever value is updated.
+    """
+
+    def __init__(self, size=16):
+        capacity = 1
+        while capacity < size:
+            capacity *= 2
+        # 1-based: tree[i] holds the sum of the values (i - lowbit(i), i]
+        self.tree = [0] * (capacity + 1)
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def _grow(self, size):
+        while len(self) < size:
+            capacity = len(self)
+            old_total = self.tree[capacity]
+            # The new upper half is empty, so only its last node (which covers everything) is non-zero
+            self.tree.extend([0] * capacity)
+            self.tree[2 * capacity] = old_total
+
+    def add(self, value, count=1):
+        if value >= len(self):
+            self._grow(value + 1)
+        i = value + 1
+        while i < len(self.tree):
+            self.tree[i] += count
+            i += i & -i
+
+    # Number of entries with a value <= value
+    def prefix(self, value):
+        if value < 0:
+            return 0
+        i = min(value + 1, len(self))
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class ExposureDistribution:
+
+    def __init__(self, num_items=0):
+        self.num_items = num_items
+        self.counts = {}
+        self.total = 0
+        self.pair_diff = 0
+        self.values = FenwickTree()
+        self.values.add(0, num_items)
+
+    def __repr__(self):
+        return f"<ExposureDistribution: {self.num_items} items, {self.total} exposures, gini {self.gini():.4f}>"
+
+    def count(self, item):
+        return self.counts.get(item, 0)
+
+    def add(self, item):
+        count = self.counts.get(item, 0)
+        if count == 0 and len(self.counts) == self.num_items:
+            # Not room for another exposed item: the catalog was larger than num_items. The new item
+            # starts at zero, which is |0 - x_j| = x_j from every other item.
+            self.num_items += 1
+            self.values.add(0)
+            self.pair_diff += self.total
+        at_or_below = self.values.prefix(count) - 1
+        above = self.num_items - 1 - at_or_below
+        self.pair_diff += at_or_below - above
+        self.values.add(count, -1)
+        self.values.add(count + 1)
+        self.counts[item] = count + 1
+        self.total += 1
+
+    # The item must have been added
+    def remove(self, item):
+        count = self.counts[item]
+        below = self.values.prefix(count - 1)
+        at_or_above = self.num_items - 1 - below
+        self.pair_diff += at_or_above - below
+        self.values.add(count, -1)
+        self.values.add(count - 1)
+        if count == 1:
+            del self.counts[item]
+        else:
+            self.counts[item] = count - 1
+        self.total -= 1
+
+    def add_items(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove_items(self, items):
+        for item in items:
+            self.remove(item)
+
+    def gini(self):
+        if self.total == 0 or self.num_items == 0:
+            return 0.0
+        return self.pair_diff / (self.num_items * self.total)
+
+    def coverage(self):
+        if self.num_items == 0:
+            return 0.0
+        return len(self.counts) / self.num_items
+
+    # Reference computation from the counts, sorted: sum_i (2i - n - 1) x_i / (n * S)
+    def gini_from_counts(self):
+        if self.total == 0 or self.num_items == 0:
+            return 0.0
+        values = np.sort(np.array(list(self.counts.values()), dtype=np.float64))
+        n = self.num_items
+        # The zeros come first in sorted order, so the exposed items have ranks n - len + 1 .. n
+        ranks = np.arange(n - len(values) + 1, n + 1)
+        return float(((2 * ranks - n - 1) * values).sum() / (n * self.total))
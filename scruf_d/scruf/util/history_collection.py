@@ -22,6 +22,13 @@ class HistoryCollection:
         for item in items:
             self.add_item(item)
 
+    # Shallow copy: the same entries and time stamps, in a collection of its own
+    def copy(self):
+        result = HistoryCollection(self.window_size)
+        result.collection = self.collection.copy()
+        result.time = self.time
+        return result
+
     def get_most_recent(self):
         if len(self.collection) > 0:
             return self.collection[0].item
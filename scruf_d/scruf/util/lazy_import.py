@@ -0,0 +1,23 @@
+import importlib
+
+# Deferred imports, for modules with heavy dependencies (whalrus, pandas, asyncio) that most configurations
+# do not use. A factory can register a type by module and class name instead of by class (see, e.g.,
+# ChoiceMechanismFactory.register_lazy_choice_mechanisms), and a package can make names available without
+# importing their modules (lazy_attributes). Either way, the module is imported the first time it is used.
+
+
+def resolve_class(module_name, class_name):
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+# Returns a module __getattr__ (PEP 562) for the package: attributes maps each name to the module that
+# defines it, relative to the package.
+def lazy_attributes(package, attributes):
+    def __getattr__(name):
+        if name not in attributes:
+            raise AttributeError(f'module {package!r} has no attribute {name!r}')
+        value = getattr(importlib.import_module(attributes[name], package), name)
+        # Later lookups find the name in the package itself
+        setattr(importlib.import_module(package), name, value)
+        return value
+    return __getattr__
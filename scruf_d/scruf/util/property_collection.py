@@ -1,5 +1,6 @@
 from abc import ABC
-from .errors import PropertyMismatchError
+from .errors import PropertyMismatchError, PropertyTypeError
+from .config_util import ensure_boolean
 
 class PropertyCollection:
     def __init__(self):
@@ -48,12 +49,45 @@ class PropertyCollection:
 
 
 class PropertyMixin():
+    """
+    Properties named in _PROPERTY_TYPES (name -> float, int, bool or str) are checked and converted once,
+    at setup, into attributes of the same name (e.g. self.recommender_weight), so that code that runs
+    for every user does not look them up and parse them again. A subclass adds to the types of its
+    parents. bool accepts True/False and the strings "true"/"false" in any case.
+    """
+
+    _PROPERTY_TYPES = {}
 
     def __init__(self):
         self.prop_coll = PropertyCollection()
 
     def setup(self, input_properties: dict, names=None):
         self.prop_coll.setup(input_properties, names=names)
+        self.compile_properties()
+
+    @classmethod
+    def property_types(cls):
+        types = {}
+        for klass in reversed(cls.__mro__):
+            types.update(klass.__dict__.get('_PROPERTY_TYPES', {}))
+        return types
+
+    def compile_properties(self):
+        properties = self.get_properties()
+        for name, property_type in self.property_types().items():
+            if name in properties:
+                setattr(self, name, self.convert_property(name, properties[name], property_type))
+
+    def convert_property(self, name, value, property_type):
+        if property_type is bool:
+            value = ensure_boolean(value)
+            if not isinstance(value, bool):
+                raise PropertyTypeError(self, name, value, property_type)
+            return value
+        try:
+            return property_type(value)
+        except (TypeError, ValueError):
+            raise PropertyTypeError(self, name, value, property_type)
 
     def configure_names(self, thisclass_props, subclass_props):
         if subclass_props is None:
@@ -1,4 +1,6 @@
 from collections import defaultdict
+import heapq
+import numpy as np
 
 
 class ResultEntry:
@@ -16,17 +18,56 @@ class ResultEntry:
 
 # TODO: Probably should have some kind of 'dirty' flag, so that when the list is changed but not
 # sorted, some functions can either fail or force sort.
+# Copy on write: view() returns a list that shares the entries and the Python list with this one. A list
+# whose entries are shared copies them before it changes a score or rank, and a list that does not own
+# its Python list copies it (once) before it appends, so a view costs one list object until somebody
+# modifies it. Code that changes entries should go through the methods here rather than setting
+# entry.score directly.
+# Removing the top: remove_top() only moves a head offset past the first entry, without changing the
+# Python list, so it is O(1) and needs no copy on a view. The removed entries are dropped the next time
+# the list itself is used (through results or get_results()).
+# Item index: contains_item() and position_of() use an item -> position dict that is built on first use
+# and kept up to date by remove_top() and the add methods, and rebuilt after anything that reorders the
+# list. Positions in the dict are offset by the number of entries removed from the top since it was
+# built, so that removing the top does not shift every position. Assumes each item appears at most once.
 class ResultList:
 
+    # Partial selection only pays off when the list is much longer than k. Below this ratio, sort(k)
+    # does a full sort (timsort is faster than heapq.nlargest up to a few hundred entries for k=10).
+    PARTIAL_SORT_RATIO = 40
+
     def __repr__(self):
         return f'Result: {self.results}'
 
     def __init__(self):
-        self.results = []
-
+        self._entries = []
+        self._head = 0
+        self._owns_list = True
+        self._shared = False
+        self._index = None
+        self._index_offset = 0
+
+    # The entries from the head on. Drops the entries removed from the top, if there are any.
+    @property
+    def results(self):
+        if self._head > 0:
+            self._entries = self._entries[self._head:]
+            self._head = 0
+            self._owns_list = True
+        return self._entries
+
+    @results.setter
+    def results(self, results):
+        self._entries = results
+        self._head = 0
+        self._owns_list = True
+
+    # A shallow copy shares the entries (as it always has). If those entries are shared with a view,
+    # the copy is shared too.
     def __copy__(self):
         result_list = ResultList()
         result_list.results = self.results.copy()
+        result_list._shared = self._shared
         return result_list
 
     def __deepcopy__(self, memodict={}):
@@ -36,18 +77,72 @@ class ResultList:
             result_list.results.append(result)
         return result_list
 
+    # Builds a sorted (and ranked) list from parallel item and score arrays, keeping only the top k
+    # if k is given.
+    @staticmethod
+    def from_scores(user, items, scores: np.ndarray, k=None):
+        output = ResultList()
+        order = top_k_indices(scores, k)
+        score_values = scores[order].tolist()
+        output.results = [ResultEntry(user=user, item=items[pos], score=score, rank=rank)
+                          for rank, (pos, score) in enumerate(zip(order.tolist(), score_values))]
+        return output
+
+    def view(self):
+        result_list = ResultList()
+        result_list._entries = self._entries
+        result_list._head = self._head
+        result_list._owns_list = False
+        result_list._shared = True
+        self._owns_list = False
+        self._shared = True
+        return result_list
+
+    def is_shared(self):
+        return self._shared
+
+    def _invalidate_index(self):
+        self._index = None
+        self._index_offset = 0
+
+    def _item_index(self):
+        if self._index is None:
+            index = {}
+            for pos, entry in enumerate(self.results):
+                index.setdefault(entry.item, pos)
+            self._index = index
+            self._index_offset = 0
+        return self._index
+
+    # Copy the entries before modifying them, if they are shared
+    def _materialize(self):
+        if self._shared:
+            self.results = [ResultEntry(user=entry.user, item=entry.item, score=entry.score, rank=entry.rank)
+                            for entry in self.results]
+            self._shared = False
+
+    # Copy the list (but not the entries) before adding to it, if it is shared. After the copy this list
+    # owns it, so later additions do not copy again.
+    def _own_list(self):
+        if not self._owns_list:
+            self.results = self._entries[self._head:]
+
     def setup(self, triples, presorted=False, trim=0):
         self.results = []
+        self._shared = False
+        self._invalidate_index()
         # Test for length of triples. If > 3, signal file format error
         for user, item, rating in triples:
             result = ResultEntry(user=user, item=item, score=float(rating), rank=-1)
             self.results.append(result)
 
-        if not presorted:
-            self.sort()
-
         if trim > 0:
+            # Only the entries that are kept need to be sorted
+            if not presorted:
+                self.sort(k=trim, keep_tail=False)
             self.trim(trim)
+        elif not presorted:
+            self.sort()
 
     # Assumes all results are for the same user
     def get_user(self):
@@ -64,14 +159,28 @@ class ResultList:
             yield entry.item
 
     def get_length(self):
-        return len(self.results)
+        return len(self._entries) - self._head
+
+    # The first entry, or None if the list is empty. Unlike get_results()[0], this does not drop the
+    # entries removed from the top.
+    def get_top(self):
+        if self._head < len(self._entries):
+            return self._entries[self._head]
+        return None
 
     def remove_result(self, item):
         self.results = keyed_delete(self.results, item, key=lambda entry: entry.item)
+        self._invalidate_index()
 
     # Assumes sorted
     def remove_top(self):
-        self.results = self.results[1:]
+        if self._head == len(self._entries):
+            return
+        top = self._entries[self._head]
+        self._head += 1
+        if self._index is not None:
+            del self._index[top.item]
+            self._index_offset += 1
 
     # Assumes the list is sorted
     def score_range(self):
@@ -81,44 +190,94 @@ class ResultList:
 
     def add_result(self, user, item, score, sort=False):
         new_entry = ResultEntry(user=user, item=item, score=score, rank=-1)
-        self.results.append(new_entry)
-        if sort:
-            self.sort()
+        self.add_result_entry(new_entry, sort=sort)
 
     def add_result_entry(self, entry: ResultEntry, sort=False):
+        self._own_list()
         self.results.append(entry)
+        if self._index is not None:
+            self._index.setdefault(entry.item, len(self.results) - 1 + self._index_offset)
         if sort:
             self.sort()
 
-    # In addition to sorting, also sets the rank value
-    def sort(self):
-        sorted_results = sorted(self.results, key=lambda result: result.score, reverse=True)
-        for i in range(0, len(sorted_results)):
-            sorted_results[i].rank= i
-
-        self.results = sorted_results
-
-    # Assumes the list is sorted.
+    # In addition to sorting, also sets the rank value. If k is given, only the top k entries are
+    # selected, sorted and ranked; the rest follow in their original order with rank -1 (or are dropped,
+    # if keep_tail is False). The top k are the same entries in the same order as the first k after a
+    # full sort (heapq.nlargest breaks ties like a stable sort), and sorting the whole list later gives
+    # the same result as sorting it now. Short lists are fully sorted, so the tail may come back sorted.
+    def sort(self, k=None, keep_tail=True):
+        if self._is_sorted():
+            # Nothing would change (and there is no need to copy shared entries)
+            return
+        self._materialize()
+        self._invalidate_index()
+        if k is None or len(self.results) <= k * ResultList.PARTIAL_SORT_RATIO:
+            sorted_results = sorted(self.results, key=lambda result: result.score, reverse=True)
+            for i in range(0, len(sorted_results)):
+                sorted_results[i].rank= i
+            self.results = sorted_results
+            if k is not None and not keep_tail:
+                self.trim(k)
+            return
+
+        top_results = heapq.nlargest(k, self.results, key=lambda result: result.score)
+        for i in range(0, len(top_results)):
+            top_results[i].rank = i
+        if not keep_tail:
+            self.results = top_results
+            return
+        top_ids = {id(result) for result in top_results}
+        tail = [result for result in self.results if id(result) not in top_ids]
+        for result in tail:
+            result.rank = -1
+        self.results = top_results + tail
+
+    def _is_sorted(self):
+        results = self.results
+        for i in range(0, len(results)):
+            if results[i].rank != i or (i > 0 and results[i].score > results[i - 1].score):
+                return False
+        return True
+
+    # Assumes the list is sorted (or sorted with k >= new_length).
     def trim(self, new_length):
         if len(self.results) > new_length:
             self.results = self.results[0:new_length]
+            self._invalidate_index()
 
     def rescore(self, score_fn):
         self.rescore_no_sort(score_fn)
         self.sort()
 
     def rescore_no_sort(self, score_fn):
+        self._materialize()
         for result in self.results:
             new_score = score_fn(result)
             result.score = new_score
 
+    # Assigns the scores in list order and re-sorts
+    def set_scores(self, scores, sort=True):
+        self._materialize()
+        for result, score in zip(self.results, scores):
+            result.score = score
+        if sort:
+            self.sort()
+
     def filter_results(self, filter_fn):
         output = ResultList()
         output.results = list(filter(filter_fn, self.results))
+        output._shared = self._shared
         return output
 
     def contains_item(self, item):
-        return item in [entry.item for entry in self.results]
+        return item in self._item_index()
+
+    # Position of the item in the list, or -1 if it is not there
+    def position_of(self, item):
+        pos = self._item_index().get(item)
+        if pos is None:
+            return -1
+        return pos - self._index_offset
 
     @staticmethod
     # Assumes all the same user. Maybe should check for this
@@ -165,6 +324,24 @@ class ResultList:
         return this_items.intersection(other_items)
 
 
+# Positions of the k highest scores, highest first. Equal scores keep their original order, which is
+# the order a stable descending sort gives. k=None means all of them.
+def top_k_indices(scores: np.ndarray, k=None):
+    n = len(scores)
+    if k is None or k >= n:
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    # Partial selection: everything above the k-th largest score, then as many of the entries equal to
+    # it as are needed, in position order.
+    threshold = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > threshold)
+    tied = np.flatnonzero(scores == threshold)[0:k - len(above)]
+    selected = np.concatenate([above, tied])
+    selected.sort()
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
 # Non-destructive
 def keyed_delete(lst, item, key=None):
     if key is None:
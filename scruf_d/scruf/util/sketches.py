@@ -0,0 +1,264 @@
+import hashlib
+import math
+import numpy as np
+
+# Fixed-memory approximate counters for exposure statistics over very large catalogs, where an exact
+# per-item count dictionary would not fit. Items are hashed with blake2b (not the built-in hash(), which
+# changes from process to process), so the estimates are reproducible.
+#
+# CountMinSketch: per-item counts, overestimated by at most epsilon * total with probability 1 - delta.
+# HyperLogLog: number of distinct items, with relative standard error about `error`. If a window is
+# given, each register remembers when each value was last seen, so that the estimate can be restricted
+# to the most recent `window` time steps.
+# QuantileSketch: a distribution of non-negative values with relative accuracy alpha (logarithmic
+# buckets, as in DDSketch), which also supports removing values. Gives quantiles, min, max and the Gini
+# index of the distribution.
+# ExposureSketch combines the three (plus a hash sample of items) to track per-item exposure over a catalog.
+
+
+def item_hash(item):
+    return int.from_bytes(hashlib.blake2b(str(item).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+# Whether the item is in the hash sample with the given threshold (sample_rate * 2^64). A different hash
+# from the one the sketches use, so the sample is independent of them.
+def in_hash_sample(item, threshold):
+    return item_hash(('sample', item)) < threshold
+
+
+class CountMinSketch:
+
+    def __init__(self, epsilon=0.001, delta=0.01):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1.0 / delta)))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.rows = np.arange(self.depth)
+        self.total = 0
+
+    # Column of the item in each row, from two 32-bit halves of one hash
+    def _columns(self, item):
+        hash_value = item_hash(item)
+        low = hash_value & 0xFFFFFFFF
+        high = hash_value >> 32
+        return (low + self.rows * high) % self.width
+
+    # Conservative update: only the rows at the current minimum are raised, which keeps the
+    # overestimate smaller. Returns the estimate before the update.
+    def add(self, item, count=1):
+        columns = self._columns(item)
+        values = self.table[self.rows, columns]
+        estimate = int(values.min())
+        self.table[self.rows, columns] = np.maximum(values, estimate + count)
+        self.total += count
+        return estimate
+
+    def estimate(self, item):
+        return int(self.table[self.rows, self._columns(item)].min())
+
+    def nbytes(self):
+        return self.table.nbytes
+
+
+class HyperLogLog:
+
+    def __init__(self, error=0.01, window=None):
+        self.error = error
+        # Standard error is about 1.04 / sqrt(m)
+        self.precision = max(4, int(math.ceil(math.log2((1.04 / error) ** 2))))
+        self.m = 1 << self.precision
+        self.window = window
+        self.max_rank = 64 - self.precision + 1
+        if window is None:
+            self.registers = np.zeros(self.m, dtype=np.int8)
+        else:
+            # Last time each (register, rank) was seen, -1 for never
+            self.last_seen = np.full((self.m, self.max_rank + 1), -1, dtype=np.int64)
+        self.time = 0
+        if self.m >= 128:
+            self.alpha = 0.7213 / (1 + 1.079 / self.m)
+        else:
+            self.alpha = {16: 0.673, 32: 0.697, 64: 0.709}[self.m]
+
+    def add(self, item):
+        hash_value = item_hash(item)
+        register = hash_value & (self.m - 1)
+        rest = hash_value >> self.precision
+        # Rank: position of the lowest set bit of the remaining bits
+        rank = (rest & -rest).bit_length() if rest != 0 else self.max_rank
+        if self.window is None:
+            if rank > self.registers[register]:
+                self.registers[register] = rank
+        else:
+            self.last_seen[register, rank] = self.time
+
+    # Advances the clock used by the window (one step per list, in the metrics)
+    def tick(self):
+        self.time += 1
+
+    def _current_registers(self):
+        if self.window is None:
+            return self.registers.astype(np.float64)
+        recent = self.last_seen >= self.time - self.window
+        # Highest rank seen within the window, 0 if none
+        ranks = np.where(recent.any(axis=1), self.max_rank - np.argmax(recent[:, ::-1], axis=1), 0)
+        return ranks.astype(np.float64)
+
+    def estimate(self):
+        registers = self._current_registers()
+        raw = self.alpha * self.m * self.m / np.sum(2.0 ** -registers)
+        zeros = int(np.count_nonzero(registers == 0))
+        # Small range correction (linear counting)
+        if raw <= 2.5 * self.m and zeros > 0:
+            return self.m * math.log(self.m / zeros)
+        return float(raw)
+
+    def nbytes(self):
+        return self.registers.nbytes if self.window is None else self.last_seen.nbytes
+
+
+class QuantileSketch:
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        # bucket index -> number of values. Bucket k holds (gamma^(k-1), gamma^k]. Zeros are kept apart.
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def _bucket(self, value):
+        return int(math.ceil(math.log(value) / self.log_gamma))
+
+    # Midpoint of the bucket in relative terms: within alpha of every value in it
+    def _value(self, bucket):
+        return 2 * self.gamma ** bucket / (self.gamma + 1)
+
+    def add(self, value, count=1):
+        if value <= 0:
+            self.zero_count += count
+        else:
+            bucket = self._bucket(value)
+            self.buckets[bucket] = self.buckets.get(bucket, 0) + count
+        self.count += count
+
+    def remove(self, value, count=1):
+        if value <= 0:
+            count = min(count, self.zero_count)
+            self.zero_count -= count
+        else:
+            bucket = self._bucket(value)
+            held = self.buckets.get(bucket, 0)
+            count = min(count, held)
+            if held - count == 0:
+                self.buckets.pop(bucket, None)
+            else:
+                self.buckets[bucket] = held - count
+        self.count -= count
+
+    # Sorted (value, count) pairs, including zeros
+    def histogram(self, extra_zeros=0):
+        pairs = [(self._value(bucket), self.buckets[bucket]) for bucket in sorted(self.buckets)]
+        zeros = self.zero_count + extra_zeros
+        if zeros > 0:
+            pairs.insert(0, (0.0, zeros))
+        return pairs
+
+    def quantile(self, q, extra_zeros=0):
+        pairs = self.histogram(extra_zeros)
+        total = sum(count for _, count in pairs)
+        if total == 0:
+            return float('nan')
+        rank = q * (total - 1)
+        seen = 0
+        for value, count in pairs:
+            seen += count
+            if seen > rank:
+                return value
+        return pairs[-1][0]
+
+    def min(self, extra_zeros=0):
+        return self.quantile(0.0, extra_zeros)
+
+    def max(self, extra_zeros=0):
+        return self.quantile(1.0, extra_zeros)
+
+    # Gini index of the distribution: sum over pairs of |x_i - x_j| / (2 n^2 mean), from the sorted buckets
+    def gini(self, extra_zeros=0):
+        pairs = self.histogram(extra_zeros)
+        values = np.array([value for value, _ in pairs])
+        counts = np.array([count for _, count in pairs], dtype=np.float64)
+        n = counts.sum()
+        value_sum = (values * counts).sum()
+        if n == 0 or value_sum == 0:
+            return 0.0
+        # For each bucket, the count and the total value of the buckets below it
+        counts_below = np.cumsum(counts) - counts
+        sums_below = np.cumsum(values * counts) - values * counts
+        pair_diffs = (counts * (values * counts_below - sums_below)).sum()
+        return float(pair_diffs / (n * value_sum))
+
+    def nbytes(self):
+        # Two machine words per bucket is a fair approximation of the dict entries
+        return 16 * len(self.buckets)
+
+
+class ExposureSketch:
+    """
+    Approximate per-item exposure for a catalog of num_items items. Count-min gives the count of any item
+    and the maximum, HyperLogLog the number of distinct items exposed (coverage). The shape of the count
+    distribution (median, Gini) comes from a quantile sketch over a hash sample of the items: items whose
+    hash falls in the first sample_rate of the hash range have their counts tracked exactly. Count-min
+    alone is not used for this because its overestimate (up to epsilon * total) swamps the small counts
+    in the tail. Items that were never exposed count as zeros, so the catalog size matters.
+    """
+
+    def __init__(self, num_items, epsilon=0.001, delta=0.01, hll_error=0.01, alpha=0.01, sample_rate=0.01):
+        self.num_items = num_items
+        self.counts = CountMinSketch(epsilon, delta)
+        self.distinct = HyperLogLog(hll_error)
+        self.distribution = QuantileSketch(alpha)
+        self.sample_rate = sample_rate
+        self.sample_threshold = int(sample_rate * 2 ** 64)
+        self.sample_counts = {}
+        self.max_count = 0
+
+    def add_items(self, items):
+        for item in items:
+            count = self.counts.add(item) + 1
+            self.max_count = max(self.max_count, count)
+            self.distinct.add(item)
+            if in_hash_sample(item, self.sample_threshold):
+                before = self.sample_counts.get(item, 0)
+                if before > 0:
+                    self.distribution.remove(before)
+                self.distribution.add(before + 1)
+                self.sample_counts[item] = before + 1
+
+    def distinct_items(self):
+        return min(self.distinct.estimate(), self.num_items)
+
+    def coverage(self):
+        return self.distinct_items() / self.num_items
+
+    # Unexposed items in the sample: the expected number of catalog items in it, less the exposed ones
+    def _sample_zeros(self):
+        return max(int(round(self.sample_rate * self.num_items)) - len(self.sample_counts), 0)
+
+    def summary(self):
+        zeros = self._sample_zeros()
+        return {'distinct_items': self.distinct_items(),
+                'coverage': self.coverage(),
+                'total': self.counts.total,
+                'min': 0.0 if self.distinct_items() < self.num_items else self.distribution.min(zeros),
+                'max': self.max_count,
+                'median': self.distribution.quantile(0.5, zeros),
+                'gini': self.distribution.gini(zeros),
+                'memory_bytes': self.nbytes()}
+
+    def nbytes(self):
+        # The sample dict is counted at roughly 100 bytes per entry (key string, int and slot)
+        return self.counts.nbytes() + self.distinct.nbytes() + self.distribution.nbytes() \
+            + 100 * len(self.sample_counts)
@@ -64,6 +64,28 @@ class AgentTestCase(unittest.TestCase):
         self.assertTrue(all(map(lambda x: x == 0, prs.values())))
         self.assertIn("Country", prs.keys())
 
+    def test_agent_index(self):
+        config = toml.loads(CONFIG_DOCUMENT)
+        agent_coll = AgentCollection()
+        agent_coll.setup(config)
+
+        self.assertEqual(["Country", "Sector"], agent_coll.agent_names())
+        self.assertEqual(1, agent_coll.agent_index("Sector"))
+        self.assertEqual("Sector", agent_coll.get_agent("Sector").name)
+        self.assertIsNone(agent_coll.get_agent("Missing"))
+        self.assertIsNone(agent_coll.agent_index("Missing"))
+
+        # Vectors are in agent order
+        compat = agent_coll.compatibility_vector(None)
+        self.assertEqual([1.0, 0.0], compat.tolist())
+        self.assertEqual({"Country": 1.0, "Sector": 0.0}, agent_coll.compute_compatibilities(None))
+        self.assertEqual([0.0, 0.5], agent_coll.from_dict({"Sector": 0.5}).tolist())
+
+        # Assigning the agent list rebuilds the index
+        agent_coll.agents = list(reversed(agent_coll.agents))
+        self.assertEqual(0, agent_coll.agent_index("Sector"))
+        self.assertEqual({"Sector": 0.0, "Country": 1.0}, agent_coll.compute_compatibilities(None))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,10 +5,10 @@ import scruf, pathlib, tempfile, toml
 from icecream import ic
 
 from scruf.agent import ItemFeatureFairnessMetric, FairnessMetricFactory, ProportionalItemFM, \
-    MeanReciprocalRankFM, DisparateExposureFM, GiniIndexFM
+    MeanReciprocalRankFM, DisparateExposureFM, GiniIndexFM, GiniSketchFM
 from scruf.util import PropertyMismatchError, UnregisteredFairnessMetricError, InvalidFairnessMetricError, \
     ResultList
-from scruf.history import ResultsHistory, ScrufHistory
+from scruf.history import ResultsHistory, ScrufHistory, ItemWindow, DecayedWindow
 from scruf.data import ItemFeatureData
 
 from numpy import log2, mean
@@ -36,6 +36,12 @@ ITEM_FEATURE_PROPERTIES2 = \
     'target': 0.75
 }
 
+GINI_PROPERTIES = \
+{
+    'num_items': 2000,
+    'target': 0.5
+}
+
 ITEM_FEATURE_PROPERTIES3 = \
 {
     'feature': 'f1',
@@ -258,9 +264,154 @@ class FairnessMetricTestCase(unittest.TestCase):
 
         self.assertAlmostEqual(correct_score, fairness, 4)
 
+    def test_window_stats(self):
+        metrics = [ProportionalItemFM(), MeanReciprocalRankFM(), DisparateExposureFM()]
+        metrics[0].setup(ITEM_FEATURE_PROPERTIES)
+        metrics[1].setup(ITEM_FEATURE_PROPERTIES2)
+        metrics[2].setup(ITEM_FEATURE_PROPERTIES3)
+
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+        scruf.Scruf.state.item_features = if_data
+
+        rlists = []
+        for triples in [RESULT_TRIPLES_1, RESULT_TRIPLES_2, RESULT_TRIPLES_3, RESULT_TRIPLES_1[0:2]]:
+            rlist = ResultList()
+            rlist.setup(triples)
+            rlists.append(rlist)
+
+        rhist = ResultsHistory(5)
+        hist = ScrufHistory()
+        hist.choice_output_history = rhist
+        requests = {'f1': set(ItemWindow.STAT_NAMES)}
+        self.assertEqual(0, hist.get_output_window().compute_stats(requests)['f1']['list_count'])
+
+        # More lists than the window holds, added between syncs
+        for step in range(8):
+            rhist.add_item(rlists[step % 4])
+            if step % 3 == 0:
+                continue
+            stats = hist.get_output_window().compute_stats(requests)['f1']
+            self.assertEqual(min(step + 1, 5), stats['list_count'])
+            for metric in metrics:
+                self.assertAlmostEqual(metric.compute_fairness(hist), metric.compute_fairness_from_stats(stats))
+
+    def test_disparate_exposure_one_group(self):
+        metric = DisparateExposureFM()
+        metric.setup(ITEM_FEATURE_PROPERTIES3)
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+        scruf.Scruf.state.item_features = if_data
+        requests = {'f1': set(DisparateExposureFM.WINDOW_STATS) | {'list_count'}}
+
+        # Odd items are protected
+        for items, expected in [(['i1', 'i3', 'i5'], 1.0), (['i2', 'i4', 'i6'], 0.0)]:
+            rlist = ResultList()
+            rlist.setup([('u1', item, 1.0) for item in items])
+            rhist = ResultsHistory(3)
+            hist = ScrufHistory()
+            hist.choice_output_history = rhist
+            decayed = DecayedWindow(rhist, if_data, half_life=2)
+            for _ in range(3):
+                rhist.add_item(rlist)
+                decayed.sync()
+            self.assertEqual(expected, metric.compute_fairness(hist))
+            for window in [hist.get_output_window(), decayed]:
+                self.assertEqual(expected, metric.compute_fairness_from_stats(window.compute_stats(requests)['f1']))
+
+    def test_unbounded_window_stats(self):
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+        scruf.Scruf.state.item_features = if_data
+
+        rlist = ResultList()
+        rlist.setup(RESULT_TRIPLES_1[0:2])
+        rhist = ResultsHistory(None)
+        window = ItemWindow(rhist, if_data)
+        # Past the initial capacity, so the buffer has to grow
+        num_lists = 2 * ItemWindow.INITIAL_CAPACITY + 1
+        for _ in range(num_lists):
+            rhist.add_item(rlist)
+            window.sync()
+        stats = window.compute_stats({'f1': {'item_count', 'non_empty_count'}})['f1']
+        self.assertEqual(num_lists, stats['list_count'])
+        self.assertEqual(num_lists, stats['non_empty_count'])
+        self.assertEqual(2 * num_lists, stats['item_count'])
+
+    def test_decayed_window_stats(self):
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+        scruf.Scruf.state.item_features = if_data
+
+        rlist1 = ResultList()
+        rlist1.setup(RESULT_TRIPLES_1)
+        rlist3 = ResultList()
+        rlist3.setup(RESULT_TRIPLES_3)
+
+        rhist = ResultsHistory(1)
+        window = DecayedWindow(rhist, if_data, half_life=2)
+        requests = {'f1': set(ItemWindow.STAT_NAMES)}
+        # l1: 3 protected, first at rank 1. l3: 3 protected, first at rank 2.
+        rhist.add_item(rlist1)
+        window.sync()
+        # The window has to be synced while the history still holds the new lists
+        rhist.add_item(rlist3)
+        window.sync()
+        rhist.add_item(rlist3)
+        window.sync()
+        stats = window.compute_stats(requests)['f1']
+        # Weights are 0.5, 1/sqrt(2) and 1
+        weight = 0.5 + 0.5 ** 0.5 + 1
+        self.assertAlmostEqual(weight, stats['list_count'])
+        self.assertAlmostEqual(5 * weight, stats['item_count'])
+        self.assertAlmostEqual(3 * weight, stats['protected_count'])
+        self.assertAlmostEqual(0.5 * 1 + (0.5 ** 0.5 + 1) * 0.5, stats['reciprocal_rank_sum'])
+
+        metric = ProportionalItemFM()
+        metric.setup(ITEM_FEATURE_PROPERTIES)
+        self.assertAlmostEqual(0.6 / 0.75, metric.compute_fairness_from_stats(stats))
+
+    def test_gini_sketch_fm(self):
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+        scruf.Scruf.state.item_features = if_data
+
+        exact = GiniIndexFM()
+        exact.setup(GINI_PROPERTIES)
+        # With every item in the sample, the sketch only rounds the counts
+        sketch = GiniSketchFM()
+        sketch.setup({'num_items': 25, 'target': 0.5, 'sample_rate': 1.0, 'relative_accuracy': 0.01})
+
+        rlists = []
+        for triples in [RESULT_TRIPLES_1, RESULT_TRIPLES_2, RESULT_TRIPLES_3, RESULT_TRIPLES_1[0:2]]:
+            rlist = ResultList()
+            rlist.setup(triples)
+            rlists.append(rlist)
+        rhist = ResultsHistory(3)
+        hist = ScrufHistory()
+        hist.choice_output_history = rhist
+        # The lists leave the window as new ones arrive
+        for step in range(10):
+            rhist.add_item(rlists[step % 4])
+            self.assertAlmostEqual(exact.compute_fairness(hist), sketch.compute_fairness(hist), delta=0.02)
+
+        item_lists = [[entry.item for entry in rlist.get_results()] for rlist in rlists]
+        self.assertAlmostEqual(exact.compute_test_fairness(item_lists), sketch.compute_test_fairness(item_lists),
+                               delta=0.02)
+
     def test_gini_index_fm(self):
         metric = GiniIndexFM()
-        metric.setup(ITEM_FEATURE_PROPERTIES_MISSING)
+        metric.setup(GINI_PROPERTIES)
 
         self.rlist1 = ResultList()
         self.rlist2 = ResultList()
@@ -292,9 +443,23 @@ class FairnessMetricTestCase(unittest.TestCase):
             position_sum += i*value
         value_sum = sum(item_recs)
         half_relative_mean = (2*position_sum)/(n*value_sum)
-        correct_score = half_relative_mean - ((n+1)/n)
-
-        self.assertAlmostEqual(correct_score, fairness, 4)
+        correct_gini = half_relative_mean - ((n+1)/n)
+        # The catalog size comes from the item features (25), not num_items
+        self.assertAlmostEqual((1 - correct_gini) / 0.5, fairness, 4)
+
+        # Post-processing gives the same value from the item lists
+        item_lists = [[entry.item for entry in rlist.get_results()] for rlist in [self.rlist3, self.rlist2, self.rlist1]]
+        self.assertAlmostEqual(fairness, metric.compute_test_fairness(item_lists))
+
+        # With a window of two lists, the first one is removed when the third arrives
+        window = ResultsHistory(2)
+        hist.choice_output_history = window
+        metric.setup(GINI_PROPERTIES)
+        for rlist in [self.rlist3, self.rlist2, self.rlist1]:
+            window.add_item(rlist)
+            fairness = metric.compute_fairness(hist)
+        window_lists = [[entry.item for entry in rlist.get_results()] for rlist in [self.rlist2, self.rlist1]]
+        self.assertAlmostEqual(metric.compute_test_fairness(window_lists), fairness)
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,12 +1,15 @@
 import unittest
 import toml
 import random
+import numpy as np
 import scruf
 from icecream import ic
 
 from scruf.agent import AgentCollection, BinaryPreferenceFunction
+from scruf.history import ScrufHistory
 from scruf.allocation import AllocationMechanismFactory, WeightedProductAllocationMechanism, \
-    MostCompatibleAllocationMechanism, LeastFairAllocationMechanism, StaticAllocationLottery
+    MostCompatibleAllocationMechanism, LeastFairAllocationMechanism, StaticAllocationLottery, \
+    ProbabilisticSerialAllocation
 
 SAMPLE_PROPERTIES = '''
 [allocation]
@@ -163,6 +166,35 @@ class AllocationMechanismTestCase(unittest.TestCase):
         self.assertEqual(probs2['Low Compatibility'], 1.0)
         self.assertEqual(probs2['High Compatibility'], 0.0)
 
+    def test_skipped_scores(self):
+        agents = AgentCollection()
+        agents.setup(toml.loads(SAMPLE_AGENTS))
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        scruf.Scruf.state.rand = random.Random(20220223)
+        history = ScrufHistory()
+
+        # MostCompatible does not use the fairness: without a history file or a reader, it is NaN
+        alloc = MostCompatibleAllocationMechanism()
+        alloc.setup({})
+        alloc_result = alloc.compute_allocation_probabilities(agents, history, None)
+        self.assertTrue(all(np.isnan(value) for value in alloc_result['fairness scores'].values()))
+        self.assertEqual(alloc_result['compatibility scores']['High Compatibility'], 1.0)
+
+        history.record_scores = True
+        alloc_result = alloc.compute_allocation_probabilities(agents, history, None)
+        self.assertEqual(alloc_result['fairness scores'], {'Low Compatibility': 0.0, 'High Compatibility': 1.0})
+
+        history.skipped_values = 'nan'
+        alloc_result = alloc.compute_allocation_probabilities(agents, history, None)
+        self.assertTrue(all(np.isnan(value) for value in alloc_result['fairness scores'].values()))
+
+        # The static lottery uses neither
+        lottery = StaticAllocationLottery()
+        lottery.setup(toml.loads(SAMPLE_LOTTERY_PROPERTIES)['allocation']['properties'])
+        self.assertEqual([], lottery.INPUTS)
+        alloc_result = lottery.compute_allocation_probabilities(agents, history, None)
+        self.assertTrue(all(np.isnan(value) for value in alloc_result['compatibility scores'].values()))
+
     def test_static_lottery(self):
         config = toml.loads(SAMPLE_LOTTERY_PROPERTIES)
         alg_name = config['allocation']['algorithm']
@@ -173,6 +205,49 @@ class AllocationMechanismTestCase(unittest.TestCase):
         self.assertEqual(lottery['Agent 2'], 0.2)
         self.assertAlmostEqual(lottery['__dummy__'], 0.3)
 
+    def test_static_lottery_blocks(self):
+        config = toml.loads(SAMPLE_LOTTERY_PROPERTIES)
+        agent_config = toml.loads(SAMPLE_AGENTS2)
+        agents = AgentCollection()
+        agents.setup(agent_config)
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        scruf.Scruf.state.agents = agents
+
+        def draw_winners(block_size, count):
+            scruf.Scruf.state.rand = random.Random(20220223)
+            alloc = StaticAllocationLottery()
+            alloc.BLOCK_SIZE = block_size
+            alloc.setup(config['allocation']['properties'])
+            winners = []
+            for _ in range(count):
+                result = alloc.score_dict_lottery(None, agents)
+                winners.append(next((name for name, val in result.items() if val == 1.0), None))
+            return winners
+
+        # The same winners whatever the block size
+        winners = draw_winners(7, 3000)
+        self.assertEqual(winners, draw_winners(StaticAllocationLottery.BLOCK_SIZE, 3000))
+        # "Agent 1" and "Agent 2" are not agents in the collection, so they show up as an extra key
+        self.assertAlmostEqual(0.5, winners.count('Agent 1') / 3000, 1)
+        self.assertAlmostEqual(0.2, winners.count('Agent 2') / 3000, 1)
+        self.assertAlmostEqual(0.3, winners.count(None) / 3000, 1)
+
+    def test_score_vector(self):
+        alloc = AllocationMechanismFactory.create_allocation_mechanism('weighted_product_lottery')
+        alloc.setup({'fairness_exponent': 2.0, 'compatibility_exponent': 0.5})
+        names = ['a', 'b', 'c']
+        fairness = np.array([0.2, 0.9, 1.0])
+        compatibility = np.array([0.5, 1.0, 0.3])
+        expected = [alloc.score(name, dict(zip(names, fairness)), dict(zip(names, compatibility)))
+                    for name in names]
+        np.testing.assert_allclose(expected, alloc.score_vector(names, fairness, compatibility))
+
+        # Zero weights lose, all zero means no winner
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        scruf.Scruf.state.rand = random.Random(20220223)
+        self.assertEqual(0, alloc.draw_winner(np.array([1.0, 0.0, -1.0])))
+        self.assertIsNone(alloc.draw_winner(np.array([0.0, 0.0])))
+
     def test_product_lottery(self):
         config = toml.loads(SAMPLE_LOTTERY_PROPERTIES2)
         alg_name = config['allocation']['algorithm']
@@ -296,3 +371,35 @@ class AllocationMechanismTestCase(unittest.TestCase):
         self.assertAlmostEqual(probA, 0.5, 4)
         self.assertAlmostEqual(probB, 0.5, 4) # Only possible if the exponent is applied
 
+    def test_probabilistic_serial(self):
+        # Equal need, so each agent has a supply of 1.5. Two users prefer A: it runs out at 0.75 and
+        # they move to B, which the three users finish at 1.0.
+        allocation = ProbabilisticSerialAllocation.allocate_batch([0.5, 0.5], [[1.0, 0.5], [1.0, 0.5], [0.5, 1.0]])
+        np.testing.assert_allclose([[0.75, 0.25], [0.75, 0.25], [0.0, 1.0]], allocation)
+
+        # One user gets each agent up to its share of the need, in order of preference
+        allocation = ProbabilisticSerialAllocation.allocate_batch([0.5, 0.75], [[1.0, 1.0]])
+        np.testing.assert_allclose([[2 / 3, 1 / 3]], allocation)
+        # Agents with zero compatibility are not eaten, so part of the probability is not allocated
+        allocation = ProbabilisticSerialAllocation.allocate_batch([0.5, 0.75], [[0.0, 1.0]])
+        np.testing.assert_allclose([[0.0, 1 / 3]], allocation)
+        # No need, no allocation
+        allocation = ProbabilisticSerialAllocation.allocate_batch([1.0, 1.0], [[1.0, 1.0]])
+        np.testing.assert_allclose([[0.0, 0.0]], allocation)
+
+        # Each user eats for one unit of time and each agent is eaten up to its supply
+        rand = np.random.default_rng(20220223)
+        fairness = rand.random(5)
+        compatibility = rand.random((300, 5))
+        allocation = ProbabilisticSerialAllocation.allocate_batch(fairness, compatibility)
+        need = 1.0 - fairness
+        np.testing.assert_allclose(np.ones(300), allocation.sum(axis=1))
+        np.testing.assert_allclose(300 * need / need.sum(), allocation.sum(axis=0))
+
+        alloc = AllocationMechanismFactory.create_allocation_mechanism('probabilistic_serial')
+        alloc.setup({})
+        agents = AgentCollection()
+        agents.setup(toml.loads(SAMPLE_AGENTS2))
+        probs = alloc.compute_allocation_probabilities(agents, None, None)['output']
+        self.assertAlmostEqual(probs['A Compatibility'], 0.5, 4)
+        self.assertAlmostEqual(probs['B Compatibility'], 0.5, 4)
@@ -1,8 +1,11 @@
 import unittest
 import toml
+import scruf
 
+from scruf.agent import AgentCollection
+from scruf.history import ScrufHistory
 from scruf.choice import ChoiceMechanismFactory, NullChoiceMechanism, WScoringChoiceMechanism
-from scruf.util import Ballot, BallotCollection, ResultList
+from scruf.util import Ballot, BallotCollection, ResultList, HistoryCollection
 from icecream import ic
 
 SAMPLE_PROPERTIES = '''
@@ -10,6 +13,18 @@ SAMPLE_PROPERTIES = '''
 algorithm = "null_choice"
 '''
 
+SAMPLE_AGENTS = '''
+[agent.a]
+name = "A"
+metric_class = "always_zero"
+compatibility_class = "always_one"
+preference_function_class = "binary_preference"
+
+[agent.a.preference]
+feature = "foo"
+delta = 0.5
+'''
+
 SAMPLE_PROPERTIES2 = '''
 [choice]
 algorithm = "weighted_scoring"
@@ -34,6 +49,26 @@ class ChoiceMechanismTestCase(unittest.TestCase):
         self.assertEqual(choice.__class__, WScoringChoiceMechanism)
         self.assertAlmostEqual(choice.get_property('recommender_weight'), 0.8)
 
+    def test_null_choice_skips_ballots(self):
+        agents = AgentCollection()
+        agents.setup(toml.loads(SAMPLE_AGENTS))
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        scruf.Scruf.state.agents = agents
+        scruf.Scruf.state.output_list_size = 2
+        history = ScrufHistory()
+        history.choice_input_history = HistoryCollection(1)
+        history.choice_output_history = HistoryCollection(1)
+        scruf.Scruf.state.history = history
+        recs = ResultList()
+        recs.setup([('u1', 'i1', 0.9), ('u1', 'i2', 0.5), ('u1', 'i3', 0.2)], presorted=True)
+
+        # The binary preference function would need the item features, which are not there
+        cmech = NullChoiceMechanism()
+        output = cmech.do_choice({'A': 1.0}, recs)
+        self.assertEqual(['i1', 'i2'], [entry.item for entry in output.get_results()])
+        self.assertEqual([BallotCollection.REC_NAME],
+                         [ballot.name for ballot in history.choice_input_history.get_most_recent().get_ballots()])
+
     def test_weighted_score(self):
         cmech = WScoringChoiceMechanism()
         config = toml.loads(SAMPLE_PROPERTIES2)
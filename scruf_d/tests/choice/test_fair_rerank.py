@@ -1,11 +1,15 @@
 import unittest
+import copy
+import pathlib
+import random
+import tempfile
 import toml
 from icecream import ic
 from collections import defaultdict
 
 from scruf.choice import ChoiceMechanismFactory, FARChoiceMechanism, PFARChoiceMechanism, OFairChoiceMechanism
 from scruf.util import ResultList, BallotCollection
-from scruf.agent import FairnessAgent, AgentCollection
+from scruf.agent import FairnessAgent, AgentCollection, BinaryPreferenceFunction
 from scruf.data import CSVContext, ItemFeatureData
 from scruf import Scruf
 
@@ -97,6 +101,104 @@ RESULT_TRIPLES3 = [('u1', 'i4', '0.0'),
                    ('u1', 'i5', '0.0'),
                   ]
 
+# A small simulation for PFAR, which reads the agents' compatibilities from the context
+PFAR_RUN_CONFIG = '''
+[location]
+path = "."
+overwrite = "true"
+
+[data]
+rec_filename = "recs.csv"
+feature_filename = "features.csv"
+
+[output]
+filename = "history.csv"
+
+[parameters]
+list_size = 3
+iterations = -1
+initialize = "skip"
+history_window_size = 5
+random_seed = 11
+
+[context]
+context_class = "csv_context"
+
+[context.properties]
+compatibility_file = "compat.csv"
+popularity_data = "pop.csv"
+
+[feature.f1]
+name = "Feature 1"
+protected_feature = "f1"
+protected_values = 1
+
+[feature.f2]
+name = "Feature 2"
+protected_feature = "f2"
+protected_values = 1
+
+[agent.a]
+name = "A"
+metric_class = "proportional_item"
+compatibility_class = "context_compatibility"
+preference_function_class = "binary_preference"
+
+[agent.a.metric]
+feature = "Feature 1"
+proportion = 0.5
+
+[agent.a.preference]
+feature = "Feature 1"
+delta = 0.5
+
+[agent.b]
+name = "B"
+metric_class = "proportional_item"
+compatibility_class = "context_compatibility"
+preference_function_class = "binary_preference"
+
+[agent.b.metric]
+feature = "Feature 2"
+proportion = 0.5
+
+[agent.b.preference]
+feature = "Feature 2"
+delta = 0.5
+
+[choice]
+choice_class = "PFAR"
+
+[choice.properties]
+recommender_weight = 0.5
+binary = "false"
+use_allocation_weight = "true"
+
+[post]
+postprocess_class = "null"
+'''
+
+PFAR_ALLOCATIONS = [{'allocation_class': 'static_lottery', 'properties': {'weights': [['A', '0.5'], ['B', '0.5']]}},
+                    {'allocation_class': 'fairness_lottery'}]
+
+
+def write_run_data(path):
+    rand = random.Random(5)
+    work_path = pathlib.Path(path)
+    with open(work_path / 'recs.csv', 'w') as f:
+        for user in range(30):
+            for item in rand.sample(range(10), 6):
+                f.write(f'u{user}, i{item}, {rand.random():.4f}\n')
+    with open(work_path / 'features.csv', 'w') as f:
+        for item in range(10):
+            f.write(f'i{item}, f1, {item % 2}\ni{item}, f2, {int(item < 4)}\n')
+    with open(work_path / 'compat.csv', 'w') as f:
+        for user in range(30):
+            f.write(f'u{user},A,{rand.random():.3f}\nu{user},B,{rand.random():.3f}\n')
+    with open(work_path / 'pop.csv', 'w') as f:
+        for item in range(10):
+            f.write(f'i{item},{rand.randint(1, 100)}\n')
+
 # TODO: Note no test cases for the non-binary version of FAR
 class FARTestCase(unittest.TestCase):
     def test_mechanism_creation(self):
@@ -190,6 +292,64 @@ class FARTestCase(unittest.TestCase):
         self.assertEqual('i2', output2.results[1].item)
 
 
+    # PFAR weights the ballots by the agents' compatibilities, which the lotteries below do not use
+    # themselves, so they must be computed whatever is recorded for the skipped scores
+    def test_PFAR_skipped_values(self):
+        with tempfile.TemporaryDirectory() as path:
+            write_run_data(path)
+
+            def run(allocation, skipped_values, history_file=True):
+                config = toml.loads(PFAR_RUN_CONFIG)
+                config['location']['path'] = path
+                config['allocation'] = copy.deepcopy(allocation)
+                config['parameters']['skipped_values'] = skipped_values
+                if not history_file:
+                    config.pop('output')
+                experiment = Scruf(config)
+                Scruf.setup_experiment()
+                outputs = []
+                experiment.run_loop(iterations=-1,
+                                    callback=lambda output: outputs.append(list(output.result_item_iter())))
+                Scruf.cleanup_experiment()
+                return outputs
+
+            for allocation in PFAR_ALLOCATIONS:
+                expected = run(allocation, 'lazy')
+                self.assertEqual(30, len(expected))
+                self.assertEqual(expected, run(allocation, 'nan'))
+                self.assertEqual(expected, run(allocation, 'lazy', history_file=False))
+
+    def test_PFAR_decay_output_window(self):
+        with tempfile.TemporaryDirectory() as path:
+            write_run_data(path)
+
+            def run():
+                config = toml.loads(PFAR_RUN_CONFIG)
+                config['location']['path'] = path
+                config['allocation'] = copy.deepcopy(PFAR_ALLOCATIONS[1])
+                config['parameters']['window'] = 'decay'
+                config['parameters']['half_life'] = 3
+                experiment = Scruf(config)
+                Scruf.setup_experiment()
+                outputs = []
+                experiment.run_loop(iterations=-1,
+                                    callback=lambda output: outputs.append(list(output.result_item_iter())))
+                window_size = Scruf.state.history.choice_output_history.window_size
+                Scruf.cleanup_experiment()
+                return outputs, window_size
+
+            # The metrics only read the decayed window statistics, so only the current list is kept
+            outputs, window_size = run()
+            self.assertEqual(30, len(outputs))
+            self.assertEqual(1, window_size)
+            # A preference function that walks the window keeps all of it, and the fairness is the same
+            saved = BinaryPreferenceFunction.READS_WINDOW
+            BinaryPreferenceFunction.READS_WINDOW = True
+            try:
+                self.assertEqual((outputs, 5), run())
+            finally:
+                BinaryPreferenceFunction.READS_WINDOW = saved
+
     def testOFAIR(self):
         config = toml.loads(SAMPLE_PROPERTIES3)
         alg_name = config['choice']['algorithm']
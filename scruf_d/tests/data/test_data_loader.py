@@ -0,0 +1,169 @@
+import unittest
+import json
+import tempfile
+import pathlib
+import random
+import toml
+import scruf
+from scruf.data import DataLoader
+from scruf.util import UnknownDataSourceError
+
+TEST_CONFIG = '''
+[location]
+path = "."
+overwrite = "true"
+
+[data]
+rec_filename = "recs.csv"
+feature_filename = "features.csv"
+
+[output]
+filename = "history.csv"
+
+[parameters]
+list_size = 2
+iterations = -1
+initialize = "skip"
+history_window_size = 3
+random_seed = 11
+
+[context]
+context_class = "csv_context"
+
+[context.properties]
+compatibility_file = "compat.csv"
+popularity_data = "pop.csv"
+
+[feature.f1]
+name = "Feature 1"
+protected_feature = "feature1"
+protected_values = 1
+
+[agent.a]
+name = "A"
+metric_class = "proportional_item"
+compatibility_class = "context_compatibility"
+preference_function_class = "binary_preference"
+
+[agent.a.metric]
+feature = "Feature 1"
+proportion = 0.5
+
+[agent.a.preference]
+feature = "Feature 1"
+delta = 0.5
+
+[agent.b]
+name = "B"
+metric_class = "gini"
+compatibility_class = "context_compatibility"
+preference_function_class = "ind_exponential"
+
+[agent.b.metric]
+num_items = 6
+target = 0.5
+
+[agent.b.preference]
+delta = 1.0
+
+[allocation]
+allocation_class = "product_lottery"
+
+[choice]
+choice_class = "weighted_scoring"
+
+[choice.properties]
+recommender_weight = 0.8
+
+[post]
+postprocess_class = "null"
+'''
+
+NUM_USERS = 10
+
+
+class DataLoaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        rand = random.Random(3)
+        with open(self.work_path / 'recs.csv', 'w') as f:
+            for user in range(NUM_USERS):
+                for item in rand.sample(range(6), 4):
+                    f.write(f'u{user}, i{item}, {rand.random():.4f}\n')
+        with open(self.work_path / 'features.csv', 'w') as f:
+            for item in range(6):
+                f.write(f'i{item}, feature1, {item % 2}\n')
+        with open(self.work_path / 'compat.csv', 'w') as f:
+            for user in range(NUM_USERS):
+                f.write(f'u{user},A,{rand.random():.3f}\nu{user},B,{rand.random():.3f}\n')
+        with open(self.work_path / 'pop.csv', 'w') as f:
+            for item in range(6):
+                f.write(f'i{item},{rand.randint(1, 100)}\n')
+        self.config = toml.loads(TEST_CONFIG)
+        self.config['location']['path'] = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Neither item features nor popularity: the Gini sketch and no preferences
+    def minimal_config(self):
+        for agent in self.config['agent'].values():
+            agent['metric_class'] = 'gini_sketch'
+            agent['metric'] = {'num_items': 6, 'target': 0.5, 'sample_rate': 1.0, 'relative_accuracy': 0.01}
+            agent['preference_function_class'] = 'zero_preference'
+            agent.pop('preference')
+        return self.config
+
+    def test_load_once(self):
+        loader = DataLoader(trace_memory=True)
+        calls = []
+        self.assertTrue(loader.load(DataLoader.POPULARITY, lambda: calls.append(list(range(1000)))))
+        self.assertFalse(loader.load(DataLoader.POPULARITY, lambda: calls.append(None)))
+        self.assertEqual(1, len(calls))
+        report = loader.report()
+        self.assertTrue(report['popularity']['loaded'])
+        self.assertGreater(report['popularity']['peak_mb'], 0.0)
+        self.assertFalse(report['recs']['loaded'])
+
+        with self.assertRaises(UnknownDataSourceError):
+            loader.load('ratings', lambda: None)
+
+    def test_dependencies(self):
+        scruf.Scruf(self.config)
+        scruf.Scruf.setup_data()
+        report = scruf.Scruf.state.data_loader.report()
+        self.assertTrue(all(entry['loaded'] for entry in report.values()))
+        self.assertEqual(['user data'], report['recs']['needed_by'])
+        self.assertEqual(['agent A metric', 'agent A preference', 'agent B metric'],
+                         report['item_features']['needed_by'])
+        self.assertEqual(['agent B preference'], report['popularity']['needed_by'])
+        self.assertIn('allocation', report['context']['needed_by'])
+        self.assertEqual(6, scruf.Scruf.state.item_features.get_num_items())
+        self.assertEqual(6, len(scruf.Scruf.state.popularity.popularity_dict))
+
+    def test_skip_unused(self):
+        experiment = scruf.Scruf(self.minimal_config())
+        experiment.run_experiment()
+        state = scruf.Scruf.state
+        self.assertFalse(state.data_loader.is_loaded(DataLoader.ITEM_FEATURES))
+        self.assertFalse(state.data_loader.is_loaded(DataLoader.POPULARITY))
+        self.assertEqual(0, state.item_features.get_num_items())
+        self.assertEqual(0, len(state.popularity.popularity_dict))
+        self.assertEqual(NUM_USERS - 1, state.user_data.current_user_index)
+
+    def test_data_report(self):
+        self.config['output']['data_report'] = 'true'
+        experiment = scruf.Scruf(self.config)
+        experiment.run_experiment()
+        with open(self.work_path / 'history_data.json') as f:
+            report = json.load(f)
+        self.assertEqual(set(DataLoader.SOURCES), set(report.keys()))
+        self.assertTrue(report['recs']['loaded'])
+        self.assertIn('peak_mb', report['recs'])
+        self.assertGreaterEqual(report['recs']['seconds'], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -74,6 +74,21 @@ class ItemFeatureTestCase(unittest.TestCase):
         self.assertSetEqual(if_data.protected_item_index['Protected values'], {'item1','item3'})
         self.assertSetEqual(if_data.protected_item_index['Protected binary'], {'item1', 'item2'})
 
+    def test_protected_many(self):
+        if_data = ItemFeatureData()
+        self.config['location']['path'] = self.temp_dir_path
+        if_data.setup(self.config)
+
+        self.assertEqual(3, if_data.get_num_items())
+        self.assertTrue(if_data.is_protected('Protected values', 'item3'))
+        self.assertFalse(if_data.is_protected('Protected values', 'item4'))
+        # Unknown items are never protected
+        mask = if_data.is_protected_many('Protected values', ['item1', 'item2', 'item4', 'item3'])
+        self.assertListEqual([True, False, False, True], mask.tolist())
+        mask = if_data.is_protected_many('Protected binary', ['item3', 'item2'])
+        self.assertListEqual([False, True], mask.tolist())
+        self.assertDictEqual({'feature1': 'b', 'feature2': 3.5, 'feature3': 1}, if_data.get_item_features('item2'))
+
 
 if __name__ == '__main__':
     unittest.main()
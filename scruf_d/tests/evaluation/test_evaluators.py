@@ -0,0 +1,149 @@
+import unittest
+import tempfile
+import pathlib
+import json
+import toml
+import scruf
+from scruf.util import ResultList
+from scruf.data import ItemFeatureData
+from scruf.evaluation import EvaluatorFactory, EvaluatorCollection, NDCGEvaluator, RBOEvaluator, \
+    CoverageEvaluator, ExposureEvaluator, ProportionalFairnessEvaluator
+
+TEST_FEATURE_DATA = '''i1, feature1, a
+i2, feature1, b
+i3, feature1, a
+i4, feature1, b
+'''
+
+TEST_CONFIG = '''
+[location]
+path = "."
+
+[data]
+feature_filename = "test-features.csv"
+
+[output]
+filename = "history.csv"
+evaluation_filename = "metrics"
+
+[feature]
+
+[feature.feature1]
+name = "Protected values"
+protected_feature = "feature1"
+protected_values = ["a"]
+
+[evaluation]
+
+[evaluation.ndcg]
+name = "nDCG"
+evaluator_class = "ndcg"
+
+[evaluation.ndcg.properties]
+binary = "false"
+threshold = "none"
+
+[evaluation.coverage]
+name = "Coverage"
+evaluator_class = "coverage"
+
+[evaluation.coverage.properties]
+num_items = 4
+
+[evaluation.prop]
+name = "Protected"
+evaluator_class = "proportional_fairness"
+
+[evaluation.prop.properties]
+feature = "Protected values"
+proportion = 0.5
+'''
+
+REC_TRIPLES = [('u1', 'i1', '4.0'),
+               ('u1', 'i2', '3.0'),
+               ('u1', 'i3', '2.0'),
+               ('u1', 'i4', '1.0')]
+
+OUT_TRIPLES = [('u1', 'i3', '2.0'),
+               ('u1', 'i1', '1.0')]
+
+
+class EvaluatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.temp_dir_path = pathlib.Path(self.temp_dir.name)
+        with open(self.temp_dir_path / 'test-features.csv', 'w') as feature_file:
+            feature_file.write(TEST_FEATURE_DATA)
+        self.config = toml.loads(TEST_CONFIG)
+        self.config['location']['path'] = self.temp_dir_path
+
+        scruf.Scruf.state = scruf.Scruf.ScrufState(None)
+        scruf.Scruf.state.config = self.config
+        scruf.Scruf.state.item_features = ItemFeatureData()
+        scruf.Scruf.state.item_features.setup(self.config)
+
+        self.rec_list = ResultList()
+        self.rec_list.setup(REC_TRIPLES)
+        self.output = ResultList()
+        self.output.setup(OUT_TRIPLES)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_factory(self):
+        evaluator = EvaluatorFactory.create_evaluator('rbo')
+        self.assertIsInstance(evaluator, RBOEvaluator)
+
+    def test_ndcg(self):
+        evaluator = NDCGEvaluator()
+        evaluator.setup({'binary': 'true', 'threshold': 'none'})
+        evaluator.consume(self.rec_list, self.rec_list)
+        self.assertAlmostEqual(evaluator.summary()['mean'], 1.0)
+
+        evaluator.setup({'binary': 'false', 'threshold': 1.5})
+        evaluator.consume(self.rec_list, self.output)
+        # Relevance 2^2-1=3, 2^4-1=15 vs ideal 15, 7
+        expected = (3 + 15 / 1.5849625) / (15 + 7 / 1.5849625)
+        self.assertAlmostEqual(evaluator.summary()['mean'], expected, places=5)
+
+    def test_rbo(self):
+        self.assertAlmostEqual(RBOEvaluator.rbo(['a', 'b'], ['a', 'b']), 1.0)
+        # Average overlap: depth 1 = 0, depth 2 = 1
+        self.assertAlmostEqual(RBOEvaluator.rbo(['a', 'b'], ['b', 'a']), 0.5)
+        self.assertAlmostEqual(RBOEvaluator.rbo(['a', 'b'], ['c', 'd'], p=0.9), 0.0)
+
+    def test_exposure(self):
+        evaluator = ExposureEvaluator()
+        evaluator.setup({})
+        evaluator.consume(self.rec_list, self.output)
+        evaluator.consume(self.rec_list, self.rec_list)
+        counts = evaluator.item_counts()
+        self.assertEqual(counts['i1'], 2)
+        self.assertEqual(counts['i4'], 1)
+        self.assertEqual(evaluator.summary()['total'], 6)
+
+    def test_collection(self):
+        coll = EvaluatorCollection()
+        coll.setup(self.config)
+        self.assertEqual(len(coll.evaluators), 3)
+        coll.consume(self.rec_list, self.output)
+        summary = coll.summary()
+        self.assertAlmostEqual(summary['Coverage_coverage'], 0.5)
+        self.assertAlmostEqual(summary['Protected_protected_ratio'], 1.0)
+        self.assertAlmostEqual(summary['Protected_fairness'], 2.0)
+
+        coll.cleanup()
+        with open(self.temp_dir_path / 'metrics.json') as json_file:
+            written = json.load(json_file)
+        self.assertEqual(written['Coverage_distinct_items'], 2)
+        self.assertTrue((self.temp_dir_path / 'metrics.csv').exists())
+
+    def test_empty_collection(self):
+        del self.config['evaluation']
+        coll = EvaluatorCollection()
+        coll.setup(self.config)
+        self.assertTrue(coll.is_empty())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import pathlib
+import random
+import toml
+
+# The simulation that the runner tests share: two agents on one protected feature (proportional item
+# fairness with binary preferences, and gini with exponential individual preferences), context
+# compatibilities and popularity data. Tests add the sections they need with make_config.
+
+RUN_CONFIG = '''
+[location]
+path = "."
+overwrite = "true"
+
+[data]
+rec_filename = "recs.csv"
+feature_filename = "features.csv"
+
+[output]
+filename = "history.csv"
+
+[parameters]
+list_size = 2
+iterations = -1
+initialize = "skip"
+history_window_size = 3
+random_seed = 11
+
+[context]
+context_class = "csv_context"
+
+[context.properties]
+compatibility_file = "compat.csv"
+popularity_data = "pop.csv"
+
+[feature.f1]
+name = "Feature 1"
+protected_feature = "feature1"
+protected_values = 1
+
+[agent.a]
+name = "A"
+metric_class = "proportional_item"
+compatibility_class = "context_compatibility"
+preference_function_class = "binary_preference"
+
+[agent.a.metric]
+feature = "Feature 1"
+proportion = 0.5
+
+[agent.a.preference]
+feature = "Feature 1"
+delta = 0.5
+
+[agent.b]
+name = "B"
+metric_class = "gini"
+compatibility_class = "context_compatibility"
+preference_function_class = "ind_exponential"
+
+[agent.b.metric]
+num_items = 6
+target = 0.5
+
+[agent.b.preference]
+delta = 1.0
+
+[allocation]
+allocation_class = "product_lottery"
+
+[choice]
+choice_class = "weighted_scoring"
+
+[choice.properties]
+recommender_weight = 0.8
+
+[post]
+postprocess_class = "null"
+'''
+
+NDCG_EVALUATION = '''
+[evaluation.ndcg]
+name = "nDCG"
+evaluator_class = "ndcg"
+
+[evaluation.ndcg.properties]
+binary = "false"
+threshold = "none"
+'''
+
+
+def make_config(path, extra=''):
+    config = toml.loads(RUN_CONFIG + extra)
+    config['location']['path'] = str(path)
+    return config
+
+
+# Writes recs.csv (list_length of num_items candidates for each user, with odd items protected in
+# features.csv), compat.csv for the given agents and pop.csv. Returns the candidates of each user as
+# (item, score) pairs.
+def write_run_data(path, num_users, num_items=6, list_length=4, agents=('A', 'B')):
+    path = pathlib.Path(path)
+    rand = random.Random(3)
+    candidates = {}
+    with open(path / 'recs.csv', 'w') as f:
+        for user in range(num_users):
+            pairs = [(f'i{item}', round(rand.random(), 4)) for item in rand.sample(range(num_items), list_length)]
+            candidates[f'u{user}'] = pairs
+            for item, score in pairs:
+                f.write(f'u{user}, {item}, {score:.4f}\n')
+    with open(path / 'features.csv', 'w') as f:
+        for item in range(num_items):
+            f.write(f'i{item}, feature1, {item % 2}\n')
+    with open(path / 'compat.csv', 'w') as f:
+        for user in range(num_users):
+            f.write(''.join(f'u{user},{agent},{rand.random():.3f}\n' for agent in agents))
+    with open(path / 'pop.csv', 'w') as f:
+        for item in range(num_items):
+            f.write(f'i{item},{rand.randint(1, 100)}\n')
+    return candidates
@@ -0,0 +1,76 @@
+import unittest
+import tempfile
+import pathlib
+import random
+from pyarrow import parquet
+from scruf import Scruf
+from scruf.runner import Checkpoint
+from scruf.util import CheckpointFormatError
+from .run_data import make_config, write_run_data
+
+CHECKPOINT_CONFIG = '''
+[checkpoint]
+interval = 3
+'''
+
+NUM_USERS = 10
+
+
+class CheckpointTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        write_run_data(self.work_path, NUM_USERS)
+        self.config = make_config(self.work_path, CHECKPOINT_CONFIG)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_history(self, name, resume=False):
+        self.config['output']['filename'] = name + '.csv'
+        random.seed(5)
+        scruf = Scruf(self.config)
+        scruf.run_experiment(resume=resume)
+        return parquet.read_table(self.work_path / (name + '.parquet')).to_pandas()
+
+    def test_resume(self):
+        expected = self.run_history('full')
+        # The checkpoint is removed once the run completes
+        self.assertFalse((self.work_path / 'full.checkpoint').exists())
+
+        # Interrupted after 7 users: the last checkpoint is from user 6, and the history file has
+        # one more user in it than the checkpoint
+        self.config['output']['filename'] = 'resumed.csv'
+        random.seed(5)
+        scruf = Scruf(self.config)
+        scruf.setup_experiment()
+        checkpoint = Checkpoint.from_config(self.config)
+        scruf.run_loop(iterations=7, checkpoint=checkpoint)
+        checkpoint.wait()
+        scruf.state.history.cleanup(no_compress=True)
+        self.assertTrue(checkpoint.exists())
+
+        # Resumed in a fresh state, with the global random generator moved on
+        random.seed(99)
+        resumed = self.run_history('resumed', resume=True)
+        self.assertFalse(checkpoint.exists())
+        # (DataFrame.equals treats NaN scores in the same places as equal)
+        self.assertTrue(expected.equals(resumed))
+
+    def test_format_error(self):
+        checkpoint = Checkpoint.from_config(self.config)
+        self.assertEqual(self.work_path / 'history.checkpoint', checkpoint.path)
+        with open(checkpoint.path, 'wb') as f:
+            f.write(b'not a checkpoint')
+        Scruf(self.config)
+        with self.assertRaises(CheckpointFormatError):
+            checkpoint.load(Scruf.state)
+
+    def test_no_checkpoint(self):
+        del self.config['checkpoint']
+        self.assertIsNone(Checkpoint.from_config(self.config))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import toml
+from scruf.runner import ConfigGrid
+
+TEST_CONFIG = '''
+[location]
+path = "."
+
+[data]
+rec_filename = "recs.csv"
+feature_filename = "features.csv"
+
+[output]
+filename = "history.csv"
+
+[agent.one]
+name = "one"
+
+[agent.two]
+name = "two"
+
+[choice]
+choice_class = "weighted_scoring"
+
+[choice.properties]
+recommender_weight = 1.0
+
+[allocation]
+allocation_class = "least_fair"
+'''
+
+
+def apply_dataset(config, dataset):
+    config['data']['rec_filename'] = f'recs_{dataset}.csv'
+
+
+class ConfigGridTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.config = toml.loads(TEST_CONFIG)
+
+    def test_expand(self):
+        grid = ConfigGrid(self.config)
+        grid.add_axis('choice.choice_class', ['weighted_scoring', 'mmr_sum'])
+        grid.add_axis('choice.properties.recommender_weight', [0.5, 2.0])
+        self.assertEqual(4, len(grid))
+
+        configs = list(grid)
+        self.assertEqual(4, len(configs))
+        self.assertEqual('mmr_sum', configs[3]['choice']['choice_class'])
+        self.assertEqual(2.0, configs[3]['choice']['properties']['recommender_weight'])
+        self.assertEqual('history_mmr_sum_2.0.csv', configs[3]['output']['filename'])
+        # Base config is not changed
+        self.assertEqual('weighted_scoring', self.config['choice']['choice_class'])
+        self.assertEqual('history.csv', self.config['output']['filename'])
+
+    def test_custom_axis(self):
+        grid = ConfigGrid(self.config, name_fn=lambda filename, labels: '-'.join(labels))
+        grid.add_axis('dataset', ['a', 'b'], apply=apply_dataset, label=lambda value: value.upper())
+        configs = list(grid)
+        self.assertEqual('recs_b.csv', configs[1]['data']['rec_filename'])
+        self.assertEqual('B', configs[1]['output']['filename'])
+
+    def test_groups(self):
+        grid = ConfigGrid(self.config)
+        grid.add_axis('dataset', ['a', 'b'], apply=apply_dataset)
+        grid.add_axis('choice.choice_class', ['weighted_scoring', 'mmr_sum', 'null_choice'])
+        groups = grid.groups()
+        self.assertEqual(2, len(groups))
+        for group in groups:
+            self.assertEqual(1, len({ConfigGrid.data_key(config) for config in group}))
+            # Most expensive first
+            self.assertEqual(['mmr_sum', 'weighted_scoring', 'null_choice'],
+                             [config['choice']['choice_class'] for config in group])
+
+    def test_schedule(self):
+        grid = ConfigGrid(self.config)
+        grid.add_axis('dataset', ['a', 'b', 'c'], apply=apply_dataset)
+        grid.add_axis('choice.choice_class', ['weighted_scoring', 'mmr_sum'])
+        work_lists = grid.schedule(workers=2)
+        self.assertEqual(2, len(work_lists))
+        self.assertEqual(6, sum(len(work_list) for work_list in work_lists))
+        # Groups are not split across workers when there are enough of them
+        keys = [{ConfigGrid.data_key(config) for config in work_list} for work_list in work_lists]
+        self.assertEqual(0, len(keys[0].intersection(keys[1])))
+
+        # More workers than groups: the group is split so every worker has work
+        grid = ConfigGrid(self.config)
+        grid.add_axis('choice.choice_class', ['weighted_scoring', 'mmr_sum', 'null_choice', 'xquad'])
+        work_lists = grid.schedule(workers=2)
+        self.assertEqual([2, 2], [len(work_list) for work_list in work_lists])
+        self.assertEqual('mmr_sum', work_lists[0][0]['choice']['choice_class'])
+
+
+if __name__ == '__main__':
+    unittest.main()
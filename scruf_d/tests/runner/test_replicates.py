@@ -0,0 +1,82 @@
+import unittest
+import json
+import tempfile
+import pathlib
+import numpy as np
+from scruf.runner import ReplicateRunner, ReplicateSummary
+from scruf.runner.replicates import t_critical
+from .run_data import make_config, write_run_data, NDCG_EVALUATION
+
+NUM_USERS = 40
+
+
+class ReplicateRunnerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        write_run_data(self.work_path, NUM_USERS)
+        self.config = make_config(self.work_path, NDCG_EVALUATION)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_t_critical(self):
+        self.assertAlmostEqual(12.706, t_critical(1))
+        self.assertAlmostEqual(2.042, t_critical(30))
+        # The expansion continues the table
+        self.assertAlmostEqual(2.040, t_critical(31), places=2)
+        self.assertAlmostEqual(2.750, t_critical(30, 0.99), places=3)
+        self.assertAlmostEqual(1.960, t_critical(100000), places=3)
+
+    def test_replicates(self):
+        runner = ReplicateRunner(self.config, max_seeds=4, min_seeds=2)
+        summary = runner.run()
+        self.assertEqual([11, 12, 13, 14], summary.seeds)
+        self.assertIsNone(summary.converged)
+        self.assertEqual(['A', 'B'], summary.agent_names)
+        self.assertEqual((NUM_USERS, 2), summary.trajectory_mean.shape)
+        self.assertIn('fairness_A', summary.final)
+        self.assertIn('nDCG_mean', summary.final)
+        # No per-seed files by default
+        self.assertFalse((self.work_path / 'history_seed11.csv').exists())
+
+        # Each replicate is the run with its own seed
+        single = ReplicateRunner(self.config, max_seeds=1, first_seed=13).run()
+        self.assertEqual(summary.results[2].final, single.results[0].final)
+        values = np.array([result.final['nDCG_mean'] for result in summary.results])
+        self.assertAlmostEqual(values.mean(), summary.final['nDCG_mean']['mean'])
+        half_width = t_critical(3) * values.std(ddof=1) / 2.0
+        self.assertAlmostEqual(values.mean() + half_width, summary.final['nDCG_mean']['ci_high'])
+
+        # Worker processes give the same result
+        parallel = ReplicateRunner(self.config, max_seeds=4, min_seeds=2, workers=2).run()
+        self.assertEqual(summary.seeds, parallel.seeds)
+        self.assertEqual(summary.final, parallel.final)
+        np.testing.assert_array_equal(summary.trajectory_mean, parallel.trajectory_mean)
+
+    def test_early_stop(self):
+        # A wide target is met as soon as there are min_seeds replicates
+        summary = ReplicateRunner(self.config, max_seeds=6, min_seeds=3, ci_width=100.0, workers=2).run()
+        self.assertEqual([11, 12, 13], summary.seeds)
+        self.assertTrue(summary.converged)
+        # An unreachable one uses all of the seeds (nDCG differs between seeds 11-13)
+        summary = ReplicateRunner(self.config, max_seeds=3, ci_width=0.0, metrics=['nDCG_mean']).run()
+        self.assertEqual(3, len(summary.seeds))
+        self.assertFalse(summary.converged)
+        self.assertGreater(summary.ci_width('nDCG_mean'), 0.0)
+
+    def test_from_config(self):
+        self.config['replicates'] = {'max_seeds': 2, 'keep_history': 'true'}
+        runner = ReplicateRunner.from_config(self.config)
+        summary = runner.run_and_write()
+        self.assertTrue((self.work_path / 'history_seed12.parquet').exists())
+        with open(self.work_path / 'history_replicates.json') as f:
+            output = json.load(f)
+        self.assertEqual([11, 12], output['seeds'])
+        self.assertEqual(NUM_USERS, len(output['trajectory']['A']['mean']))
+        self.assertEqual(summary.final['nDCG_mean']['mean'], output['final']['nDCG_mean']['mean'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import asyncio
+import tempfile
+import pathlib
+from scruf import Scruf
+from scruf.runner import RerankService, RerankClient
+from .run_data import make_config, write_run_data
+
+SERVICE_CONFIG = '''
+[service]
+max_batch_size = 8
+max_wait_ms = 50
+'''
+
+NUM_USERS = 20
+
+
+class RerankServiceTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        self.candidates = write_run_data(self.work_path, NUM_USERS, num_items=10, list_length=6, agents=['A'])
+        # One agent, and longer lists than the shared configuration
+        self.config = make_config(self.work_path, SERVICE_CONFIG)
+        del self.config['agent']['b']
+        self.config['parameters'].update({'list_size': 3, 'history_window_size': 5})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    # Starts a service, runs the client coroutine against it and stops the service
+    def with_service(self, client_fn):
+        async def run():
+            service = RerankService.from_config(self.config)
+            await service.start(port=0)
+            try:
+                return await client_fn(service)
+            finally:
+                await service.stop()
+        return asyncio.run(run())
+
+    def test_concurrent_requests(self):
+        async def clients(service):
+            async def one_user(user):
+                client = RerankClient(service.host, service.port)
+                try:
+                    return await client.rerank(user, self.candidates[user])
+                finally:
+                    await client.close()
+            responses = await asyncio.gather(*[one_user(user) for user in self.candidates])
+            stats = service.stats.summary()
+            return responses, stats, len(Scruf.state.history.choice_output_history.collection)
+
+        responses, stats, window = self.with_service(clients)
+        for (status, response), user in zip(responses, self.candidates):
+            self.assertEqual(200, status)
+            self.assertEqual(user, response['user'])
+            self.assertEqual(3, len(response['results']))
+            self.assertTrue({result['item'] for result in response['results']}
+                            <= {item for item, _ in self.candidates[user]})
+        # Every request got its own time step
+        self.assertListEqual(list(range(NUM_USERS)), sorted(response['time'] for _, response in responses))
+        self.assertEqual(NUM_USERS, stats['served'])
+        self.assertLess(stats['batches'], NUM_USERS)
+        self.assertLessEqual(stats['max_batch_size'], 8)
+        self.assertLessEqual(stats['latency_p50_ms'], stats['latency_p99_ms'])
+        # The fairness history follows the served outputs
+        self.assertEqual(5, window)
+        self.assertTrue((self.work_path / 'history.parquet').exists())
+
+    # Users served one at a time get the same lists as in the simulation
+    def test_same_as_simulation(self):
+        experiment = Scruf(self.config)
+        Scruf.setup_experiment()
+        expected = [[entry.item for entry in Scruf.process_user(user_info).get_results()]
+                    for user_info in Scruf.state.user_data.user_iterator()]
+        Scruf.cleanup_experiment()
+        (self.work_path / 'history.parquet').unlink()
+
+        async def sequential(service):
+            client = RerankClient(service.host, service.port)
+            served = []
+            for user in self.candidates:
+                status, response = await client.rerank(user, self.candidates[user])
+                served.append([result['item'] for result in response['results']])
+            await client.close()
+            return served
+
+        self.assertListEqual(expected, self.with_service(sequential))
+
+    def test_bad_requests(self):
+        async def bad(service):
+            client = RerankClient(service.host, service.port)
+            too_short = await client.rerank('u1', self.candidates['u1'][0:2])
+            not_json = await client.request('POST', '/rerank', None)
+            no_route = await client.request('GET', '/nowhere')
+            unknown_user = await client.rerank('new_user', self.candidates['u1'])
+            with_compat = await client.rerank('new_user', self.candidates['u1'], compatibility={'A': 0.5})
+            await client.close()
+            return too_short, not_json, no_route, unknown_user, with_compat
+
+        too_short, not_json, no_route, unknown_user, with_compat = self.with_service(bad)
+        self.assertEqual(400, too_short[0])
+        self.assertEqual(400, not_json[0])
+        self.assertEqual(404, no_route[0])
+        # No compatibility data for the user, unless the request brings it
+        self.assertEqual(400, unknown_user[0])
+        self.assertEqual(200, with_compat[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import numpy as np
+from scruf.runner import Reranker
+from scruf.util import ResultList, ScrufError
+
+# No file names at all: item features, compatibilities and candidates are all passed in
+TEST_CONFIG = {
+    'parameters': {'list_size': 3, 'history_window_size': 4, 'random_seed': 11},
+    'feature': {'f1': {'name': 'Feature 1', 'protected_feature': 'feature1', 'protected_values': 1}},
+    'agent': {'a': {'name': 'A', 'metric_class': 'proportional_item',
+                    'compatibility_class': 'context_compatibility',
+                    'preference_function_class': 'binary_preference',
+                    'metric': {'feature': 'Feature 1', 'proportion': 0.5},
+                    'preference': {'feature': 'Feature 1', 'delta': 0.5}}},
+    'allocation': {'allocation_class': 'least_fair'},
+    'choice': {'choice_class': 'weighted_scoring', 'properties': {'recommender_weight': 0.5}},
+}
+
+ITEM_FEATURES = [(f'i{item}', 'feature1', item % 2) for item in range(8)]
+
+
+class RerankerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.reranker = Reranker(TEST_CONFIG, item_features=ITEM_FEATURES)
+
+    def test_rerank(self):
+        self.assertFalse(self.reranker.state.history.has_sink())
+        items = [f'i{item}' for item in range(6)]
+        scores = np.array([6.0, 5.0, 4.0, 3.0, 2.0, 1.0])
+
+        # Unprotected items on top from the recommender: the agent is unfair and promotes protected ones
+        output = self.reranker.rerank('u1', items, scores=scores, compatibility={'A': 1.0})
+        self.assertEqual(3, output.get_length())
+        self.assertEqual(0, self.reranker.current_time())
+        history = self.reranker.state.history
+        self.assertEqual(1, len(history.choice_output_history.collection))
+        self.assertIs(output, history.choice_output_history.get_most_recent())
+        self.assertTrue(any(int(entry.item[1:]) % 2 == 1 for entry in output.get_results()))
+
+        # (item, score) pairs and ResultLists are accepted too
+        pairs = list(zip(items, scores.tolist()))
+        self.reranker.rerank('u2', pairs, compatibility={'A': 0.0})
+        rlist = ResultList()
+        rlist.setup([('u3', item, score) for item, score in pairs])
+        self.reranker.rerank('u3', rlist, compatibility={'A': 0.5})
+        self.assertEqual(2, self.reranker.current_time())
+        self.assertEqual(3, len(history.choice_output_history.collection))
+
+        # The window holds the last four outputs
+        for user in range(5):
+            self.reranker.rerank(f'v{user}', pairs, compatibility={'A': 0.5})
+        self.assertEqual(4, len(history.choice_output_history.collection))
+        self.reranker.close()
+
+    def test_errors(self):
+        items = ['i0', 'i1', 'i2', 'i3']
+        scores = [4.0, 3.0, 2.0, 1.0]
+        # Compatibility is needed from the request context
+        with self.assertRaises(ScrufError):
+            self.reranker.rerank('u1', items, scores=scores)
+        # Too few candidates for the output list
+        with self.assertRaises(ScrufError):
+            self.reranker.rerank('u1', items[0:2], scores=scores[0:2], compatibility={'A': 1.0})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import tempfile
+import pathlib
+import os
+import toml
+from scruf.runner import ResultCache
+
+TEST_REC_DATA = '''u1, i1, 1.0
+u1, i2, 0.5
+'''
+
+TEST_CONFIG = '''
+[location]
+path = "."
+overwrite = "true"
+
+[data]
+rec_filename = "recs.csv"
+
+[output]
+filename = "history.csv"
+
+[parameters]
+list_size = 10
+iterations = 100
+'''
+
+
+class ResultCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        with open(self.work_path / 'recs.csv', 'w') as f:
+            f.write(TEST_REC_DATA)
+        self.config = toml.loads(TEST_CONFIG)
+        self.config['location']['path'] = self.temp_dir.name
+        self.cache = ResultCache(self.work_path / 'cache', max_size_mb=1)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_artifact(self, name, contents):
+        path = self.work_path / name
+        with open(path, 'w') as f:
+            f.write(contents)
+        return path
+
+    def test_key(self):
+        key = self.cache.compute_key(self.config)
+        # Output locations do not change the key
+        self.config['output']['filename'] = 'other_history.csv'
+        self.config['location']['overwrite'] = 'false'
+        self.assertEqual(key, self.cache.compute_key(self.config))
+        # Parameters do
+        self.config['parameters']['list_size'] = 5
+        self.assertNotEqual(key, self.cache.compute_key(self.config))
+
+    def test_key_input_data(self):
+        key = self.cache.compute_key(self.config)
+        with open(self.work_path / 'recs.csv', 'a') as f:
+            f.write('u2, i1, 0.1\n')
+        # Make sure the mtime differs even on coarse-grained file systems
+        stat = os.stat(self.work_path / 'recs.csv')
+        os.utime(self.work_path / 'recs.csv', ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertNotEqual(key, self.cache.compute_key(self.config))
+
+    def test_store_restore(self):
+        history = self.write_artifact('history.parquet', 'history contents')
+        self.assertFalse(self.cache.restore(self.config, {'history': history}))
+        self.cache.store(self.config, {'history': history})
+        history.unlink()
+
+        # A different output location gets a copy of the stored artifact
+        target = self.work_path / 'out' / 'other.parquet'
+        self.assertTrue(self.cache.restore(self.config, {'history': target}))
+        with open(target, 'r') as f:
+            self.assertEqual('history contents', f.read())
+
+    def test_evict(self):
+        cache = ResultCache(self.work_path / 'small_cache', max_size_mb=0.001)
+        history = self.write_artifact('history.parquet', 'x' * 800)
+        cache.store(self.config, {'history': history})
+        key1 = cache.compute_key(self.config)
+        self.config['parameters']['list_size'] = 5
+        cache.store(self.config, {'history': history})
+        key2 = cache.compute_key(self.config)
+        # Only the most recent entry fits
+        self.assertFalse(cache.contains(key1))
+        self.assertTrue(cache.contains(key2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+import json
+import tempfile
+import pathlib
+import numpy as np
+from pyarrow import parquet
+from scruf.runner import ShardedRun
+from .run_data import make_config, write_run_data, NDCG_EVALUATION
+
+NUM_USERS = 40
+
+
+
+class ShardedRunTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        write_run_data(self.work_path, NUM_USERS)
+        self.config = make_config(self.work_path, NDCG_EVALUATION)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_history(self, name):
+        return parquet.read_table(self.work_path / (name + '.parquet')).to_pandas()
+
+    def test_one_shard(self):
+        # One shard is the single-process run, exchanges and all
+        self.config['output']['filename'] = 'sharded.csv'
+        report = ShardedRun(self.config, shards=1, sync_interval=7).run()
+        self.assertEqual((NUM_USERS, 2), report.trajectory.shape)
+        np.testing.assert_array_equal(report.exact_trajectory, report.trajectory)
+        self.assertEqual(0.0, report.deviation()['A']['max_abs'])
+        self.assertEqual(report.exact_metrics, report.metrics)
+        self.assertTrue(self.read_history('sharded_exact').equals(self.read_history('sharded')))
+
+    def test_shards(self):
+        report = ShardedRun(self.config, shards=3, sync_interval=6).run()
+        self.assertEqual((NUM_USERS, 2), report.trajectory.shape)
+        self.assertIn('nDCG_mean', report.metrics)
+        deviation = report.deviation()
+        self.assertEqual(['A', 'B'], list(deviation.keys()))
+        self.assertGreaterEqual(deviation['A']['max_abs'], deviation['A']['mean_abs'])
+
+        # One history with every user in order, and no shard files left
+        # (the history file has no header, so its first row becomes the column names)
+        history = self.read_history('history')
+        times = history.iloc[:, 0].to_numpy()
+        self.assertEqual(list(range(NUM_USERS)), sorted(set(times.tolist())))
+        self.assertTrue(np.all(np.diff(times) >= 0))
+        self.assertFalse((self.work_path / 'history_shard0.csv').exists())
+        self.assertTrue((self.work_path / 'history_metrics.json').exists())
+
+    def test_from_config(self):
+        self.config['sharding'] = {'shards': 2, 'sync_interval': 5, 'compare': 'false'}
+        run = ShardedRun.from_config(self.config)
+        self.assertEqual(2, run.shards)
+        report = run.run_and_write()
+        self.assertIsNone(report.deviation())
+        with open(self.work_path / 'history_sharded.json') as f:
+            output = json.load(f)
+        self.assertEqual(NUM_USERS, output['users'])
+        self.assertNotIn('deviation', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
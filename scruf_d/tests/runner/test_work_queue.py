@@ -0,0 +1,127 @@
+import unittest
+import json
+import os
+import tempfile
+import pathlib
+import threading
+import time
+from scruf.runner import ConfigGrid, WorkQueue, QueueWorker, run_local_workers
+from .run_data import make_config, write_run_data, NDCG_EVALUATION
+
+NUM_USERS = 40
+
+
+
+
+class WorkQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.work_path = pathlib.Path(self.temp_dir.name)
+        write_run_data(self.work_path, NUM_USERS)
+        self.config = make_config(self.work_path, NDCG_EVALUATION)
+        self.queue_path = self.work_path / 'queue'
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_local_workers(self):
+        queue = WorkQueue(self.queue_path)
+        grid = ConfigGrid(self.config).add_axis('choice.properties.recommender_weight', [0.2, 0.4, 0.6, 0.8])
+        job_ids = queue.publish_grid(grid)
+        self.assertEqual(4, len(job_ids))
+        self.assertEqual(job_ids, queue.status()['pending'])
+
+        status = run_local_workers(self.queue_path, workers=3)
+        self.assertEqual(sorted(job_ids), status['done'])
+        results = queue.results()
+        for job_id in job_ids:
+            # Each job ran once
+            self.assertEqual(1, len(queue.attempts(job_id)))
+            self.assertIn('nDCG_mean', results[job_id]['metrics'])
+            self.assertTrue(os.path.exists(results[job_id]['outputs']['history']))
+        self.assertTrue((self.work_path / 'history_0.4.parquet').exists())
+        self.assertEqual([], os.listdir(self.queue_path / 'claims'))
+
+    def test_retry(self):
+        queue = WorkQueue(self.queue_path, max_attempts=2)
+        self.config['data']['rec_filename'] = 'missing.csv'
+        job_id = queue.publish(self.config)
+        worker = QueueWorker(queue, poll_interval=0.01)
+        self.assertEqual(2, worker.run())
+        self.assertEqual([job_id], queue.status()['failed'])
+        attempts = queue.attempts(job_id)
+        self.assertEqual(2, len(attempts))
+        self.assertIn('error', json.loads(attempts[1].read_text()))
+
+    def test_expired_lease(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=5)
+        job_id = queue.publish(self.config)
+        # Another worker claimed the job and started an attempt
+        other = QueueWorker(queue, worker_id='other')
+        self.assertTrue(other.claim(job_id))
+        (self.queue_path / 'attempts' / f'{job_id}.0.json').write_text('{"worker": "other"}')
+
+        worker = QueueWorker(queue, worker_id='late', poll_interval=0.01)
+        self.assertFalse(worker.claim(job_id))
+        self.assertEqual([job_id], queue.status()['running'])
+
+        # The lease runs out: the claim is broken and the job runs again
+        past = time.time() - 60
+        os.utime(queue.claim_path(job_id), (past, past))
+        self.assertEqual(1, worker.run())
+        self.assertEqual([job_id], queue.status()['done'])
+        self.assertEqual(1, queue.results()[job_id]['attempt'])
+        self.assertEqual('late', queue.results()[job_id]['worker'])
+
+    def test_racing_lease_breakers(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=5)
+        job_id = queue.publish(self.config)
+        self.assertTrue(QueueWorker(queue, worker_id='dead').claim(job_id))
+        past = time.time() - 60
+        os.utime(queue.claim_path(job_id), (past, past))
+
+        # Both workers find the claim expired; the second breaks it and claims the job before the first
+        # goes on
+        second = QueueWorker(queue, worker_id='second')
+
+        class SlowWorker(QueueWorker):
+            def fs_time(self):
+                now = super().fs_time()
+                if not second.claimed:
+                    second.claimed = second.claim(job_id)
+                return now
+
+        second.claimed = False
+        first = SlowWorker(queue, worker_id='first')
+        self.assertFalse(first.claim(job_id))
+        self.assertTrue(second.claimed)
+        self.assertEqual('second', json.loads(queue.claim_path(job_id).read_text())['worker'])
+
+    def test_concurrent_lease_breakers(self):
+        queue = WorkQueue(self.queue_path, lease_seconds=5)
+        job_id = queue.publish(self.config)
+        self.assertTrue(QueueWorker(queue, worker_id='dead').claim(job_id))
+        past = time.time() - 60
+        os.utime(queue.claim_path(job_id), (past, past))
+
+        workers = [QueueWorker(queue, worker_id=f'w{index}') for index in range(8)]
+        results = [None] * len(workers)
+        start = threading.Barrier(len(workers))
+
+        def claim(index):
+            start.wait()
+            results[index] = workers[index].claim(job_id)
+
+        threads = [threading.Thread(target=claim, args=(index,)) for index in range(len(workers))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, sum(results))
+        holder = workers[results.index(True)].worker_id
+        self.assertEqual(holder, json.loads(queue.claim_path(job_id).read_text())['worker'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,6 +13,7 @@ from choice.test_fair_rerank import FARTestCase
 from data.test_context_class import ContextClassTestCase
 from data.test_item_feature import ItemFeatureTestCase
 from data.test_user_data import UserDataTestCase
+from data.test_data_loader import DataLoaderTestCase
 from history.test_results_history import TestResultsHistory
 from history.test_scruf_history import ScrufHistoryTestCase
 from util.test_hcollection import TestHistoryCollection
@@ -20,7 +21,21 @@ from util.test_result_list import ResultListTestCase
 from util.test_config_util import ConfigUtilTestCase
 from util.test_score_dict import ScoreDictTestCase
 from util.test_ballot_collection import TestBallotCollection
+from util.test_csv_cache import CSVRowCacheTestCase
+from util.test_sketches import SketchTestCase
+from util.test_exposure_distribution import ExposureDistributionTestCase
+from util.test_lazy_import import LazyImportTestCase
+from util.test_property_types import PropertyTypesTestCase
 from post.test_post_process import PostProcessorTestCase
+from evaluation.test_evaluators import EvaluatorTestCase
+from runner.test_result_cache import ResultCacheTestCase
+from runner.test_config_grid import ConfigGridTestCase
+from runner.test_checkpoint import CheckpointTestCase
+from runner.test_reranker import RerankerTestCase
+from runner.test_rerank_service import RerankServiceTestCase
+from runner.test_replicates import ReplicateRunnerTestCase
+from runner.test_sharding import ShardedRunTestCase
+from runner.test_work_queue import WorkQueueTestCase
 from test_scruf_integration import ScrufIntegrationTestCase
 
 
@@ -52,6 +67,8 @@ def suite():
     suite.addTest(if_test)
     ud_test = unittest.defaultTestLoader.loadTestsFromTestCase(UserDataTestCase)
     suite.addTest(ud_test)
+    loader_tests = unittest.defaultTestLoader.loadTestsFromTestCase(DataLoaderTestCase)
+    suite.addTest(loader_tests)
     rhist_tests = unittest.defaultTestLoader.loadTestsFromTestCase(TestResultsHistory)
     suite.addTest(rhist_tests)
     shist_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ScrufHistoryTestCase)
@@ -60,6 +77,16 @@ def suite():
     suite.addTest(hcoll_tests)
     bcoll_tests = unittest.defaultTestLoader.loadTestsFromTestCase(TestBallotCollection)
     suite.addTest(bcoll_tests)
+    csv_tests = unittest.defaultTestLoader.loadTestsFromTestCase(CSVRowCacheTestCase)
+    suite.addTest(csv_tests)
+    sketch_tests = unittest.defaultTestLoader.loadTestsFromTestCase(SketchTestCase)
+    suite.addTest(sketch_tests)
+    dist_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ExposureDistributionTestCase)
+    suite.addTest(dist_tests)
+    lazy_tests = unittest.defaultTestLoader.loadTestsFromTestCase(LazyImportTestCase)
+    suite.addTest(lazy_tests)
+    ptype_tests = unittest.defaultTestLoader.loadTestsFromTestCase(PropertyTypesTestCase)
+    suite.addTest(ptype_tests)
     rlist_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ResultListTestCase)
     suite.addTest(rlist_tests)
     conf_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ConfigUtilTestCase)
@@ -68,6 +95,24 @@ def suite():
     suite.addTest(score_tests)
     post_tests = unittest.defaultTestLoader.loadTestsFromTestCase(PostProcessorTestCase)
     suite.addTest(post_tests)
+    eval_tests = unittest.defaultTestLoader.loadTestsFromTestCase(EvaluatorTestCase)
+    suite.addTest(eval_tests)
+    cache_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ResultCacheTestCase)
+    suite.addTest(cache_tests)
+    grid_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ConfigGridTestCase)
+    suite.addTest(grid_tests)
+    checkpoint_tests = unittest.defaultTestLoader.loadTestsFromTestCase(CheckpointTestCase)
+    suite.addTest(checkpoint_tests)
+    reranker_tests = unittest.defaultTestLoader.loadTestsFromTestCase(RerankerTestCase)
+    suite.addTest(reranker_tests)
+    service_tests = unittest.defaultTestLoader.loadTestsFromTestCase(RerankServiceTestCase)
+    suite.addTest(service_tests)
+    replicate_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ReplicateRunnerTestCase)
+    suite.addTest(replicate_tests)
+    sharding_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ShardedRunTestCase)
+    suite.addTest(sharding_tests)
+    queue_tests = unittest.defaultTestLoader.loadTestsFromTestCase(WorkQueueTestCase)
+    suite.addTest(queue_tests)
     integration_tests = unittest.defaultTestLoader.loadTestsFromTestCase(ScrufIntegrationTestCase)
     suite.addTest(integration_tests)
 
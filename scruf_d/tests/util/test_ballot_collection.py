@@ -53,6 +53,60 @@ class TestBallotCollection(unittest.TestCase):
         self.assertEqual(0.2, bcoll.get_weights()['test2'])
         self.assertEqual('u3', bcoll.get_ballot('test3').prefs.get_user())
 
+    def test_view(self):
+        rl1 = ResultList()
+        rl1.setup(RESULT_TRIPLES1)
+        bcoll = BallotCollection()
+        bcoll.set_ballot('test1', rl1, 0.1)
+
+        bview = bcoll.view()
+        bview.set_ballot('test2', rl1, 0.2)
+        self.assertEqual(1, bcoll.get_count())
+        bview.get_ballot('test1').rescore(lambda entry: 0.0)
+        self.assertEqual(0.0, bview.get_ballot('test1').prefs.get_results()[0].score)
+        self.assertEqual(5.0, bcoll.get_ballot('test1').prefs.get_results()[0].score)
+
+    def test_merge(self):
+        rl1 = ResultList()
+        rl1.setup(RESULT_TRIPLES1)
+        rl2 = ResultList()
+        rl2.setup([('u1', 'i1', 1.0), ('u1', 'i2', 2.0), ('u1', 'i3', 3.0), ('u1', 'i4', 0.0), ('u1', 'i5', 0.0)])
+        bcoll = BallotCollection()
+        bcoll.set_ballot('test1', rl1, 0.5)
+        bcoll.set_ballot('test2', rl2, 1.0)
+
+        merged = bcoll.merge('u1')
+        self.assertEqual(['i3', 'i2', 'i1', 'i5', 'i4'], [entry.item for entry in merged.get_results()])
+        self.assertEqual([0, 1, 2, 3, 4], [entry.rank for entry in merged.get_results()])
+        self.assertAlmostEqual(4.25, merged.get_results()[0].score)
+
+        merged = bcoll.merge('u1', ignore_weight=True)
+        self.assertEqual('i3', merged.get_results()[0].item)
+        self.assertAlmostEqual(5.5, merged.get_results()[0].score)
+
+        merged = bcoll.merge('u1', k=2)
+        self.assertEqual(['i3', 'i2'], [entry.item for entry in merged.get_results()])
+
+    def test_merge_missing(self):
+        rl1 = ResultList()
+        rl1.setup([('u1', 'i1', 1.0), ('u1', 'i2', 2.0)])
+        rl2 = ResultList()
+        rl2.setup([('u1', 'i1', 1.0), ('u1', 'i2', 1.0), ('u1', 'i3', 1.0)])
+        bcoll = BallotCollection()
+        bcoll.set_ballot('test1', rl1, 1.0)
+        bcoll.set_ballot('test2', rl2, 1.0)
+
+        # Candidates come from the last ballot; ties keep its order
+        merged = bcoll.merge('u1')
+        self.assertEqual([('i2', 3.0), ('i1', 2.0), ('i3', 1.0)],
+                         [(entry.item, entry.score) for entry in merged.get_results()])
+        merged = bcoll.merge('u1', missing_score=-1.0)
+        self.assertEqual(0.0, merged.get_results()[-1].score)
+
+        # Ties at the cutoff are broken the same way as in the full sort
+        merged = bcoll.merge('u1', k=2, missing_score=2.0)
+        self.assertEqual(['i2', 'i3'], [entry.item for entry in merged.get_results()])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import toml
-from scruf.util.config_util import is_valid_keys, get_value_from_keys, check_key_lists
+import pathlib
+from scruf.util.config_util import is_valid_keys, get_value_from_keys, check_key_lists, get_artifact_path
 
 SAMPLE_TOML = '''
 # Test TOML
@@ -51,6 +52,14 @@ class ConfigUtilTestCase(unittest.TestCase):
         self.assertEqual(get_value_from_keys(['b', 'bar'], config=self.config), 'foo')
         self.assertEqual(get_value_from_keys(['e', 'list'], config=self.config), [1, 2, 3])
 
+    def test_artifact_path(self):
+        config = {'location': {'path': '/work'}, 'output': {'filename': 'runs/history.csv'}}
+        self.assertEqual(pathlib.Path('/work/runs/history_report.json'),
+                         get_artifact_path(['report', 'filename'], config, '_report.json'))
+        config['report'] = {'filename': 'report.json'}
+        self.assertEqual(pathlib.Path('/work/report.json'),
+                         get_artifact_path(['report', 'filename'], config, '_report.json'))
+
     def test_check_paths(self):
         path_specs = [['c', '3', 'value'],
                      ['c', '1', 'value'],
@@ -0,0 +1,36 @@
+import unittest
+import tempfile
+import pathlib
+from scruf.util import CSVRowCache
+
+
+class CSVRowCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / 'data.csv'
+        with open(self.path, 'w') as f:
+            f.write('u1, i1, 1.0\nu1, i2, 0.5\n')
+
+    def tearDown(self):
+        CSVRowCache.disable()
+        self.temp_dir.cleanup()
+
+    def test_read_rows(self):
+        rows = CSVRowCache.read_rows(self.path, skipinitialspace=True)
+        self.assertEqual([['u1', 'i1', '1.0'], ['u1', 'i2', '0.5']], rows)
+        rows = CSVRowCache.read_rows(self.path)
+        self.assertEqual(' i1', rows[0][1])
+        # Not cached when disabled
+        self.assertIsNot(CSVRowCache.read_rows(self.path), rows)
+
+    def test_enabled(self):
+        CSVRowCache.enable()
+        rows = CSVRowCache.read_rows(self.path, skipinitialspace=True)
+        self.assertIs(rows, CSVRowCache.read_rows(self.path, skipinitialspace=True))
+        CSVRowCache.disable()
+        self.assertIsNot(rows, CSVRowCache.read_rows(self.path, skipinitialspace=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import random
+from itertools import combinations
+from scruf.util import FenwickTree, ExposureDistribution
+
+
+def brute_force_gini(counts, num_items):
+    values = list(counts.values()) + [0] * (num_items - len(counts))
+    total = sum(values)
+    pair_diff = sum(abs(x - y) for x, y in combinations(values, 2))
+    return pair_diff / (len(values) * total)
+
+
+class ExposureDistributionTestCase(unittest.TestCase):
+
+    def test_fenwick_tree(self):
+        tree = FenwickTree(4)
+        tree.add(0, 5)
+        tree.add(2)
+        tree.add(3, 2)
+        self.assertEqual(5, tree.prefix(1))
+        self.assertEqual(8, tree.prefix(3))
+        # Grows to fit
+        tree.add(20)
+        self.assertEqual(32, len(tree))
+        self.assertEqual(8, tree.prefix(19))
+        self.assertEqual(9, tree.prefix(100))
+        self.assertEqual(0, tree.prefix(-1))
+
+    def test_gini(self):
+        dist = ExposureDistribution(5)
+        self.assertEqual(0.0, dist.gini())
+        dist.add_items(['a', 'b', 'a', 'c', 'a'])
+        counts = {'a': 3, 'b': 1, 'c': 1}
+        self.assertAlmostEqual(brute_force_gini(counts, 5), dist.gini())
+        self.assertAlmostEqual(dist.gini_from_counts(), dist.gini())
+        self.assertAlmostEqual(0.6, dist.coverage())
+
+        dist.remove_items(['a', 'b'])
+        self.assertEqual(0, dist.count('b'))
+        self.assertAlmostEqual(brute_force_gini({'a': 2, 'c': 1}, 5), dist.gini())
+
+    def test_random_updates(self):
+        rand = random.Random(3)
+        dist = ExposureDistribution(30)
+        added = []
+        for step in range(2000):
+            if added and rand.random() < 0.4:
+                dist.remove(added.pop(rand.randrange(len(added))))
+            else:
+                item = f'i{int(30 * rand.random() ** 3)}'
+                dist.add(item)
+                added.append(item)
+            if step % 100 == 0 and dist.total > 0:
+                self.assertAlmostEqual(brute_force_gini(dist.counts, 30), dist.gini())
+
+    def test_items_beyond_catalog(self):
+        dist = ExposureDistribution(2)
+        dist.add_items(['a', 'b', 'c', 'c'])
+        self.assertEqual(3, dist.num_items)
+        self.assertAlmostEqual(brute_force_gini({'a': 1, 'b': 1, 'c': 2}, 3), dist.gini())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import pathlib
+import subprocess
+import sys
+import unittest
+import scruf
+from scruf.choice import ChoiceMechanismFactory
+from scruf.post import PostProcessorFactory
+
+HEAVY_MODULES = ['pandas', 'whalrus', 'pyarrow', 'jsonlines', 'tqdm', 'icecream', 'asyncio', 'multiprocessing']
+
+
+def loaded_modules(statement):
+    code = f'{statement}; import sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True,
+                            cwd=pathlib.Path(__file__).parents[2]).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class LazyImportTestCase(unittest.TestCase):
+
+    def test_import_scruf(self):
+        self.assertEqual(loaded_modules('import scruf'), [])
+
+    def test_import_on_use(self):
+        self.assertIn('whalrus', loaded_modules("from scruf.choice import WhalrusWrapperScoring"))
+        self.assertIn('pandas', loaded_modules("from scruf.post import DefaultPostProcessor"))
+        self.assertIn('asyncio', loaded_modules("from scruf.runner import RerankService"))
+
+    def test_lazy_factories(self):
+        from scruf.choice import WhalrusWrapperOrdinal
+        from scruf.post import NDCGPostProcessor
+        choice = ChoiceMechanismFactory.create_choice_mechanism('whalrus_ordinal')
+        self.assertEqual(choice.__class__, WhalrusWrapperOrdinal)
+        post = PostProcessorFactory.create_post_processor('ndcg')
+        self.assertEqual(post.__class__, NDCGPostProcessor)
+
+    def test_unknown_attribute(self):
+        with self.assertRaises(AttributeError):
+            scruf.runner.NoSuchRunner
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from scruf.util import PropertyTypeError
+from scruf.agent import FairnessMetricFactory
+from scruf.choice import FARChoiceMechanism
+
+
+class PropertyTypesTestCase(unittest.TestCase):
+
+    def test_convert(self):
+        metric = FairnessMetricFactory.create_fairness_metric('disparate_exposure')
+        metric.setup({'feature': 'Country', 'n_protected': '0.2', 'target': 1})
+        self.assertEqual(metric.n_protected, 0.2)
+        self.assertIsInstance(metric.target, float)
+        self.assertEqual(metric.feature, 'Country')
+        # The properties themselves are unchanged
+        self.assertEqual(metric.get_property('n_protected'), '0.2')
+
+    def test_inherited(self):
+        self.assertEqual(FARChoiceMechanism.property_types(),
+                         {'recommender_weight': float, 'binary': bool})
+        far = FARChoiceMechanism()
+        far.setup({'recommender_weight': 0.5, 'use_allocation_weight': 'false', 'binary': 'True'})
+        self.assertEqual(far.recommender_weight, 0.5)
+        self.assertIs(far.binary, True)
+        far.setup({'recommender_weight': 0.5, 'use_allocation_weight': 'false', 'binary': False})
+        self.assertIs(far.binary, False)
+
+    def test_bad_value(self):
+        metric = FairnessMetricFactory.create_fairness_metric('proportional_item')
+        with self.assertRaises(PropertyTypeError):
+            metric.setup({'feature': 'Country', 'proportion': 'half'})
+        far = FARChoiceMechanism()
+        with self.assertRaises(PropertyTypeError):
+            far.setup({'recommender_weight': 0.5, 'use_allocation_weight': 'false', 'binary': 'yes'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
 from icecream import ic
 
+import random
+import numpy as np
+
 from scruf.util import ResultList
+from scruf.util.result_list import top_k_indices
 
 RESULT_TRIPLES = [('u1', 'i1', '3.5'),
                   ('u1', 'i2', '3.0'),
@@ -50,5 +54,120 @@ class ResultListTestCase(unittest.TestCase):
         self.assertEqual(output.results[0].item, 'i5')
         self.assertEqual(output.results[0].score, 10)
 
+    def test_view(self):
+        rlist = ResultList()
+        rlist.setup(RESULT_TRIPLES)
+        view = rlist.view()
+        # Shared until modified
+        self.assertIs(view.get_results()[0], rlist.get_results()[0])
+        view.trim(2)
+        self.assertEqual(2, view.get_length())
+        self.assertEqual(5, rlist.get_length())
+        # Sorting a sorted list does not copy
+        view.sort()
+        self.assertIs(view.get_results()[0], rlist.get_results()[0])
+
+        view.rescore(lambda result: -result.score)
+        self.assertEqual('i4', view.get_results()[0].item)
+        self.assertEqual('i5', rlist.get_results()[0].item)
+        self.assertEqual(5.0, rlist.get_results()[0].score)
+        self.assertEqual(0, rlist.get_results()[0].rank)
+
+        # The original also copies before it changes anything
+        view2 = rlist.view()
+        rlist.rescore_no_sort(lambda result: 0.0)
+        self.assertEqual(5.0, view2.get_results()[0].score)
+        view2.add_result('u1', 'i6', 1.0)
+        self.assertEqual(6, view2.get_length())
+        self.assertEqual(5, rlist.get_length())
+
+    def test_sort_top_k(self):
+        rand = random.Random(0)
+        # Few distinct scores, so there are many ties
+        triples = [('u1', f'i{i}', rand.randint(0, 5)) for i in range(1000)]
+        full = ResultList()
+        full.setup(triples)
+        for k in [0, 1, 7, 10, 100, 999, 1000, 1200]:
+            partial = ResultList()
+            partial.setup(triples, presorted=True)
+            partial.sort(k=k)
+            kept = min(k, 1000)
+            self.assertEqual([entry.item for entry in full.get_results()[0:kept]],
+                             [entry.item for entry in partial.get_results()[0:kept]])
+            self.assertEqual(list(range(kept)), [entry.rank for entry in partial.get_results()[0:kept]])
+            if 0 < k <= 10:
+                # Partial selection: the tail is not ranked
+                self.assertTrue(all(entry.rank == -1 for entry in partial.get_results()[kept:]))
+            # Sorting the rest later gives the full sort
+            partial.sort()
+            self.assertEqual([entry.item for entry in full.get_results()],
+                             [entry.item for entry in partial.get_results()])
+
+            trimmed = ResultList()
+            trimmed.setup(triples, trim=10)
+            self.assertEqual([entry.item for entry in full.get_results()[0:10]],
+                             [entry.item for entry in trimmed.get_results()])
+
+    def test_item_index(self):
+        rlist = ResultList()
+        rlist.setup(RESULT_TRIPLES)
+        self.assertTrue(rlist.contains_item('i3'))
+        self.assertFalse(rlist.contains_item('i6'))
+        self.assertEqual(2, rlist.position_of('i1'))
+
+        rlist.remove_top()
+        self.assertFalse(rlist.contains_item('i5'))
+        self.assertEqual(1, rlist.position_of('i1'))
+        rlist.add_result('u1', 'i6', 1.0)
+        self.assertEqual(4, rlist.position_of('i6'))
+        rlist.rescore(lambda result: -result.score)
+        self.assertEqual(0, rlist.position_of('i6'))
+        rlist.remove_result('i6')
+        self.assertEqual(-1, rlist.position_of('i6'))
+        rlist.trim(2)
+        self.assertFalse(rlist.contains_item('i1'))
+
+        # Removing from a view does not change the original
+        view = rlist.view()
+        view.remove_top()
+        self.assertEqual(2, rlist.get_length())
+        self.assertTrue(rlist.contains_item('i3'))
+
+    def test_remove_top_view(self):
+        rlist = ResultList()
+        rlist.setup(RESULT_TRIPLES)
+        items = [entry.item for entry in rlist.get_results()]
+        view = rlist.view()
+        view.position_of('i1')
+        # Removing the top moves past the entry without copying the shared list
+        entries = view._entries
+        view.remove_top()
+        view.remove_top()
+        self.assertIs(entries, view._entries)
+        self.assertEqual(items[2], view.get_top().item)
+        self.assertEqual(len(items) - 2, view.get_length())
+        self.assertEqual(0, view.position_of('i1'))
+        self.assertFalse(view.contains_item(items[0]))
+        # The first addition copies the list, later ones add to the copy
+        view.add_result('u1', 'i6', 0.5)
+        entries = view._entries
+        view.add_result('u1', 'i7', 0.25)
+        self.assertIs(entries, view._entries)
+        self.assertEqual(items[2:] + ['i6', 'i7'], [entry.item for entry in view.get_results()])
+        self.assertEqual(3, view.position_of('i6'))
+        self.assertEqual(items, [entry.item for entry in rlist.get_results()])
+        while view.get_length() > 0:
+            view.remove_top()
+        self.assertIsNone(view.get_top())
+        view.remove_top()
+        self.assertEqual([], view.get_results())
+
+    def test_top_k_indices(self):
+        scores = np.array([1.0, 3.0, 2.0, 3.0, 2.0, 1.0])
+        self.assertEqual([1, 3, 2, 4, 0, 5], top_k_indices(scores).tolist())
+        self.assertEqual([1, 3, 2], top_k_indices(scores, 3).tolist())
+        self.assertEqual([1], top_k_indices(scores, 1).tolist())
+        self.assertEqual([], top_k_indices(scores, 0).tolist())
+
 if __name__ == '__main__':
     unittest.main()
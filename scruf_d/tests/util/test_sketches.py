@@ -0,0 +1,80 @@
+import unittest
+import random
+import numpy as np
+from scruf.util import CountMinSketch, HyperLogLog, QuantileSketch, ExposureSketch
+
+
+def exact_gini(values):
+    values = np.sort(np.array(values, dtype=np.float64))
+    n = len(values)
+    index = np.arange(1, n + 1)
+    return float(((2 * index - n - 1) * values).sum() / (n * values.sum()))
+
+
+class SketchTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rand = random.Random(0)
+        # Skewed exposure over a catalog of 5000 items, of which some are never seen
+        self.catalog = 5000
+        self.stream = [f'i{int(rand.paretovariate(1.2)) % self.catalog}' for _ in range(20000)]
+        self.counts = {}
+        for item in self.stream:
+            self.counts[item] = self.counts.get(item, 0) + 1
+
+    def test_count_min(self):
+        sketch = CountMinSketch(epsilon=0.001, delta=0.01)
+        for item in self.stream:
+            sketch.add(item)
+        bound = sketch.epsilon * len(self.stream)
+        for item, count in self.counts.items():
+            estimate = sketch.estimate(item)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate, count + bound)
+        self.assertLessEqual(sketch.estimate('never seen'), bound)
+
+    def test_hyperloglog(self):
+        sketch = HyperLogLog(error=0.02)
+        for item in self.stream:
+            sketch.add(item)
+        distinct = len(self.counts)
+        self.assertLess(abs(sketch.estimate() - distinct) / distinct, 4 * sketch.error)
+
+    def test_windowed_hyperloglog(self):
+        sketch = HyperLogLog(error=0.02, window=2)
+        for step in range(5):
+            for i in range(1000):
+                sketch.add(f's{step}-{i}')
+            sketch.tick()
+        # Only the last two steps are in the window
+        self.assertLess(abs(sketch.estimate() - 2000) / 2000, 4 * sketch.error)
+
+    def test_quantile_sketch(self):
+        sketch = QuantileSketch(alpha=0.01)
+        values = list(self.counts.values())
+        for value in values:
+            sketch.add(value)
+        sketch.add(7)
+        sketch.remove(7)
+        self.assertEqual(len(values), sketch.count)
+        self.assertLess(abs(sketch.max() - max(values)) / max(values), 0.011)
+        self.assertLess(abs(sketch.quantile(0.5) - np.median(values)) / np.median(values), 0.011)
+        zeros = self.catalog - len(values)
+        self.assertAlmostEqual(exact_gini(values + [0] * zeros), sketch.gini(zeros), 2)
+        self.assertEqual(0.0, sketch.min(zeros))
+
+    def test_exposure_sketch(self):
+        sketch = ExposureSketch(self.catalog, epsilon=0.0005, delta=0.01, hll_error=0.02, alpha=0.01,
+                                sample_rate=1.0)
+        for start in range(0, len(self.stream), 10):
+            sketch.add_items(self.stream[start:start + 10])
+        summary = sketch.summary()
+        exact = list(self.counts.values()) + [0] * (self.catalog - len(self.counts))
+        self.assertLess(abs(summary['coverage'] - len(self.counts) / self.catalog), 0.05)
+        self.assertAlmostEqual(exact_gini(exact), summary['gini'], 2)
+        self.assertEqual(len(self.stream), summary['total'])
+        self.assertEqual(max(self.counts.values()), summary['max'])
+
+
+if __name__ == '__main__':
+    unittest.main()